@@ -99,6 +99,32 @@ DATABASES = {
     }
 }
 
+# Banco do Protheus (opcional, só leitura): origem do comando `importar_sra_banco`
+if config("PROTHEUS_DB_NAME", default=""):
+    DATABASES["protheus"] = {
+        "ENGINE": config("PROTHEUS_DB_ENGINE", default="django.db.backends.postgresql"),
+        "NAME": config("PROTHEUS_DB_NAME"),
+        "USER": config("PROTHEUS_DB_USER", default=""),
+        "PASSWORD": config("PROTHEUS_DB_PASSWORD", default=""),
+        "HOST": config("PROTHEUS_DB_HOST", default=""),
+        "PORT": config("PROTHEUS_DB_PORT", default=""),
+    }
+PROTHEUS_SRA_TABELA = config("PROTHEUS_SRA_TABELA", default="SRA010")
+# Colunas da tabela de origem cujo nome não é o atributo em maiúsculas (ex: ra_mat -> RA_MAT),
+# e as colunas de Cargo/Setor/usuário, que não existem na SRA (views/joins do Protheus), ex:
+# {"ra_data_admis": "RA_ADMISSA", "cargo": "RJ_DESC", "setor_primario": "QB_DESCRIC"}
+PROTHEUS_SRA_COLUNAS = {}
+
+# Cache (diretório de aprovadores, painéis). Em produção com vários workers o cache
+# PRECISA ser compartilhado, ex: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# (o LocMem só serve para um processo; `check --deploy` avisa, ver hierarquia/checks.py)
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default="hierarquia"),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -133,6 +159,29 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Métricas das importações (hierarquia/metricas.py): relatórios JSON e pico de memória
+IMPORTACAO_METRICAS_PASTA = os.path.join(BASE_DIR, 'relatorios_importacao')
+IMPORTACAO_METRICAS_MEMORIA = config("IMPORTACAO_METRICAS_MEMORIA", default=False, cast=bool)
+
+# Notificações de aprovação (hierarquia/notificacoes.py, comando despachar_notificacoes).
+# O e-mail vai por padrão para um SMTP local de testes: python -m aiosmtpd -n -l localhost:1025
+EMAIL_HOST = config("EMAIL_HOST", default="localhost")
+EMAIL_PORT = config("EMAIL_PORT", default=1025, cast=int)
+EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
+EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
+EMAIL_USE_TLS = config("EMAIL_USE_TLS", default=False, cast=bool)
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="rh@localhost")
+NOTIFICACOES_NOTIFICADORES = [
+    'hierarquia.notificacoes.NotificadorInApp',
+    'hierarquia.notificacoes.NotificadorEmail',
+    'hierarquia.notificacoes.NotificadorWebhook',
+]
+NOTIFICACOES_WEBHOOK_URL = config("NOTIFICACOES_WEBHOOK_URL", default="")
+# Prefixo dos links (ex: https://rh.empresa.com.br); vazio = links relativos
+NOTIFICACOES_URL_BASE = config("NOTIFICACOES_URL_BASE", default="")
+NOTIFICACOES_MAX_TENTATIVAS = config("NOTIFICACOES_MAX_TENTATIVAS", default=5, cast=int)
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -1,33 +1,83 @@
-from django.contrib import admin
+import os
+import time
+from functools import lru_cache
+
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
 from import_export.admin import ImportExportModelAdmin
 from import_export import resources, fields
 from import_export.widgets import ForeignKeyWidget, ManyToManyWidget
 from django.contrib.auth.models import User
-from .resources import FuncionarioResource
+from .exportacao import exportar_csv, exportar_xlsx
+from .resources import FuncionarioResource, MetricasResourceMixin
+from .importacao import importar_arquivo
+from .tarefas import enfileirar
 # --- Importação dos Modelos ---
 from .models import (
     Cargo, Setor, CentroServico, Vaga, 
-    RequisicaoPessoal, MovimentacaoPessoal, RequisicaoDesligamento
+    RequisicaoPessoal, MovimentacaoPessoal, RequisicaoDesligamento, ControleSincronizacao,
+    ImportacaoArquivo, LoteImportacao, TarefaSegundoPlano, EventoNotificacao,
     )
 from .models_funcionario import Funcionario 
 
 
+# --- Métricas do import do django-import-export (hierarquia/metricas.py) ---
+@lru_cache(maxsize=None)
+def _formato_medido(formato):
+    """ Subclasse do formato de importação que mede a decodificação do arquivo. """
+    class FormatoMedido(formato):
+        def create_dataset(self, *args, **kwargs):
+            inicio = time.perf_counter()
+            dataset = super().create_dataset(*args, **kwargs)
+            dataset.segundos_leitura = time.perf_counter() - inicio
+            return dataset
+    FormatoMedido.__name__ = FormatoMedido.__qualname__ = formato.__name__
+    return FormatoMedido
+
+
+def mensagem_metricas(request, metricas):
+    if metricas is None:
+        return
+    texto = f"Desempenho: {metricas.resumo()}."
+    if metricas.caminho_relatorio:
+        texto += f" Relatório: {metricas.caminho_relatorio}"
+    messages.info(request, texto)
+
+
+class MetricasImportacaoAdminMixin:
+    """ Mostra as métricas na prévia e no resultado do Importar (o Resource usa MetricasResourceMixin). """
+    import_template_name = 'admin/hierarquia/import_metricas.html'
+
+    def get_import_formats(self):
+        return [_formato_medido(formato) for formato in super().get_import_formats()]
+
+    def add_success_message(self, result, request):
+        super().add_success_message(result, request)
+        mensagem_metricas(request, getattr(result, 'metricas', None))
+
+
 # --- Resources para Cargo e Setor (sem mudanças) ---
-class CargoResource(resources.ModelResource):
+class CargoResource(MetricasResourceMixin, resources.ModelResource):
     class Meta: 
         model = Cargo; fields = ('id', 'nome', 'nivel', 'descricao',); export_order = fields
         import_id_fields = ['nome']; skip_unchanged = True; report_skipped = True
 @admin.register(Cargo)
-class CargoAdmin(ImportExportModelAdmin): 
+class CargoAdmin(MetricasImportacaoAdminMixin, ImportExportModelAdmin): 
     resource_class = CargoResource; list_display = ('nome', 'nivel', 'descricao')
     search_fields = ('nome', 'descricao'); list_filter = ('nivel',)
 
-class SetorResource(resources.ModelResource):
+class SetorResource(MetricasResourceMixin, resources.ModelResource):
     class Meta: 
         model = Setor; fields = ('id', 'nome', 'descricao',); export_order = fields
         import_id_fields = ['nome']; skip_unchanged = True; report_skipped = True
 @admin.register(Setor)
-class SetorAdmin(ImportExportModelAdmin): 
+class SetorAdmin(MetricasImportacaoAdminMixin, ImportExportModelAdmin): 
     resource_class = SetorResource; list_display = ('nome', 'descricao'); search_fields = ('nome',)
 
 
@@ -35,11 +85,32 @@ class SetorAdmin(ImportExportModelAdmin):
 # Pega a lista de campos do Protheus (como você já fez)
 protheus_fields = [f.name for f in Funcionario._meta.fields if f.name.startswith('ra_')]
 
+class ImportacaoEmMassaForm(forms.Form):
+    MODO_CHOICES = [
+        ('massa', 'Em massa (bulk_create/bulk_update, sem save() por linha)'),
+        ('linha', 'Linha a linha, em lotes (save() completo de cada funcionário)'),
+    ]
+    arquivo = forms.FileField(label='Planilha SRA (.csv ou .xlsx)')
+    modo = forms.ChoiceField(label='Modo', choices=MODO_CHOICES, initial='massa')
+    reiniciar = forms.BooleanField(label='Importar do início (ignorar o ponto de retomada deste arquivo)',
+                                   required=False)
+    segundo_plano = forms.BooleanField(label='Executar em segundo plano (acompanhe o progresso na tarefa criada)',
+                                       required=False, initial=True)
+
+
+EXPORTADORES = {'csv': exportar_csv, 'xlsx': exportar_xlsx}
+
+# Quantos erros de linha são mostrados como mensagem após a importação em massa
+MAX_ERROS_EXIBIDOS = 20
+
+
 # --- ADMIN DO FUNCIONÁRIO (COM MELHORIAS) ---
 @admin.register(Funcionario)
-class FuncionarioAdmin(ImportExportModelAdmin):
+class FuncionarioAdmin(MetricasImportacaoAdminMixin, ImportExportModelAdmin):
     # Usa o Resource completo do 'resources.py'
     resource_class = FuncionarioResource
+    # Base da change list: o import-export acrescenta Importar/Exportar por cima dela
+    change_list_template = 'admin/hierarquia/funcionario/change_list.html'
     
     # Configuração da lista (sem mudança)
     list_display = ('ra_mat', 'ra_nome', 'ra_filial', 'cargo', 'setor_primario','ra_centro_custo', 'ativo')
@@ -76,8 +147,118 @@ class FuncionarioAdmin(ImportExportModelAdmin):
     # --- MELHORIA 4: Lista de readonly_fields atualizada ---
     # Adicionamos o 'salario_bruto_calculado' para que não seja editável
     readonly_fields = ['salario_bruto_calculado'] + protheus_fields
+
+    def get_queryset(self, request):
+        # O manager padrão adia as colunas SRA: a change list só carrega as do list_display
+        return super().get_queryset(request).com_protheus('ra_filial', 'ra_centro_custo')
+
+    def get_object(self, request, object_id, from_field=None):
+        # O formulário de edição exibe todas as colunas SRA: carrega a linha completa
+        queryset = self.get_queryset(request).com_protheus()
+        field = self.model._meta.pk if from_field is None else self.model._meta.get_field(from_field)
+        try:
+            return queryset.get(**{field.name: field.to_python(object_id)})
+        except (self.model.DoesNotExist, ValidationError, ValueError):
+            return None
+
+    def get_export_queryset(self, request):
+        # Exportação padrão do import-export: o resource lê todas as colunas SRA
+        return super().get_export_queryset(request).com_protheus()
+
+    # --- Importação em massa (hierarquia/importacao) ---
+    def get_urls(self):
+        urls = [
+            path('importar-em-massa/', self.admin_site.admin_view(self.importar_em_massa),
+                 name='hierarquia_funcionario_importar_em_massa'),
+            path('exportar-sra/<str:formato>/', self.admin_site.admin_view(self.exportar_sra),
+                 name='hierarquia_funcionario_exportar_sra'),
+            path('exportar-sra/<str:formato>/segundo-plano/',
+                 self.admin_site.admin_view(self.exportar_sra_segundo_plano),
+                 name='hierarquia_funcionario_exportar_sra_segundo_plano'),
+        ]
+        return urls + super().get_urls()
+
+    # --- Exportação em streaming (hierarquia/exportacao.py) ---
+    actions = ['exportar_sra_csv', 'exportar_sra_xlsx', 'exportar_sra_xlsx_segundo_plano']
+
+    def exportar_sra(self, request, formato):
+        """ Exporta a lista filtrada (mesmos filtros/busca da change list) sem montar o Dataset. """
+        if not self.has_export_permission(request) or formato not in EXPORTADORES:
+            raise PermissionDenied
+        queryset = self.get_changelist_instance(request).get_queryset(request)
+        return EXPORTADORES[formato](queryset)
+
+    def exportar_sra_segundo_plano(self, request, formato):
+        """ Como exportar_sra, mas gera o arquivo no worker (tarefas.py). """
+        if not self.has_export_permission(request) or formato not in EXPORTADORES:
+            raise PermissionDenied
+        queryset = self.get_changelist_instance(request).get_queryset(request)
+        return self._exportar_em_segundo_plano(request, queryset, formato)
+
+    def _exportar_em_segundo_plano(self, request, queryset, formato):
+        # Os ids fixam o conjunto filtrado no momento do pedido
+        tarefa = enfileirar(TarefaSegundoPlano.TIPO_EXPORTAR_SRA, request.user, formato=formato,
+                            ids=list(queryset.order_by('pk').values_list('pk', flat=True)))
+        return self._redirecionar_para_tarefa(request, tarefa)
+
+    def _redirecionar_para_tarefa(self, request, tarefa):
+        messages.info(request, f"{tarefa} enviada para a fila. Ela é executada pelo comando processar_tarefas.")
+        return redirect('admin:hierarquia_tarefasegundoplano_change', tarefa.pk)
+
+    @admin.action(description='Exportar SRA (XLSX) dos selecionados em segundo plano')
+    def exportar_sra_xlsx_segundo_plano(self, request, queryset):
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+        return self._exportar_em_segundo_plano(request, queryset, 'xlsx')
+
+    @admin.action(description='Exportar SRA (CSV) dos selecionados')
+    def exportar_sra_csv(self, request, queryset):
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+        return exportar_csv(queryset)
+
+    @admin.action(description='Exportar SRA (XLSX) dos selecionados')
+    def exportar_sra_xlsx(self, request, queryset):
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+        return exportar_xlsx(queryset)
+
+    def importar_em_massa(self, request):
+        """ Importa a SRA com bulk_create/bulk_update, sem o save() de cada linha. """
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+
+        form = ImportacaoEmMassaForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            arquivo = form.cleaned_data['arquivo']
+            if form.cleaned_data['segundo_plano']:
+                tarefa = enfileirar(TarefaSegundoPlano.TIPO_IMPORTAR_SRA, request.user, arquivo,
+                                    modo=form.cleaned_data['modo'], reiniciar=form.cleaned_data['reiniciar'])
+                return self._redirecionar_para_tarefa(request, tarefa)
+            # Nos dois modos a planilha é lida em streaming (nunca fica inteira na memória)
+            _, resultado = importar_arquivo(arquivo, nome=arquivo.name, modo=form.cleaned_data['modo'],
+                                            reiniciar=form.cleaned_data['reiniciar'])
+            if resultado.retomada_de:
+                messages.info(request, f"Importação retomada após a linha {resultado.retomada_de}.")
+            for linha, mensagem in resultado.erros[:MAX_ERROS_EXIBIDOS]:
+                messages.warning(request, f"Linha {linha}: {mensagem}")
+            if len(resultado.erros) > MAX_ERROS_EXIBIDOS:
+                messages.warning(request, f"... e mais {len(resultado.erros) - MAX_ERROS_EXIBIDOS} linhas com erro.")
+            for mensagem in resultado.relatorio_nao_encontrados():
+                messages.warning(request, mensagem)
+            messages.success(request, f"Importação concluída: {resultado.resumo()}.")
+            mensagem_metricas(request, resultado.metricas)
+            return redirect('admin:hierarquia_funcionario_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Importação em massa (SRA)',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/hierarquia/funcionario/importar_em_massa.html', context)
 # --- Admin para outros modelos ---
-class CentroServicoResource(resources.ModelResource):
+class CentroServicoResource(MetricasResourceMixin, resources.ModelResource):
     """
     Ensina o django-import-export a importar/exportar CentroServico.
     """
@@ -105,7 +286,7 @@ class CentroServicoResource(resources.ModelResource):
 
 # --- ✅ ADMIN DO CENTROSERVICO ATUALIZADO ---
 @admin.register(CentroServico)
-class CentroServicoAdmin(ImportExportModelAdmin): # 1. Mudei para ImportExportModelAdmin
+class CentroServicoAdmin(MetricasImportacaoAdminMixin, ImportExportModelAdmin): # 1. Mudei para ImportExportModelAdmin
     resource_class = CentroServicoResource      # 2. Adicionei esta linha
     
     # Suas configurações originais (sem mudança)
@@ -144,4 +325,126 @@ class RequisicaoDesligamentoAdmin(admin.ModelAdmin):
     list_display = ('id', 'funcionario_desligado', 'solicitante', 'setor_atual', 'tipo_desligamento', 'status')
     list_filter = ('status', 'tipo_desligamento', 'setor_atual')
     search_fields = ('funcionario_desligado__ra_nome', 'solicitante__ra_nome')
-    raw_id_fields = ('solicitante', 'funcionario_desligado', 'cargo_atual', 'setor_atual', 'aprovador_atual', 'aprovado_por_gestor', 'aprovado_por_rh', 'rejeitado_por')
\ No newline at end of file
+    raw_id_fields = ('solicitante', 'funcionario_desligado', 'cargo_atual', 'setor_atual', 'aprovador_atual', 'aprovado_por_gestor', 'aprovado_por_rh', 'rejeitado_por')
+
+
+@admin.register(ControleSincronizacao)
+class ControleSincronizacaoAdmin(admin.ModelAdmin):
+    # Limpar `ultima_marca` faz a próxima carga delta aplicar todas as linhas;
+    # limpar `linhas_pendentes` desiste de tentar de novo as linhas com erro
+    list_display = ('origem', 'tipo_marca', 'ultima_marca', 'total_pendentes', 'ultima_execucao', 'resumo')
+    readonly_fields = ('ultima_execucao', 'resumo')
+
+    @admin.display(description='Linhas pendentes')
+    def total_pendentes(self, obj):
+        return len(obj.linhas_pendentes)
+
+
+class LoteImportacaoInline(admin.TabularInline):
+    model = LoteImportacao
+    extra = 0
+    can_delete = False
+    fields = ('linha_inicial', 'linha_final', 'criados', 'atualizados', 'inalterados', 'ignorados', 'erros',
+              'gravado_em')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ImportacaoArquivo)
+class ImportacaoArquivoAdmin(admin.ModelAdmin):
+    list_display = ('nome_arquivo', 'modo', 'status', 'ultima_linha', 'iniciada_em', 'concluida_em', 'resumo')
+    list_filter = ('status', 'modo')
+    readonly_fields = ('hash_arquivo', 'nome_arquivo', 'modo', 'ultima_linha', 'iniciada_em', 'atualizada_em',
+                       'concluida_em', 'resumo')
+    inlines = [LoteImportacaoInline]
+
+
+@admin.register(TarefaSegundoPlano)
+class TarefaSegundoPlanoAdmin(admin.ModelAdmin):
+    """ Acompanhamento das tarefas em segundo plano: a página da tarefa consulta o progresso em JSON. """
+    list_display = ('__str__', 'nome_arquivo', 'status', 'processadas', 'total', 'criado_por', 'criada_em',
+                    'concluida_em')
+    list_filter = ('tipo', 'status')
+    fields = ('tipo', 'status', 'nome_arquivo', 'parametros_exibidos', 'processadas', 'total', 'resumo', 'erro',
+              'worker', 'criado_por', 'criada_em', 'iniciada_em', 'concluida_em')
+    readonly_fields = fields
+    change_form_template = 'admin/hierarquia/tarefasegundoplano/change_form.html'
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related('criado_por')
+        # Cada um vê as próprias tarefas; o superusuário vê todas
+        return queryset if request.user.is_superuser else queryset.filter(criado_por=request.user)
+
+    @admin.display(description='Parâmetros')
+    def parametros_exibidos(self, obj):
+        parametros = dict(obj.parametros)
+        if 'ids' in parametros:
+            parametros['ids'] = f"{len(parametros['ids'])} funcionários"
+        return ', '.join(f"{chave}: {valor}" for chave, valor in parametros.items()) or '-'
+
+    def has_view_permission(self, request, obj=None):
+        # Quem enviou uma importação/exportação acompanha a própria tarefa (o queryset já filtra)
+        return request.user.is_active and request.user.is_staff
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path('<int:pk>/progresso/', self.admin_site.admin_view(self.progresso),
+                 name='hierarquia_tarefasegundoplano_progresso'),
+            path('<int:pk>/resultado/', self.admin_site.admin_view(self.resultado),
+                 name='hierarquia_tarefasegundoplano_resultado'),
+        ]
+        return urls + super().get_urls()
+
+    def _tarefa(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        return get_object_or_404(self.get_queryset(request), pk=pk)
+
+    def progresso(self, request, pk):
+        """ {status, processadas, total, percentual, segundos_restantes, ...} para a barra de progresso. """
+        tarefa = self._tarefa(request, pk)
+        dados = tarefa.como_dict()
+        if tarefa.arquivo_resultado:
+            dados['url_resultado'] = reverse('admin:hierarquia_tarefasegundoplano_resultado', args=[tarefa.pk])
+        return JsonResponse(dados)
+
+    def resultado(self, request, pk):
+        """ Arquivo gerado (exportação ou relatório de erros da importação). """
+        tarefa = self._tarefa(request, pk)
+        if not tarefa.arquivo_resultado:
+            raise Http404('Tarefa sem arquivo de resultado.')
+        return FileResponse(tarefa.arquivo_resultado.open('rb'), as_attachment=True,
+                            filename=os.path.basename(tarefa.arquivo_resultado.name))
+
+
+@admin.register(EventoNotificacao)
+class EventoNotificacaoAdmin(admin.ModelAdmin):
+    """ Outbox das notificações (notificacoes.py): acompanhamento e reenvio das que falharam. """
+    list_display = ('tipo', 'objeto_id', 'evento', 'destinatario', 'status', 'tentativas', 'canais_entregues',
+                    'criado_em', 'enviado_em')
+    list_filter = ('status', 'tipo', 'evento')
+    list_select_related = ('destinatario',)
+    readonly_fields = ('tipo', 'objeto_id', 'evento', 'destinatario', 'status', 'canais_entregues', 'tentativas',
+                       'proxima_tentativa', 'erro', 'worker', 'criado_em', 'reservado_em', 'enviado_em')
+    actions = ['reenviar']
+
+    @admin.action(description='Reenviar os que falharam')
+    def reenviar(self, request, queryset):
+        reenviados = queryset.filter(status=EventoNotificacao.STATUS_FALHOU) \
+                             .update(status=EventoNotificacao.STATUS_PENDENTE, tentativas=0, erro='',
+                                     proxima_tentativa=timezone.now())
+        self.message_user(request, f'{reenviados} evento(s) de volta à fila.', messages.SUCCESS)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
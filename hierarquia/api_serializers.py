@@ -3,8 +3,10 @@
 from rest_framework import serializers
 from .models import (
     Funcionario, Vaga, Cargo, Setor, 
-    RequisicaoPessoal, RequisicaoDesligamento, MovimentacaoPessoal
+    RequisicaoPessoal, RequisicaoDesligamento, MovimentacaoPessoal, Notificacao
 )
+from .aprovacao_lote import LIMITE_LOTE
+from .protheus import formatar_data
 
 # --- Serializers Auxiliares (para mostrar nomes) ---
 
@@ -59,12 +61,13 @@ class FuncionarioDetailSerializer(serializers.ModelSerializer):
     def get_centro_servico_nome(self, obj):
         # Tenta acessar obj.centro_servico.nome. Se obj.centro_servico for nulo, retorna 'N/A'.
         return getattr(getattr(obj, 'centro_servico', None), 'nome', 'N/A')
+
+    def get_ra_dt_admissao_formatada(self, obj):
+        # Data tipada (Funcionario.data_admissao), já normalizada no save()
+        return formatar_data(obj.data_admissao)
     
     # Garantindo que campos de propriedade (como os formatados) também sejam seguros
-    ra_dt_admissao_formatada = serializers.CharField(
-        read_only=True, 
-        default='N/A'
-    )
+    ra_dt_admissao_formatada = serializers.SerializerMethodField(read_only=True)
     ra_cpf_formatado = serializers.CharField(
         read_only=True, 
         default='N/A'
@@ -89,6 +92,36 @@ class RejeitarSerializer(serializers.Serializer):
     """
     observacao = serializers.CharField(write_only=True, required=True, style={'base_template': 'textarea.html'})
 
+
+class AcaoEmLoteSerializer(serializers.Serializer):
+    """
+    Corpo de bulk-aprovar: os ids das requisições (ver aprovacao_lote.py).
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False,
+                                max_length=LIMITE_LOTE)
+
+
+class RejeitarEmLoteSerializer(AcaoEmLoteSerializer):
+    """
+    Corpo de bulk-rejeitar: os ids e uma observação única para todas.
+    """
+    observacao = serializers.CharField(write_only=True, required=True, style={'base_template': 'textarea.html'})
+
+# --- Notificações in-app (notificacoes.py) ---
+
+class NotificacaoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notificacao
+        fields = ['id', 'titulo', 'mensagem', 'link', 'lida', 'criada_em']
+
+
+class MarcarLidasSerializer(serializers.Serializer):
+    """
+    Corpo de marcar-lidas: os ids das notificações (vazio = todas).
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False,
+                                max_length=LIMITE_LOTE)
+
 # --- Serializers de Requisição Pessoal (RP) ---
 
 class RequisicaoPessoalSerializer(serializers.ModelSerializer):
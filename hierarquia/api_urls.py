@@ -10,9 +10,11 @@ from .api_views import (
     RequisicaoPessoalViewSet,
     RequisicaoDesligamentoViewSet,
     MovimentacaoPessoalViewSet,
+    NotificacaoViewSet,
     get_dashboard_data,
     get_setores_summary
 )
+from .eventos_pendencias import stream_pendencias
 
 # O Router cuida de tudo
 router = DefaultRouter()
@@ -21,12 +23,15 @@ router.register(r'vagas', VagaViewSet, basename='vaga')
 router.register(r'requisicoes-pessoal', RequisicaoPessoalViewSet, basename='requisicao-pessoal')
 router.register(r'requisicoes-desligamento', RequisicaoDesligamentoViewSet, basename='requisicao-desligamento')
 router.register(r'movimentacoes-pessoal', MovimentacaoPessoalViewSet, basename='movimentacao-pessoal')
+router.register(r'notificacoes', NotificacaoViewSet, basename='notificacao')
 
 
 urlpatterns = [
     # Endpoint do Dashboard
     path('dashboard-data/', get_dashboard_data, name='api-dashboard-data'),
     path('setores-summary/', get_setores_summary, name='api-setores-summary'),
+    # Stream (SSE) da caixa de entrada: precisa de servidor ASGI
+    path('pendencias/stream/', stream_pendencias, name='api-pendencias-stream'),
     # Endpoints do Router (que incluem /aprovar/ e /rejeitar/ via @action)
     path('', include(router.urls)),
 ]
@@ -34,6 +39,7 @@ urlpatterns = [
 # URLs CRIADAS AUTOMATICAMENTE:
 #
 # GET /api/dashboard-data/
+# GET /api/pendencias/stream/       (text/event-stream)
 #
 # GET /api/vagas/
 #
@@ -53,4 +59,7 @@ urlpatterns = [
 # GET, POST /api/movimentacoes-pessoal/
 # GET /api/movimentacoes-pessoal/<id>/
 # POST /api/movimentacoes-pessoal/<id>/aprovar/
-# POST /api/movimentacoes-pessoal/<id>/rejeitar/
\ No newline at end of file
+# POST /api/movimentacoes-pessoal/<id>/rejeitar/
+#
+# GET /api/notificacoes/            (?nao_lidas=1)
+# POST /api/notificacoes/marcar-lidas/
@@ -17,14 +17,19 @@ from rest_framework.decorators import action
 # Importe TODOS os modelos e serializers que vamos usar
 from .models import (
     Funcionario, Vaga, Setor, Cargo,
-    RequisicaoPessoal, RequisicaoDesligamento, MovimentacaoPessoal
+    RequisicaoPessoal, RequisicaoDesligamento, MovimentacaoPessoal, PendenciaAprovacao, Notificacao
 )
+from .aprovacao_lote import aprovar_em_lote, rejeitar_em_lote
+from .models_pendencias import STATUS_PENDENTES
+from .dashboard import montar_dashboard_api, painel_em_cache
+from .protheus import formatar_data
 from .api_serializers import (
     FuncionarioSerializer, FuncionarioDetailSerializer,
-    VagaSerializer, RejeitarSerializer,
+    VagaSerializer, RejeitarSerializer, AcaoEmLoteSerializer, RejeitarEmLoteSerializer,
     RequisicaoPessoalSerializer, RequisicaoPessoalDetailSerializer, RequisicaoPessoalCreateSerializer,
     RequisicaoDesligamentoSerializer, RequisicaoDesligamentoDetailSerializer, RequisicaoDesligamentoCreateSerializer,
-    MovimentacaoPessoalSerializer, MovimentacaoPessoalDetailSerializer, MovimentacaoPessoalCreateSerializer
+    MovimentacaoPessoalSerializer, MovimentacaoPessoalDetailSerializer, MovimentacaoPessoalCreateSerializer,
+    NotificacaoSerializer, MarcarLidasSerializer
 )
 
 from django.db.models import Q, Count # <--- ADICIONE COUNT
@@ -47,107 +52,22 @@ def get_dashboard_data(request):
     Endpoint único para carregar todos os dados do dashboard do app Flutter.
     """
     funcionario = _get_funcionario_logado(request)
+    data = painel_em_cache('api', funcionario, lambda: _calcular_dashboard_data(funcionario))
+    return Response(data)
+
 
+def _calcular_dashboard_data(funcionario):
     # 1. Perfil
     perfil = {
         'nome': funcionario.ra_nome,
         'cargo': funcionario.cargo.nome if funcionario.cargo else "N/A",
         'setor': funcionario.setor_primario.nome if funcionario.setor_primario else "N/A",
         
-        # --- CORREÇÃO ESTÁ AQUI ---
-        # Corrigido o erro de digitação de 'ra_data_admissao' para 'ra_dt_admissao'
-        # e 'ra_data_admissao_formatada' para 'ra_dt_admissao_formatada'
-        'data_admissao': (
-            funcionario.ra_dt_admissao_formatada 
-            if hasattr(funcionario, 'ra_dt_admissao_formatada') 
-            else (
-                funcionario.ra_dt_admissao.strftime('%d/%m/%Y') 
-                if hasattr(funcionario, 'ra_dt_admissao') and funcionario.ra_dt_admissao 
-                else 'N/A'
-            )
-        )
+        'data_admissao': formatar_data(funcionario.data_admissao),
     }
 
-    # 2. Card: Total de Funcionários
-    total_funcionarios = funcionario.obter_subordinados(incluir_responsaveis=True).count()
-    if funcionario.cargo.nivel == 1:
-        total_funcionarios = Funcionario.objects.filter(ativo=True).count()
-    
-    # 3. Card: Vagas Abertas
-    vagas_abertas_count = Vaga.objects.filter(status='aberta').count()
-
-    # (Definindo os status "finalizados" que NÃO contam como pendência)
-    status_finalizados = ['aprovada', 'rejeitada', 'cancelada'] 
-
-    # 4. Card: Pendências (RPs, RDs, MPs aguardando aprovação DESTE usuário)
-    pendencias_rp = RequisicaoPessoal.objects.filter(aprovador_atual=funcionario).exclude(status__in=status_finalizados).count()
-    pendencias_rd = RequisicaoDesligamento.objects.filter(aprovador_atual=funcionario).exclude(status__in=status_finalizados).count()
-    pendencias_mp_q = (
-        Q(status='pendente_gestor_atual', aprovador_gestor_atual=funcionario) |
-        Q(status='pendente_gestor_proposto', aprovador_gestor_proposto=funcionario) |
-        Q(status='pendente_rh', aprovador_rh=funcionario)
-        # (Adicione outros status pendentes de MP se houver)
-    )
-    pendencias_mp = MovimentacaoPessoal.objects.filter(pendencias_mp_q).count()
-    
-    minhas_pendencias_count = pendencias_rp + pendencias_rd + pendencias_mp
-    # 5. Card: Setor
-    meu_setor_nome = perfil['setor']
-    meu_setor_count = "N/A"
-    if funcionario.setor_primario:
-         meu_setor_count = Funcionario.objects.filter(setor_primario=funcionario.setor_primario, ativo=True).count()
-
-
-    # 6. Gráfico: Status (Apenas RPs, RDs e MPs SOLICITADAS pelo usuário)
-    
-    # Contagens de RP
-    rp_counts = RequisicaoPessoal.objects.filter(solicitante=funcionario) \
-        .values('status').annotate(count=Count('id'))
-        
-    # Contagens de RD
-    rd_counts = RequisicaoDesligamento.objects.filter(solicitante=funcionario) \
-        .values('status').annotate(count=Count('id'))
-        
-    # Contagens de MP
-    mp_counts = MovimentacaoPessoal.objects.filter(solicitante=funcionario) \
-        .values('status').annotate(count=Count('id'))
-
-    # Combina os resultados
-    status_counts = {}
-    for item in list(rp_counts) + list(rd_counts) + list(mp_counts):
-        status_key = item['status']
-        status_counts[status_key] = status_counts.get(status_key, 0) + item['count']
-
-    # Separa em 'pendente', 'aprovada', 'rejeitada'
-    chart_data_map = {'pendente': 0, 'aprovada': 0, 'rejeitada': 0}
-    for status, count in status_counts.items():
-        if status == 'aprovada':
-            chart_data_map['aprovada'] += count
-        elif status == 'rejeitada':
-            chart_data_map['rejeitada'] += count
-        elif status not in status_finalizados: # Qualquer outra coisa não finalizada é pendente
-             chart_data_map['pendente'] += count
-
-    # Compila a resposta final
-    data = {
-        'perfil': perfil,
-        'cards': {
-            'total_funcionarios': total_funcionarios,
-            'vagas_abertas_count': vagas_abertas_count, 
-            'minhas_pendencias_count': minhas_pendencias_count,
-            'setores_titulo_card': f"Funcionários em {meu_setor_nome}",
-            'setores_valor_card': str(meu_setor_count)
-        },
-        'chart_data': {
-            'labels': ['Pendente', 'Aprovada', 'Rejeitada'],
-            'data': [
-                chart_data_map['pendente'],
-                chart_data_map['aprovada'],
-                chart_data_map['rejeitada']
-            ]
-        }
-    }
-    return Response(data)
+    # 2. Cards e Gráfico (agregações em hierarquia/dashboard.py)
+    return {'perfil': perfil, **montar_dashboard_api(funcionario)}
 
 @api_view(['GET'])
 @authentication_classes([TokenAuthentication])
@@ -270,6 +190,36 @@ class FuncionarioViewSet(viewsets.ReadOnlyModelViewSet):
 
 # ... (resto do arquivo api_views.py)
 
+class NotificacaoViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Notificações in-app do usuário logado (entregues por despachar_notificacoes).
+    ?nao_lidas=1 filtra as não lidas.
+    """
+    serializer_class = NotificacaoSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def get_queryset(self):
+        queryset = Notificacao.objects.filter(destinatario=_get_funcionario_logado(self.request))
+        if self.request.query_params.get('nao_lidas'):
+            queryset = queryset.filter(lida=False)
+        return queryset
+
+    @action(detail=False, methods=['POST'], url_path='marcar-lidas')
+    def marcar_lidas(self, request):
+        """ POST {"ids": [...]} marca essas notificações como lidas; sem ids, todas. """
+        serializer = MarcarLidasSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queryset = self.get_queryset().filter(lida=False)
+        if serializer.validated_data.get('ids'):
+            queryset = queryset.filter(pk__in=serializer.validated_data['ids'])
+        return Response({'marcadas': queryset.update(lida=True)}, status=status.HTTP_200_OK)
+
+    def get_serializer_class(self):
+        if self.action == 'marcar_lidas':
+            return MarcarLidasSerializer
+        return NotificacaoSerializer
+
 # --- ViewSet Base para Requisições ---
 # (Cria lógica comum para RP, RD, MP)
 
@@ -296,20 +246,10 @@ class BaseRequisicaoViewSet(viewsets.ModelViewSet):
         # --- Lógica de Filtragem (Baseada no status_filter do Flutter) ---
 
         if status_filter == 'aprovador':
-            # Filtro: Requisições onde o usuário é o aprovador atual (pendentes de aprovação)
-            
-            # Movimentação Pessoal (MP) é especial, pois tem múltiplos aprovadores
-            if self.basename == 'movimentacao-pessoal':
-                q_aprovador = (
-                    Q(status='pendente_gestor_atual', aprovador_gestor_atual=funcionario_logado) |
-                    Q(status='pendente_gestor_proposto', aprovador_gestor_proposto=funcionario_logado) |
-                    Q(status='pendente_rh', aprovador_rh=funcionario_logado)
-                )
-                queryset = queryset.filter(q_aprovador)
-                
-            # RP e RD (assumindo que usam o campo 'aprovador_atual')
-            else:
-                queryset = queryset.filter(aprovador_atual=funcionario_logado).exclude(status__in=['aprovada', 'rejeitada', 'cancelada'])
+            # Filtro: Requisições que aguardam o usuário (caixa de entrada PendenciaAprovacao).
+            # Vale para RP, RD e MP (inclusive os múltiplos aprovadores da MP).
+            tipo = queryset.model.TIPO_PENDENCIA
+            queryset = queryset.filter(pk__in=PendenciaAprovacao.ids_pendentes(funcionario_logado, tipo))
         
         elif status_filter == 'historico':
             # Filtro: Requisições que o usuário solicitou E que foram FINALIZADAS
@@ -335,37 +275,53 @@ class BaseRequisicaoViewSet(viewsets.ModelViewSet):
         # A lógica de .save() no seu modelo vai definir o 'aprovador_atual'
         serializer.save(solicitante=funcionario_logado)
 
-    def _validar_permissao_acao(self, requisicao, funcionario):
-        """ Helper para validar se o usuário pode aprovar/rejeitar """
-        if not hasattr(requisicao, 'actionable_statuses'):
-            raise ValidationError("Modelo de requisição não define 'actionable_statuses'.")
-            
-        if requisicao.aprovador_atual != funcionario or requisicao.status not in requisicao.actionable_statuses:
-            return False
-        return True
+    def _get_requisicao_acao(self, pk):
+        """
+        aprovar/rejeitar buscam fora do filtro de status_filter: depois da primeira
+        aprovação a requisição sai da caixa de entrada, e o segundo toque precisa
+        receber 409 (já tratada), não 404. A permissão é checada em _recusar_acao.
+        O solicitante vem junto: a resposta o serializa e o sinal do dashboard usa o setor dele.
+        """
+        return get_object_or_404(self.queryset.model.objects.select_related('solicitante'), pk=pk)
+
+    def _recusar_acao(self, requisicao, funcionario, verbo):
+        """
+        Pré-checagem (no estado lido) de aprovar/rejeitar. Retorna a Response de
+        erro, ou None se `funcionario` pode agir. A garantia contra corridas é o
+        UPDATE condicional do modelo; isto só dá a mensagem certa de antemão.
+        """
+        if requisicao.aguarda(funcionario):
+            return None
+        if (requisicao.status not in STATUS_PENDENTES[requisicao.TIPO_PENDENCIA]
+                or requisicao.ja_tratada_por(funcionario)):
+            return self._ja_tratada(requisicao)
+        return Response({'error': f'Você não tem permissão para {verbo} esta requisição ou ela não está pendente.'},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    def _ja_tratada(self, requisicao):
+        """ 409: outra requisição (outro aprovador, toque duplo no app) já mudou o status. """
+        requisicao.refresh_from_db(fields=['status'])
+        return Response({'error': 'Esta requisição já foi tratada. Nada foi alterado.', 'status': requisicao.status},
+                        status=status.HTTP_409_CONFLICT)
 
     @action(detail=True, methods=['POST'], url_path='aprovar')
     def aprovar(self, request, pk=None):
         """
         Endpoint para APROVAR uma requisição.
         Chamado via POST para /api/requisicoes_.../<id>/aprovar/
+        Responde 409 se a requisição já foi tratada (a transição é um UPDATE condicional).
         """
-        requisicao = self.get_object()
+        requisicao = self._get_requisicao_acao(pk)
         funcionario_logado = _get_funcionario_logado(request)
 
-        if not self._validar_permissao_acao(requisicao, funcionario_logado):
-            return Response({'error': 'Você não tem permissão para aprovar esta requisição ou ela não está pendente.'}, status=status.HTTP_403_FORBIDDEN)
+        recusa = self._recusar_acao(requisicao, funcionario_logado, 'aprovar')
+        if recusa:
+            return recusa
 
-        # Chama a lógica do modelo (RP, RD, MP)
-        # (O seu modelo RD usa 'aprovador=', o RP usa 'aprovador_que_aprovou=')
-        # Vamos usar o nome do seu modelo RP como padrão, pois RD também o aceita
-        try:
-            requisicao.avancar_aprovacao(aprovador_que_aprovou=funcionario_logado)
-        except TypeError:
-            # Fallback para o modelo RD/MP que espera 'aprovador'
-            requisicao.avancar_aprovacao(aprovador=funcionario_logado)
+        # Chama a lógica do modelo (RP, RD, MP: mesma assinatura aprovar_por)
+        if not requisicao.aprovar_por(funcionario_logado):
+            return self._ja_tratada(requisicao)
 
-        
         serializer = self.get_serializer_class_for_detail()(requisicao) # Usa o serializer de detalhe
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -375,11 +331,12 @@ class BaseRequisicaoViewSet(viewsets.ModelViewSet):
         Endpoint para REJEITAR uma requisição.
         Chamado via POST para /api/requisicoes_.../<id>/rejeitar/
         """
-        requisicao = self.get_object()
+        requisicao = self._get_requisicao_acao(pk)
         funcionario_logado = _get_funcionario_logado(request)
 
-        if not self._validar_permissao_acao(requisicao, funcionario_logado):
-            return Response({'error': 'Você não tem permissão para rejeitar esta requisição.'}, status=status.HTTP_403_FORBIDDEN)
+        recusa = self._recusar_acao(requisicao, funcionario_logado, 'rejeitar')
+        if recusa:
+            return recusa
 
         # Valida os dados enviados (a observação)
         serializer = RejeitarSerializer(data=request.data)
@@ -387,13 +344,45 @@ class BaseRequisicaoViewSet(viewsets.ModelViewSet):
             observacao = serializer.validated_data['observacao']
             
             # Chama a lógica do modelo
-            requisicao.rejeitar(aprovador_que_rejeitou=funcionario_logado, observacao=observacao)
+            if not requisicao.rejeitar(aprovador_que_rejeitou=funcionario_logado, observacao=observacao):
+                return self._ja_tratada(requisicao)
             
             detail_serializer = self.get_serializer_class_for_detail()(requisicao)
             return Response(detail_serializer.data, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    # --- Ações em lote (aprovacao_lote.py) ---
+
+    def _resposta_lote(self, resultados):
+        tratadas = sum(1 for resultado in resultados if resultado['ok'])
+        return Response({'tratadas': tratadas, 'falhas': len(resultados) - tratadas, 'resultados': resultados},
+                        status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['POST'], url_path='bulk-aprovar')
+    def bulk_aprovar(self, request):
+        """
+        Aprova várias requisições numa chamada: POST {"ids": [1, 2, ...]}.
+        Responde com o resultado de cada id ('ok' e o novo 'status', ou 'erro').
+        """
+        funcionario_logado = _get_funcionario_logado(request)
+        serializer = AcaoEmLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        resultados = aprovar_em_lote(self.queryset.model, funcionario_logado, serializer.validated_data['ids'])
+        return self._resposta_lote(resultados)
+
+    @action(detail=False, methods=['POST'], url_path='bulk-rejeitar')
+    def bulk_rejeitar(self, request):
+        """
+        Rejeita várias requisições numa chamada: POST {"ids": [...], "observacao": "..."}.
+        """
+        funcionario_logado = _get_funcionario_logado(request)
+        serializer = RejeitarEmLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        resultados = rejeitar_em_lote(self.queryset.model, funcionario_logado, serializer.validated_data['ids'],
+                                      serializer.validated_data['observacao'])
+        return self._resposta_lote(resultados)
+
 # --- ViewSets Específicos para RP, RD, MP ---
 
 class RequisicaoPessoalViewSet(BaseRequisicaoViewSet):
@@ -410,6 +399,10 @@ class RequisicaoPessoalViewSet(BaseRequisicaoViewSet):
             return RequisicaoPessoalCreateSerializer
         if self.action == 'rejeitar':
             return RejeitarSerializer
+        if self.action == 'bulk_aprovar':
+            return AcaoEmLoteSerializer
+        if self.action == 'bulk_rejeitar':
+            return RejeitarEmLoteSerializer
         return RequisicaoPessoalDetailSerializer # Default para 'aprovar'
 
     def get_serializer_class_for_detail(self):
@@ -429,6 +422,10 @@ class RequisicaoDesligamentoViewSet(BaseRequisicaoViewSet):
             return RequisicaoDesligamentoCreateSerializer
         if self.action == 'rejeitar':
             return RejeitarSerializer
+        if self.action == 'bulk_aprovar':
+            return AcaoEmLoteSerializer
+        if self.action == 'bulk_rejeitar':
+            return RejeitarEmLoteSerializer
         return RequisicaoDesligamentoDetailSerializer
     
     def get_serializer_class_for_detail(self):
@@ -447,19 +444,13 @@ class MovimentacaoPessoalViewSet(BaseRequisicaoViewSet):
             """
             funcionario_logado = _get_funcionario_logado(self.request)
             
-            # Lógica dos aprovadores (replicada da property 'aprovador_atual')
-            # (Estes nomes de status são suposições baseadas nos nomes dos campos de aprovador)
-            q_aprovador = (
-                Q(status='pendente_gestor_atual', aprovador_gestor_atual=funcionario_logado) |
-                Q(status='pendente_gestor_proposto', aprovador_gestor_proposto=funcionario_logado) |
-                Q(status='pendente_rh', aprovador_rh=funcionario_logado)
-                # (Adicione outros status pendentes de MP se houver)
-            )
+            # Aprovadores pendentes vêm da caixa de entrada (PendenciaAprovacao)
+            q_aprovador = Q(pk__in=PendenciaAprovacao.ids_pendentes(funcionario_logado, PendenciaAprovacao.TIPO_MP))
             
             # Q object: (solicitante=eu) OU (sou um dos aprovadores pendentes)
             return self.queryset.filter(
                 Q(solicitante=funcionario_logado) | q_aprovador
-            ).distinct().order_by('-' + self.data_field)
+            ).order_by('-' + self.data_field)
         # --- FIM DO FIX 2 ---
     def get_serializer_class(self):
         if self.action == 'list':
@@ -470,6 +461,10 @@ class MovimentacaoPessoalViewSet(BaseRequisicaoViewSet):
             return MovimentacaoPessoalCreateSerializer
         if self.action == 'rejeitar':
             return RejeitarSerializer
+        if self.action == 'bulk_aprovar':
+            return AcaoEmLoteSerializer
+        if self.action == 'bulk_rejeitar':
+            return RejeitarEmLoteSerializer
         return MovimentacaoPessoalDetailSerializer
 
     def get_serializer_class_for_detail(self):
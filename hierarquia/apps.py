@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HierarquiaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hierarquia'
+
+    def ready(self):
+        # Registra os sinais (manutenção da tabela de hierarquia, etc.) e as verificações de deploy
+        from . import checks, signals  # noqa: F401
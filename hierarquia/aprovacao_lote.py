@@ -0,0 +1,105 @@
+# hierarquia/aprovacao_lote.py
+"""
+Aprovação e rejeição em lote de RP, MP ou RD (API bulk-aprovar/bulk-rejeitar e
+seleção múltipla nas telas "Aprovar ...").
+
+Para N ids:
+  1. uma consulta traz (e trava) só as requisições que estão na caixa de entrada
+     de quem aprova (PendenciaAprovacao), já descartando as demais;
+  2. cada requisição descreve sua transição (_transicao_aprovacao/_rejeicao do
+     modelo) e as que recebem o mesmo UPDATE são agrupadas: um UPDATE condicional
+     por grupo (ex: todas as RPs em 'pendente_rh' viram 'aprovada' de uma vez).
+     A aprovação final de MP e RD tem efeito (mover/desligar o funcionário): ali
+     cada requisição tem o seu savepoint, com o UPDATE e o efetivar() juntos, e
+     uma que falhe fica pendente sem desfazer as outras;
+  3. a caixa de entrada é sincronizada de uma vez e os eventos de notificação
+     vão para o outbox num INSERT;
+tudo numa única transação. O resultado é uma lista por id, na ordem recebida.
+
+UPDATE em massa não dispara post_save: no final é enviado
+`requisicoes_tratadas_em_lote` e signals.py invalida o dashboard.
+"""
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models_notificacoes import EventoNotificacao
+from .models_pendencias import PendenciaAprovacao
+
+# Enviado após gravar o lote. sender = modelo (RP, MP ou RD); kwargs: `requisicoes`
+# (instâncias relidas, já no novo status).
+requisicoes_tratadas_em_lote = Signal()
+
+# Máximo de ids por chamada
+LIMITE_LOTE = 500
+
+NAO_PENDENTE = 'Não está pendente para você (já foi tratada ou não cabe a você).'
+
+
+class _Conflito(Exception):
+    """ Um grupo não atualizou todas as linhas: alguém chegou antes (desfeito só o grupo). """
+
+
+def aprovar_em_lote(modelo, aprovador, ids):
+    """ Aprova a etapa atual de cada requisição de `modelo` em `ids`. """
+    return _tratar_em_lote(modelo, aprovador, ids,
+                           lambda req, agora: req._transicao_aprovacao(aprovador, agora), efetivar=True)
+
+
+def rejeitar_em_lote(modelo, aprovador, ids, observacao):
+    """ Rejeita cada requisição de `modelo` em `ids` com a mesma observação. """
+    return _tratar_em_lote(modelo, aprovador, ids,
+                           lambda req, agora: req._transicao_rejeicao(aprovador, observacao, agora), efetivar=False)
+
+
+def _tratar_em_lote(modelo, aprovador, ids, transicao_de, efetivar):
+    ids = list(dict.fromkeys(ids))
+    resultados = {pk: {'id': pk, 'ok': False, 'erro': NAO_PENDENTE} for pk in ids}
+    agora = timezone.now()
+
+    with transaction.atomic():
+        # 1. Elegibilidade: uma consulta, só o que está na caixa de entrada de `aprovador`
+        elegiveis = modelo.objects.select_for_update() \
+                                  .filter(pk__in=ids) \
+                                  .filter(pk__in=PendenciaAprovacao.ids_pendentes(aprovador, modelo.TIPO_PENDENCIA))
+
+        # 2. Um UPDATE condicional por grupo de requisições com a mesma transição
+        grupos = {}
+        status_anteriores = {}
+        for req in elegiveis:
+            status_anteriores[req.pk] = req.status
+            transicao = transicao_de(req, agora)
+            if transicao is not None:
+                chave, condicao, valores = transicao
+                grupos.setdefault(chave, (condicao, valores, []))[2].append(req.pk)
+
+        tratados = []
+        for condicao, valores, pks in grupos.values():
+            modelo.preencher_auto_now(valores, agora)
+            final = efetivar and valores.get('status') == 'aprovada'
+            for parte in ([pk] for pk in pks) if final else [pks]:
+                try:
+                    with transaction.atomic():
+                        if modelo._base_manager.filter(condicao, pk__in=parte).update(**valores) != len(parte):
+                            raise _Conflito
+                        if final:
+                            modelo._base_manager.get(pk=parte[0]).efetivar()
+                except _Conflito:
+                    continue
+                except Exception as erro:
+                    # Como na aprovação individual: o efetivar() falhou, a requisição continua pendente
+                    resultados[parte[0]]['erro'] = f"Erro ao efetivar (nada foi alterado): {erro}"
+                    continue
+                tratados += parte
+
+        # 3. Caixa de entrada, outbox de notificações e aviso aos caches
+        requisicoes = list(modelo._base_manager.filter(pk__in=tratados))
+        novas = PendenciaAprovacao.sincronizar_varias(modelo.TIPO_PENDENCIA, requisicoes)
+        EventoNotificacao.registrar(modelo.TIPO_PENDENCIA, requisicoes, novas, status_anteriores)
+        for req in requisicoes:
+            resultados[req.pk] = {'id': req.pk, 'ok': True, 'status': req.status}
+        if requisicoes:
+            requisicoes_tratadas_em_lote.send(sender=modelo, requisicoes=requisicoes)
+
+    return list(resultados.values())
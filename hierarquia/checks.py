@@ -0,0 +1,26 @@
+# hierarquia/checks.py
+"""
+Verificações de implantação (python manage.py check --deploy).
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def cache_compartilhado(app_configs, **kwargs):
+    """
+    O diretório de aprovadores (roteamento.py) e os painéis do Dashboard
+    (dashboard.py) são invalidados no cache: com um cache por processo, a
+    invalidação feita num worker não chega aos outros.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if 'locmem' not in backend.lower():
+        return []
+    return [Warning(
+        'CACHE_BACKEND usa memória local (LocMemCache): com mais de um worker, trocas de '
+        'aprovador e de painel só valem no processo que fez a alteração.',
+        hint='Configure um cache compartilhado, ex: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache '
+             'e CACHE_LOCATION=redis://127.0.0.1:6379/1 (ver README, "Variáveis de Ambiente").',
+        id='hierarquia.W001',
+    )]
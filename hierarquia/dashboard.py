@@ -0,0 +1,302 @@
+# hierarquia/dashboard.py
+"""
+Agregações do Dashboard (tela HTML e /api/dashboard-data/).
+
+Em vez de um COUNT por modelo / status / escopo, cada bloco é calculado
+com agregação condicional (Count com filter=...) ou um único UNION ALL:
+
+- Status das requisições: RP + MP + RD agrupados por status em 1 consulta.
+- Cards de funcionários: total, cargos distintos e contagens extras em 1 consulta.
+- Gráfico de setores: 1 consulta.
+
+O resultado de cada painel fica em cache por funcionário (ver "Cache por
+funcionário" abaixo) e só é recalculado quando algo de que ele depende muda.
+"""
+
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import (
+    Cargo, Funcionario, MovimentacaoPessoal, PendenciaAprovacao,
+    RequisicaoDesligamento, RequisicaoPessoal, Setor, Vaga,
+)
+
+# Status que NÃO contam como pendência
+STATUS_FINALIZADOS = ['aprovada', 'rejeitada', 'cancelada']
+
+
+# --- Blocos de agregação ---
+
+def contar_status_requisicoes(filtro=None):
+    """
+    Retorna {status: total} somando RP, MP e RD numa única consulta (UNION ALL).
+    `filtro` é um Q aplicado aos três modelos (ex: Q(solicitante=...)).
+    """
+    filtro = filtro or Q()
+    por_modelo = [
+        modelo.objects.filter(filtro).order_by().values('status').annotate(total=Count('pk'))
+        for modelo in (RequisicaoPessoal, MovimentacaoPessoal, RequisicaoDesligamento)
+    ]
+    contagem = {}
+    for linha in por_modelo[0].union(*por_modelo[1:], all=True):
+        contagem[linha['status']] = contagem.get(linha['status'], 0) + linha['total']
+    return contagem
+
+
+def agrupar_status(contagem):
+    """
+    Agrupa {status: total} nos baldes usados pelos gráficos:
+    - 'pendentes':  status que começam com 'pendente' (gráfico da tela HTML)
+    - 'em_aberto':  qualquer status não finalizado (gráfico do app)
+    - 'aprovadas' / 'rejeitadas'
+    """
+    baldes = {'pendentes': 0, 'em_aberto': 0, 'aprovadas': 0, 'rejeitadas': 0}
+    for status, total in contagem.items():
+        if status.startswith('pendente'):
+            baldes['pendentes'] += total
+        if status not in STATUS_FINALIZADOS:
+            baldes['em_aberto'] += total
+        elif status == 'aprovada':
+            baldes['aprovadas'] += total
+        elif status == 'rejeitada':
+            baldes['rejeitadas'] += total
+    return baldes
+
+
+def contar_funcionarios(escopo=None, apenas_ativos=True, **extras):
+    """
+    Uma consulta com agregação condicional sobre Funcionario.
+    Retorna {'total', 'cargos', **extras}, onde `total` e `cargos` (cargos distintos)
+    consideram o `escopo` (Q) e cada extra é {nome: Q} contado dentro do mesmo escopo.
+    """
+    qs = Funcionario.objects.filter(ativo=True) if apenas_ativos else Funcionario.objects.all()
+    if escopo is not None:
+        qs = qs.filter(escopo)
+    return qs.aggregate(
+        total=Count('pk'),
+        cargos=Count('cargo', distinct=True),
+        **{nome: Count('pk', filter=q) for nome, q in extras.items()}
+    )
+
+
+def grafico_setores(setor_ids=None):
+    """ Funcionários por Setor Principal (apenas setores com alguém), em 1 consulta. """
+    setores = Setor.objects.all() if setor_ids is None else Setor.objects.filter(pk__in=setor_ids)
+    setor_data = setores.annotate(num_funcionarios=Count('funcionarios_primarios')) \
+                        .filter(num_funcionarios__gt=0) \
+                        .order_by('-num_funcionarios') \
+                        .values_list('nome', 'num_funcionarios')
+    labels, data = [], []
+    for nome, total in setor_data:
+        labels.append(nome)
+        data.append(total)
+    return {'labels': labels, 'data': data}
+
+
+def grafico_status(contagem):
+    """ Gráfico de status da tela HTML (sem as fatias zeradas). """
+    baldes = agrupar_status(contagem)
+    req_status_data = {
+        'Pendentes': baldes['pendentes'],
+        'Aprovadas': baldes['aprovadas'],
+        'Rejeitadas': baldes['rejeitadas'],
+    }
+    req_status_data = {k: v for k, v in req_status_data.items() if v > 0}
+    return {'labels': list(req_status_data.keys()), 'data': list(req_status_data.values())}
+
+
+# --- Montagem dos painéis ---
+
+def montar_dashboard(funcionario):
+    """
+    Cards e gráficos da tela HTML. `funcionario=None` é o Superusuário sem
+    perfil (vê o sistema inteiro).
+    """
+    vagas_abertas_count = Vaga.objects.filter(status='aberta').count()
+
+    # --- Superusuário / Diretor (Nível 1): visão da empresa toda ---
+    if funcionario is None or funcionario.cargo.nivel == 1:
+        resumo = contar_funcionarios(apenas_ativos=funcionario is not None)
+        return {
+            'total_funcionarios': resumo['total'],
+            'total_cargos': Cargo.objects.count(),
+            'setores_titulo_card': "Total de Setores",
+            'setores_valor_card': Setor.objects.count(),
+            'is_setor_name': False,
+            'vagas_abertas_count': vagas_abertas_count,
+            'setor_chart_data': grafico_setores(),
+            'req_status_chart_data': grafico_status(
+                contar_status_requisicoes(None if funcionario is None else Q(solicitante__ativo=True))
+            ),
+        }
+
+    # --- Demais níveis: setor primário + setores responsáveis ---
+    responsaveis_ids = list(funcionario.setores_responsaveis.values_list('pk', flat=True))
+    setor_ids = set(responsaveis_ids)
+    if funcionario.setor_primario_id:
+        setor_ids.add(funcionario.setor_primario_id)
+
+    resumo = contar_funcionarios(Q(setor_primario_id__in=setor_ids))
+
+    if funcionario.cargo.nivel <= 3 and responsaveis_ids:
+        setores_titulo_card = "Setores Responsáveis"
+        setores_valor_card = len(responsaveis_ids)
+        is_setor_name = False
+    else:
+        setores_titulo_card = "Meu Setor Principal"
+        setores_valor_card = funcionario.setor_primario.nome if funcionario.setor_primario else "Nenhum"
+        is_setor_name = True
+
+    # Requisições abertas por quem está nos setores visíveis
+    filtro_visiveis = Q(solicitante__ativo=True, solicitante__setor_primario_id__in=setor_ids)
+
+    return {
+        'total_funcionarios': resumo['total'],
+        'total_cargos': resumo['cargos'],
+        'setores_titulo_card': setores_titulo_card,
+        'setores_valor_card': setores_valor_card,
+        'is_setor_name': is_setor_name,
+        'vagas_abertas_count': vagas_abertas_count,
+        'setor_chart_data': grafico_setores(setor_ids),
+        'req_status_chart_data': grafico_status(contar_status_requisicoes(filtro_visiveis)),
+    }
+
+
+def montar_dashboard_api(funcionario):
+    """ Cards e gráfico do app (Flutter): /api/dashboard-data/. """
+    # Total de Funcionários (subordinados; Diretor vê todos) e colegas do setor, numa consulta
+    extras = {}
+    if funcionario.cargo.nivel != 1:
+        subordinados = funcionario.obter_subordinados(incluir_responsaveis=True).order_by().values('pk')
+        extras['subordinados'] = Q(pk__in=subordinados)
+    if funcionario.setor_primario_id:
+        extras['meu_setor'] = Q(setor_primario_id=funcionario.setor_primario_id)
+    resumo = contar_funcionarios(**extras)
+
+    meu_setor_nome = funcionario.setor_primario.nome if funcionario.setor_primario else "N/A"
+
+    # Gráfico: Status (Apenas RPs, RDs e MPs SOLICITADAS pelo usuário)
+    baldes = agrupar_status(contar_status_requisicoes(Q(solicitante=funcionario)))
+
+    return {
+        'cards': {
+            'total_funcionarios': resumo.get('subordinados', resumo['total']),
+            'vagas_abertas_count': Vaga.objects.filter(status='aberta').count(),
+            'minhas_pendencias_count': sum(PendenciaAprovacao.contar(funcionario).values()),
+            'setores_titulo_card': f"Funcionários em {meu_setor_nome}",
+            'setores_valor_card': str(resumo.get('meu_setor', "N/A")),
+        },
+        'chart_data': {
+            'labels': ['Pendente', 'Aprovada', 'Rejeitada'],
+            'data': [baldes['em_aberto'], baldes['aprovadas'], baldes['rejeitadas']],
+        },
+    }
+
+
+# --- Cache por funcionário ---
+#
+# Cada painel em cache guarda a versão das "etiquetas" das quais depende:
+#   'estrutura'    Cargos e Setores (nomes, níveis)          -> todos os painéis
+#   'vagas'        Vagas (card de vagas abertas)             -> todos os painéis
+#   'func:<id>'    o próprio funcionário, suas pendências e as requisições que ele abriu
+#   'setor:<id>'   funcionários lotados no setor e as requisições abertas por eles
+#   'empresa'      qualquer funcionário/requisição           -> Diretor e Superusuário
+# Os sinais (signals.py) trocam a versão das etiquetas afetadas; na leitura,
+# basta um get_many das versões (sem consultas ao banco) para validar o painel.
+#
+# Em produção o cache precisa ser compartilhado entre os workers (Redis,
+# Memcached; ver README e checks.py): só assim a invalidação feita num worker
+# chega aos outros. Com o LocMem (padrão de desenvolvimento) ela vale só no
+# processo que alterou os dados, e o timeout curto limita a defasagem, como em
+# roteamento.TIMEOUT_DIRETORIO.
+
+CACHE_POR_PROCESSO = 'locmem' in settings.CACHES['default']['BACKEND'].lower()
+TIMEOUT_PAINEL = 300 if CACHE_POR_PROCESSO else 60 * 60
+TIMEOUT_TRAVA = 30
+ESPERA_TRAVA = 0.05       # segundos entre cada verificação enquanto outro processo calcula
+TENTATIVAS_TRAVA = 40     # ~2s de espera antes de calcular por conta própria
+
+
+def _chave_versao(etiqueta):
+    return f'dashboard:versao:{etiqueta}'
+
+
+def _versoes(etiquetas):
+    """ Versão atual de cada etiqueta (cria uma se ainda não existir). """
+    chaves = {etiqueta: _chave_versao(etiqueta) for etiqueta in etiquetas}
+    atuais = cache.get_many(chaves.values())
+    versoes = {}
+    for etiqueta, chave in chaves.items():
+        versao = atuais.get(chave)
+        if versao is None:
+            versao = uuid4().hex
+            if not cache.add(chave, versao, None):
+                versao = cache.get(chave, versao)
+        versoes[etiqueta] = versao
+    return versoes
+
+
+def invalidar(*etiquetas):
+    """
+    Troca a versão das etiquetas: os painéis que dependem delas deixam de valer.
+    Só depois do commit: se a troca acontecesse dentro da transação, um painel
+    calculado antes do commit (com os dados antigos) seria gravado com as versões
+    novas e continuaria valendo até o TIMEOUT_PAINEL.
+    """
+    if etiquetas:
+        novas = {_chave_versao(etiqueta): uuid4().hex for etiqueta in etiquetas}
+        transaction.on_commit(lambda: cache.set_many(novas, None))
+
+
+def etiquetas_funcionario(funcionario):
+    if funcionario is None:
+        return ['estrutura', 'vagas', 'empresa']
+    etiquetas = ['estrutura', 'vagas', f'func:{funcionario.pk}']
+    if funcionario.cargo.nivel == 1:
+        etiquetas.append('empresa')
+    else:
+        setor_ids = set(funcionario.setores_responsaveis.values_list('pk', flat=True))
+        if funcionario.setor_primario_id:
+            setor_ids.add(funcionario.setor_primario_id)
+        etiquetas += [f'setor:{setor_id}' for setor_id in sorted(setor_ids)]
+    return etiquetas
+
+
+def _valido(entrada):
+    return entrada is not None and _versoes(entrada['versoes']) == entrada['versoes']
+
+
+def painel_em_cache(tipo, funcionario, calcular):
+    """
+    Retorna `calcular()` do cache do funcionário (tipo 'html' ou 'api').
+    Proteção contra "estouro de manada": só um processo recalcula por vez
+    (trava com cache.add); os demais esperam o resultado por alguns instantes.
+    """
+    chave = f'dashboard:{tipo}:{funcionario.pk if funcionario else "admin"}'
+    entrada = cache.get(chave)
+    if _valido(entrada):
+        return entrada['dados']
+
+    trava = f'{chave}:trava'
+    if not cache.add(trava, 1, TIMEOUT_TRAVA):
+        for _ in range(TENTATIVAS_TRAVA):
+            time.sleep(ESPERA_TRAVA)
+            entrada = cache.get(chave)
+            if _valido(entrada):
+                return entrada['dados']
+        # Quem tinha a trava demorou demais: calcula sem gravar
+        return calcular()
+
+    try:
+        # As versões são lidas ANTES do cálculo: se algo mudar durante, o painel já nasce inválido
+        versoes = _versoes(etiquetas_funcionario(funcionario))
+        dados = calcular()
+        cache.set(chave, {'versoes': versoes, 'dados': dados}, TIMEOUT_PAINEL)
+    finally:
+        cache.delete(trava)
+    return dados
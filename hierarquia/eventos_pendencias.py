@@ -0,0 +1,187 @@
+# hierarquia/eventos_pendencias.py
+"""
+Stream (Server-Sent Events) da caixa de entrada: GET /api/pendencias/stream/.
+
+O app e a sidebar do dashboard deixam de consultar get_dashboard_data só para
+saber se chegou algo novo: a conexão fica aberta e recebe um evento
+
+    event: pendencias
+    id: <versão>
+    data: {"versao": 12, "RP": 1, "MP": 0, "RD": 2, "total": 3}
+
+ao conectar e de novo só quando a caixa de entrada do usuário muda.
+
+Sem consulta por cliente: cada processo ASGI tem uma CentralPendencias com uma
+única tarefa que, a cada INTERVALO segundos, lê as linhas de VersaoCaixaEntrada
+alteradas recentemente (incrementadas em signals.py após cada commit), reconta
+numa consulta as caixas de quem mudou e tem conexão aberta, e acorda só essas
+conexões. Milhares de clientes ociosos custam uma consulta pequena por processo.
+
+Precisa de um servidor ASGI (ex: `uvicorn config.asgi:application`). No WSGI o
+Django lê o iterador assíncrono até o fim antes de enviar o primeiro byte: como o
+stream nunca termina, cada aba aberta prenderia um worker para sempre. Por isso a
+view responde 204 (o EventSource não reconecta) quando não está sob ASGI, e o
+dashboard só abre o stream quando `servido_por_asgi(request)`.
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from .models_funcionario import Funcionario
+from .models_pendencias import PendenciaAprovacao, VersaoCaixaEntrada
+
+# Segundos entre duas leituras de VersaoCaixaEntrada (por processo)
+INTERVALO = 2.0
+
+# Relê as alterações dos últimos segundos: um commit pode gravar `alterada_em`
+# um pouco antes de ficar visível (ou o relógio de outro servidor estar atrás)
+MARGEM = timedelta(seconds=10)
+
+# Comentário enviado sem novidades, para proxies não fecharem a conexão
+KEEPALIVE = 20.0
+
+# Espera que o EventSource usa para reconectar (ms)
+RECONEXAO_MS = 5000
+
+
+def montar_estado(versao, contagem):
+    return {'versao': versao, **contagem, 'total': sum(contagem.values())}
+
+
+def formatar_evento(estado):
+    return f"event: pendencias\nid: {estado['versao']}\ndata: {json.dumps(estado)}\n\n"
+
+
+class CentralPendencias:
+    """
+    Uma por processo: guarda as filas das conexões abertas por funcionário e
+    roda a tarefa de leitura enquanto houver alguém conectado.
+    """
+
+    def __init__(self):
+        self._filas = {}  # funcionario_id -> {asyncio.Queue}
+        self._versoes = {}  # funcionario_id -> última versão enviada
+        self._tarefa = None
+        self._desde = None
+
+    def assinar(self, funcionario_id, versao):
+        fila = asyncio.Queue(maxsize=1)
+        self._filas.setdefault(funcionario_id, set()).add(fila)
+        self._versoes[funcionario_id] = max(versao, self._versoes.get(funcionario_id, 0))
+        loop = asyncio.get_running_loop()
+        if self._tarefa is None or self._tarefa.done() or self._tarefa.get_loop() is not loop:
+            self._desde = timezone.now() - MARGEM
+            self._tarefa = loop.create_task(self._laco())
+        return fila
+
+    def cancelar(self, funcionario_id, fila):
+        filas = self._filas.get(funcionario_id)
+        if filas is None:
+            return
+        filas.discard(fila)
+        if not filas:
+            del self._filas[funcionario_id]
+            self._versoes.pop(funcionario_id, None)
+
+    async def _laco(self):
+        while self._filas:
+            await asyncio.sleep(INTERVALO)
+            try:
+                estados = await sync_to_async(self._consultar)(set(self._filas))
+            except Exception:
+                # Banco fora do ar: as conexões continuam e a próxima volta tenta de novo
+                continue
+            for funcionario_id, estado in estados.items():
+                if funcionario_id not in self._filas:
+                    continue  # desconectou durante a consulta
+                self._versoes[funcionario_id] = estado['versao']
+                for fila in self._filas[funcionario_id]:
+                    if fila.full():
+                        fila.get_nowait()  # só o estado mais recente interessa
+                    fila.put_nowait(estado)
+
+    def _consultar(self, conectados):
+        """ {funcionario_id: estado} de quem está conectado e teve a caixa alterada (2 consultas, no máximo). """
+        close_old_connections()
+        agora = timezone.now()
+        alteradas = VersaoCaixaEntrada.objects.filter(alterada_em__gte=self._desde) \
+                                              .values_list('aprovador_id', 'versao')
+        self._desde = agora - MARGEM
+        novas = {pk: versao for pk, versao in alteradas
+                 if pk in conectados and versao > self._versoes.get(pk, 0)}
+        if not novas:
+            return {}
+        contagens = PendenciaAprovacao.contar_varios(novas)
+        return {pk: montar_estado(versao, contagens[pk]) for pk, versao in novas.items()}
+
+
+central = CentralPendencias()
+
+
+# --- View ---
+
+def servido_por_asgi(request):
+    """ True se a requisição chegou por um servidor ASGI (único caso em que o stream funciona). """
+    return isinstance(request, ASGIRequest)
+
+
+def _estado_inicial(funcionario_id):
+    return montar_estado(VersaoCaixaEntrada.atual(funcionario_id), PendenciaAprovacao.contar(funcionario_id))
+
+
+async def _funcionario_da_requisicao(request):
+    """ Sessão (dashboard) ou token da API (app: cabeçalho Authorization). """
+    from rest_framework.authtoken.models import Token
+
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        cabecalho = request.headers.get('Authorization', '')
+        chave = cabecalho[len('Token '):].strip() if cabecalho.startswith('Token ') else ''
+        if not chave:
+            return None
+        token = await Token.objects.select_related('user').filter(key=chave).afirst()
+        if token is None or not token.user.is_active:
+            return None
+        usuario = token.user
+    return await Funcionario.objects.filter(usuario=usuario).values_list('pk', flat=True).afirst()
+
+
+@require_GET
+async def stream_pendencias(request):
+    if not servido_por_asgi(request):
+        # 204: o EventSource desiste em vez de prender um worker WSGI indefinidamente
+        return HttpResponse(status=204)
+
+    funcionario_id = await _funcionario_da_requisicao(request)
+    if funcionario_id is None:
+        return HttpResponse('Não autenticado ou usuário sem funcionário.', status=401)
+
+    estado = await sync_to_async(_estado_inicial)(funcionario_id)
+
+    async def eventos():
+        fila = central.assinar(funcionario_id, estado['versao'])
+        try:
+            yield f"retry: {RECONEXAO_MS}\n"
+            yield formatar_evento(estado)
+            while True:
+                try:
+                    novo = await asyncio.wait_for(fila.get(), timeout=KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield formatar_evento(novo)
+        finally:
+            central.cancelar(funcionario_id, fila)
+
+    resposta = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    resposta['Cache-Control'] = 'no-cache'
+    resposta['X-Accel-Buffering'] = 'no'  # nginx: não acumular o stream
+    return resposta
@@ -0,0 +1,143 @@
+# hierarquia/exportacao.py
+"""
+Exportação dos funcionários com todas as colunas SRA, para CSV ou XLSX.
+
+Os cabeçalhos são os mesmos do FuncionarioResource (o arquivo pode ser
+reimportado). O Export do django-import-export monta o Dataset inteiro (~226
+colunas por funcionário) antes de responder; aqui o queryset é percorrido com
+.iterator() (cursor do lado do servidor no PostgreSQL) em blocos de
+`TAMANHO_BLOCO` linhas, sem instanciar Funcionario:
+
+- CSV: cada linha vai direto para a StreamingHttpResponse (o primeiro byte sai
+  logo e a memória não cresce com o número de funcionários).
+- XLSX: o openpyxl em modo write-only grava as linhas em arquivo temporário;
+  o .xlsx (um zip) só fica pronto no final e é enviado em blocos (FileResponse).
+"""
+
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+
+from .importacao.leitura import ENCODING_PADRAO, em_lotes
+from .models_funcionario import Funcionario
+from .resources import FuncionarioResource
+
+TAMANHO_BLOCO = 2000
+
+TIPO_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Colunas de relacionamento do FuncionarioResource -> valor buscado no banco
+RELACIONAMENTOS = {
+    'usuario': 'usuario__username',
+    'cargo': 'cargo__nome',
+    'setor_primario': 'setor_primario__nome',
+}
+
+
+def colunas_exportacao(resource=None):
+    """
+    [(cabeçalho, campo)] na ordem do Resource. Cada campo ra_* aparece uma vez, com o
+    nome de coluna declarado no Resource (ex: 'Matricula' para ra_mat) quando houver.
+    """
+    resource = resource or FuncionarioResource()
+    colunas = {}
+    for campo in resource.get_export_fields():
+        atributo = campo.attribute
+        if atributo in RELACIONAMENTOS or atributo == 'setores_responsaveis':
+            colunas[atributo] = campo.column_name
+        elif atributo and atributo.startswith('ra_'):
+            if atributo not in colunas or campo.column_name != atributo:
+                colunas[atributo] = campo.column_name
+    return [(cabecalho, RELACIONAMENTOS.get(atributo, atributo)) for atributo, cabecalho in colunas.items()]
+
+
+def linhas_exportacao(queryset, colunas, tamanho_bloco=TAMANHO_BLOCO, separador=','):
+    """ Gera o cabeçalho e depois uma lista de textos por funcionário. """
+    yield [cabecalho for cabecalho, _ in colunas]
+    campos = [campo for _, campo in colunas if campo != 'setores_responsaveis']
+    posicao_responsaveis = next((i for i, (_, campo) in enumerate(colunas) if campo == 'setores_responsaveis'), None)
+
+    valores = queryset.order_by('pk').values_list('pk', *campos).iterator(chunk_size=tamanho_bloco)
+    for bloco in em_lotes(valores, tamanho_bloco):
+        responsaveis = _responsaveis([linha[0] for linha in bloco]) if posicao_responsaveis is not None else {}
+        for pk, *linha in bloco:
+            linha = ['' if valor is None else str(valor) for valor in linha]
+            if posicao_responsaveis is not None:
+                linha.insert(posicao_responsaveis, separador.join(responsaveis.get(pk, [])))
+            yield linha
+
+
+def _responsaveis(funcionario_ids):
+    """ {funcionario_id: [nomes dos setores responsáveis]} com uma consulta por bloco. """
+    through = Funcionario.setores_responsaveis.through
+    nomes = {}
+    for funcionario_id, setor in through.objects.filter(funcionario_id__in=funcionario_ids) \
+                                                .order_by('setor__nome') \
+                                                .values_list('funcionario_id', 'setor__nome'):
+        nomes.setdefault(funcionario_id, []).append(setor)
+    return nomes
+
+
+def _linhas(queryset, ao_progresso=None):
+    resource = FuncionarioResource()
+    separador = resource.fields['setores_responsaveis'].widget.separator
+    linhas = linhas_exportacao(queryset, colunas_exportacao(resource), separador=separador)
+    if ao_progresso is None:
+        return linhas
+    return _contando(linhas, ao_progresso)
+
+
+def _contando(linhas, ao_progresso):
+    """ Repassa as linhas chamando ao_progresso(funcionários já escritos) a cada bloco. """
+    yield next(linhas)   # cabeçalho
+    escritas = 0
+    for escritas, linha in enumerate(linhas, start=1):
+        yield linha
+        if escritas % TAMANHO_BLOCO == 0:
+            ao_progresso(escritas)
+    ao_progresso(escritas)
+
+
+class _Eco:
+    """ "Arquivo" cujo write() devolve o texto: o csv.writer vira um gerador de linhas. """
+    def write(self, valor):
+        return valor
+
+
+def exportar_csv(queryset, nome_arquivo='funcionarios.csv', encoding=ENCODING_PADRAO):
+    """ StreamingHttpResponse com o CSV (mesma codificação padrão do import). """
+    escritor = csv.writer(_Eco())
+    conteudo = (escritor.writerow(linha).encode(encoding, errors='replace') for linha in _linhas(queryset))
+    resposta = StreamingHttpResponse(conteudo, content_type=f'text/csv; charset={encoding}')
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    return resposta
+
+
+def exportar_xlsx(queryset, nome_arquivo='funcionarios.xlsx'):
+    """ FileResponse com o XLSX gerado em modo write-only (memória constante). """
+    arquivo = tempfile.TemporaryFile()
+    gravar_xlsx(queryset, arquivo)
+    arquivo.seek(0)
+    return FileResponse(arquivo, as_attachment=True, filename=nome_arquivo, content_type=TIPO_XLSX)
+
+
+# --- Gravação em arquivo (exportação em segundo plano, ver tarefas.py) ---
+
+def gravar_csv(queryset, arquivo, encoding=ENCODING_PADRAO, ao_progresso=None):
+    """ Escreve o CSV em `arquivo` (aberto em modo binário). """
+    escritor = csv.writer(_Eco())
+    for linha in _linhas(queryset, ao_progresso):
+        arquivo.write(escritor.writerow(linha).encode(encoding, errors='replace'))
+
+
+def gravar_xlsx(queryset, arquivo, ao_progresso=None):
+    """ Escreve o XLSX em `arquivo` com o openpyxl em modo write-only. """
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet('Funcionarios')
+    for linha in _linhas(queryset, ao_progresso):
+        aba.append([ILLEGAL_CHARACTERS_RE.sub('', valor) for valor in linha])
+    planilha.save(arquivo)
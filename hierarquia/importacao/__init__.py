@@ -0,0 +1,22 @@
+# hierarquia/importacao/__init__.py
+"""
+Importação em massa da SRA (Protheus), fora do django-import-export.
+Usada pelo comando `importar_funcionarios` e pela tela "Importação em massa" do Admin.
+Para arquivos grandes, `importar_em_paralelo` divide a carga entre processos (por matrícula).
+Cargas delta (só as linhas alteradas no Protheus) usam `sincronizar_delta`; `TabelaSRA`
+lê as linhas direto do banco do Protheus. `importar_arquivo` grava um ponto de retomada
+por lote e, se a importação cair, continua de onde parou ao receber o mesmo arquivo.
+Os cadastros de referência (Cargo, Setor, CentroServico) usam os importadores de cadastros.py.
+"""
+
+from .funcionarios import (
+    ImportadorFuncionarios, MapeamentoSRA, ResultadoImportacao, funcionarios_importados,
+)
+from .cadastros import (
+    ImportadorCargos, ImportadorCentrosServico, ImportadorSetores, cadastros_importados,
+)
+from .delta import sincronizar_delta
+from .leitura import em_lotes, ler_linhas
+from .origem import TabelaSRA
+from .paralelo import importar_em_paralelo
+from .retomada import importar_arquivo
@@ -0,0 +1,195 @@
+# hierarquia/importacao/cadastros.py
+"""
+Importação em massa dos cadastros de referência: Cargo, Setor e CentroServico.
+
+O arquivo é lido numa passada só e comparado em memória com o que já está no
+banco (uma consulta por tabela). Só o que mudou é gravado, com bulk_create /
+bulk_update numa única transação. Colunas:
+
+    Cargo:          nome, nivel, descricao
+    Setor:          nome, descricao
+    CentroServico:  nome, setor_nome (ou setor), descricao
+
+`descricao` é opcional: sem a coluna, a descrição cadastrada é mantida.
+Centros de serviço dependem dos setores: importe os setores antes.
+
+bulk_create/bulk_update não disparam post_save: no final é enviado
+`cadastros_importados` e signals.py recalcula a hierarquia (cargos que mudaram
+de nível) e invalida o diretório de aprovadores e o dashboard.
+"""
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from ..metricas import ETAPA_LEITURA, etapa, medindo
+from ..models import Cargo, CentroServico, Setor
+from .funcionarios import TAMANHO_LOTE, ResultadoImportacao
+
+# Enviado após a gravação. sender = modelo importado; kwargs: `ids` (criados e
+# atualizados) e `cargos_nivel_alterado` (ids dos cargos que mudaram de nível).
+cadastros_importados = Signal()
+
+
+def _texto(valor):
+    return str(valor).strip() if valor not in (None, '') else ''
+
+
+class ImportadorCadastro:
+    """
+    Uso:
+        resultado = ImportadorCargos().importar(ler_linhas('cargos.csv'))
+    Subclasses definem `modelo`, `campos` (gravados no update) e como montar
+    a chave e os valores de cada linha.
+    """
+    modelo = None
+    campos = ()
+    rotulo = ''
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE):
+        self.tamanho_lote = tamanho_lote
+
+    # --- Pontos de extensão ---
+
+    def carregar(self):
+        """ Mapas auxiliares (ex: setores por nome), carregados uma vez. """
+
+    def valores(self, linha, resultado):
+        """ {campo: valor} da linha. ValueError = linha com erro. """
+        raise NotImplementedError
+
+    def chave(self, valores):
+        return valores['nome']
+
+    # --- Importação ---
+
+    def importar(self, linhas):
+        resultado = ResultadoImportacao()
+        with medindo(type(self).__name__) as metricas:
+            with etapa('preparação (mapas)'):
+                self.carregar()
+                existentes = {self.chave(self._valores_do_objeto(obj)): obj for obj in self.modelo.objects.all()}
+
+            with etapa(ETAPA_LEITURA):
+                linhas = list(enumerate(linhas, start=1))
+            metricas.linhas = len(linhas)
+
+            with etapa('diff'):
+                novos, alterados, campos_alterados, nivel_alterado = self._comparar(linhas, existentes, resultado)
+
+            with etapa('commit'), transaction.atomic():
+                with etapa('gravação (bulk)'):
+                    self.modelo.objects.bulk_create(novos, batch_size=self.tamanho_lote)
+                    if alterados:
+                        agora = timezone.now()
+                        for obj in alterados:
+                            obj.atualizado_em = agora
+                        self.modelo.objects.bulk_update(alterados, [*sorted(campos_alterados), 'atualizado_em'],
+                                                        batch_size=self.tamanho_lote)
+
+            resultado.criados = len(novos)
+            resultado.atualizados = len(alterados)
+            resultado.importados = [obj.pk for obj in novos + alterados if obj.pk]
+            if novos or alterados:
+                with etapa('hierarquia e caches'):
+                    cadastros_importados.send(sender=self.modelo, ids=resultado.importados,
+                                              cargos_nivel_alterado=nivel_alterado)
+        resultado.metricas = metricas
+        return resultado
+
+    def _valores_do_objeto(self, obj):
+        return {campo: getattr(obj, campo) for campo in ('nome', *self.campos)}
+
+    def _comparar(self, linhas, existentes, resultado):
+        novos, alterados, campos_alterados, nivel_alterado = [], [], set(), []
+        vistos = {}   # chave -> linha em que apareceu
+        for numero, linha in linhas:
+            try:
+                valores = self.valores(linha, resultado)
+            except ValueError as exc:
+                resultado.erro(numero, str(exc))
+                continue
+            chave = self.chave(valores)
+            if chave in vistos:
+                resultado.erro(numero, f"{self.rotulo} '{valores['nome']}' repetido (já veio na linha {vistos[chave]})")
+                continue
+            vistos[chave] = numero
+
+            obj = existentes.get(chave)
+            if obj is None:
+                novos.append(self.modelo(**valores))
+                continue
+            mudou = [campo for campo, valor in valores.items() if getattr(obj, campo) != valor]
+            if not mudou:
+                resultado.inalterados += 1
+                continue
+            if 'nivel' in mudou:
+                nivel_alterado.append(obj.pk)
+            for campo in mudou:
+                setattr(obj, campo, valores[campo])
+            campos_alterados.update(mudou)
+            alterados.append(obj)
+        return novos, alterados, campos_alterados, nivel_alterado
+
+    @staticmethod
+    def _descricao(linha, valores):
+        if 'descricao' in linha:
+            valores['descricao'] = _texto(linha['descricao']) or None
+        return valores
+
+    @staticmethod
+    def _nome(linha):
+        nome = _texto(linha.get('nome'))
+        if not nome:
+            raise ValueError("Coluna 'nome' vazia")
+        return nome
+
+
+class ImportadorCargos(ImportadorCadastro):
+    modelo = Cargo
+    campos = ('nivel', 'descricao')
+    rotulo = 'Cargo'
+    NIVEIS = dict(Cargo.NIVEL_CHOICES)
+
+    def valores(self, linha, resultado):
+        nome = self._nome(linha)
+        texto = _texto(linha.get('nivel'))
+        try:
+            nivel = int(float(texto))
+        except ValueError:
+            raise ValueError(f"Cargo '{nome}': nível inválido ({texto or 'vazio'})")
+        if nivel not in self.NIVEIS:
+            raise ValueError(f"Cargo '{nome}': nível {nivel} fora da tabela (1 a {max(self.NIVEIS)})")
+        return self._descricao(linha, {'nome': nome, 'nivel': nivel})
+
+
+class ImportadorSetores(ImportadorCadastro):
+    modelo = Setor
+    campos = ('descricao',)
+    rotulo = 'Setor'
+
+    def valores(self, linha, resultado):
+        return self._descricao(linha, {'nome': self._nome(linha)})
+
+
+class ImportadorCentrosServico(ImportadorCadastro):
+    modelo = CentroServico
+    campos = ('setor_id', 'descricao')
+    rotulo = 'Centro de serviço'
+    COLUNAS_SETOR = ('setor_nome', 'setor')   # 'setor_nome' é a coluna do Importar do Admin
+
+    def carregar(self):
+        self.setores = dict(Setor.objects.values_list('nome', 'pk'))
+
+    def chave(self, valores):
+        return valores['nome'], valores['setor_id']
+
+    def valores(self, linha, resultado):
+        nome = self._nome(linha)
+        setor = next((_texto(linha[coluna]) for coluna in self.COLUNAS_SETOR if coluna in linha), '')
+        if not setor:
+            raise ValueError(f"Centro de serviço '{nome}' sem setor")
+        if setor not in self.setores:
+            resultado.nao_encontrado('Setor', setor)
+            raise ValueError(f"Setor não encontrado: {setor}")
+        return self._descricao(linha, {'nome': nome, 'setor_id': self.setores[setor]})
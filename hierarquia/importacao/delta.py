@@ -0,0 +1,128 @@
+# hierarquia/importacao/delta.py
+"""
+Sincronização incremental (delta) da SRA.
+
+Em vez da planilha inteira, o Protheus envia só as linhas alteradas desde a
+última execução, cada uma com uma marca de alteração (coluna `COLUNA_MARCA`:
+data/hora ou número sequencial). A sincronização:
+
+1. pula as linhas com marca <= `ControleSincronizacao.ultima_marca` (já aplicadas,
+   contadas como inalteradas);
+2. grava as demais com o ImportadorFuncionarios, aplicando também as demissões
+   (ra_sit_folha 'D'), que a carga completa ignora;
+3. avança a marca para a maior marca lida, mesmo que alguma linha tenha dado erro
+   (ex: cargo ainda não cadastrado). As linhas com erro ficam em
+   `ControleSincronizacao.linhas_pendentes`, por matrícula, e são tentadas de novo
+   no início das próximas execuções; uma linha mais nova da mesma matrícula (com ou
+   sem erro) substitui a pendente. Assim uma linha ruim não faz toda execução
+   reler tudo o que veio depois dela.
+"""
+
+from django.utils import timezone
+
+from ..models_importacao import ControleSincronizacao
+from .funcionarios import COLUNA_LINHA, TAMANHO_LOTE, ImportadorFuncionarios, ResultadoImportacao
+
+ORIGEM_SRA = 'SRA'
+# Marca de alteração das tabelas do Protheus (TOTVS)
+COLUNA_MARCA = 'S_T_A_M_P_'
+
+
+class _FiltroMarca:
+    """ Iterador sobre as linhas ainda não aplicadas, guardando a maior marca lida. """
+
+    def __init__(self, linhas, controle, coluna, resultado):
+        self.linhas = linhas
+        self.controle = controle
+        self.coluna = coluna
+        self.resultado = resultado
+        self.maior = None
+
+    def __iter__(self):
+        for numero, linha in enumerate(self.linhas, start=1):
+            if self.coluna not in linha:
+                raise ValueError(f"Coluna de marca ausente: {self.coluna}")
+            marca = linha[self.coluna]
+            if marca in (None, ''):
+                self.resultado.erro(numero, "Marca de alteração vazia")
+                continue
+            try:
+                if not self.controle.pendente(marca):
+                    self.resultado.inalterados += 1
+                    continue
+                if self.maior is None or self.controle.chave(marca) > self.controle.chave(self.maior):
+                    self.maior = str(marca).strip()
+            except ValueError:
+                self.resultado.erro(numero, f"Marca de alteração inválida: {marca}")
+                continue
+            yield {**linha, COLUNA_LINHA: numero}
+
+
+class _LinhasPendentes:
+    """
+    Acompanha as linhas de cada lote gravado e guarda, por matrícula, as que deram
+    erro (`ao_gravar_lote` do ImportadorFuncionarios). Só o lote em gravação fica
+    em memória.
+    """
+
+    def __init__(self, pendentes, mapeamento):
+        self.por_matricula = dict(pendentes)
+        self.mapeamento = mapeamento
+        self._lote = {}   # número da linha -> (matrícula, linha)
+
+    def acompanhar(self, linhas):
+        for linha in linhas:
+            matricula = self.mapeamento.valores(linha).get('ra_mat')
+            if matricula:
+                self._lote[int(linha[COLUNA_LINHA])] = (matricula, linha)
+            yield linha
+
+    def ao_gravar_lote(self, linha_inicial, linha_final, parcial):
+        erros = dict(parcial.erros)
+        # Em ordem de leitura: a última linha de uma matrícula decide se ela fica pendente
+        for numero, (matricula, linha) in self._lote.items():
+            if numero in erros:
+                linha = {coluna: valor for coluna, valor in linha.items() if coluna != COLUNA_LINHA}
+                self.por_matricula[matricula] = {'linha': linha, 'erro': erros[numero]}
+            else:
+                self.por_matricula.pop(matricula, None)
+        self._lote.clear()
+
+
+def sincronizar_delta(linhas, origem=ORIGEM_SRA, coluna_marca=COLUNA_MARCA, tipo_marca=None,
+                      tamanho_lote=TAMANHO_LOTE):
+    """
+    Aplica uma carga delta (`linhas`: iterável de dicts) e registra a nova marca.
+    Retorna o ResultadoImportacao.
+    """
+    controle, _ = ControleSincronizacao.objects.get_or_create(
+        origem=origem, defaults={'tipo_marca': tipo_marca or ControleSincronizacao.MARCA_DATA})
+    if tipo_marca and controle.tipo_marca != tipo_marca:
+        raise ValueError(f"A origem {origem} usa marca do tipo '{controle.tipo_marca}', não '{tipo_marca}'")
+
+    importador = ImportadorFuncionarios(tamanho_lote=tamanho_lote, aplicar_demissoes=True)
+    pendentes = _LinhasPendentes(controle.linhas_pendentes, importador.mapeamento)
+    resultado = ResultadoImportacao()
+
+    # 1. Linhas com erro de execuções anteriores (antes das novas, que são mais recentes).
+    #    Os erros delas não entram em `resultado.erros`: seus números de linha não são os
+    #    da carga atual, e quem continua com erro segue em linhas_pendentes.
+    if controle.linhas_pendentes:
+        retentativa = ResultadoImportacao()
+        anteriores = [{**item['linha'], COLUNA_LINHA: numero}
+                      for numero, item in enumerate(controle.linhas_pendentes.values(), start=1)]
+        importador.importar(pendentes.acompanhar(anteriores), retentativa, ao_gravar_lote=pendentes.ao_gravar_lote)
+        retentativa.erros = []
+        resultado.somar(retentativa)
+
+    # 2. Carga atual
+    filtro = _FiltroMarca(linhas, controle, coluna_marca, resultado)
+    importador.importar(pendentes.acompanhar(filtro), resultado, ao_gravar_lote=pendentes.ao_gravar_lote)
+
+    controle.ultima_execucao = timezone.now()
+    if filtro.maior is not None:
+        controle.ultima_marca = filtro.maior
+    controle.linhas_pendentes = pendentes.por_matricula
+    controle.resumo = resultado.resumo()[:255]
+    controle.save(update_fields=['ultima_marca', 'linhas_pendentes', 'ultima_execucao', 'resumo'])
+    return resultado
@@ -0,0 +1,387 @@
+# hierarquia/importacao/funcionarios.py
+"""
+Importação em massa da SRA (Protheus) para Funcionario.
+
+O import do Admin (FuncionarioResource, use_model_save=True) roda o save() de
+cada linha: consultas de Cargo e Setor, ContentType/Permission e sincronização
+de permissões, linha a linha. Aqui o arquivo é lido em lotes e:
+
+1. Cargo e Setor são resolvidos por dicionários carregados uma única vez
+   (nomes normalizados, como nos widgets do FuncionarioResource);
+2. linhas cujo hash (hash_sra) não mudou desde a última importação são puladas;
+   as demais são gravadas em lote com bulk_create / bulk_update;
+3. `ativo` e as permissões de equipe são aplicados depois, em comandos por lote;
+4. ao final, o sinal `funcionarios_importados` reconstrói a hierarquia e
+   invalida os caches (ver signals.py).
+
+O mapeamento coluna -> campo é o mesmo do FuncionarioResource.
+"""
+
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+from import_export.widgets import CharWidget
+
+from ..models import Cargo, Setor
+from ..metricas import ETAPA_LEITURA, etapa, medindo
+from ..models_funcionario import SITUACOES_INATIVAS, Funcionario
+from ..permissoes import sincronizar_equipe
+from ..protheus import CAMPOS_DATA, hash_linha
+from ..resources import FuncionarioResource, normalizar_nome
+from .leitura import em_lotes
+
+# Enviado ao final de uma importação em massa (que não passa pelos sinais de post_save).
+# `funcionario_ids`: Funcionario.pk criados ou atualizados.
+funcionarios_importados = Signal()
+
+TAMANHO_LOTE = 1000
+# Linhas por UPDATE do bulk_update (cada coluna vira um CASE com uma cláusula por linha)
+TAMANHO_LOTE_UPDATE = 100
+# Coluna opcional com o número da linha no arquivo original (ver paralelo.py)
+COLUNA_LINHA = '_linha'
+
+
+def gravar_responsaveis(itens):
+    """ Substitui setores_responsaveis de cada (funcionario_id, setor_ids) (DELETE + INSERT). """
+    through = Funcionario.setores_responsaveis.through
+    itens = list(itens)
+    through.objects.filter(funcionario_id__in=[pk for pk, _ in itens]).delete()
+    through.objects.bulk_create([
+        through(funcionario_id=pk, setor_id=setor_id)
+        for pk, setor_ids in itens for setor_id in set(setor_ids)
+    ], ignore_conflicts=True)
+
+
+class MapeamentoSRA:
+    """ Colunas da planilha -> campos do Funcionario, lidas do FuncionarioResource. """
+
+    def __init__(self, resource=None):
+        resource = resource or FuncionarioResource()
+        self.colunas = {}
+        for campo in resource.get_import_fields():
+            if campo.attribute and campo.attribute.startswith('ra_'):
+                self.colunas.setdefault(campo.column_name, []).append(campo.attribute)
+        self.coluna_usuario = resource.fields['usuario'].column_name
+        self.coluna_cargo = resource.fields['cargo'].column_name
+        self.coluna_setor = resource.fields['setor_primario'].column_name
+        self.coluna_responsaveis = resource.fields['setores_responsaveis'].column_name
+        self.separador_responsaveis = resource.fields['setores_responsaveis'].widget.separator
+        self._texto = CharWidget().clean
+
+    def valores(self, linha):
+        """ {campo ra_*: texto} das colunas conhecidas presentes na linha. """
+        valores = {}
+        for coluna, valor in linha.items():
+            for atributo in self.colunas.get(coluna, ()):
+                valores[atributo] = self._texto(valor)
+        return valores
+
+    def impressao(self, linha, valores=None):
+        """
+        Hash da linha normalizada: campos ra_* e os textos de Cargo, Setor, usuário
+        e setores responsáveis. Igual ao `hash_sra` gravado => nada mudou na SRA.
+        """
+        normalizada = dict(valores if valores is not None else self.valores(linha))
+        if self.coluna_cargo in linha:
+            normalizada['cargo'] = normalizar_nome(linha[self.coluna_cargo]) or ''
+        if self.coluna_setor in linha:
+            normalizada['setor_primario'] = normalizar_nome(linha[self.coluna_setor]) or ''
+        if self.coluna_usuario in linha:
+            normalizada['usuario'] = self._texto(linha[self.coluna_usuario])
+        responsaveis = self.responsaveis(linha)
+        if responsaveis is not None:
+            normalizada['setores_responsaveis'] = sorted(set(responsaveis))
+        return hash_linha(normalizada)
+
+    def responsaveis(self, linha):
+        """ Nomes de setores da coluna de setores responsáveis (None se a coluna não veio). """
+        if self.coluna_responsaveis not in linha:
+            return None
+        texto = linha[self.coluna_responsaveis]
+        if not texto:
+            return []
+        return [nome.strip() for nome in str(texto).split(self.separador_responsaveis) if nome.strip()]
+
+
+def descrever_nao_encontrados(nao_encontrados, limite=20):
+    """ {rótulo: Counter({valor: linhas})} -> uma mensagem por rótulo. """
+    mensagens = []
+    for rotulo, contagem in sorted(nao_encontrados.items()):
+        itens = [f"{valor} ({linhas} linha{'s' if linhas > 1 else ''})"
+                 for valor, linhas in contagem.most_common(limite)]
+        if len(contagem) > limite:
+            itens.append(f"e mais {len(contagem) - limite}")
+        mensagens.append(f"{rotulo} não encontrado: {'; '.join(itens)}")
+    return mensagens
+
+
+class ResultadoImportacao:
+    def __init__(self):
+        self.criados = 0
+        self.atualizados = 0
+        self.ignorados = 0
+        self.inalterados = 0   # mesmo hash_sra da última importação
+        self.erros = []   # [(linha, mensagem)]
+        self.importados = []   # Funcionario.pk criados ou atualizados
+        self.responsaveis_pendentes = []   # [(funcionario_id, setor_ids)] quando adiados
+        self.nao_encontrados = {}   # {rótulo: Counter({valor: linhas})}
+        self.retomada_de = 0   # linhas já gravadas numa execução anterior (ver retomada.py)
+        self.metricas = None   # MetricasImportacao (ver metricas.py)
+
+    def erro(self, linha, mensagem):
+        self.erros.append((linha, mensagem))
+
+    def nao_encontrado(self, rotulo, valor):
+        self.nao_encontrados.setdefault(rotulo, Counter())[valor] += 1
+
+    def relatorio_nao_encontrados(self):
+        return descrever_nao_encontrados(self.nao_encontrados)
+
+    def somar(self, outro):
+        """ Acumula o resultado de outra parte da mesma importação. """
+        self.criados += outro.criados
+        self.atualizados += outro.atualizados
+        self.ignorados += outro.ignorados
+        self.inalterados += outro.inalterados
+        self.erros += outro.erros
+        self.importados += outro.importados
+        self.responsaveis_pendentes += outro.responsaveis_pendentes
+        for rotulo, contagem in outro.nao_encontrados.items():
+            self.nao_encontrados.setdefault(rotulo, Counter()).update(contagem)
+
+    def resumo(self):
+        return (f"{self.criados} criados, {self.atualizados} atualizados, "
+                f"{self.inalterados} inalterados, {self.ignorados} ignorados, "
+                f"{len(self.erros)} com erro")
+
+
+class ImportadorFuncionarios:
+    """
+    Uso:
+        resultado = ImportadorFuncionarios().importar(ler_linhas('sra.csv'))
+    `linhas` é qualquer iterável de dicts {coluna: valor} (ver leitura.py).
+
+    Numa partição da importação paralela (paralelo.py), `adiar_responsaveis` deixa
+    a M2M setores_responsaveis em `resultado.responsaveis_pendentes` e `notificar=False`
+    não envia `funcionarios_importados`: as duas coisas ficam para a fase final.
+
+    Na carga completa, linhas de demitidos (ra_sit_folha 'D') são ignoradas, como no
+    FuncionarioResource. Com `aplicar_demissoes` (sincronização delta, ver delta.py)
+    elas atualizam o funcionário já cadastrado, que fica inativo; matrículas
+    desconhecidas continuam ignoradas.
+    """
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE, mapeamento=None, adiar_responsaveis=False, notificar=True,
+                 aplicar_demissoes=False):
+        self.tamanho_lote = tamanho_lote
+        self.mapeamento = mapeamento or MapeamentoSRA()
+        self.adiar_responsaveis = adiar_responsaveis
+        self.notificar = notificar
+        self.aplicar_demissoes = aplicar_demissoes
+
+    def importar(self, linhas, resultado=None, pular=0, ao_gravar_lote=None):
+        """
+        `pular`: linhas iniciais já gravadas numa execução anterior (ver retomada.py).
+        `ao_gravar_lote(linha_inicial, linha_final, parcial)` roda dentro da transação
+        de cada lote, com o ResultadoImportacao só daquele lote.
+        """
+        resultado = resultado or ResultadoImportacao()
+        with medindo(type(self).__name__, modo='massa') as metricas:
+            with etapa('preparação (mapas)'):
+                self._carregar_mapas()
+            lotes = em_lotes(islice(enumerate(linhas, start=1), pular, None), self.tamanho_lote)
+            while True:
+                with etapa(ETAPA_LEITURA):
+                    lote = next(lotes, None)
+                if lote is None:
+                    break
+                parcial = ResultadoImportacao()
+                # O que sobra fora das etapas internas é o commit do lote
+                with etapa('commit'), transaction.atomic():
+                    with etapa('gravação (bulk)'):
+                        parcial.importados = self._importar_lote(lote, parcial)
+                    with etapa('efeitos (ativo e permissões)'):
+                        self._aplicar_efeitos(parcial.importados)
+                    if ao_gravar_lote:
+                        with etapa('ponto de retomada'):
+                            ao_gravar_lote(lote[0][0], lote[-1][0], parcial)
+                resultado.somar(parcial)
+                metricas.linhas += len(lote)
+            if self.notificar and resultado.importados:
+                with etapa('hierarquia e caches'):
+                    funcionarios_importados.send(sender=self.__class__, funcionario_ids=resultado.importados)
+        resultado.metricas = metricas
+        return resultado
+
+    # --- Etapas ---
+
+    def _carregar_mapas(self):
+        """ Cargo e Setor por nome normalizado (como os widgets do FuncionarioResource). """
+        self.cargos = {normalizar_nome(nome): pk for pk, nome in Cargo.objects.values_list('pk', 'nome')}
+        self.setores = {normalizar_nome(nome): pk for pk, nome in Setor.objects.values_list('pk', 'nome')}
+
+    def _resolver(self, mapa, nome, rotulo, resultado):
+        if not nome:
+            return None
+        try:
+            return mapa[nome]
+        except KeyError:
+            resultado.nao_encontrado(rotulo, nome)
+            raise ValueError(f"{rotulo} não encontrado: {nome}")
+
+    def _relacionamentos(self, linha, usuarios, resultado):
+        """ {campo FK: pk} das colunas de relacionamento presentes na linha. """
+        m = self.mapeamento
+        buscas = []
+        if m.coluna_cargo in linha:
+            buscas.append(('cargo', self.cargos, normalizar_nome(linha[m.coluna_cargo]), 'Cargo'))
+        if m.coluna_setor in linha:
+            buscas.append(('setor_primario', self.setores, normalizar_nome(linha[m.coluna_setor]), 'Setor'))
+        if m.coluna_usuario in linha:
+            buscas.append(('usuario', usuarios, linha[m.coluna_usuario], 'Usuário'))
+
+        # Resolve todas as colunas antes de falhar, para o relatório contar cada valor ausente
+        fks, erros = {}, []
+        for campo, mapa, nome, rotulo in buscas:
+            try:
+                fks[campo] = self._resolver(mapa, nome, rotulo, resultado)
+            except ValueError as erro:
+                erros.append(str(erro))
+        if erros:
+            raise ValueError('; '.join(erros))
+        return fks
+
+    def _setores_responsaveis(self, linha, resultado):
+        """ pks dos setores responsáveis; como no ManyToManyWidget, nomes inexistentes são ignorados. """
+        nomes = self.mapeamento.responsaveis(linha)
+        if nomes is None:
+            return None
+        setor_ids = []
+        for nome in map(normalizar_nome, nomes):
+            if nome in self.setores:
+                setor_ids.append(self.setores[nome])
+            else:
+                resultado.nao_encontrado('Setor responsável', nome)
+        return setor_ids
+
+    def _importar_lote(self, lote, resultado):
+        m = self.mapeamento
+
+        # 1. Normaliza as linhas (a última ocorrência de uma matrícula vence)
+        lidas, demitidos = {}, set()
+        for numero, linha in lote:
+            numero = int(linha.get(COLUNA_LINHA) or numero)
+            valores = m.valores(linha)
+            matricula = valores.get('ra_mat')
+            if not matricula:
+                resultado.erro(numero, "Matrícula vazia")
+                continue
+            if valores.get('ra_sit_folha') == 'D':
+                if not self.aplicar_demissoes:
+                    # Mesma regra do FuncionarioResource.skip_row: demitidos não são importados
+                    resultado.ignorados += 1
+                    continue
+                demitidos.add(matricula)
+            else:
+                demitidos.discard(matricula)
+            lidas[matricula] = (numero, linha, valores, m.impressao(linha, valores))
+        if not lidas:
+            return []
+
+        # 2. Funcionários existentes do lote: só segue quem mudou desde a última importação
+        existentes = {}
+        for matricula, pk, impressao in Funcionario.objects.filter(ra_mat__in=lidas) \
+                                                           .values_list('ra_mat', 'pk', 'hash_sra'):
+            if matricula not in lidas:
+                continue  # matrícula duplicada no banco: já tratada
+            if impressao and impressao == lidas[matricula][3]:
+                del lidas[matricula]
+                resultado.inalterados += 1
+            else:
+                existentes[matricula] = pk
+        # Demissão de quem nunca foi importado: nada a desligar
+        for matricula in demitidos - set(existentes):
+            if matricula in lidas:
+                del lidas[matricula]
+                resultado.ignorados += 1
+        if not lidas:
+            return []
+
+        # 3. Usuários citados no lote (1 consulta)
+        nomes_usuarios = {linha.get(m.coluna_usuario) for _, linha, _, _ in lidas.values()} - {None, ''}
+        usuarios = dict(User.objects.filter(username__in=nomes_usuarios).values_list('username', 'pk')) \
+            if nomes_usuarios else {}
+
+        # 4. Monta as instâncias
+        agora = timezone.now()
+        novos, alterados, responsaveis = [], {}, {}
+        for matricula, (numero, linha, valores, impressao) in lidas.items():
+            try:
+                fks = self._relacionamentos(linha, usuarios, resultado)
+            except ValueError as erro:
+                resultado.erro(numero, str(erro))
+                continue
+
+            setores_responsaveis = self._setores_responsaveis(linha, resultado)
+            func = Funcionario(pk=existentes.get(matricula), hash_sra=impressao, **valores)
+            for campo, pk in fks.items():
+                setattr(func, f'{campo}_id', pk)
+            func.sincronizar_datas()
+            if func.pk:
+                func.atualizado_em = agora
+                alterados[func.pk] = (func, {'hash_sra', *valores, *fks})
+            else:
+                novos.append(func)
+            if setores_responsaveis is not None:
+                responsaveis[matricula] = (func, setores_responsaveis)
+
+        # 5. Grava
+        if novos:
+            Funcionario.objects.bulk_create(novos, batch_size=self.tamanho_lote)
+        if alterados:
+            self._atualizar(alterados)
+        if responsaveis:
+            itens = [(func.pk, setor_ids) for func, setor_ids in responsaveis.values()]
+            if self.adiar_responsaveis:
+                resultado.responsaveis_pendentes += itens
+            else:
+                gravar_responsaveis(itens)
+
+        resultado.criados += len(novos)
+        resultado.atualizados += len(alterados)
+        return [func.pk for func in novos] + list(alterados)
+
+    def _atualizar(self, alterados):
+        """
+        Grava {pk: (funcionario, campos da linha)} só com as colunas que mudaram:
+        compara com o banco (1 consulta) e faz um bulk_update por conjunto de
+        colunas alteradas, em vez de um CASE por coluna do arquivo para toda linha.
+        """
+        campos = set().union(*(campos_linha for _, campos_linha in alterados.values()))
+        atuais = {linha.pop('pk'): linha
+                  for linha in Funcionario.objects.filter(pk__in=alterados).values('pk', *campos)}
+
+        grupos = {}
+        for pk, (func, campos_linha) in alterados.items():
+            atual = atuais.get(pk, {})
+            mudaram = frozenset(campo for campo in campos_linha
+                                if getattr(func, Funcionario._meta.get_field(campo).attname) != atual.get(campo))
+            grupos.setdefault(mudaram, []).append(func)
+
+        for mudaram, funcionarios in grupos.items():
+            campos_datas = [campo for campo, origem in CAMPOS_DATA.items() if origem in mudaram]
+            Funcionario.objects.bulk_update(funcionarios, sorted(mudaram) + campos_datas + ['atualizado_em'],
+                                            batch_size=TAMANHO_LOTE_UPDATE)
+
+    def _aplicar_efeitos(self, ids):
+        """ O que o save() faria linha a linha: `ativo` por ra_sit_folha e permissões de equipe. """
+        if not ids:
+            return
+        Funcionario.objects.filter(pk__in=ids).exclude(ra_sit_folha__isnull=True).exclude(ra_sit_folha='') \
+            .update(ativo=Case(When(ra_sit_folha__in=SITUACOES_INATIVAS, then=Value(False)), default=Value(True)))
+        sincronizar_equipe(ids)
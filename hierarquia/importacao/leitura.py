@@ -0,0 +1,88 @@
+# hierarquia/importacao/leitura.py
+"""
+Leitura linha a linha das planilhas do Protheus (CSV ou XLSX).
+Nada é carregado inteiro na memória: o CSV é decodificado incrementalmente
+e o XLSX é aberto em modo somente-leitura do openpyxl.
+"""
+
+import csv
+import io
+from itertools import islice
+
+# Mesma codificação do FuncionarioResource ("ANSI" / Windows Brasil)
+ENCODING_PADRAO = 'windows-1252'
+
+
+def _abrir_binario(arquivo):
+    """ Aceita um caminho ou um arquivo já aberto (ex: UploadedFile do Django). """
+    if isinstance(arquivo, (str, bytes)) or hasattr(arquivo, '__fspath__'):
+        return open(arquivo, 'rb'), True
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+    return arquivo, False
+
+
+def _nome_do_arquivo(arquivo, nome):
+    return str(nome or getattr(arquivo, 'name', None) or arquivo)
+
+
+def ler_csv(arquivo, encoding=ENCODING_PADRAO, delimitador=','):
+    binario, proprio = _abrir_binario(arquivo)
+    try:
+        texto = io.TextIOWrapper(binario, encoding=encoding, newline='')
+        try:
+            yield from csv.DictReader(texto, delimiter=delimitador)
+        finally:
+            # Não fecha o arquivo de quem chamou junto com o wrapper
+            texto.detach()
+    finally:
+        if proprio:
+            binario.close()
+
+
+def ler_xlsx(arquivo):
+    from openpyxl import load_workbook
+
+    binario, proprio = _abrir_binario(arquivo)
+    planilha = load_workbook(binario, read_only=True, data_only=True)
+    try:
+        linhas = planilha.active.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        colunas = [str(coluna).strip() if coluna is not None else '' for coluna in cabecalho]
+        for valores in linhas:
+            if not any(valor not in (None, '') for valor in valores):
+                continue
+            yield dict(zip(colunas, valores))
+    finally:
+        planilha.close()
+        if proprio:
+            binario.close()
+
+
+def ler_linhas(arquivo, nome=None, encoding=ENCODING_PADRAO, delimitador=','):
+    """ Gera um dict {coluna: valor} por linha; o formato vem da extensão do arquivo. """
+    if _nome_do_arquivo(arquivo, nome).lower().endswith('.xlsx'):
+        return ler_xlsx(arquivo)
+    return ler_csv(arquivo, encoding=encoding, delimitador=delimitador)
+
+
+def contar_linhas(arquivo, nome=None, encoding=ENCODING_PADRAO, delimitador=','):
+    """ Número de linhas de dados (uma passada a mais no arquivo; usado para mostrar o progresso). """
+    binario, proprio = _abrir_binario(arquivo)
+    try:
+        return sum(1 for _ in ler_linhas(binario, nome=_nome_do_arquivo(arquivo, nome),
+                                         encoding=encoding, delimitador=delimitador))
+    finally:
+        if proprio:
+            binario.close()
+        else:
+            binario.seek(0)
+
+
+def em_lotes(linhas, tamanho):
+    """ Agrupa um iterável em listas de até `tamanho` itens. """
+    linhas = iter(linhas)
+    while lote := list(islice(linhas, tamanho)):
+        yield lote
@@ -0,0 +1,97 @@
+# hierarquia/importacao/origem.py
+"""
+Leitura da SRA direto do banco do Protheus, sem exportar planilha.
+
+As linhas saem de um cursor do lado do servidor (`chunked_cursor`: cursor nomeado
+no PostgreSQL), em blocos de `tamanho_lote`, já no formato da planilha
+({coluna do FuncionarioResource: valor}). Assim elas seguem sem conversão para o
+ImportadorFuncionarios ou para a sincronização delta, e a leitura do próximo
+bloco acontece enquanto o anterior é gravado.
+
+Coluna de origem de cada campo: o atributo em maiúsculas (ra_mat -> RA_MAT), salvo
+o que estiver em settings.PROTHEUS_SRA_COLUNAS. Colunas inexistentes na tabela são
+ignoradas (o campo não é alterado), como uma coluna ausente na planilha.
+"""
+
+from django.conf import settings
+from django.db import connections
+
+from .funcionarios import TAMANHO_LOTE, MapeamentoSRA
+
+# Protheus: registros apagados ficam com '*' em D_E_L_E_T_
+COLUNA_EXCLUSAO = 'D_E_L_E_T_'
+
+
+class TabelaSRA:
+    """
+    Uso:
+        for linha in TabelaSRA('protheus').linhas(): ...
+    """
+
+    def __init__(self, alias='protheus', tabela=None, colunas=None, mapeamento=None, tamanho_lote=TAMANHO_LOTE):
+        if alias not in connections.databases:
+            raise ValueError(f"Banco não configurado: {alias}")
+        self.conexao = connections[alias]
+        self.tabela = tabela or settings.PROTHEUS_SRA_TABELA
+        self.colunas = colunas if colunas is not None else getattr(settings, 'PROTHEUS_SRA_COLUNAS', {})
+        self.mapeamento = mapeamento or MapeamentoSRA()
+        self.tamanho_lote = tamanho_lote
+
+    def _colunas_tabela(self):
+        """ {NOME EM MAIÚSCULAS: nome real} das colunas da tabela de origem. """
+        with self.conexao.cursor() as cursor:
+            if self.tabela not in self.conexao.introspection.table_names(cursor):
+                raise ValueError(f"Tabela não encontrada no banco {self.conexao.alias}: {self.tabela}")
+            descricao = self.conexao.introspection.get_table_description(cursor, self.tabela)
+        return {coluna.name.upper(): coluna.name for coluna in descricao}
+
+    def _selecao(self, existentes):
+        """ [(coluna de origem, coluna da planilha)] do que a tabela tem. """
+        m = self.mapeamento
+        destinos = {atributo: coluna for coluna, atributos in m.colunas.items() for atributo in atributos}
+        destinos.update({'cargo': m.coluna_cargo, 'setor_primario': m.coluna_setor,
+                         'usuario': m.coluna_usuario, 'setores_responsaveis': m.coluna_responsaveis})
+        selecao = []
+        for atributo, destino in destinos.items():
+            origem = self.colunas.get(atributo) or (atributo.upper() if atributo.startswith('ra_') else None)
+            if origem and origem.upper() in existentes:
+                selecao.append((existentes[origem.upper()], destino))
+        return selecao
+
+    def linhas(self, coluna_marca=None, apos=None):
+        """
+        Gera as linhas da tabela. Com `coluna_marca`, o valor dela vem na chave
+        `coluna_marca` de cada linha e, se `apos` for informado, só vêm as linhas
+        com marca maior (filtro feito no banco), em ordem de marca.
+        """
+        existentes = self._colunas_tabela()
+        selecao = self._selecao(existentes)
+        if coluna_marca:
+            if coluna_marca.upper() not in existentes:
+                raise ValueError(f"Coluna de marca ausente na tabela {self.tabela}: {coluna_marca}")
+            selecao.append((existentes[coluna_marca.upper()], coluna_marca))
+
+        q = self.conexao.ops.quote_name
+        sql = f"SELECT {', '.join(q(origem) for origem, _ in selecao)} FROM {q(self.tabela)}"
+        filtros, parametros = [], []
+        if COLUNA_EXCLUSAO in existentes:
+            filtros.append(f"{q(existentes[COLUNA_EXCLUSAO])} <> '*'")
+        if coluna_marca and apos not in (None, ''):
+            filtros.append(f"{q(existentes[coluna_marca.upper()])} > %s")
+            parametros.append(apos)
+        if filtros:
+            sql += f" WHERE {' AND '.join(filtros)}"
+        if coluna_marca:
+            sql += f" ORDER BY {q(existentes[coluna_marca.upper()])}"
+
+        destinos = [destino for _, destino in selecao]
+        with self.conexao.chunked_cursor() as cursor:
+            cursor.execute(sql, parametros)
+            while True:
+                bloco = cursor.fetchmany(self.tamanho_lote)
+                if not bloco:
+                    break
+                for registro in bloco:
+                    # Colunas CHAR do Protheus vêm completadas com espaços
+                    yield {destino: valor.rstrip() if isinstance(valor, str) else valor
+                           for destino, valor in zip(destinos, registro)}
@@ -0,0 +1,109 @@
+# hierarquia/importacao/paralelo.py
+"""
+Importação da SRA em vários processos.
+
+1. O processo principal lê o arquivo (em streaming) e distribui as linhas em
+   N partições gravadas em CSVs temporários, por hash da matrícula.
+2. Cada partição roda o ImportadorFuncionarios num processo próprio, com a sua
+   conexão ao banco. A matrícula é a chave com que o importador encontra o
+   funcionário (e não é única no banco): uma mesma matrícula cai sempre na mesma
+   partição, então dois processos nunca a veem como nova e a inserem em dobro.
+3. Fase final, no processo principal: grava a M2M setores_responsaveis de todas
+   as partições e envia `funcionarios_importados` uma única vez (hierarquia e caches).
+
+No PostgreSQL cada processo usa um núcleo; no SQLite as gravações são serializadas
+pelo próprio banco, então vale usar `processos=1`.
+"""
+
+import csv
+import os
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections, transaction
+
+from .funcionarios import (
+    COLUNA_LINHA, TAMANHO_LOTE, ImportadorFuncionarios, MapeamentoSRA, ResultadoImportacao,
+    funcionarios_importados, gravar_responsaveis,
+)
+from ..metricas import etapa, medindo
+from .leitura import em_lotes, ler_csv
+
+def _iniciar_processo():
+    """ Inicializa o Django no processo filho (necessário quando o início é por 'spawn'). """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _importar_particao(caminho, tamanho_lote):
+    importador = ImportadorFuncionarios(tamanho_lote=tamanho_lote, adiar_responsaveis=True, notificar=False)
+    try:
+        return importador.importar(ler_csv(caminho, encoding='utf-8'))
+    finally:
+        connections.close_all()
+
+
+def particionar(linhas, pasta, processos, mapeamento=None):
+    """
+    Grava as linhas em até `processos` CSVs (UTF-8) dentro de `pasta`, com a coluna
+    COLUNA_LINHA guardando o número da linha original. Retorna os caminhos usados.
+    """
+    mapeamento = mapeamento or MapeamentoSRA()
+    colunas_chave = [coluna for coluna, atributos in mapeamento.colunas.items() if 'ra_mat' in atributos]
+
+    arquivos, escritores = {}, {}
+    try:
+        for numero, linha in enumerate(linhas, start=1):
+            valor = next((str(linha[coluna]) for coluna in colunas_chave if linha.get(coluna)), '')
+            particao = zlib.crc32(valor.encode('utf-8')) % processos
+            if particao not in escritores:
+                caminho = os.path.join(pasta, f'particao_{particao}.csv')
+                arquivos[particao] = open(caminho, 'w', encoding='utf-8', newline='')
+                escritores[particao] = csv.DictWriter(arquivos[particao], fieldnames=[COLUNA_LINHA, *linha.keys()],
+                                                      extrasaction='ignore')
+                escritores[particao].writeheader()
+            escritores[particao].writerow({COLUNA_LINHA: numero, **linha})
+    finally:
+        for arquivo in arquivos.values():
+            arquivo.close()
+    return [arquivo.name for _, arquivo in sorted(arquivos.items())]
+
+
+def importar_em_paralelo(linhas, processos=None, tamanho_lote=TAMANHO_LOTE):
+    """ Importa `linhas` (iterável de dicts) em `processos` processos. Retorna um ResultadoImportacao. """
+    processos = processos or os.cpu_count() or 1
+    resultado = ResultadoImportacao()
+    # Cada processo grava o próprio relatório; este cobre o total (partições, espera e fase final)
+    with medindo('importar_em_paralelo', modo='paralelo', processos=processos) as metricas:
+        pasta = tempfile.mkdtemp(prefix='importacao_sra_')
+        try:
+            with etapa('particionamento'):
+                caminhos = particionar(linhas, pasta, processos)
+
+            # As conexões do processo principal não podem ser herdadas pelos filhos (fork)
+            connections.close_all()
+            with etapa('processos (partições)'), ProcessPoolExecutor(
+                    max_workers=min(processos, len(caminhos)) or 1, initializer=_iniciar_processo) as executor:
+                for parcial in executor.map(_importar_particao, caminhos, [tamanho_lote] * len(caminhos)):
+                    resultado.somar(parcial)
+                    if parcial.metricas:
+                        metricas.linhas += parcial.metricas.linhas
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+        # --- Fase final (entre partições) ---
+        with etapa('responsáveis (M2M)'):
+            for lote in em_lotes(resultado.responsaveis_pendentes, tamanho_lote):
+                with transaction.atomic():
+                    gravar_responsaveis(lote)
+        resultado.responsaveis_pendentes = []
+        resultado.erros.sort(key=lambda erro: erro[0] or 0)
+        if resultado.importados:
+            with etapa('hierarquia e caches'):
+                funcionarios_importados.send(sender=ImportadorFuncionarios, funcionario_ids=resultado.importados)
+    resultado.metricas = metricas
+    return resultado
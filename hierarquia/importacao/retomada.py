@@ -0,0 +1,131 @@
+# hierarquia/importacao/retomada.py
+"""
+Importação de planilha com ponto de retomada (checkpoint).
+
+Cada lote gravado registra um LoteImportacao (totais e erros do lote) e avança
+`ImportacaoArquivo.ultima_linha`. No modo massa isso acontece na MESMA transação
+do lote: o ponto de retomada nunca fica à frente (ou atrás) do que foi gravado.
+No modo linha o import_data() tem a sua própria transação e o registro vem logo
+depois; se o processo cair entre os dois, o lote é refeito (e as linhas já
+gravadas são puladas pelo hash_sra).
+
+Se a importação cair, reenviar o mesmo arquivo (identificado pelo SHA-256) retoma
+da linha seguinte ao último lote gravado, e o resultado final soma as duas execuções.
+"""
+
+import hashlib
+from collections import Counter
+
+from django.utils import timezone
+
+from ..metricas import etapa, medindo
+from ..models_importacao import ImportacaoArquivo, LoteImportacao
+from .funcionarios import TAMANHO_LOTE, ImportadorFuncionarios, ResultadoImportacao, funcionarios_importados
+from .leitura import ENCODING_PADRAO, _abrir_binario, _nome_do_arquivo, ler_linhas
+
+MODO_MASSA = 'massa'
+MODO_LINHA = 'linha'
+
+
+def hash_arquivo(arquivo, tamanho_bloco=1024 * 1024):
+    """ SHA-256 do conteúdo (caminho ou arquivo aberto, que volta ao início). """
+    binario, proprio = _abrir_binario(arquivo)
+    try:
+        sha = hashlib.sha256()
+        while bloco := binario.read(tamanho_bloco):
+            sha.update(bloco)
+        return sha.hexdigest()
+    finally:
+        if proprio:
+            binario.close()
+        else:
+            binario.seek(0)
+
+
+def resultado_gravado(importacao):
+    """ ResultadoImportacao somado dos lotes já gravados de `importacao`. """
+    resultado = ResultadoImportacao()
+    for lote in importacao.lotes.all():
+        resultado.criados += lote.criados
+        resultado.atualizados += lote.atualizados
+        resultado.inalterados += lote.inalterados
+        resultado.ignorados += lote.ignorados
+        resultado.erros += [tuple(erro) for erro in lote.erros]
+        resultado.importados += lote.funcionario_ids
+        for rotulo, contagem in lote.nao_encontrados.items():
+            resultado.nao_encontrados.setdefault(rotulo, Counter()).update(contagem)
+    return resultado
+
+
+def _registrar_lote(importacao, ao_progresso=None):
+    def registrar(linha_inicial, linha_final, parcial):
+        LoteImportacao.objects.create(
+            importacao=importacao, linha_inicial=linha_inicial, linha_final=linha_final,
+            criados=parcial.criados, atualizados=parcial.atualizados,
+            inalterados=parcial.inalterados, ignorados=parcial.ignorados,
+            erros=[list(erro) for erro in parcial.erros],
+            nao_encontrados={rotulo: dict(contagem) for rotulo, contagem in parcial.nao_encontrados.items()},
+            funcionario_ids=parcial.importados,
+        )
+        ImportacaoArquivo.objects.filter(pk=importacao.pk).update(ultima_linha=linha_final,
+                                                                  atualizada_em=timezone.now())
+        importacao.ultima_linha = linha_final
+        if ao_progresso:
+            ao_progresso(linha_final)
+    return registrar
+
+
+def importar_arquivo(arquivo, nome=None, modo=MODO_MASSA, tamanho_lote=TAMANHO_LOTE,
+                     encoding=ENCODING_PADRAO, delimitador=',', reiniciar=False, ao_progresso=None):
+    """
+    Importa a planilha (caminho ou arquivo aberto) retomando, se houver, a última
+    importação inacabada do mesmo arquivo. `reiniciar=True` ignora o ponto de retomada.
+    `ao_progresso(linhas já gravadas)` é chamado a cada lote (ver tarefas.py).
+    Retorna (ImportacaoArquivo, ResultadoImportacao da importação inteira).
+    """
+    from ..resources import FuncionarioResource
+
+    nome = _nome_do_arquivo(arquivo, nome)
+    with medindo('importar_arquivo', modo=modo, arquivo=nome) as metricas:
+        with etapa('hash do arquivo'):
+            sha = hash_arquivo(arquivo)
+        pendentes = ImportacaoArquivo.objects.filter(hash_arquivo=sha) \
+                                             .exclude(status=ImportacaoArquivo.STATUS_CONCLUIDA)
+        importacao = None if reiniciar else pendentes.order_by('-iniciada_em').first()
+        if importacao is None:
+            importacao = ImportacaoArquivo.objects.create(hash_arquivo=sha, nome_arquivo=nome[-255:], modo=modo)
+            resultado = ResultadoImportacao()
+        else:
+            importacao.status = ImportacaoArquivo.STATUS_EM_ANDAMENTO
+            importacao.save(update_fields=['status', 'atualizada_em'])
+            resultado = resultado_gravado(importacao)
+        retomada_de = importacao.ultima_linha
+
+        linhas = ler_linhas(arquivo, nome=nome, encoding=encoding, delimitador=delimitador)
+        registrar = _registrar_lote(importacao, ao_progresso)
+        if ao_progresso and retomada_de:
+            ao_progresso(retomada_de)
+        try:
+            if modo == MODO_LINHA:
+                parcial = FuncionarioResource().importar_em_lotes(linhas, tamanho_lote=tamanho_lote,
+                                                                  pular=retomada_de, ao_gravar_lote=registrar)
+            else:
+                # A hierarquia e os caches são atualizados no final, com os ids das duas execuções
+                parcial = ImportadorFuncionarios(tamanho_lote=tamanho_lote, notificar=False).importar(
+                    linhas, pular=retomada_de, ao_gravar_lote=registrar)
+        except Exception:
+            ImportacaoArquivo.objects.filter(pk=importacao.pk).update(status=ImportacaoArquivo.STATUS_FALHOU)
+            raise
+        resultado.somar(parcial)
+        resultado.retomada_de = retomada_de
+
+        if modo == MODO_MASSA and resultado.importados:
+            with etapa('hierarquia e caches'):
+                funcionarios_importados.send(sender=ImportadorFuncionarios, funcionario_ids=resultado.importados)
+
+        importacao.status = ImportacaoArquivo.STATUS_CONCLUIDA
+        importacao.concluida_em = timezone.now()
+        importacao.resumo = resultado.resumo()[:255]
+        importacao.save(update_fields=['status', 'concluida_em', 'resumo', 'atualizada_em'])
+    resultado.metricas = metricas
+    return importacao, resultado
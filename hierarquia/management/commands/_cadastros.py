@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hierarquia.importacao import ler_linhas
+from hierarquia.importacao.funcionarios import TAMANHO_LOTE
+
+
+class ComandoImportarCadastro(BaseCommand):
+    """ Base dos comandos importar_cargos / importar_setores / importar_centros_servico. """
+    importador_class = None
+    descricao_arquivo = ''
+
+    def add_arguments(self, parser):
+        parser.add_argument('caminho_arquivo', type=str, help=f'Arquivo CSV ou XLSX ({self.descricao_arquivo})')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Linhas por INSERT/UPDATE')
+        parser.add_argument('--encoding', default='utf-8-sig', help='Codificação do CSV')
+        parser.add_argument('--delimitador', default=',', help='Separador de colunas do CSV')
+
+    def handle(self, *args, **options):
+        caminho = options['caminho_arquivo']
+        importador = self.importador_class(tamanho_lote=options['lote'])
+        self.stdout.write(self.style.NOTICE(f'Importando {importador.modelo._meta.verbose_name_plural} de: {caminho}'))
+        try:
+            linhas = ler_linhas(caminho, encoding=options['encoding'], delimitador=options['delimitador'])
+            resultado = importador.importar(linhas)
+        except FileNotFoundError:
+            raise CommandError(f'Arquivo não encontrado: {caminho}')
+
+        for linha, mensagem in resultado.erros:
+            self.stdout.write(self.style.WARNING(f'Linha {linha}: {mensagem}'))
+        for mensagem in resultado.relatorio_nao_encontrados():
+            self.stdout.write(self.style.WARNING(mensagem))
+        self.stdout.write(self.style.SUCCESS(f'Importação concluída: {resultado.resumo()}.'))
+        if resultado.metricas:
+            self.stdout.write(f'Desempenho: {resultado.metricas.resumo()}.')
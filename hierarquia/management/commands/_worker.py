@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from hierarquia.tarefas import identificacao_worker
+
+
+class ComandoWorker(BaseCommand):
+    """
+    Base dos workers sem broker (processar_tarefas / despachar_notificacoes).
+
+    Reserva e processa em laço, esperando `--intervalo` segundos com a fila vazia,
+    até ser encerrado (ou, com `--uma-vez`, até esvaziar a fila). Ao iniciar e a
+    cada `intervalo_recuperacao` segundos, devolve à fila o que ficou reservado por
+    um worker que caiu (sem esperar outro worker reiniciar). A reserva de cada
+    fila é um SELECT ... FOR UPDATE SKIP LOCKED seguido de um UPDATE condicional no
+    status: vários workers podem rodar juntos, inclusive sem SKIP LOCKED (SQLite).
+    """
+    fila = ''                     # ex: 'a fila', 'o outbox'
+    itens = ''                    # ex: 'tarefas', 'notificações'
+    opcao_abandonados = '--abandonados-apos'
+    abandonados_apos = 30         # minutos
+    mensagem_recuperados = '{} item(ns) abandonado(s) voltaram para {}.'
+    intervalo_recuperacao = 60    # segundos entre duas buscas por itens abandonados
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help=f'Esvazia {self.fila} e sai (para rodar pelo cron)')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera quando não há nada a processar')
+        parser.add_argument(self.opcao_abandonados, dest='abandonados_apos', type=int, default=self.abandonados_apos,
+                            help=f'Minutos para um item reservado e sem progresso voltar para {self.fila}')
+
+    # --- O que cada fila define ---
+
+    def recuperar(self, minutos):
+        """ Devolve à fila os itens abandonados; retorna quantos. """
+        raise NotImplementedError
+
+    def reservar(self, worker, options):
+        """ Reserva o próximo item (ou lote) para `worker`; vazio/None se não há nada. """
+        raise NotImplementedError
+
+    def processar(self, reservado, options):
+        raise NotImplementedError
+
+    # --- Laço ---
+
+    def _recuperar_abandonados(self, options):
+        recuperados = self.recuperar(options['abandonados_apos'])
+        if recuperados:
+            self.stdout.write(self.style.WARNING(self.mensagem_recuperados.format(recuperados, self.fila)))
+
+    def handle(self, *args, **options):
+        worker = identificacao_worker()
+        self.stdout.write(self.style.NOTICE(f'Worker {worker} aguardando {self.itens}.'))
+
+        ultima_recuperacao = None
+        try:
+            while True:
+                close_old_connections()
+                agora = time.monotonic()
+                if ultima_recuperacao is None or agora - ultima_recuperacao >= self.intervalo_recuperacao:
+                    self._recuperar_abandonados(options)
+                    ultima_recuperacao = agora
+                reservado = self.reservar(worker, options)
+                if not reservado:
+                    if options['uma_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                self.processar(reservado, options)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.NOTICE('Worker encerrado.'))
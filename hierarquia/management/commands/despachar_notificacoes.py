@@ -0,0 +1,30 @@
+from hierarquia.notificacoes import TAMANHO_LOTE, despachar, recuperar_abandonados, reservar_lote
+
+from ._worker import ComandoWorker
+
+
+class Command(ComandoWorker):
+    help = 'Entrega as notificações de aprovação do outbox (in-app, e-mail e webhook)'
+    fila = 'o outbox'
+    itens = 'notificações'
+    opcao_abandonados = '--abandonado-apos'
+    abandonados_apos = 10
+    mensagem_recuperados = '{} evento(s) abandonado(s) voltaram para {}.'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Eventos por lote')
+
+    def recuperar(self, minutos):
+        return recuperar_abandonados(minutos)
+
+    def reservar(self, worker, options):
+        return reservar_lote(worker, options['lote'])
+
+    def processar(self, eventos, options):
+        enviados, falhas = despachar(eventos)
+        mensagem = f'{enviados} notificação(ões) enviada(s)'
+        if falhas:
+            self.stdout.write(self.style.WARNING(f'{mensagem}, {falhas} com falha (nova tentativa depois).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{mensagem}.'))
@@ -0,0 +1,9 @@
+from hierarquia.importacao import ImportadorCargos
+
+from ._cadastros import ComandoImportarCadastro
+
+
+class Command(ComandoImportarCadastro):
+    help = 'Importa Cargos de um arquivo CSV/XLSX (nome, nivel, descricao)'
+    importador_class = ImportadorCargos
+    descricao_arquivo = 'colunas: nome, nivel, descricao'
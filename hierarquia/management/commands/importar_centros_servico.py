@@ -0,0 +1,9 @@
+from hierarquia.importacao import ImportadorCentrosServico
+
+from ._cadastros import ComandoImportarCadastro
+
+
+class Command(ComandoImportarCadastro):
+    help = 'Importa Centros de Serviço de um arquivo CSV/XLSX (nome, setor_nome, descricao)'
+    importador_class = ImportadorCentrosServico
+    descricao_arquivo = 'colunas: nome, setor_nome, descricao'
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hierarquia.importacao import importar_arquivo, importar_em_paralelo, ler_linhas
+from hierarquia.importacao.funcionarios import TAMANHO_LOTE
+from hierarquia.importacao.leitura import ENCODING_PADRAO
+
+
+class Command(BaseCommand):
+    help = 'Importa em massa a planilha SRA do Protheus (CSV ou XLSX) para Funcionario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('caminho_arquivo', type=str, help='Planilha exportada do Protheus (.csv ou .xlsx)')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Linhas gravadas por transação')
+        parser.add_argument('--encoding', default=ENCODING_PADRAO, help='Codificação do CSV')
+        parser.add_argument('--delimitador', default=',', help='Separador de colunas do CSV')
+        parser.add_argument('--modo', choices=['massa', 'linha'], default='massa',
+                            help="massa: bulk_create/bulk_update; linha: FuncionarioResource (save() por linha) em lotes")
+        parser.add_argument('--processos', type=int, default=1,
+                            help='Modo massa: número de processos (0 = um por núcleo)')
+        parser.add_argument('--reiniciar', action='store_true',
+                            help='Ignora o ponto de retomada de uma importação anterior do mesmo arquivo')
+
+    def handle(self, *args, **options):
+        caminho = options['caminho_arquivo']
+        self.stdout.write(self.style.NOTICE(f'Importando funcionários de: {caminho}'))
+
+        try:
+            if options['modo'] == 'massa' and options['processos'] != 1:
+                # Partições em paralelo não têm ponto de retomada (o hash_sra pula o que já foi gravado)
+                linhas = ler_linhas(caminho, encoding=options['encoding'], delimitador=options['delimitador'])
+                resultado = importar_em_paralelo(linhas, processos=options['processos'] or None,
+                                                 tamanho_lote=options['lote'])
+            else:
+                _, resultado = importar_arquivo(caminho, modo=options['modo'], tamanho_lote=options['lote'],
+                                                encoding=options['encoding'], delimitador=options['delimitador'],
+                                                reiniciar=options['reiniciar'])
+                if resultado.retomada_de:
+                    self.stdout.write(self.style.NOTICE(f'Retomada após a linha {resultado.retomada_de}.'))
+        except FileNotFoundError:
+            raise CommandError(f'Arquivo não encontrado: {caminho}')
+
+        for linha, mensagem in resultado.erros:
+            self.stdout.write(self.style.WARNING(f'Linha {linha}: {mensagem}'))
+        for mensagem in resultado.relatorio_nao_encontrados():
+            self.stdout.write(self.style.WARNING(mensagem))
+        self.stdout.write(self.style.SUCCESS(f'Importação concluída: {resultado.resumo()}.'))
+        if resultado.metricas:
+            self.stdout.write(f'Desempenho: {resultado.metricas.resumo()}.')
+            if resultado.metricas.caminho_relatorio:
+                self.stdout.write(f'Relatório de desempenho: {resultado.metricas.caminho_relatorio}')
@@ -0,0 +1,9 @@
+from hierarquia.importacao import ImportadorSetores
+
+from ._cadastros import ComandoImportarCadastro
+
+
+class Command(ComandoImportarCadastro):
+    help = 'Importa Setores de um arquivo CSV/XLSX (nome, descricao)'
+    importador_class = ImportadorSetores
+    descricao_arquivo = 'colunas: nome, descricao'
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hierarquia.importacao import ImportadorFuncionarios, sincronizar_delta
+from hierarquia.importacao.delta import COLUNA_MARCA, ORIGEM_SRA
+from hierarquia.importacao.funcionarios import TAMANHO_LOTE
+from hierarquia.importacao.origem import TabelaSRA
+from hierarquia.models import ControleSincronizacao
+
+
+class Command(BaseCommand):
+    help = 'Importa a SRA lendo a tabela direto do banco do Protheus (carga completa ou delta)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='protheus', help='Alias do banco de origem em settings.DATABASES')
+        parser.add_argument('--tabela', help='Tabela (ou view) da SRA; padrão: settings.PROTHEUS_SRA_TABELA')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE,
+                            help='Linhas lidas do cursor e gravadas por transação')
+        parser.add_argument('--delta', action='store_true',
+                            help='Só as linhas com marca maior que a da última sincronização (ver sincronizar_funcionarios)')
+        parser.add_argument('--coluna-marca', default=COLUNA_MARCA, help='Delta: coluna com a marca de alteração')
+        parser.add_argument('--tipo-marca', choices=[ControleSincronizacao.MARCA_DATA,
+                                                     ControleSincronizacao.MARCA_SEQUENCIA],
+                            help='Delta: tipo da marca (só na primeira sincronização da origem)')
+        parser.add_argument('--origem', default=ORIGEM_SRA, help='Delta: nome do controle de sincronização')
+
+    def handle(self, *args, **options):
+        try:
+            tabela = TabelaSRA(options['database'], tabela=options['tabela'], tamanho_lote=options['lote'])
+            self.stdout.write(self.style.NOTICE(f'Lendo {tabela.tabela} do banco "{options["database"]}"'))
+            if options['delta']:
+                resultado = self._delta(tabela, options)
+            else:
+                resultado = ImportadorFuncionarios(tamanho_lote=options['lote']).importar(tabela.linhas())
+        except ValueError as erro:
+            raise CommandError(str(erro))
+
+        for linha, mensagem in resultado.erros:
+            self.stdout.write(self.style.WARNING(f'Linha {linha}: {mensagem}'))
+        for mensagem in resultado.relatorio_nao_encontrados():
+            self.stdout.write(self.style.WARNING(mensagem))
+        self.stdout.write(self.style.SUCCESS(f'Importação concluída: {resultado.resumo()}.'))
+        if resultado.metricas:
+            self.stdout.write(f'Desempenho: {resultado.metricas.resumo()}.')
+            if resultado.metricas.caminho_relatorio:
+                self.stdout.write(f'Relatório de desempenho: {resultado.metricas.caminho_relatorio}')
+
+    def _delta(self, tabela, options):
+        # A marca atual também filtra no banco: só as linhas novas saem da origem
+        controle = ControleSincronizacao.objects.filter(origem=options['origem']).first()
+        apos = None
+        if controle and controle.ultima_marca:
+            apos = controle.ultima_marca
+            if controle.tipo_marca == ControleSincronizacao.MARCA_SEQUENCIA:
+                apos = int(apos)
+        linhas = tabela.linhas(coluna_marca=options['coluna_marca'], apos=apos)
+        resultado = sincronizar_delta(linhas, origem=options['origem'], coluna_marca=options['coluna_marca'],
+                                      tipo_marca=options['tipo_marca'], tamanho_lote=options['lote'])
+        controle = ControleSincronizacao.objects.get(origem=options['origem'])
+        self.stdout.write(self.style.NOTICE(f'Marca atual: {controle.ultima_marca or "(vazia)"}'))
+        if controle.linhas_pendentes:
+            self.stdout.write(self.style.WARNING(
+                f'{len(controle.linhas_pendentes)} linha(s) com erro ficam pendentes para a próxima sincronização.'))
+        return resultado
@@ -0,0 +1,25 @@
+from hierarquia.tarefas import executar, recuperar_abandonadas, reservar_proxima
+
+from ._worker import ComandoWorker
+
+
+class Command(ComandoWorker):
+    help = 'Executa as tarefas em segundo plano (importação/exportação da SRA enviadas pelo Admin)'
+    fila = 'a fila'
+    itens = 'tarefas'
+    opcao_abandonados = '--abandonada-apos'
+    abandonados_apos = 30
+    mensagem_recuperados = '{} tarefa(s) abandonada(s) voltaram para {}.'
+
+    def recuperar(self, minutos):
+        return recuperar_abandonadas(minutos)
+
+    def reservar(self, worker, options):
+        return reservar_proxima(worker)
+
+    def processar(self, tarefa, options):
+        self.stdout.write(f'Executando {tarefa}...')
+        executar(tarefa)
+        estilo = self.style.SUCCESS if tarefa.status == tarefa.STATUS_CONCLUIDA else self.style.ERROR
+        detalhe = tarefa.resumo if tarefa.status == tarefa.STATUS_CONCLUIDA else tarefa.erro.partition('\n')[0]
+        self.stdout.write(estilo(f'{tarefa}: {detalhe}'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from hierarquia.models import RelacaoHierarquica
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói do zero a tabela de hierarquia (RelacaoHierarquica)'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE('Reconstruindo a tabela de hierarquia...'))
+        RelacaoHierarquica.reconstruir()
+        total = RelacaoHierarquica.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'Hierarquia reconstruída: {total} relações.'))
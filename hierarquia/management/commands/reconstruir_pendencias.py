@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from hierarquia.models import (
+    MovimentacaoPessoal, PendenciaAprovacao, RequisicaoDesligamento, RequisicaoPessoal,
+)
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói do zero a caixa de entrada de aprovações (PendenciaAprovacao)'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE('Reconstruindo as pendências de aprovação...'))
+        PendenciaAprovacao.reconstruir({
+            PendenciaAprovacao.TIPO_RP: RequisicaoPessoal,
+            PendenciaAprovacao.TIPO_MP: MovimentacaoPessoal,
+            PendenciaAprovacao.TIPO_RD: RequisicaoDesligamento,
+        })
+        total = PendenciaAprovacao.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'Pendências reconstruídas: {total} linhas.'))
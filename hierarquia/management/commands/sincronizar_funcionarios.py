@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hierarquia.importacao import ler_linhas, sincronizar_delta
+from hierarquia.importacao.delta import COLUNA_MARCA, ORIGEM_SRA
+from hierarquia.importacao.funcionarios import TAMANHO_LOTE
+from hierarquia.importacao.leitura import ENCODING_PADRAO
+from hierarquia.models import ControleSincronizacao
+
+
+class Command(BaseCommand):
+    help = 'Aplica uma carga delta da SRA (só as linhas alteradas desde a última sincronização)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('caminho_arquivo', type=str, help='Linhas alteradas exportadas do Protheus (.csv ou .xlsx)')
+        parser.add_argument('--coluna-marca', default=COLUNA_MARCA,
+                            help='Coluna com a data/hora ou o número sequencial da alteração')
+        parser.add_argument('--tipo-marca', choices=[ControleSincronizacao.MARCA_DATA,
+                                                     ControleSincronizacao.MARCA_SEQUENCIA],
+                            help='Tipo da marca (só na primeira sincronização da origem)')
+        parser.add_argument('--origem', default=ORIGEM_SRA, help='Nome do controle de sincronização')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Linhas gravadas por transação')
+        parser.add_argument('--encoding', default=ENCODING_PADRAO, help='Codificação do CSV')
+        parser.add_argument('--delimitador', default=',', help='Separador de colunas do CSV')
+
+    def handle(self, *args, **options):
+        caminho = options['caminho_arquivo']
+        self.stdout.write(self.style.NOTICE(f'Sincronizando funcionários de: {caminho}'))
+
+        try:
+            linhas = ler_linhas(caminho, encoding=options['encoding'], delimitador=options['delimitador'])
+            resultado = sincronizar_delta(linhas, origem=options['origem'], coluna_marca=options['coluna_marca'],
+                                          tipo_marca=options['tipo_marca'], tamanho_lote=options['lote'])
+        except FileNotFoundError:
+            raise CommandError(f'Arquivo não encontrado: {caminho}')
+        except ValueError as erro:
+            raise CommandError(str(erro))
+
+        for linha, mensagem in resultado.erros:
+            self.stdout.write(self.style.WARNING(f'Linha {linha}: {mensagem}'))
+        for mensagem in resultado.relatorio_nao_encontrados():
+            self.stdout.write(self.style.WARNING(mensagem))
+
+        controle = ControleSincronizacao.objects.get(origem=options['origem'])
+        if controle.linhas_pendentes:
+            self.stdout.write(self.style.WARNING(
+                f'{len(controle.linhas_pendentes)} linha(s) com erro ficam pendentes e serão tentadas de novo '
+                f'na próxima sincronização (Controles de Sincronização no Admin).'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Sincronização concluída: {resultado.resumo()}. Marca atual: {controle.ultima_marca or "(vazia)"}.'))
+        if resultado.metricas:
+            self.stdout.write(f'Desempenho: {resultado.metricas.resumo()}.')
+            if resultado.metricas.caminho_relatorio:
+                self.stdout.write(f'Relatório de desempenho: {resultado.metricas.caminho_relatorio}')
@@ -0,0 +1,198 @@
+# hierarquia/metricas.py
+"""
+Métricas das importações: tempo e consultas por etapa, linhas por segundo e pico
+de memória (tracemalloc).
+
+    with medindo('FuncionarioResource') as metricas:
+        with etapa('leitura'):
+            ...
+        metricas.linhas += n
+
+`etapa()` fora de uma medição não faz nada, então pode ficar em código comum
+(ex: Funcionario.save). Etapas aninhadas contam só o tempo próprio: o tempo de
+'permissões' dentro de 'save()' não é contado duas vezes.
+
+Ao final, o relatório é gravado em JSON em settings.IMPORTACAO_METRICAS_PASTA
+(se a pasta não puder ser gravada, só fica um aviso no log: a importação já foi
+gravada). O pico de memória só é medido com settings.IMPORTACAO_METRICAS_MEMORIA
+= True: o tracemalloc deixa a importação várias vezes mais lenta.
+"""
+
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_ativa = ContextVar('metricas_importacao', default=None)
+
+ETAPA_LEITURA = 'leitura (decodificação)'
+
+
+def etapa(nome):
+    """ Mede o bloco como a etapa `nome` da importação em andamento (se houver). """
+    metricas = _ativa.get()
+    return metricas.etapa(nome) if metricas else nullcontext()
+
+
+def medir_etapa(nome):
+    """ Decorador: cada chamada da função conta como a etapa `nome`. """
+    def decorador(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            with etapa(nome):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorador
+
+
+@contextmanager
+def medindo(nome, **extras):
+    """
+    Abre uma medição (ou reaproveita a que já está aberta, ex: import_data()
+    chamado por lote dentro de importar_em_lotes). Quem abriu fecha e grava o JSON.
+    """
+    atual = _ativa.get()
+    if atual is not None:
+        yield atual
+        return
+    metricas = MetricasImportacao(nome, **extras)
+    token = _ativa.set(metricas)
+    metricas.iniciar()
+    try:
+        yield metricas
+    finally:
+        _ativa.reset(token)
+        metricas.finalizar()
+
+
+class MetricasImportacao:
+    def __init__(self, nome, **extras):
+        self.nome = nome
+        self.extras = extras
+        self.linhas = 0
+        self.consultas = 0
+        self.etapas = {}   # {nome: {'segundos', 'chamadas', 'consultas'}}
+        self.segundos = 0.0
+        self.pico_memoria = None   # bytes
+        self.caminho_relatorio = None
+        self._pilha = []
+        self._segundos_antes = 0.0
+
+    # --- Ciclo de vida ---
+
+    def iniciar(self):
+        self.inicio = timezone.now()
+        self._memoria_propria = False
+        if getattr(settings, 'IMPORTACAO_METRICAS_MEMORIA', False):
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self._memoria_propria = True
+        connection.execute_wrappers.append(self._contar_consulta)
+        self._t0 = time.perf_counter()
+
+    def finalizar(self):
+        self.segundos = time.perf_counter() - self._t0 + self._segundos_antes
+        connection.execute_wrappers.remove(self._contar_consulta)
+        if tracemalloc.is_tracing():
+            self.pico_memoria = tracemalloc.get_traced_memory()[1]
+            if self._memoria_propria:
+                tracemalloc.stop()
+        try:
+            self.salvar()
+        except OSError as erro:
+            # Roda depois do commit dos dados: o relatório não pode derrubar a importação
+            logger.warning("Relatório de métricas de %s não gravado: %s", self.nome, erro)
+
+    def _contar_consulta(self, execute, sql, params, many, context):
+        self.consultas += 1
+        return execute(sql, params, many, context)
+
+    # --- Etapas ---
+
+    @contextmanager
+    def etapa(self, nome):
+        # [nome, início, consultas no início, tempo dos filhos, consultas dos filhos]
+        quadro = [nome, time.perf_counter(), self.consultas, 0.0, 0]
+        self._pilha.append(quadro)
+        try:
+            yield
+        finally:
+            self._pilha.pop()
+            segundos = time.perf_counter() - quadro[1]
+            consultas = self.consultas - quadro[2]
+            self._somar(nome, segundos - quadro[3], consultas - quadro[4])
+            if self._pilha:
+                self._pilha[-1][3] += segundos
+                self._pilha[-1][4] += consultas
+
+    def registrar_etapa(self, nome, segundos):
+        """ Etapa medida antes da medição começar (ex: decodificação do arquivo no Admin). """
+        self._somar(nome, segundos, 0)
+        self._segundos_antes += segundos
+
+    def _somar(self, nome, segundos, consultas):
+        dados = self.etapas.setdefault(nome, {'segundos': 0.0, 'chamadas': 0, 'consultas': 0})
+        dados['segundos'] += segundos
+        dados['chamadas'] += 1
+        dados['consultas'] += consultas
+
+    # --- Relatório ---
+
+    @property
+    def linhas_por_segundo(self):
+        return self.linhas / self.segundos if self.segundos else None
+
+    def como_dict(self):
+        return {
+            'importacao': self.nome,
+            **self.extras,
+            'inicio': self.inicio.isoformat(),
+            'segundos': round(self.segundos, 3),
+            'linhas': self.linhas,
+            'linhas_por_segundo': round(self.linhas_por_segundo, 1) if self.linhas_por_segundo else None,
+            'consultas': self.consultas,
+            'pico_memoria_mb': round(self.pico_memoria / 2 ** 20, 2) if self.pico_memoria is not None else None,
+            'etapas': [
+                {'etapa': nome, 'segundos': round(dados['segundos'], 4), 'chamadas': dados['chamadas'],
+                 'consultas': dados['consultas'],
+                 'percentual': round(100 * dados['segundos'] / self.segundos, 1) if self.segundos else None}
+                for nome, dados in sorted(self.etapas.items(), key=lambda item: -item[1]['segundos'])
+            ],
+        }
+
+    def resumo(self):
+        """ Uma linha de texto com os números principais e as etapas mais lentas. """
+        dados = self.como_dict()
+        partes = [f"{dados['linhas']} linhas em {dados['segundos']:.1f}s"]
+        if dados['linhas_por_segundo']:
+            partes.append(f"{dados['linhas_por_segundo']:.0f} linhas/s")
+        partes.append(f"{dados['consultas']} consultas")
+        if dados['pico_memoria_mb'] is not None:
+            partes.append(f"pico de memória {dados['pico_memoria_mb']} MB")
+        etapas = ', '.join(f"{e['etapa']} {e['percentual']}%" for e in dados['etapas'][:4] if e['percentual'])
+        texto = '; '.join(partes)
+        return f"{texto} ({etapas})" if etapas else texto
+
+    def salvar(self, pasta=None):
+        """ Grava o relatório JSON e guarda o caminho em `caminho_relatorio`. """
+        pasta = pasta or getattr(settings, 'IMPORTACAO_METRICAS_PASTA', None)
+        if not pasta:
+            return None
+        os.makedirs(pasta, exist_ok=True)
+        nome = f"{self.nome}_{self.inicio:%Y%m%d_%H%M%S_%f}.json"
+        self.caminho_relatorio = os.path.join(pasta, nome)
+        with open(self.caminho_relatorio, 'w', encoding='utf-8') as arquivo:
+            json.dump(self.como_dict(), arquivo, ensure_ascii=False, indent=2)
+        return self.caminho_relatorio
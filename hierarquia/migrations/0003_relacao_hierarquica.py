@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-17 14:34
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def preencher_relacoes(apps, schema_editor):
+    """ Popula a tabela com a hierarquia atual (mesmas regras do modelo). """
+    from hierarquia.models_hierarquia import calcular_pares
+
+    Funcionario = apps.get_model('hierarquia', 'Funcionario')
+    RelacaoHierarquica = apps.get_model('hierarquia', 'RelacaoHierarquica')
+
+    pessoas = {
+        pk: (nivel, setor_id)
+        for pk, nivel, setor_id in Funcionario.objects.values_list('pk', 'cargo__nivel', 'setor_primario_id')
+    }
+    responsaveis = defaultdict(set)
+    for funcionario_id, setor_id in Funcionario.setores_responsaveis.through.objects.values_list('funcionario_id', 'setor_id'):
+        responsaveis[funcionario_id].add(setor_id)
+
+    RelacaoHierarquica.objects.bulk_create(
+        [RelacaoHierarquica(superior_id=sup, subordinado_id=sub, via=via)
+         for sup, sub, via in calcular_pares(pessoas, responsaveis)],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0002_remove_funcionario_ra_adcinte_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelacaoHierarquica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('via', models.CharField(choices=[('setor', 'Mesmo Setor Principal'), ('responsavel', 'Responsável pelo Setor'), ('diretor', 'Diretoria')], max_length=20)),
+                ('subordinado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacoes_como_subordinado', to='hierarquia.funcionario')),
+                ('superior', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacoes_como_superior', to='hierarquia.funcionario')),
+            ],
+            options={
+                'verbose_name': 'Relação Hierárquica',
+                'verbose_name_plural': 'Relações Hierárquicas',
+                'indexes': [models.Index(fields=['subordinado', 'via'], name='relacao_hier_sub_via_idx'), models.Index(fields=['superior', 'via'], name='relacao_hier_sup_via_idx')],
+                'constraints': [models.UniqueConstraint(fields=('superior', 'subordinado', 'via'), name='relacao_hierarquica_unica')],
+            },
+        ),
+        migrations.RunPython(preencher_relacoes, migrations.RunPython.noop),
+    ]
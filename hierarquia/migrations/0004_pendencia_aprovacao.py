@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-17 14:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def preencher_pendencias(apps, schema_editor):
+    """ Popula a caixa de entrada com as requisições pendentes atuais (mesmas regras do modelo). """
+    from hierarquia.models_pendencias import STATUS_PENDENTES, calcular_pendencias
+
+    PendenciaAprovacao = apps.get_model('hierarquia', 'PendenciaAprovacao')
+    modelos = {
+        'RP': apps.get_model('hierarquia', 'RequisicaoPessoal'),
+        'MP': apps.get_model('hierarquia', 'MovimentacaoPessoal'),
+        'RD': apps.get_model('hierarquia', 'RequisicaoDesligamento'),
+    }
+
+    linhas = []
+    for tipo, modelo in modelos.items():
+        for req in modelo.objects.filter(status__in=STATUS_PENDENTES[tipo]).iterator():
+            for aprovador_id, papel in calcular_pendencias(tipo, req):
+                linhas.append(PendenciaAprovacao(aprovador_id=aprovador_id, tipo=tipo, objeto_id=req.pk,
+                                                 papel=papel, criado_em=req.criado_em))
+    PendenciaAprovacao.objects.bulk_create(linhas, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0003_relacao_hierarquica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendenciaAprovacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('RP', 'Requisição Pessoal'), ('MP', 'Movimentação Pessoal'), ('RD', 'Requisição de Desligamento')], max_length=2)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('papel', models.CharField(choices=[('aprovador', 'Aprovador Atual'), ('gestor_atual', 'Gestor Atual'), ('gestor_proposto', 'Gestor Proposto'), ('rh', 'RH')], max_length=20)),
+                ('criado_em', models.DateTimeField()),
+                ('aprovador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pendencias', to='hierarquia.funcionario')),
+            ],
+            options={
+                'verbose_name': 'Pendência de Aprovação',
+                'verbose_name_plural': 'Pendências de Aprovação',
+                'indexes': [models.Index(fields=['aprovador', 'criado_em'], name='pendencia_aprov_criado_idx'), models.Index(fields=['tipo', 'objeto_id'], name='pendencia_tipo_objeto_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id', 'aprovador', 'papel'), name='pendencia_aprovacao_unica')],
+            },
+        ),
+        migrations.RunPython(preencher_pendencias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 14:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0004_pendencia_aprovacao'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='funcionario',
+            options={'base_manager_name': 'objects', 'ordering': ['ra_nome'], 'verbose_name': 'Funcionário', 'verbose_name_plural': 'Funcionários'},
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-17 14:57
+
+from django.db import migrations, models
+
+
+def preencher_datas(apps, schema_editor):
+    """ Converte os textos da SRA já gravados para as novas colunas de data. """
+    from hierarquia.protheus import CAMPOS_DATA, parse_data
+
+    Funcionario = apps.get_model('hierarquia', 'Funcionario')
+    lote = []
+    for func in Funcionario.objects.only('pk', *CAMPOS_DATA.values()).iterator(chunk_size=2000):
+        for campo, origem in CAMPOS_DATA.items():
+            setattr(func, campo, parse_data(getattr(func, origem)))
+        lote.append(func)
+        if len(lote) >= 2000:
+            Funcionario.objects.bulk_update(lote, list(CAMPOS_DATA))
+            lote = []
+    if lote:
+        Funcionario.objects.bulk_update(lote, list(CAMPOS_DATA))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0005_funcionario_base_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='funcionario',
+            name='data_admissao',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data de Admissão'),
+        ),
+        migrations.AddField(
+            model_name='funcionario',
+            name='data_demissao',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data de Demissão'),
+        ),
+        migrations.AddField(
+            model_name='funcionario',
+            name='data_nascimento',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Data de Nascimento'),
+        ),
+        migrations.RunPython(preencher_datas, migrations.RunPython.noop),
+    ]
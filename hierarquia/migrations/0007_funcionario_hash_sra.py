@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 15:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0006_funcionario_datas_tipadas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='funcionario',
+            name='hash_sra',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64, verbose_name='Hash da linha SRA'),
+        ),
+        migrations.AddIndex(
+            model_name='funcionario',
+            index=models.Index(fields=['ra_mat', 'hash_sra'], name='funcionario_mat_hash_idx'),
+        ),
+    ]
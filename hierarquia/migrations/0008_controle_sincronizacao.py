@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0007_funcionario_hash_sra'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ControleSincronizacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origem', models.CharField(max_length=50, unique=True)),
+                ('tipo_marca', models.CharField(choices=[('data', 'Data/hora da alteração'), ('sequencia', 'Número sequencial')], default='data', max_length=20)),
+                ('ultima_marca', models.CharField(blank=True, default='', help_text='Vazio = a próxima sincronização aplica todas as linhas.', max_length=50)),
+                ('ultima_execucao', models.DateTimeField(blank=True, null=True)),
+                ('resumo', models.CharField(blank=True, default='', max_length=255)),
+            ],
+            options={
+                'verbose_name': 'Controle de Sincronização',
+                'verbose_name_plural': 'Controles de Sincronização',
+                'ordering': ['origem'],
+            },
+        ),
+    ]
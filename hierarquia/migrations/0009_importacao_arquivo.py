@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-17 15:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0008_controle_sincronizacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoArquivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash_arquivo', models.CharField(db_index=True, max_length=64)),
+                ('nome_arquivo', models.CharField(max_length=255)),
+                ('modo', models.CharField(max_length=20)),
+                ('status', models.CharField(choices=[('em_andamento', 'Em andamento'), ('falhou', 'Falhou'), ('concluida', 'Concluída')], default='em_andamento', max_length=20)),
+                ('ultima_linha', models.PositiveIntegerField(default=0)),
+                ('iniciada_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizada_em', models.DateTimeField(auto_now=True)),
+                ('concluida_em', models.DateTimeField(blank=True, null=True)),
+                ('resumo', models.CharField(blank=True, default='', max_length=255)),
+            ],
+            options={
+                'verbose_name': 'Importação de Arquivo',
+                'verbose_name_plural': 'Importações de Arquivo',
+                'ordering': ['-iniciada_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LoteImportacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('linha_inicial', models.PositiveIntegerField()),
+                ('linha_final', models.PositiveIntegerField()),
+                ('criados', models.PositiveIntegerField(default=0)),
+                ('atualizados', models.PositiveIntegerField(default=0)),
+                ('inalterados', models.PositiveIntegerField(default=0)),
+                ('ignorados', models.PositiveIntegerField(default=0)),
+                ('erros', models.JSONField(blank=True, default=list)),
+                ('nao_encontrados', models.JSONField(blank=True, default=dict)),
+                ('funcionario_ids', models.JSONField(blank=True, default=list)),
+                ('gravado_em', models.DateTimeField(auto_now_add=True)),
+                ('importacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lotes', to='hierarquia.importacaoarquivo')),
+            ],
+            options={
+                'verbose_name': 'Lote de Importação',
+                'verbose_name_plural': 'Lotes de Importação',
+                'ordering': ['importacao', 'linha_inicial'],
+            },
+        ),
+    ]
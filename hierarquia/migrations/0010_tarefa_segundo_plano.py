@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 15:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0009_importacao_arquivo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaSegundoPlano',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('importar_sra', 'Importação da SRA'), ('exportar_sra', 'Exportação da SRA')], max_length=30)),
+                ('status', models.CharField(choices=[('pendente', 'Na fila'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], default='pendente', max_length=20)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('arquivo_entrada', models.FileField(blank=True, upload_to='tarefas/entrada/%Y/%m/')),
+                ('nome_arquivo', models.CharField(blank=True, default='', max_length=255)),
+                ('arquivo_resultado', models.FileField(blank=True, upload_to='tarefas/resultado/%Y/%m/')),
+                ('total', models.PositiveIntegerField(blank=True, null=True)),
+                ('processadas', models.PositiveIntegerField(default=0)),
+                ('resumo', models.TextField(blank=True, default='')),
+                ('erro', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True)),
+                ('atualizada_em', models.DateTimeField(auto_now=True)),
+                ('concluida_em', models.DateTimeField(blank=True, null=True)),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tarefas_segundo_plano', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarefa em Segundo Plano',
+                'verbose_name_plural': 'Tarefas em Segundo Plano',
+                'ordering': ['-criada_em'],
+                'indexes': [models.Index(fields=['status', 'criada_em'], name='hierarquia__status_f50947_idx')],
+            },
+        ),
+    ]
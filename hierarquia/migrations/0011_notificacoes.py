@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-17 16:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0010_tarefa_segundo_plano'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoNotificacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('RP', 'Requisição Pessoal'), ('MP', 'Movimentação Pessoal'), ('RD', 'Requisição de Desligamento')], max_length=2)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('evento', models.CharField(choices=[('pendente', 'Aguarda aprovação'), ('aprovada', 'Aprovada'), ('rejeitada', 'Rejeitada')], max_length=20)),
+                ('status', models.CharField(choices=[('pendente', 'Na fila'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('falhou', 'Falhou')], default='pendente', max_length=20)),
+                ('canais_entregues', models.JSONField(blank=True, default=list)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now)),
+                ('erro', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('reservado_em', models.DateTimeField(blank=True, null=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+                ('destinatario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_notificacao', to='hierarquia.funcionario')),
+            ],
+            options={
+                'verbose_name': 'Evento de Notificação',
+                'verbose_name_plural': 'Eventos de Notificação',
+                'ordering': ['criado_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Notificacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('titulo', models.CharField(max_length=200)),
+                ('mensagem', models.TextField(blank=True, default='')),
+                ('link', models.CharField(blank=True, default='', max_length=255)),
+                ('lida', models.BooleanField(default=False)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('destinatario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificacoes', to='hierarquia.funcionario')),
+                ('evento', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notificacao', to='hierarquia.eventonotificacao')),
+            ],
+            options={
+                'verbose_name': 'Notificação',
+                'verbose_name_plural': 'Notificações',
+                'ordering': ['-criada_em'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='eventonotificacao',
+            index=models.Index(fields=['status', 'proxima_tentativa'], name='evento_notif_fila_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(fields=['destinatario', 'lida', 'criada_em'], name='notificacao_dest_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 16:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0011_notificacoes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersaoCaixaEntrada',
+            fields=[
+                ('aprovador', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='versao_caixa_entrada', serialize=False, to='hierarquia.funcionario')),
+                ('versao', models.PositiveBigIntegerField(default=0)),
+                ('alterada_em', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Versão da Caixa de Entrada',
+                'verbose_name_plural': 'Versões da Caixa de Entrada',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:20
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hierarquia', '0012_versao_caixa_entrada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='controlesincronizacao',
+            name='linhas_pendentes',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Linhas com erro, tentadas de novo na próxima sincronização.'),
+        ),
+    ]
@@ -6,9 +6,16 @@ from django.contrib.contenttypes.models import ContentType
 # ---------------------
 from django.http import HttpResponseForbidden
 from django.core.validators import RegexValidator
-from django.db.models import Q
+from django.db.models import Case, F, Q, Value, When
 from django.utils import timezone
 from .models_funcionario import Funcionario
+from .models_alteracoes import RastreiaAlteracoesMixin
+from .models_hierarquia import RelacaoHierarquica
+from .models_importacao import ControleSincronizacao, ImportacaoArquivo, LoteImportacao
+from .models_notificacoes import EventoNotificacao, Notificacao
+from .models_pendencias import PendenciaAprovacao, PendenciasMixin, VersaoCaixaEntrada
+from .models_tarefas import TarefaSegundoPlano
+from . import protheus, roteamento
 from datetime import datetime
 
 # Validadores
@@ -43,6 +50,13 @@ class Cargo(models.Model):
     def __str__(self):
         return f"{self.nome} (Nível {self.nivel})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Nível carregado do banco (a hierarquia só é recalculada se ele mudar)
+        instance._nivel_original = instance.__dict__.get('nivel')
+        return instance
+
 
 class Setor(models.Model):
     """Modelo para representar setores/centros de custo"""
@@ -121,7 +135,9 @@ class Vaga(models.Model):
 
 
 # Modelo RequisicaoPessoal ATUALIZADO com fluxo Gestor -> RH
-class RequisicaoPessoal(models.Model):
+class RequisicaoPessoal(PendenciasMixin, RastreiaAlteracoesMixin, models.Model):
+    TIPO_PENDENCIA = PendenciaAprovacao.TIPO_RP
+
     # --- 1. STATUS ATUALIZADOS PARA O NOVO FLUXO ---
     STATUS_RP_CHOICES = [
         ('pendente_gestor', 'Pendente Gestor/Coordenador'),
@@ -191,34 +207,9 @@ class RequisicaoPessoal(models.Model):
         Encontra o aprovador do RH.
         Busca qualquer funcionário ativo nos setores 'RECURSOS HUMANOS' ou 'DEPARTAMENTO PESSOAL'.
         Dá preferência para Níveis mais altos (Gestor/Coordenador/Supervisor).
+        Fallback: Diretor (Nível 1). Ver roteamento.py (diretório em cache).
         """
-        # Nomes exatos dos setores, case-insensitive
-        rh_sector_names = ["RECURSOS HUMANOS", "DEPARTAMENTO DE PESSOAL"]
-        
-        # Cria uma consulta Q para buscar em qualquer um dos nomes, ignorando maiúsculas
-        q_objects = Q()
-        for name in rh_sector_names:
-            q_objects |= Q(setor_primario__nome__iexact=name) # __iexact = case-insensitive
-
-        try:
-            # Tenta encontrar QUALQUER funcionário ativo nesses setores
-            rh_approver = Funcionario.objects.filter(
-                q_objects,  # Filtra pelos setores de RH/DP
-                ativo=True
-            ).order_by('cargo__nivel').first() # Pega o de nível mais alto (Ex: Nível 3) primeiro
-
-            if rh_approver:
-                # --- SUCESSO! ---
-                # Com base nas suas imagens, isso vai encontrar o 
-                # "DIEGO WALLACE ARAUJO DA COSTA" (Nível 3) do DP.
-                return rh_approver 
-            
-            # Fallback: Se não achar NINGUÉM no RH/DP, aí sim pega o Diretor (Nível 1)
-            return Funcionario.objects.filter(cargo__nivel=1, ativo=True).first()
-
-        except Exception:
-            # Fallback final: Pega o Diretor (Nível 1) em caso de erro
-            return Funcionario.objects.filter(cargo__nivel=1, ativo=True).first()
+        return roteamento.aprovador_rh()
 
     # --- 5. LÓGICA DE APROVADOR INICIAL (CORRIGIDA) ---
     def set_initial_approver(self):
@@ -229,26 +220,18 @@ class RequisicaoPessoal(models.Model):
         # Usa a função `obter_superiores()` que JÁ EXISTE E FUNCIONA
         superiores = self.solicitante.obter_superiores()
         
-        # 1. Tenta encontrar o Coordenador (Nível 3) primeiro
-        coordenador = superiores.filter(cargo__nivel=3).first()
+        # 1. Coordenador (Nível 3) primeiro, senão o Gestor (Nível 2) — numa única consulta
+        gestor_id = superiores.filter(cargo__nivel__in=[2, 3]) \
+                              .order_by('-cargo__nivel').values_list('pk', flat=True).first()
 
-        if coordenador:
-            # Encontrou o Coordenador, define ele
-            self.aprovador_atual = coordenador
+        if gestor_id:
+            self.aprovador_atual_id = gestor_id
             self.status = 'pendente_gestor'
         else:
-            # 2. Se não achou Coordenador, tenta encontrar o Gestor (Nível 2)
-            gestor = superiores.filter(cargo__nivel=2).first()
-            
-            if gestor:
-                # Encontrou o Gestor, define ele
-                self.aprovador_atual = gestor
-                self.status = 'pendente_gestor'
-            else:
-                # 3. Se não achar Coordenador NEM Gestor (ex: um gestor abriu a RP), 
-                # vai direto pro RH
-                self.aprovador_atual = self.get_rh_approver()
-                self.status = 'pendente_rh'
+            # 2. Se não achar Coordenador NEM Gestor (ex: um gestor abriu a RP), 
+            # vai direto pro RH
+            self.aprovador_atual_id = roteamento.aprovador_rh_id()
+            self.status = 'pendente_rh'
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding
@@ -257,65 +240,76 @@ class RequisicaoPessoal(models.Model):
         super().save(*args, **kwargs)
 
     # --- 6. MÁQUINA DE ESTADOS (AVANÇAR) ---
-    def avancar_aprovacao(self, aprovador_que_aprovou):
+    # Cada transição é um UPDATE condicional (ver PendenciasMixin): só grava se a
+    # RP ainda está no status lido E aguarda quem está agindo. Os métodos
+    # retornam False se outra requisição (outro aprovador, clique duplo) já tratou a RP.
+    def _transicao_aprovacao(self, aprovador, agora):
         """ Move a RP para o próximo estágio (Gestor -> RH -> Aprovada) """
-        now = timezone.now()
+        condicao = Q(status=self.status, aprovador_atual=aprovador)
 
         # Cenário 1: Gestor está aprovando (primeira vez ou re-aprovação)
         if self.status == 'pendente_gestor' or self.status == 'em_revisao_gestor':
-            self.aprovado_por_gestor = aprovador_que_aprovou
-            self.data_aprovacao_gestor = now
-            
-            # Limpa a justificativa de edição (caso seja uma re-aprovação)
-            self.justificativa_edicao_rh = None 
-            
-            # Próximo passo: RH
-            self.status = 'pendente_rh'
-            self.aprovador_atual = self.get_rh_approver()
+            return self.status, condicao, {
+                'aprovado_por_gestor': aprovador,
+                'data_aprovacao_gestor': agora,
+                # Limpa a justificativa de edição (caso seja uma re-aprovação)
+                'justificativa_edicao_rh': None,
+                # Próximo passo: RH
+                'status': 'pendente_rh',
+                'aprovador_atual_id': roteamento.aprovador_rh_id(),
+            }
 
         # Cenário 2: RH está aprovando
-        elif self.status == 'pendente_rh':
-            self.aprovado_por_rh = aprovador_que_aprovou
-            self.data_aprovacao_rh = now
-            
-            # Próximo passo: Fim do fluxo
-            self.status = 'aprovada'
-            self.aprovador_atual = None # Ninguém mais precisa aprovar
+        if self.status == 'pendente_rh':
+            return self.status, condicao, {
+                'aprovado_por_rh': aprovador,
+                'data_aprovacao_rh': agora,
+                # Próximo passo: Fim do fluxo
+                'status': 'aprovada',
+                'aprovador_atual': None, # Ninguém mais precisa aprovar
+            }
+        return None
 
-        self.save()
+    def avancar_aprovacao(self, aprovador_que_aprovou):
+        """ Aprova a etapa atual. Retorna False se a RP já foi tratada. """
+        return self.aprovar_por(aprovador_que_aprovou)
 
     # --- 7. REJEITAR (ATUALIZADO) ---
-    def rejeitar(self, aprovador_que_rejeitou, observacao):
-        """ Marca a RP como rejeitada. """
-        self.status = 'rejeitada'
-        self.rejeitado_por = aprovador_que_rejeitou
-        self.data_rejeicao = timezone.now()
-        self.observacao_rejeicao = observacao
-        self.aprovador_atual = None
-        self.save()
+    def _transicao_rejeicao(self, aprovador, observacao, agora):
+        """ Marca a RP como rejeitada (só o aprovador atual, enquanto pendente). """
+        return 'rejeitar', Q(status__in=['pendente_gestor', 'pendente_rh', 'em_revisao_gestor'],
+                             aprovador_atual=aprovador), {
+            'status': 'rejeitada',
+            'rejeitado_por': aprovador,
+            'data_rejeicao': agora,
+            'observacao_rejeicao': observacao,
+            'aprovador_atual': None,
+        }
 
     # --- 8. DEVOLVER PARA GESTOR (NOVA FUNÇÃO) ---
     def devolver_para_gestor(self, rh_editor, justificativa):
         """ O RH edita e devolve para o Gestor re-aprovar. """
         if self.status != 'pendente_rh':
             # Só pode fazer isso se estiver pendente no RH
-            return
+            return False
 
-        self.status = 'em_revisao_gestor'
-        self.justificativa_edicao_rh = justificativa
-        
         # Encontra o Gestor original (Nível 2 ou 3) do solicitante
         superiores = self.solicitante.obter_superiores()
-        gestor_original = superiores.filter(cargo__nivel__in=[2, 3]).order_by('cargo__nivel').first()
+        gestor_original_id = superiores.filter(cargo__nivel__in=[2, 3]).order_by('cargo__nivel') \
+                                       .values_list('pk', flat=True).first()
 
-        if gestor_original:
-            self.aprovador_atual = gestor_original
+        if gestor_original_id:
+            status, aprovador_id = 'em_revisao_gestor', gestor_original_id
         else:
             # Fallback: Se não achar, manda pro RH de novo (estranho, mas seguro)
-            self.aprovador_atual = self.get_rh_approver()
-            self.status = 'pendente_rh' # Volta pro RH
-            
-        self.save()
+            status, aprovador_id = 'pendente_rh', roteamento.aprovador_rh_id() # Volta pro RH
+
+        return self.atualizar_se(
+            Q(status='pendente_rh', aprovador_atual=rh_editor),
+            status=status,
+            justificativa_edicao_rh=justificativa,
+            aprovador_atual_id=aprovador_id,
+        )
 
 
     class Meta:
@@ -323,7 +317,9 @@ class RequisicaoPessoal(models.Model):
         verbose_name_plural = "Requisições Pessoais"
         ordering = ['-criado_em']
 
-class MovimentacaoPessoal(models.Model):
+class MovimentacaoPessoal(PendenciasMixin, RastreiaAlteracoesMixin, models.Model):
+    TIPO_PENDENCIA = PendenciaAprovacao.TIPO_MP
+
     # --- 1. Status do Fluxo ATUALIZADOS ---
     STATUS_MP_CHOICES = [
         ('pendente_gestores', 'Pendente Gestores (Atual e Proposto)'), # Novo status inicial
@@ -378,53 +374,31 @@ class MovimentacaoPessoal(models.Model):
     def __str__(self):
         return f"MP #{self.id}: {self.funcionario_movido.ra_nome} para {self.cargo_proposto.nome}"  
 
-    # --- 3. Funções Auxiliares ATUALIZADAS (Corrigidas) ---
+    # --- 3. Funções Auxiliares (diretório de aprovadores, ver roteamento.py) ---
     def _get_gestor_setor(self, setor):
         """ 
-        Encontra o Gestor (Nível 2) ou Coordenador (Nível 3) de um setor.
+        Encontra o Coordenador (Nível 3) ou, se não houver, o Gestor (Nível 2) de um setor.
         Verifica 'setor_primario' E 'setores_responsaveis'.
         """
-        if not setor:
-            return None
-        
-        # Q para Nível 2 ou 3
-        nivel_q = Q(cargo__nivel__in=[2, 3])
-        
-        # Q para Setor (Primário OU Responsável)
-        setor_q = Q(setor_primario=setor) | Q(setores_responsaveis=setor)
-        
-        try:
-            gestor = Funcionario.objects.filter(
-                nivel_q, 
-                setor_q,
-                ativo=True
-            ).distinct().order_by('-cargo__nivel').first() # Prefere Nível 2 (Gestor)
-            return gestor
-        except Funcionario.DoesNotExist:
-            return None
+        return roteamento.gestor_imediato(setor)
 
     def _get_rh_approver(self):
-        """ Encontra o aprovador do RH (Copiado/Adaptado de RequisicaoPessoal). """
-        rh_sector_names = ["RECURSOS HUMANOS", "DEPARTAMENTO DE PESSOAL"]
-        q_objects = Q()
-        for name in rh_sector_names:
-            q_objects |= Q(setor_primario__nome__iexact=name)
-        try:
-            rh_approver = Funcionario.objects.filter(q_objects, ativo=True).order_by('cargo__nivel').first()
-            if rh_approver: return rh_approver
-            return Funcionario.objects.filter(cargo__nivel=1, ativo=True).first()
-        except Exception:
-            return Funcionario.objects.filter(cargo__nivel=1, ativo=True).first()
+        """ Encontra o aprovador do RH (mesma regra de RequisicaoPessoal). """
+        return roteamento.aprovador_rh()
 
 
     # --- 4. Lógica de Workflow ATUALIZADA ---
 
     def _check_gestor_approvals(self):
-        """ Verifica se ambos os gestores aprovaram para mover ao RH. """
+        """
+        Verifica se ambos os gestores aprovaram para mover ao RH (usado na
+        criação). Não grava: o save() faz um único INSERT já no status certo.
+        """
         if self.gestor_proposto_aprovou and self.gestor_atual_aprovou and self.status == 'pendente_gestores':
             self.status = 'pendente_rh'
-            self.aprovador_rh = self._get_rh_approver()
-            self.save()
+            self.aprovador_rh_id = roteamento.aprovador_rh_id()
+            return True
+        return False
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding
@@ -434,77 +408,125 @@ class MovimentacaoPessoal(models.Model):
             self.setor_atual = self.funcionario_movido.setor_primario
             # self.salario_atual = ... # Adicionar busca do salário atual
             
-            # Encontra os aprovadores
-            self.aprovador_gestor_proposto = self._get_gestor_setor(self.setor_proposto)
-            self.aprovador_gestor_atual = self._get_gestor_setor(self.setor_atual)
+            # Encontra os aprovadores (direto pelo ID, sem carregar o Funcionario)
+            self.aprovador_gestor_proposto_id = roteamento.gestor_imediato_id(self.setor_proposto_id)
+            self.aprovador_gestor_atual_id = roteamento.gestor_imediato_id(self.setor_atual_id)
             
             self.status = 'pendente_gestores'
 
             # Auto-aprova se não houver gestor (ou se for o mesmo gestor)
-            if not self.aprovador_gestor_proposto:
+            if not self.aprovador_gestor_proposto_id:
                 self.gestor_proposto_aprovou = True
             
-            if not self.aprovador_gestor_atual:
+            if not self.aprovador_gestor_atual_id:
                 self.gestor_atual_aprovou = True
                 
             # Se o gestor for o mesmo para atual e proposto
-            if self.aprovador_gestor_proposto == self.aprovador_gestor_atual and self.aprovador_gestor_proposto is not None:
+            if self.aprovador_gestor_proposto_id == self.aprovador_gestor_atual_id and self.aprovador_gestor_proposto_id is not None:
                 # Deixa o Gestor Atual como o único a aprovar
-                self.aprovador_gestor_proposto = None
+                self.aprovador_gestor_proposto_id = None
                 self.gestor_proposto_aprovou = True # Auto-aprova o "proposto"
 
-        super().save(*args, **kwargs) # Salva primeiro
-
-        if is_new:
-            # Chama a verificação *depois* de salvar, caso ambos sejam auto-aprovados
+            # Se ambos foram auto-aprovados já nasce pendente do RH (um único INSERT)
             self._check_gestor_approvals()
 
+        super().save(*args, **kwargs)
+
+
+    def _transicao_aprovacao(self, aprovador, agora):
+        """
+        Em 'pendente_gestores', marca a aprovação de UM dos gestores: só grava se
+        a parte de `aprovador` ainda não foi aprovada. Se a outra parte já estava
+        aprovada (no banco, não na instância), o mesmo UPDATE move a MP para o RH.
+        Em 'pendente_rh', é a aprovação final do RH.
+        """
+        aprovador_id = getattr(aprovador, 'pk', aprovador)
+
+        if self.status == 'pendente_rh':
+            return self.status, Q(status='pendente_rh', aprovador_rh=aprovador_id), {
+                'aprovado_por_rh_id': aprovador_id,
+                'data_aprovacao_rh': agora,
+                'status': 'aprovada',
+                'aprovador_gestor_proposto': None, # Limpa aprovadores pendentes
+                'aprovador_gestor_atual': None,
+                'aprovador_rh': None,
+            }
+
+        if self.status != 'pendente_gestores':
+            return None
+
+        papeis = tuple(papel for papel in ('proposto', 'atual')
+                       if getattr(self, f'aprovador_gestor_{papel}_id') == aprovador_id
+                       and not getattr(self, f'gestor_{papel}_aprovou'))
+        if not papeis:
+            return None
+
+        condicao = Q(status='pendente_gestores')
+        valores = {}
+        for papel in papeis:
+            condicao &= Q(**{f'aprovador_gestor_{papel}': aprovador_id, f'gestor_{papel}_aprovou': False})
+            valores[f'gestor_{papel}_aprovou'] = True
+            valores[f'data_aprovacao_gestor_{papel}'] = agora
+
+        # Verifica se o fluxo avança para o RH (avaliado pelo banco, na própria linha)
+        outros = [papel for papel in ('proposto', 'atual') if papel not in papeis]
+        aprovador_rh_id = roteamento.aprovador_rh_id()
+        if not outros:
+            valores.update(status='pendente_rh', aprovador_rh_id=aprovador_rh_id)
+        else:
+            outros_aprovaram = Q(**{f'gestor_{papel}_aprovou': True for papel in outros})
+            valores['status'] = Case(When(outros_aprovaram, then=Value('pendente_rh')),
+                                     default=Value('pendente_gestores'), output_field=models.CharField())
+            valores['aprovador_rh_id'] = Case(When(outros_aprovaram, then=Value(aprovador_rh_id)),
+                                              default=F('aprovador_rh_id'), output_field=models.IntegerField())
+        return (self.status, *papeis), condicao, valores
 
     def aprovar(self, aprovador):
-        """ Marca a aprovação de UM dos aprovadores. """
+        """ Aprovação de gestor. Retorna False se não havia nada para `aprovador` aprovar. """
         if self.status != 'pendente_gestores':
-            return # Só permite aprovação de gestor nesta etapa
-        
-        aprovou_algo = False
-        if aprovador == self.aprovador_gestor_proposto and not self.gestor_proposto_aprovou:
-            self.gestor_proposto_aprovou = True
-            self.data_aprovacao_gestor_proposto = timezone.now()
-            aprovou_algo = True
-        
-        if aprovador == self.aprovador_gestor_atual and not self.gestor_atual_aprovou:
-            self.gestor_atual_aprovou = True
-            self.data_aprovacao_gestor_atual = timezone.now()
-            aprovou_algo = True
-        
-        if aprovou_algo:
-            self.save()
-            self._check_gestor_approvals() # Verifica se o fluxo avança para o RH
-        
+            return False # Só permite aprovação de gestor nesta etapa
+        return self.aprovar_por(aprovador)
 
     def aprovar_rh(self, aprovador_rh):
-        """ Aprovação final do RH. """
-        if self.status != 'pendente_rh' or aprovador_rh != self.aprovador_rh:
-            return False # Não pode aprovar
-        
-        self.aprovado_por_rh = aprovador_rh
-        self.data_aprovacao_rh = timezone.now()
-        self.status = 'aprovada'
-        self.aprovador_gestor_proposto = None # Limpa aprovadores pendentes
-        self.aprovador_gestor_atual = None
-        self.aprovador_rh = None
-        self.save()
-        return True
-
-    def rejeitar(self, aprovador_que_rejeitou, observacao):
-        """ Marca a MP como rejeitada (qualquer aprovador pode rejeitar). """
-        self.status = 'rejeitada'
-        self.rejeitado_por = aprovador_que_rejeitou
-        self.data_rejeicao = timezone.now()
-        self.observacao_rejeicao = observacao
-        self.aprovador_gestor_proposto = None # Limpa aprovadores pendentes
-        self.aprovador_gestor_atual = None
-        self.aprovador_rh = None
-        self.save()
+        """ Aprovação final do RH, sem efetivar (False se já tratada ou não cabe a ele). """
+        if self.status != 'pendente_rh':
+            return False
+        return self._executar_transicao(self._transicao_aprovacao(aprovador_rh, timezone.now()))
+
+    def ja_tratada_por(self, funcionario):
+        """ Como em PendenciasMixin, mas as aprovações dos gestores são flags por papel. """
+        funcionario_id = getattr(funcionario, 'pk', funcionario)
+        return (funcionario_id in (self.aprovado_por_rh_id, self.rejeitado_por_id)
+                or (self.gestor_atual_aprovou and self.aprovador_gestor_atual_id == funcionario_id)
+                or (self.gestor_proposto_aprovou and self.aprovador_gestor_proposto_id == funcionario_id))
+
+    def efetivar(self):
+        """ Aplica a movimentação aprovada ao funcionário (cargo e setor propostos). """
+        funcionario = self.funcionario_movido
+        funcionario.cargo = self.cargo_proposto
+        funcionario.setor_primario = self.setor_proposto
+        # Adicione salário se aplicável
+        # funcionario.salario = self.salario_proposto
+        funcionario.save()
+        return funcionario
+
+    def _transicao_rejeicao(self, aprovador, observacao, agora):
+        """ Marca a MP como rejeitada (qualquer aprovador com a MP ainda pendente para ele). """
+        aprovador_id = getattr(aprovador, 'pk', aprovador)
+        pode_rejeitar = (
+            Q(status='pendente_gestores', aprovador_gestor_proposto=aprovador_id, gestor_proposto_aprovou=False)
+            | Q(status='pendente_gestores', aprovador_gestor_atual=aprovador_id, gestor_atual_aprovou=False)
+            | Q(status='pendente_rh', aprovador_rh=aprovador_id)
+        )
+        return 'rejeitar', pode_rejeitar, {
+            'status': 'rejeitada',
+            'rejeitado_por_id': aprovador_id,
+            'data_rejeicao': agora,
+            'observacao_rejeicao': observacao,
+            'aprovador_gestor_proposto': None, # Limpa aprovadores pendentes
+            'aprovador_gestor_atual': None,
+            'aprovador_rh': None,
+        }
 
     class Meta:
         verbose_name = "Movimentação Pessoal"
@@ -514,7 +536,9 @@ class MovimentacaoPessoal(models.Model):
 
 
 # --- ✅ NOVO MODELO: RequisicaoDesligamento ---
-class RequisicaoDesligamento(models.Model):
+class RequisicaoDesligamento(PendenciasMixin, RastreiaAlteracoesMixin, models.Model):
+    TIPO_PENDENCIA = PendenciaAprovacao.TIPO_RD
+
     # --- Status do Fluxo ---
     STATUS_RD_CHOICES = [
         ('pendente_gestor', 'Pendente Gestor Imediato'),
@@ -586,75 +610,23 @@ class RequisicaoDesligamento(models.Model):
     def __str__(self):
         return f"RD #{self.id}: Desligamento de {self.funcionario_desligado.ra_nome}"
 
-    # --- Funções Auxiliares ---
+    # --- Funções Auxiliares (diretório de aprovadores, ver roteamento.py) ---
     def _get_gestor_imediato(self, setor):
         """ 
         Encontra o Gestor Imediato:
         1. Tenta Coordenador (Nível 3)
         2. Se não achar, tenta Gestor (Nível 2)
         """
-        if not setor:
-            return None
-        
-        setor_q = Q(setor_primario=setor) | Q(setores_responsaveis=setor)
-        
-        try:
-            # 1. Tenta Coordenador (Nível 3)
-            coordenador = Funcionario.objects.filter(
-                Q(cargo__nivel=3), 
-                setor_q,
-                ativo=True
-            ).distinct().first()
-            
-            if coordenador:
-                return coordenador
-
-            # 2. Se não achar, tenta Gestor (Nível 2)
-            gestor = Funcionario.objects.filter(
-                Q(cargo__nivel=2), 
-                setor_q,
-                ativo=True
-            ).distinct().first()
-            
-            return gestor # Retorna o gestor ou None se não encontrar
-            
-        except Funcionario.DoesNotExist:
-            return None
+        return roteamento.gestor_imediato(setor)
 
     def _get_rh_approver(self):
-        """ Encontra o aprovador do RH (Copiado/Adaptado). """
-        rh_sector_names = ["RECURSOS HUMANOS", "DEPARTAMENTO DE PESSOAL"]
-        q_objects = Q()
-        for name in rh_sector_names:
-            q_objects |= Q(setor_primario__nome__iexact=name)
-        try:
-            rh_approver = Funcionario.objects.filter(q_objects, ativo=True).order_by('cargo__nivel').first()
-            if rh_approver: return rh_approver
-            return Funcionario.objects.filter(cargo__nivel=1, ativo=True).first()
-        except Exception:
-            return Funcionario.objects.filter(cargo__nivel=1, ativo=True).first()
+        """ Encontra o aprovador do RH (mesma regra de RequisicaoPessoal). """
+        return roteamento.aprovador_rh()
 
 
     def _parse_protheus_date(self, protheus_date_str):
-        """
-        Converte uma data string do Protheus (assumindo YYYYMMDD ou DD/MM/YYYY) 
-        para um objeto date.
-        """
-        if not protheus_date_str:
-            return None
-        
-        # Tenta o formato YYYYMMDD (comum no Protheus)
-        if len(protheus_date_str) == 8:
-            try:
-                return datetime.strptime(protheus_date_str, '%Y%m%d').date()
-            except ValueError:
-                pass # Tenta o próximo formato
-
-        # Tenta o formato DD/MM/YYYY
-        try:
-            return datetime.strptime(protheus_date_str, '%d/%m/%Y').date()
-        except ValueError:
-            return None # Retorna None se tudo falhar
+        """ Converte uma data string do Protheus para date (ver protheus.parse_data). """
+        return protheus.parse_data(protheus_date_str)
 
     # --- Lógica de Workflow ---
     def save(self, *args, **kwargs):
@@ -664,61 +636,66 @@ class RequisicaoDesligamento(models.Model):
             self.cargo_atual = self.funcionario_desligado.cargo
             self.setor_atual = self.funcionario_desligado.setor_primario
             
-            # --- ✅ CORREÇÃO AQUI ---
-            # 1. Busca o campo de texto 'ra_data_admis' do funcionário
-            protheus_data_str = self.funcionario_desligado.ra_data_admis
-            # 2. Converte a string para um objeto date
-            self.data_admissao = self._parse_protheus_date(protheus_data_str)
-            # --- FIM DA CORREÇÃO ---
+            # Data já normalizada no save() do funcionário
+            self.data_admissao = self.funcionario_desligado.data_admissao
             
             # Encontra o primeiro aprovador (Gestor Imediato)
-            self.aprovador_atual = self._get_gestor_imediato(self.setor_atual)
+            self.aprovador_atual_id = roteamento.gestor_imediato_id(self.setor_atual_id)
             
-            if self.aprovador_atual:
+            if self.aprovador_atual_id:
                 self.status = 'pendente_gestor'
             else:
                 # Se não encontrar gestor/coordenador, pula direto para o RH
                 self.status = 'pendente_rh'
-                self.aprovador_atual = self._get_rh_approver()
+                self.aprovador_atual_id = roteamento.aprovador_rh_id()
 
         super().save(*args, **kwargs)
 
-    def avancar_aprovacao(self, aprovador):
+    def _transicao_aprovacao(self, aprovador, agora):
         """ Move a RD para o próximo estágio (Gestor -> RH -> Aprovada) """
-        now = timezone.now()
+        condicao = Q(status=self.status, aprovador_atual=aprovador)
 
         # 1. Gestor aprovou
-        if self.status == 'pendente_gestor' and aprovador == self.aprovador_atual:
-            self.aprovado_por_gestor = aprovador
-            self.data_aprovacao_gestor = now
-            # Próximo passo: RH
-            self.status = 'pendente_rh'
-            self.aprovador_atual = self._get_rh_approver()
-            self.save()
-
-        # 2. RH aprovou
-        elif self.status == 'pendente_rh' and aprovador == self.aprovador_atual:
-            self.aprovado_por_rh = aprovador
-            self.data_aprovacao_rh = now
-            # Próximo passo: Fim
-            self.status = 'aprovada'
-            self.aprovador_atual = None
-            self.save()
-            
-            # --- AÇÃO DE DESLIGAMENTO ---
-            # Desativa o funcionário no sistema
-            self.funcionario_desligado.ativo = False
-            self.funcionario_desligado.save()
-            # --------------------------
-
-    def rejeitar(self, aprovador_que_rejeitou, observacao):
-        """ Marca a RD como rejeitada. """
-        self.status = 'rejeitada'
-        self.rejeitado_por = aprovador_que_rejeitou
-        self.data_rejeicao = timezone.now()
-        self.observacao_rejeicao = observacao
-        self.aprovador_atual = None
-        self.save()
+        if self.status == 'pendente_gestor':
+            return self.status, condicao, {
+                'aprovado_por_gestor': aprovador,
+                'data_aprovacao_gestor': agora,
+                # Próximo passo: RH
+                'status': 'pendente_rh',
+                'aprovador_atual_id': roteamento.aprovador_rh_id(),
+            }
+
+        # 2. RH aprovou (o desligamento é feito em efetivar())
+        if self.status == 'pendente_rh':
+            return self.status, condicao, {
+                'aprovado_por_rh': aprovador,
+                'data_aprovacao_rh': agora,
+                # Próximo passo: Fim
+                'status': 'aprovada',
+                'aprovador_atual': None,
+            }
+        return None
+
+    def avancar_aprovacao(self, aprovador):
+        """ Aprova a etapa atual; na aprovação final já desativa o funcionário. False se já tratada. """
+        return self.aprovar_por(aprovador)
+
+    def efetivar(self):
+        # --- AÇÃO DE DESLIGAMENTO ---
+        # Desativa o funcionário no sistema
+        self.funcionario_desligado.ativo = False
+        self.funcionario_desligado.save()
+        return self.funcionario_desligado
+
+    def _transicao_rejeicao(self, aprovador, observacao, agora):
+        """ Marca a RD como rejeitada (só o aprovador atual, enquanto pendente). """
+        return 'rejeitar', Q(status__in=['pendente_gestor', 'pendente_rh'], aprovador_atual=aprovador), {
+            'status': 'rejeitada',
+            'rejeitado_por': aprovador,
+            'data_rejeicao': agora,
+            'observacao_rejeicao': observacao,
+            'aprovador_atual': None,
+        }
 
     class Meta:
         verbose_name = "Requisição de Desligamento"
@@ -0,0 +1,105 @@
+# hierarquia/models_alteracoes.py
+
+import copy
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+
+class RastreiaAlteracoesMixin:
+    """
+    Mixin de modelo: guarda os valores carregados do banco e, no save() de um
+    registro existente sem `update_fields`, grava só as colunas que mudaram
+    (mais as auto_now). Um Funcionario tem ~240 colunas e as requisições 20-30;
+    uma aprovação muda 3 ou 4.
+
+    Quem passa `update_fields` explicitamente continua no controle. Campos
+    adiados (defer/only) que não foram lidos não entram na comparação.
+
+    `atualizar_se()` faz transições de estado como um único UPDATE condicional.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_originais()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None:
+            self._guardar_originais()
+        else:
+            self._guardar_originais(self._meta.get_field(campo).attname for campo in fields)
+
+    def _guardar_originais(self, attnames=None):
+        originais = getattr(self, '_valores_originais', None)
+        if originais is None or attnames is None:
+            originais = self._valores_originais = {}
+            attnames = (campo.attname for campo in self._meta.concrete_fields)
+        for attname in attnames:
+            if attname in self.__dict__:
+                valor = self.__dict__[attname]
+                # Só valores mutáveis (JSON) precisam de cópia para a comparação
+                originais[attname] = copy.deepcopy(valor) if isinstance(valor, (dict, list)) else valor
+
+    def campos_alterados(self):
+        """ Nomes dos campos carregados cujo valor mudou desde a leitura (ou o último save). """
+        originais = getattr(self, '_valores_originais', {})
+        alterados = []
+        for campo in self._meta.concrete_fields:
+            if campo.primary_key or campo.attname not in self.__dict__:
+                continue
+            if campo.attname not in originais or originais[campo.attname] != self.__dict__[campo.attname]:
+                alterados.append(campo.name)
+        return alterados
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and hasattr(self, '_valores_originais') and not args
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert')):
+            auto_now = [campo.name for campo in self._meta.concrete_fields if getattr(campo, 'auto_now', False)]
+            kwargs['update_fields'] = list(dict.fromkeys(self.campos_alterados() + auto_now))
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self._guardar_originais()
+        else:
+            self._guardar_originais(self._meta.get_field(campo).attname for campo in update_fields)
+
+    @classmethod
+    def preencher_auto_now(cls, valores, agora=None):
+        """ Acrescenta as auto_now aos valores de um QuerySet.update() (que não as preenche). """
+        agora = agora or timezone.now()
+        for campo in cls._meta.concrete_fields:
+            if getattr(campo, 'auto_now', False):
+                valores.setdefault(campo.name, agora)
+        return valores
+
+    def atualizar_se(self, condicao, **valores):
+        """
+        Transição atômica: UPDATE ... SET <valores> WHERE pk=<pk> AND <condicao>.
+
+        Retorna False (sem gravar nada) se a linha não atende mais a `condicao`,
+        ou seja, outra requisição chegou antes. Nenhum lock fica aberto durante o
+        código Python: quem perde a corrida simplesmente não altera nenhuma linha.
+
+        Valores que são expressões (Case, F...) são relidos do banco depois do
+        UPDATE; os demais vão direto para a instância. As auto_now entram sozinhas
+        e o post_save é enviado como num save(update_fields=...).
+        """
+        self.preencher_auto_now(valores)
+        modelo = type(self)
+        with transaction.atomic():
+            if not modelo._base_manager.filter(condicao, pk=self.pk).update(**valores):
+                return False
+            relidos = [nome for nome, valor in valores.items() if hasattr(valor, 'resolve_expression')]
+            for nome, valor in valores.items():
+                if nome not in relidos:
+                    setattr(self, nome, valor)
+            self._guardar_originais(self._meta.get_field(nome).attname for nome in valores if nome not in relidos)
+            if relidos:
+                self.refresh_from_db(fields=relidos)
+            post_save.send(sender=modelo, instance=self, created=False, update_fields=frozenset(valores),
+                           raw=False, using=self._state.db)
+        return True
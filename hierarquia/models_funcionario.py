@@ -2,13 +2,51 @@
 
 from django.db import models
 from django.db.models import Q
-from django.contrib.auth.models import User, Permission
-from django.contrib.contenttypes.models import ContentType
+from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 
+from . import permissoes
+from .metricas import etapa
+from .models_alteracoes import RastreiaAlteracoesMixin
+from .protheus import CAMPOS_DATA, parse_data
+
 # NOTA: Não importamos mais Cargo e Setor diretamente daqui
 
-class Funcionario(models.Model):
+
+# Colunas da "linha quente": o que a lógica do app e as telas do dia a dia usam.
+# As ~226 colunas SRA (Protheus) ficam adiadas (defer) e só são carregadas
+# pelo Admin, pelo detalhe do funcionário e pelo importador (com_protheus()).
+CAMPOS_ESSENCIAIS = (
+    'id', 'usuario', 'cargo', 'setor_primario', 'ativo',
+    'ra_nome', 'ra_mat',
+    'ra_sit_folha',     # usado no save() para calcular 'ativo'
+    'data_admissao',    # Dashboard, listagem por setor e Requisição de Desligamento
+    'atualizado_em',    # auto_now: precisa estar carregado para o save() parcial atualizar
+)
+
+# ra_sit_folha que tornam o funcionário inativo no app
+# D = Demitido, T = Transferido, A = Afastado, F = Férias
+SITUACOES_INATIVAS = ['D', 'T', 'A'] # Adicione 'F' se Férias = Inativo
+
+
+class FuncionarioQuerySet(models.QuerySet):
+    def com_protheus(self, *campos):
+        """
+        Carrega também as colunas SRA: só as informadas em `campos`
+        (além das essenciais) ou, sem argumentos, a linha completa.
+        """
+        if not campos:
+            return self.defer(None)
+        return self.only(*CAMPOS_ESSENCIAIS, *campos)
+
+
+class FuncionarioManager(models.Manager.from_queryset(FuncionarioQuerySet)):
+    """ Manager padrão: carrega apenas CAMPOS_ESSENCIAIS. """
+    def get_queryset(self):
+        return super().get_queryset().only(*CAMPOS_ESSENCIAIS)
+
+
+class Funcionario(RastreiaAlteracoesMixin, models.Model):
     """
     Modelo ATUALIZADO para representar funcionários, mesclando
     a lógica do app (usuario, cargo, setores) com a estrutura
@@ -47,6 +85,15 @@ class Funcionario(models.Model):
     # --- 2. NOVO CAMPO DE SALÁRIO CALCULADO ---
     salario_bruto_calculado = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Salário Bruto (Calculado)")
 
+    # --- 2b. DATAS TIPADAS (derivadas dos textos da SRA no save(); ver protheus.py) ---
+    data_admissao = models.DateField(null=True, blank=True, db_index=True, editable=False, verbose_name='Data de Admissão')
+    data_nascimento = models.DateField(null=True, blank=True, editable=False, verbose_name='Data de Nascimento')
+    data_demissao = models.DateField(null=True, blank=True, db_index=True, editable=False, verbose_name='Data de Demissão')
+
+    # --- 2c. IMPRESSÃO DIGITAL DA ÚLTIMA LINHA IMPORTADA (sha256; ver importacao/) ---
+    # A importação compara o hash da linha da planilha com este e pula as que não mudaram.
+    hash_sra = models.CharField(max_length=64, blank=True, default='', editable=False, verbose_name='Hash da linha SRA')
+
 
     # --- 3. CAMPOS DO PROTHEUS (SRA) - 226 CAMPOS ---
     ra_filial = models.CharField(max_length=255, blank=True, null=True, verbose_name='Filial')
@@ -280,78 +327,93 @@ class Funcionario(models.Model):
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
+    objects = FuncionarioManager()
+
     class Meta:
         ordering = ['ra_nome']
+        # Acessos por FK/O2O (rp.solicitante, request.user.funcionario...) também usam a linha estreita
+        base_manager_name = 'objects'
+        indexes = [
+            # Busca por matrícula na importação já devolve o hash (index-only no PostgreSQL)
+            models.Index(fields=['ra_mat', 'hash_sra'], name='funcionario_mat_hash_idx'),
+        ]
         verbose_name = 'Funcionário'
         verbose_name_plural = 'Funcionários'
 
     def __str__(self):
         return f"{self.ra_nome} ({self.ra_mat})"
 
-    def _calcular_salario_bruto(self):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda o estado hierárquico carregado do banco, para que o sinal de
+        # post_save só recalcule a hierarquia quando cargo/setor realmente mudarem
+        instance._estado_hierarquico = (instance.__dict__.get('cargo_id'), instance.__dict__.get('setor_primario_id'))
+        # Usuário e cargo carregados: o save() só refaz as permissões de equipe se a regra mudar
+        instance._estado_equipe = (instance.__dict__.get('usuario_id'), instance.__dict__.get('cargo_id'))
+        return instance
+
+    def estado_hierarquico_mudou(self):
+        """ True se cargo ou setor primário mudaram desde o carregamento. """
+        atual = (self.cargo_id, self.setor_primario_id)
+        return getattr(self, '_estado_hierarquico', None) != atual
+
+    def sincronizar_datas(self):
         """
-        Calcula o salário bruto com base nas regras de negócio do Protheus.
-        ESTA LÓGICA É UM EXEMPLO E PRECISA SER VALIDADA/AJUSTADA POR VOCÊ.
+        Preenche as datas tipadas a partir dos textos da SRA (uma vez, no save/importação).
+        Só olha as colunas de origem carregadas: numa instância "estreita" o texto
+        adiado não mudou, então a data tipada já está correta no banco.
         """
-        try:
-            # Converte todos para Decimal para segurança no cálculo
-            base = self.ra_salario or 0
-            per_insa = self.ra_perinsa or 0
-            per_per = self.ra_perper or 0
-            # Adicione outros campos base aqui (ex: ra_vlradic, ra_peradit, etc.)
-            
-            # TODO: ADICIONE SUA FÓRMULA DE CÁLCULO AQUI
-            # Exemplo simples: Salário Base + (Base * % Insalubridade / 100) + (Base * % Periculosidade / 100)
-            # NOTA: Muitas empresas calculam % sobre o salário mínimo, não sobre o base.
-            # Verifique sua regra de negócio.
-            
-            # Exemplo de cálculo (SUBSTITUA PELA SUA LÓGICA):
-            salario_bruto = base + (base * (per_insa / 100)) + (base * (per_per / 100))
-            
-            return salario_bruto
-        except Exception as e:
-            print(f"Erro ao calcular salário para {self.ra_mat}: {e}")
-            return self.ra_salario or 0 # Retorna o base em caso de falha
+        for campo, origem in CAMPOS_DATA.items():
+            if origem in self.__dict__:
+                setattr(self, campo, parse_data(self.__dict__[origem]))
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding
         
         # ✅ CORREÇÃO AQUI: Use 'ra_sit_folha' (o nome real do campo no modelo)
         if self.ra_sit_folha:
-            # D = Demitido, T = Transferido, A = Afastado, F = Férias
-            if self.ra_sit_folha in ['D', 'T', 'A']: # Adicione 'F' se Férias = Inativo
+            if self.ra_sit_folha in SITUACOES_INATIVAS:
                 self.ativo = False
             else:
                 self.ativo = True
         
-        # Chama o cálculo do salário bruto
-        #self.salario_bruto_calculado = self._calcular_salario_bruto()
+        self.sincronizar_datas()
+        # Edição feita fora da importação: a linha não bate mais com a SRA,
+        # então a próxima importação precisa reprocessá-la (ver hash_sra)
+        if not getattr(self, '_importando', False):
+            self.hash_sra = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derivados = [campo for campo, origem in CAMPOS_DATA.items() if origem in update_fields]
+            kwargs['update_fields'] = list(update_fields) + derivados + ['hash_sra']
 
         super().save(*args, **kwargs)
+        # Os sinais de post_save já compararam com o estado anterior: agora o "carregado" é o atual
+        self._estado_hierarquico = (self.cargo_id, self.setor_primario_id)
 
-        # Lógica de permissão de usuário (MANTIDA)
-        if self.usuario:
-            pode_gerenciar_equipe = False
-            if self.cargo and self.cargo.nivel:
-                pode_gerenciar_equipe = self.cargo.nivel <= 4
-
-            self.usuario.is_staff = pode_gerenciar_equipe
-            try:
-                content_type = ContentType.objects.get_for_model(Funcionario)
-                perm_add = Permission.objects.get(content_type=content_type, codename='add_funcionario')
-                perm_change = Permission.objects.get(content_type=content_type, codename='change_funcionario')
-                perm_view = Permission.objects.get(content_type=content_type, codename='view_funcionario')
-
-                if pode_gerenciar_equipe:
-                    self.usuario.user_permissions.add(perm_add, perm_change, perm_view)
-                elif not is_new:
-                    self.usuario.user_permissions.remove(perm_add, perm_change, perm_view)
-
-                if is_new or self.usuario.is_staff != pode_gerenciar_equipe:
-                    self.usuario.save()
+        # Permissões de equipe do usuário vinculado (permissoes.py), só se a regra pode ter mudado
+        with etapa('permissões (save)'):
+            if self._equipe_mudou(is_new):
+                permissoes.sincronizar_ou_adiar(self.pk)
+                if Funcionario.usuario.is_cached(self):
+                    self.usuario.is_staff = permissoes.pode_gerenciar_equipe(self.cargo.nivel if self.cargo_id else None)
+            self._estado_equipe = (self.usuario_id, self.cargo_id)
 
-            except (Permission.DoesNotExist, ContentType.DoesNotExist):
-                pass # Ignora se permissões não existem (primeira migração)
+    def _equipe_mudou(self, is_new):
+        """ True se is_staff/permissões do usuário podem ter mudado desde o carregamento. """
+        if not self.usuario_id:
+            return False
+        estado = getattr(self, '_estado_equipe', None)
+        if is_new or estado is None or estado[0] != self.usuario_id:
+            return True
+        cargo_anterior = estado[1]
+        if cargo_anterior == self.cargo_id:
+            return False
+        from .models import Cargo
+        niveis = dict(Cargo.objects.filter(pk__in=[cargo_anterior, self.cargo_id]).values_list('pk', 'nivel'))
+        return (permissoes.pode_gerenciar_equipe(niveis.get(cargo_anterior))
+                != permissoes.pode_gerenciar_equipe(niveis.get(self.cargo_id)))
 
     # --- MÉTODOS HIERÁRQUICOS ATUALIZADOS (MANTIDOS) ---
     def obter_nivel_hierarquico(self):
@@ -359,80 +421,35 @@ class Funcionario(models.Model):
 
     def obter_superiores(self):
         """
-        (CORRIGIDO NOVAMENTE) Retorna superiores hierárquicos:
+        Retorna superiores hierárquicos (ativos):
         1. Superiores (nível < atual) DENTRO do mesmo Setor Principal.
         2. Superiores (nível < atual) que são RESPONSÁVEIS pelo Setor Principal do funcionário.
         3. SEMPRE inclui Diretores (nível 1) ativos.
-        """
-        if not self.setor_primario:
-            # Se o funcionário não tem setor primário, apenas Diretores podem ser superiores.
-            return Funcionario.objects.filter(cargo__nivel=1, ativo=True).exclude(pk=self.pk).distinct().order_by('cargo__nivel')
-
-        # Condição 1: Superior no mesmo setor primário E nível menor
-        condicao_mesmo_setor = Q(
-            setor_primario=self.setor_primario,
-            cargo__nivel__lt=self.cargo.nivel,
-            ativo=True
-        )
-
-        # --- NOVA CONDIÇÃO ---
-        # Condição 2: Superior é RESPONSÁVEL pelo setor primário deste funcionário E tem nível menor
-        condicao_responsavel = Q(
-            setores_responsaveis=self.setor_primario, # Verifica se o setor_primario DESTE func está na lista M2M do OUTRO
-            cargo__nivel__lt=self.cargo.nivel,
-            ativo=True
-        )
-        # ---------------------
 
-        # Condição 3: É um Diretor (Nível 1) ativo
-        condicao_diretor = Q(
-            cargo__nivel=1,
+        As regras acima ficam materializadas em RelacaoHierarquica
+        (models_hierarquia.py), então aqui é uma única busca indexada.
+        """
+        superiores_ids = self.relacoes_como_subordinado.values('superior_id')
+        return Funcionario.objects.filter(
+            pk__in=superiores_ids,
             ativo=True
-        )
-
-        # Combina as condições: (Mesmo Setor OU Responsável OU Diretor)
-        superiores = Funcionario.objects.filter(
-            condicao_mesmo_setor | condicao_responsavel | condicao_diretor
-        ).exclude(pk=self.pk).distinct().order_by('cargo__nivel')
-
-        # --- REMOÇÃO DO FILTRO DE CENTRO DE SERVIÇO ---
-        # O filtro por centro_servico aqui provavelmente não faz sentido,
-        # pois um gerente responsável ou um diretor não necessariamente
-        # compartilharão o mesmo centro de serviço. Removendo para clareza.
-        # Se precisar reintroduzir com lógica específica, pode ser feito.
-        # if self.centro_servico:
-        #     superiores = superiores.filter(centro_servico=self.centro_servico)
-        # -----------------------------------------------
-
-        return superiores
+        ).exclude(pk=self.pk).order_by('cargo__nivel')
 
     def obter_subordinados(self, incluir_responsaveis=True):
         """
-            Retorna subordinados:
+            Retorna subordinados (ativos):
             1. Com nível maior DENTRO do Setor Principal do funcionário.
             2. Se incluir_responsaveis=True (padrão), também inclui todos os funcionários
             cujo Setor Principal seja um dos Setores Responsáveis por este funcionário.
+
+            Lido da tabela RelacaoHierarquica (models_hierarquia.py).
             """
-        # (Lógica original... mantida)
-        if not self.cargo:
+        if not self.cargo_id:
             return Funcionario.objects.none()
 
-        subordinados = Funcionario.objects.none()
-        if self.setor_primario:
-            subordinados_primario = Funcionario.objects.filter(
-                setor_primario=self.setor_primario,
-                cargo__nivel__gt=self.cargo.nivel,
-                ativo=True
-            )
-            subordinados = subordinados | subordinados_primario
-
-        if incluir_responsaveis and self.setores_responsaveis.exists():
-            setores_resp = self.setores_responsaveis.all()
-            subordinados_responsaveis = Funcionario.objects.filter(
-                setor_primario__in=setores_resp,
-                cargo__nivel__gt=self.cargo.nivel,
-                ativo=True
-            ).exclude(pk=self.pk)
-            subordinados = subordinados | subordinados_responsaveis
-        
-        return subordinados.distinct().order_by('setor_primario__nome', 'cargo__nivel', 'ra_nome') # Atualizado para ra_nome
\ No newline at end of file
+        vias = ['setor', 'responsavel'] if incluir_responsaveis else ['setor']
+        subordinados_ids = self.relacoes_como_superior.filter(via__in=vias).values('subordinado_id')
+        return Funcionario.objects.filter(
+            pk__in=subordinados_ids,
+            ativo=True
+        ).order_by('setor_primario__nome', 'cargo__nivel', 'ra_nome')
@@ -0,0 +1,180 @@
+# hierarquia/models_hierarquia.py
+
+from collections import defaultdict
+
+from django.db import models, transaction
+from django.db.models import Q
+
+from .models_funcionario import Funcionario
+
+
+def calcular_pares(pessoas, responsaveis, envolvendo=None):
+    """
+    Calcula os pares (superior, subordinado, via) da hierarquia, usando as
+    MESMAS regras de Funcionario.obter_superiores / obter_subordinados:
+
+    - 'setor':       mesmo Setor Principal e nível menor.
+    - 'responsavel': o superior é RESPONSÁVEL pelo Setor Principal do
+                     subordinado e tem nível menor.
+    - 'diretor':     Diretores (Nível 1) são superiores de todos.
+
+    `pessoas` é um dict {id: (nivel, setor_primario_id)} e `responsaveis`
+    um dict {id: set(setor_ids)}. Se `envolvendo` for informado, só
+    retorna os pares em que um dos lados está nesse conjunto de ids.
+    Função pura (sem acesso ao banco) para ser usada também nas migrações.
+    """
+    por_setor = defaultdict(list)
+    for pk, (nivel, setor_id) in pessoas.items():
+        if nivel and setor_id:
+            por_setor[setor_id].append((pk, nivel))
+
+    def interessa(sup, sub):
+        return envolvendo is None or sup in envolvendo or sub in envolvendo
+
+    pares = set()
+
+    # 1. Mesmo setor primário, nível menor
+    for membros in por_setor.values():
+        for sup, nivel_sup in membros:
+            for sub, nivel_sub in membros:
+                if nivel_sup < nivel_sub and interessa(sup, sub):
+                    pares.add((sup, sub, RelacaoHierarquica.VIA_SETOR))
+
+    # 2. Responsável pelo setor primário do subordinado, nível menor
+    for sup, setores in responsaveis.items():
+        nivel_sup = pessoas.get(sup, (None, None))[0]
+        if not nivel_sup:
+            continue
+        for setor_id in setores:
+            for sub, nivel_sub in por_setor.get(setor_id, ()):
+                if sub != sup and nivel_sub > nivel_sup and interessa(sup, sub):
+                    pares.add((sup, sub, RelacaoHierarquica.VIA_RESPONSAVEL))
+
+    # 3. Diretores (Nível 1) são superiores de todos
+    diretores = [pk for pk, (nivel, _) in pessoas.items() if nivel == 1]
+    for sup in diretores:
+        for sub in pessoas:
+            if sub != sup and interessa(sup, sub):
+                pares.add((sup, sub, RelacaoHierarquica.VIA_DIRETOR))
+
+    return pares
+
+
+class RelacaoHierarquica(models.Model):
+    """
+    Tabela de fechamento (closure table) da hierarquia.
+    Cada linha diz que `superior` está acima de `subordinado` e por qual
+    regra. É mantida incrementalmente quando cargo, setor primário,
+    setores responsáveis ou o nível do cargo mudam, e permite que
+    obter_superiores() / obter_subordinados() virem uma única busca indexada.
+
+    O campo 'ativo' NÃO entra na tabela: ele é filtrado na consulta, o que
+    preserva o comportamento original (superiores/subordinados inativos
+    somem da lista sem precisar recalcular nada).
+    """
+    VIA_SETOR = 'setor'
+    VIA_RESPONSAVEL = 'responsavel'
+    VIA_DIRETOR = 'diretor'
+    VIA_CHOICES = [
+        (VIA_SETOR, 'Mesmo Setor Principal'),
+        (VIA_RESPONSAVEL, 'Responsável pelo Setor'),
+        (VIA_DIRETOR, 'Diretoria'),
+    ]
+
+    superior = models.ForeignKey(Funcionario, on_delete=models.CASCADE, related_name='relacoes_como_superior')
+    subordinado = models.ForeignKey(Funcionario, on_delete=models.CASCADE, related_name='relacoes_como_subordinado')
+    via = models.CharField(max_length=20, choices=VIA_CHOICES)
+
+    class Meta:
+        verbose_name = 'Relação Hierárquica'
+        verbose_name_plural = 'Relações Hierárquicas'
+        constraints = [
+            models.UniqueConstraint(fields=['superior', 'subordinado', 'via'], name='relacao_hierarquica_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['subordinado', 'via'], name='relacao_hier_sub_via_idx'),
+            models.Index(fields=['superior', 'via'], name='relacao_hier_sup_via_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.superior_id} -> {self.subordinado_id} ({self.via})"
+
+    # --- Manutenção da tabela ---
+
+    @classmethod
+    def _carregar_pessoas(cls, filtro=None):
+        """ Carrega {id: (nivel, setor_id)} (apenas colunas estreitas). """
+        qs = Funcionario.objects.all()
+        if filtro is not None:
+            qs = qs.filter(filtro)
+        return {
+            pk: (nivel, setor_id)
+            for pk, nivel, setor_id in qs.values_list('pk', 'cargo__nivel', 'setor_primario_id')
+        }
+
+    @classmethod
+    def _carregar_responsaveis(cls, filtro=None):
+        """ Carrega {funcionario_id: set(setor_ids)} da M2M setores_responsaveis. """
+        through = Funcionario.setores_responsaveis.through
+        qs = through.objects.all()
+        if filtro is not None:
+            qs = qs.filter(filtro)
+        responsaveis = defaultdict(set)
+        for funcionario_id, setor_id in qs.values_list('funcionario_id', 'setor_id'):
+            responsaveis[funcionario_id].add(setor_id)
+        return responsaveis
+
+    @classmethod
+    def _gravar(cls, pares):
+        cls.objects.bulk_create(
+            [cls(superior_id=sup, subordinado_id=sub, via=via) for sup, sub, via in pares],
+            batch_size=2000,
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def reconstruir(cls):
+        """ Recalcula a tabela inteira (usado na migração e no comando de manutenção). """
+        pessoas = cls._carregar_pessoas()
+        responsaveis = cls._carregar_responsaveis()
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls._gravar(calcular_pares(pessoas, responsaveis))
+
+    @classmethod
+    def recalcular(cls, funcionario_ids):
+        """
+        Recalcula APENAS as relações que envolvem os funcionários informados.
+        Carrega somente quem pode se relacionar com eles: colegas de setor,
+        membros dos setores pelos quais são responsáveis, responsáveis pelos
+        seus setores e os Diretores (ou todos, se algum deles for Diretor).
+        """
+        ids = {pk for pk in funcionario_ids if pk is not None}
+        if not ids:
+            return
+
+        afetados = cls._carregar_pessoas(Q(pk__in=ids))
+        resp_afetados = cls._carregar_responsaveis(Q(funcionario_id__in=ids))
+
+        setores_afetados = {setor_id for _, setor_id in afetados.values() if setor_id}
+        setores_resp = set().union(*resp_afetados.values()) if resp_afetados else set()
+
+        if any(nivel == 1 for nivel, _ in afetados.values()):
+            # Um Diretor é superior de todos: precisa do quadro completo
+            pessoas = cls._carregar_pessoas()
+        else:
+            pessoas = cls._carregar_pessoas(
+                Q(setor_primario_id__in=setores_afetados | setores_resp)
+                | Q(setores_responsaveis__in=setores_afetados)
+                | Q(cargo__nivel=1)
+            )
+        pessoas.update(afetados)
+
+        responsaveis = cls._carregar_responsaveis(Q(setor_id__in=setores_afetados))
+        for pk, setores in resp_afetados.items():
+            responsaveis[pk] |= setores
+
+        pares = calcular_pares(pessoas, responsaveis, envolvendo=ids)
+        with transaction.atomic():
+            cls.objects.filter(Q(superior_id__in=ids) | Q(subordinado_id__in=ids)).delete()
+            cls._gravar(pares)
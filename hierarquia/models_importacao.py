@@ -0,0 +1,112 @@
+# hierarquia/models_importacao.py
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class ControleSincronizacao(models.Model):
+    """
+    Marca d'água (watermark) da sincronização incremental de uma origem (ex.: a SRA).
+
+    A carga delta só traz as linhas alteradas no Protheus; cada linha tem uma
+    marca de alteração (data/hora ou número sequencial). Linhas com marca menor
+    ou igual a `ultima_marca` já foram aplicadas e são puladas.
+
+    Linhas que deram erro não seguram a marca: ficam em `linhas_pendentes`
+    ({matrícula: {'linha': ..., 'erro': ...}}) e são tentadas de novo no início
+    de cada sincronização, até gravarem ou chegar uma versão mais nova da matrícula.
+    """
+    MARCA_DATA = 'data'
+    MARCA_SEQUENCIA = 'sequencia'
+    TIPO_MARCA_CHOICES = [
+        (MARCA_DATA, 'Data/hora da alteração'),
+        (MARCA_SEQUENCIA, 'Número sequencial'),
+    ]
+
+    origem = models.CharField(max_length=50, unique=True)
+    tipo_marca = models.CharField(max_length=20, choices=TIPO_MARCA_CHOICES, default=MARCA_DATA)
+    ultima_marca = models.CharField(max_length=50, blank=True, default='',
+                                    help_text="Vazio = a próxima sincronização aplica todas as linhas.")
+    ultima_execucao = models.DateTimeField(null=True, blank=True)
+    resumo = models.CharField(max_length=255, blank=True, default='')
+    linhas_pendentes = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder,
+                                        help_text="Linhas com erro, tentadas de novo na próxima sincronização.")
+
+    class Meta:
+        ordering = ['origem']
+        verbose_name = 'Controle de Sincronização'
+        verbose_name_plural = 'Controles de Sincronização'
+
+    def __str__(self):
+        return f"{self.origem} (até {self.ultima_marca or '—'})"
+
+    def chave(self, marca):
+        """
+        Valor comparável da marca. Data/hora: só os dígitos, completados até
+        AAAAMMDDHHMMSS (aceita '20240506', '2024-05-06 10:00:00' e afins).
+        """
+        marca = str(marca).strip()
+        if self.tipo_marca == self.MARCA_SEQUENCIA:
+            return int(marca)
+        return ''.join(c for c in marca if c.isdigit()).ljust(14, '0')
+
+    def pendente(self, marca):
+        """ True se a linha com esta marca ainda não foi aplicada. """
+        return not self.ultima_marca or self.chave(marca) > self.chave(self.ultima_marca)
+
+
+class ImportacaoArquivo(models.Model):
+    """
+    Uma importação de planilha da SRA, com ponto de retomada: `ultima_linha` é a
+    última linha já gravada. Se a importação cair no meio, reenviar o mesmo
+    arquivo (mesmo hash) continua dali em vez de começar do zero.
+    """
+    STATUS_EM_ANDAMENTO = 'em_andamento'
+    STATUS_FALHOU = 'falhou'
+    STATUS_CONCLUIDA = 'concluida'
+    STATUS_CHOICES = [
+        (STATUS_EM_ANDAMENTO, 'Em andamento'),
+        (STATUS_FALHOU, 'Falhou'),
+        (STATUS_CONCLUIDA, 'Concluída'),
+    ]
+
+    hash_arquivo = models.CharField(max_length=64, db_index=True)
+    nome_arquivo = models.CharField(max_length=255)
+    modo = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_EM_ANDAMENTO)
+    ultima_linha = models.PositiveIntegerField(default=0)
+    iniciada_em = models.DateTimeField(auto_now_add=True)
+    atualizada_em = models.DateTimeField(auto_now=True)
+    concluida_em = models.DateTimeField(null=True, blank=True)
+    resumo = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        ordering = ['-iniciada_em']
+        verbose_name = 'Importação de Arquivo'
+        verbose_name_plural = 'Importações de Arquivo'
+
+    def __str__(self):
+        return f"{self.nome_arquivo} ({self.get_status_display()}, até a linha {self.ultima_linha})"
+
+
+class LoteImportacao(models.Model):
+    """ Um lote gravado de uma ImportacaoArquivo: totais e relatório de erros do lote. """
+    importacao = models.ForeignKey(ImportacaoArquivo, on_delete=models.CASCADE, related_name='lotes')
+    linha_inicial = models.PositiveIntegerField()
+    linha_final = models.PositiveIntegerField()
+    criados = models.PositiveIntegerField(default=0)
+    atualizados = models.PositiveIntegerField(default=0)
+    inalterados = models.PositiveIntegerField(default=0)
+    ignorados = models.PositiveIntegerField(default=0)
+    erros = models.JSONField(default=list, blank=True)   # [[linha, mensagem]]
+    nao_encontrados = models.JSONField(default=dict, blank=True)   # {rótulo: {valor: linhas}}
+    funcionario_ids = models.JSONField(default=list, blank=True)   # criados/atualizados (hierarquia no final)
+    gravado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['importacao', 'linha_inicial']
+        verbose_name = 'Lote de Importação'
+        verbose_name_plural = 'Lotes de Importação'
+
+    def __str__(self):
+        return f"Linhas {self.linha_inicial}-{self.linha_final}"
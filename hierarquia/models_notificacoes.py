@@ -0,0 +1,108 @@
+# hierarquia/models_notificacoes.py
+
+from django.db import models
+from django.utils import timezone
+
+from .models_funcionario import Funcionario
+from .models_pendencias import PendenciaAprovacao
+
+
+class EventoNotificacao(models.Model):
+    """
+    Outbox das notificações de aprovação. Cada transição de RP/MP/RD grava aqui,
+    na MESMA transação (ver PendenciasMixin e aprovacao_lote.py), uma linha por
+    destinatário; o comando `despachar_notificacoes` (notificacoes.py) entrega
+    depois, em lotes, aos notificadores configurados. Transição desfeita =
+    evento desfeito, e o envio nunca atrasa a aprovação.
+    """
+    EVENTO_PENDENTE = 'pendente'
+    EVENTO_APROVADA = 'aprovada'
+    EVENTO_REJEITADA = 'rejeitada'
+    EVENTO_CHOICES = [
+        (EVENTO_PENDENTE, 'Aguarda aprovação'),
+        (EVENTO_APROVADA, 'Aprovada'),
+        (EVENTO_REJEITADA, 'Rejeitada'),
+    ]
+    # Status finais que avisam o solicitante
+    EVENTOS_FINAIS = (EVENTO_APROVADA, EVENTO_REJEITADA)
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_ENVIANDO = 'enviando'
+    STATUS_ENVIADO = 'enviado'
+    STATUS_FALHOU = 'falhou'
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Na fila'),
+        (STATUS_ENVIANDO, 'Enviando'),
+        (STATUS_ENVIADO, 'Enviado'),
+        (STATUS_FALHOU, 'Falhou'),
+    ]
+
+    tipo = models.CharField(max_length=2, choices=PendenciaAprovacao.TIPO_CHOICES)
+    objeto_id = models.PositiveIntegerField()
+    evento = models.CharField(max_length=20, choices=EVENTO_CHOICES)
+    destinatario = models.ForeignKey(Funcionario, on_delete=models.CASCADE, related_name='eventos_notificacao')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    # Notificadores que já entregaram (uma nova tentativa não repete o canal)
+    canais_entregues = models.JSONField(default=list, blank=True)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    erro = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    reservado_em = models.DateTimeField(null=True, blank=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['criado_em']
+        indexes = [models.Index(fields=['status', 'proxima_tentativa'], name='evento_notif_fila_idx')]
+        verbose_name = 'Evento de Notificação'
+        verbose_name_plural = 'Eventos de Notificação'
+
+    def __str__(self):
+        return f"{self.tipo} #{self.objeto_id} {self.evento} -> {self.destinatario_id} ({self.status})"
+
+    @classmethod
+    def registrar(cls, tipo, reqs, novas_pendencias, status_anteriores):
+        """
+        Grava (um INSERT) os eventos de requisições de `tipo` que acabaram de mudar:
+
+        - 'pendente' para quem passou a ter a requisição na caixa de entrada
+          (`novas_pendencias`, devolvido por PendenciaAprovacao.sincronizar_varias);
+        - 'aprovada'/'rejeitada' para o solicitante, quando o status final é novo
+          (`status_anteriores`: {pk: status antes da transição}).
+
+        Chame dentro da transação que gravou a transição.
+        """
+        eventos = [
+            cls(tipo=tipo, objeto_id=objeto_id, evento=cls.EVENTO_PENDENTE, destinatario_id=aprovador_id)
+            for objeto_id, aprovador_id in sorted({(objeto_id, aprovador_id)
+                                                   for objeto_id, aprovador_id, _ in novas_pendencias})
+        ]
+        for req in reqs:
+            if req.status in cls.EVENTOS_FINAIS and status_anteriores.get(req.pk) != req.status:
+                eventos.append(cls(tipo=tipo, objeto_id=req.pk, evento=req.status, destinatario_id=req.solicitante_id))
+        if eventos:
+            cls.objects.bulk_create(eventos)
+        return eventos
+
+
+class Notificacao(models.Model):
+    """ Notificação in-app (NotificadorInApp), lida pelo app em /api/notificacoes/. """
+    destinatario = models.ForeignKey(Funcionario, on_delete=models.CASCADE, related_name='notificacoes')
+    # Um evento gera no máximo uma notificação (reentrega após falha de outro canal não duplica)
+    evento = models.OneToOneField(EventoNotificacao, on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='notificacao')
+    titulo = models.CharField(max_length=200)
+    mensagem = models.TextField(blank=True, default='')
+    link = models.CharField(max_length=255, blank=True, default='')
+    lida = models.BooleanField(default=False)
+    criada_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-criada_em']
+        indexes = [models.Index(fields=['destinatario', 'lida', 'criada_em'], name='notificacao_dest_idx')]
+        verbose_name = 'Notificação'
+        verbose_name_plural = 'Notificações'
+
+    def __str__(self):
+        return f"{self.destinatario_id}: {self.titulo}"
@@ -0,0 +1,299 @@
+# hierarquia/models_pendencias.py
+
+from django.db import models, transaction
+from django.db.models import Count, F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models_funcionario import Funcionario
+
+
+# Enviado quando a caixa de entrada de alguém muda.
+# `aprovador_ids`: conjunto de Funcionario.pk afetados (None = todos, após reconstruir()).
+pendencias_alteradas = Signal()
+
+# Status em que cada tipo de requisição aguarda alguém (os demais são finais)
+STATUS_PENDENTES = {
+    'RP': ['pendente_gestor', 'pendente_rh', 'em_revisao_gestor'],
+    'MP': ['pendente_gestores', 'pendente_rh'],
+    'RD': ['pendente_gestor', 'pendente_rh'],
+}
+
+
+def calcular_pendencias(tipo, req):
+    """
+    Retorna o conjunto {(aprovador_id, papel)} de quem precisa agir na
+    requisição `req` AGORA, usando as mesmas regras das telas de aprovação:
+
+    - RP / RD: o `aprovador_atual`, enquanto o status estiver pendente.
+    - MP:      em 'pendente_gestores', cada gestor (atual/proposto) que ainda
+               não aprovou; em 'pendente_rh', o `aprovador_rh`.
+
+    Usa apenas os campos `*_id` (função pura para ser usada também nas migrações).
+    """
+    if req.status not in STATUS_PENDENTES[tipo]:
+        return set()
+
+    if tipo != 'MP':
+        if not req.aprovador_atual_id:
+            return set()
+        return {(req.aprovador_atual_id, PendenciaAprovacao.PAPEL_APROVADOR)}
+
+    pendencias = set()
+    if req.status == 'pendente_gestores':
+        if req.aprovador_gestor_atual_id and not req.gestor_atual_aprovou:
+            pendencias.add((req.aprovador_gestor_atual_id, PendenciaAprovacao.PAPEL_GESTOR_ATUAL))
+        if req.aprovador_gestor_proposto_id and not req.gestor_proposto_aprovou:
+            pendencias.add((req.aprovador_gestor_proposto_id, PendenciaAprovacao.PAPEL_GESTOR_PROPOSTO))
+    elif req.aprovador_rh_id:
+        pendencias.add((req.aprovador_rh_id, PendenciaAprovacao.PAPEL_RH))
+    return pendencias
+
+
+class PendenciaAprovacao(models.Model):
+    """
+    Caixa de entrada de aprovações (RP, MP e RD numa única tabela).
+    Cada linha diz que `aprovador` precisa agir na requisição (`tipo`, `objeto_id`).
+    É mantida pelo save() das requisições (ver PendenciasMixin), então
+    "minhas pendências" vira uma busca indexada por (aprovador, criado_em)
+    em vez de vários OR sobre os campos de aprovador de cada modelo.
+    """
+    TIPO_RP = 'RP'
+    TIPO_MP = 'MP'
+    TIPO_RD = 'RD'
+    TIPO_CHOICES = [
+        (TIPO_RP, 'Requisição Pessoal'),
+        (TIPO_MP, 'Movimentação Pessoal'),
+        (TIPO_RD, 'Requisição de Desligamento'),
+    ]
+
+    PAPEL_APROVADOR = 'aprovador'
+    PAPEL_GESTOR_ATUAL = 'gestor_atual'
+    PAPEL_GESTOR_PROPOSTO = 'gestor_proposto'
+    PAPEL_RH = 'rh'
+    PAPEL_CHOICES = [
+        (PAPEL_APROVADOR, 'Aprovador Atual'),
+        (PAPEL_GESTOR_ATUAL, 'Gestor Atual'),
+        (PAPEL_GESTOR_PROPOSTO, 'Gestor Proposto'),
+        (PAPEL_RH, 'RH'),
+    ]
+
+    aprovador = models.ForeignKey(Funcionario, on_delete=models.CASCADE, related_name='pendencias')
+    tipo = models.CharField(max_length=2, choices=TIPO_CHOICES)
+    objeto_id = models.PositiveIntegerField()
+    papel = models.CharField(max_length=20, choices=PAPEL_CHOICES)
+    # Data de abertura da requisição (para ordenar a caixa de entrada)
+    criado_em = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Pendência de Aprovação'
+        verbose_name_plural = 'Pendências de Aprovação'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id', 'aprovador', 'papel'], name='pendencia_aprovacao_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['aprovador', 'criado_em'], name='pendencia_aprov_criado_idx'),
+            models.Index(fields=['tipo', 'objeto_id'], name='pendencia_tipo_objeto_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.objeto_id} -> {self.aprovador_id} ({self.papel})"
+
+    # --- Consultas ---
+
+    @classmethod
+    def ids_pendentes(cls, funcionario, tipo):
+        """ Subquery com os IDs das requisições de `tipo` que aguardam `funcionario`. """
+        return cls.objects.filter(aprovador=funcionario, tipo=tipo).values('objeto_id')
+
+    @classmethod
+    def contar(cls, funcionario):
+        """ Retorna {'RP': n, 'MP': n, 'RD': n} com as pendências de `funcionario` (1 consulta). """
+        funcionario_id = getattr(funcionario, 'pk', funcionario)
+        return cls.contar_varios([funcionario_id])[funcionario_id]
+
+    @classmethod
+    def contar_varios(cls, funcionario_ids):
+        """ contar() para vários funcionários: {funcionario_id: {'RP': n, ...}}, numa consulta. """
+        contagens = {pk: {tipo: 0 for tipo, _ in cls.TIPO_CHOICES} for pk in funcionario_ids}
+        linhas = cls.objects.filter(aprovador_id__in=contagens) \
+                            .values('aprovador_id', 'tipo') \
+                            .annotate(total=Count('objeto_id', distinct=True)).order_by()
+        for linha in linhas:
+            contagens[linha['aprovador_id']][linha['tipo']] = linha['total']
+        return contagens
+
+    # --- Manutenção da tabela ---
+
+    @classmethod
+    def sincronizar(cls, tipo, req):
+        """ Ajusta as linhas de UMA requisição ao estado atual dela. """
+        return cls.sincronizar_varias(tipo, [req])
+
+    @classmethod
+    def sincronizar_varias(cls, tipo, reqs):
+        """
+        sincronizar() para várias requisições do mesmo tipo: um SELECT, um DELETE e um INSERT.
+        Retorna as pendências criadas, {(objeto_id, aprovador_id, papel)}.
+        """
+        reqs = list(reqs)
+        if not reqs:
+            return set()
+        desejadas = {
+            (req.pk, aprovador_id, papel): req
+            for req in reqs
+            for aprovador_id, papel in calcular_pendencias(tipo, req)
+        }
+        atuais = {
+            (objeto_id, aprovador_id, papel): pk
+            for pk, objeto_id, aprovador_id, papel in cls.objects.filter(tipo=tipo, objeto_id__in=[req.pk for req in reqs])
+                                                                 .values_list('pk', 'objeto_id', 'aprovador_id', 'papel')
+        }
+        remover = [pk for chave, pk in atuais.items() if chave not in desejadas]
+        if remover:
+            cls.objects.filter(pk__in=remover).delete()
+        novas = desejadas.keys() - atuais.keys()
+        if novas:
+            cls.objects.bulk_create([
+                cls(aprovador_id=aprovador_id, tipo=tipo, objeto_id=objeto_id, papel=papel,
+                    criado_em=desejadas[(objeto_id, aprovador_id, papel)].criado_em)
+                for objeto_id, aprovador_id, papel in novas
+            ], ignore_conflicts=True)
+
+        alterados = {aprovador_id for _, aprovador_id, _ in novas | (atuais.keys() - desejadas.keys())}
+        if alterados:
+            pendencias_alteradas.send(sender=cls, aprovador_ids=alterados)
+        return novas
+
+    @classmethod
+    def remover(cls, tipo, objeto_id):
+        linhas = cls.objects.filter(tipo=tipo, objeto_id=objeto_id)
+        alterados = set(linhas.values_list('aprovador_id', flat=True))
+        if alterados:
+            linhas.delete()
+            pendencias_alteradas.send(sender=cls, aprovador_ids=alterados)
+
+    @classmethod
+    def reconstruir(cls, modelos):
+        """ Recria a tabela a partir de {tipo: Model} (usado na migração e no comando de manutenção). """
+        linhas = []
+        for tipo, modelo in modelos.items():
+            pendentes = modelo.objects.filter(status__in=STATUS_PENDENTES[tipo]).iterator()
+            for req in pendentes:
+                for aprovador_id, papel in calcular_pendencias(tipo, req):
+                    linhas.append(cls(aprovador_id=aprovador_id, tipo=tipo, objeto_id=req.pk,
+                                      papel=papel, criado_em=req.criado_em))
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(linhas, batch_size=2000)
+        pendencias_alteradas.send(sender=cls, aprovador_ids=None)
+
+
+class VersaoCaixaEntrada(models.Model):
+    """
+    Versão da caixa de entrada de cada aprovador: incrementada (signals.py)
+    sempre que as pendências dele mudam. O stream de pendências
+    (eventos_pendencias.py) lê só as linhas alteradas recentemente, numa
+    consulta por processo, em vez de recontar a caixa de cada cliente conectado.
+    """
+    aprovador = models.OneToOneField(Funcionario, on_delete=models.CASCADE, primary_key=True,
+                                     related_name='versao_caixa_entrada')
+    versao = models.PositiveBigIntegerField(default=0)
+    alterada_em = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = 'Versão da Caixa de Entrada'
+        verbose_name_plural = 'Versões da Caixa de Entrada'
+
+    def __str__(self):
+        return f"{self.aprovador_id} v{self.versao}"
+
+    @classmethod
+    def incrementar(cls, aprovador_ids=None):
+        """ +1 na versão de `aprovador_ids` (None = de todos, após reconstruir()). """
+        if aprovador_ids is None:
+            aprovador_ids = PendenciaAprovacao.objects.values_list('aprovador_id', flat=True).distinct()
+            existentes = cls.objects.all()
+        else:
+            existentes = cls.objects.filter(pk__in=aprovador_ids)
+        cls.objects.bulk_create([cls(aprovador_id=pk) for pk in aprovador_ids], ignore_conflicts=True)
+        existentes.update(versao=F('versao') + 1, alterada_em=timezone.now())
+
+    @classmethod
+    def atual(cls, funcionario_id):
+        return cls.objects.filter(pk=funcionario_id).values_list('versao', flat=True).first() or 0
+
+
+class PendenciasMixin:
+    """
+    Mixin para RP, MP e RD: mantém a PendenciaAprovacao em dia a cada save() e
+    grava os eventos de notificação (EventoNotificacao), na mesma transação.
+    Cada modelo define `TIPO_PENDENCIA` ('RP', 'MP' ou 'RD').
+    """
+    TIPO_PENDENCIA = None
+
+    def save(self, *args, **kwargs):
+        status_anterior = None if self._state.adding else getattr(self, '_valores_originais', {}).get('status')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._apos_transicao(status_anterior)
+
+    def _apos_transicao(self, status_anterior):
+        """ Caixa de entrada + outbox de notificações (chamado dentro da transação de quem gravou). """
+        from .models_notificacoes import EventoNotificacao
+        novas = PendenciaAprovacao.sincronizar(self.TIPO_PENDENCIA, self)
+        EventoNotificacao.registrar(self.TIPO_PENDENCIA, [self], novas, {self.pk: status_anterior})
+
+    # --- Transições ---
+    # Cada modelo descreve suas transições como (chave, condição, valores) em
+    # _transicao_aprovacao(aprovador, agora) e _transicao_rejeicao(aprovador,
+    # observacao, agora), ou None se não há o que fazer. Aqui elas viram um
+    # UPDATE condicional; em aprovacao_lote.py, um UPDATE por chave para N requisições.
+
+    def aprovar_por(self, aprovador):
+        """ Aprova a etapa atual e, se foi a final, efetiva. False se já tratada (ou não cabe a `aprovador`). """
+        with transaction.atomic():
+            if not self._executar_transicao(self._transicao_aprovacao(aprovador, timezone.now())):
+                return False
+            if self.status == 'aprovada':
+                self.efetivar()
+        return True
+
+    def rejeitar(self, aprovador_que_rejeitou, observacao):
+        """ Rejeita a requisição. False se já tratada (ou não cabe a quem rejeita). """
+        return self._executar_transicao(self._transicao_rejeicao(aprovador_que_rejeitou, observacao, timezone.now()))
+
+    def efetivar(self):
+        """ Efeito da aprovação final (a MP move o funcionário, a RD o desliga). """
+        return None
+
+    def _executar_transicao(self, transicao):
+        if transicao is None:
+            return False
+        _, condicao, valores = transicao
+        return self.atualizar_se(condicao, **valores)
+
+    def atualizar_se(self, condicao, **valores):
+        """ Transição condicional (RastreiaAlteracoesMixin) + caixa de entrada e notificações, na mesma transação. """
+        status_anterior = self.status
+        with transaction.atomic():
+            if not super().atualizar_se(condicao, **valores):
+                return False
+            self._apos_transicao(status_anterior)
+        return True
+
+    def ja_tratada_por(self, funcionario):
+        """ True se `funcionario` já aprovou ou rejeitou a requisição (ex: toque duplo no app). """
+        funcionario_id = getattr(funcionario, 'pk', funcionario)
+        return funcionario_id in (self.aprovado_por_gestor_id, self.aprovado_por_rh_id, self.rejeitado_por_id)
+
+    def aguarda(self, funcionario):
+        """ True se a requisição (no estado carregado) espera uma ação de `funcionario`. """
+        funcionario_id = getattr(funcionario, 'pk', funcionario)
+        return any(aprovador_id == funcionario_id
+                   for aprovador_id, _ in calcular_pendencias(self.TIPO_PENDENCIA, self))
+
+    @classmethod
+    def pendentes_para(cls, funcionario):
+        """ Requisições deste tipo que aguardam ação de `funcionario`. """
+        return cls.objects.filter(pk__in=PendenciaAprovacao.ids_pendentes(funcionario, cls.TIPO_PENDENCIA))
@@ -0,0 +1,93 @@
+# hierarquia/models_tarefas.py
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils import timezone
+
+
+class TarefaSegundoPlano(models.Model):
+    """
+    Importação/exportação enviada pelo Admin e executada fora da requisição HTTP
+    pelo comando `processar_tarefas` (ver tarefas.py). A própria tabela é a fila:
+    o worker reserva a próxima tarefa pendente com SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    TIPO_IMPORTAR_SRA = 'importar_sra'
+    TIPO_EXPORTAR_SRA = 'exportar_sra'
+    TIPO_CHOICES = [
+        (TIPO_IMPORTAR_SRA, 'Importação da SRA'),
+        (TIPO_EXPORTAR_SRA, 'Exportação da SRA'),
+    ]
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_EXECUTANDO = 'executando'
+    STATUS_CONCLUIDA = 'concluida'
+    STATUS_FALHOU = 'falhou'
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Na fila'),
+        (STATUS_EXECUTANDO, 'Executando'),
+        (STATUS_CONCLUIDA, 'Concluída'),
+        (STATUS_FALHOU, 'Falhou'),
+    ]
+
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    parametros = models.JSONField(default=dict, blank=True)
+    arquivo_entrada = models.FileField(upload_to='tarefas/entrada/%Y/%m/', blank=True)
+    nome_arquivo = models.CharField(max_length=255, blank=True, default='')
+    arquivo_resultado = models.FileField(upload_to='tarefas/resultado/%Y/%m/', blank=True)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    processadas = models.PositiveIntegerField(default=0)
+    resumo = models.TextField(blank=True, default='')
+    erro = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+    criado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='tarefas_segundo_plano')
+    criada_em = models.DateTimeField(auto_now_add=True)
+    iniciada_em = models.DateTimeField(null=True, blank=True)
+    atualizada_em = models.DateTimeField(auto_now=True)
+    concluida_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-criada_em']
+        indexes = [models.Index(fields=['status', 'criada_em'])]
+        verbose_name = 'Tarefa em Segundo Plano'
+        verbose_name_plural = 'Tarefas em Segundo Plano'
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def finalizada(self):
+        return self.status in (self.STATUS_CONCLUIDA, self.STATUS_FALHOU)
+
+    @property
+    def percentual(self):
+        if self.status == self.STATUS_CONCLUIDA:
+            return 100.0
+        if not self.total:
+            return None
+        return round(min(100.0, 100 * self.processadas / self.total), 1)
+
+    @property
+    def segundos_restantes(self):
+        """ Previsão de término pelo ritmo até agora (None sem total ou antes da primeira linha). """
+        if self.status != self.STATUS_EXECUTANDO or not self.total or not self.processadas or not self.iniciada_em:
+            return None
+        decorridos = (timezone.now() - self.iniciada_em).total_seconds()
+        return round(decorridos / self.processadas * max(self.total - self.processadas, 0))
+
+    def como_dict(self):
+        """ Corpo do endpoint de progresso. """
+        return {
+            'id': self.pk,
+            'tipo': self.tipo,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'processadas': self.processadas,
+            'total': self.total,
+            'percentual': self.percentual,
+            'segundos_restantes': self.segundos_restantes,
+            'resumo': self.resumo,
+            'erro': self.erro,
+            'tem_resultado': bool(self.arquivo_resultado),
+        }
@@ -0,0 +1,268 @@
+# hierarquia/notificacoes.py
+"""
+Entrega das notificações de aprovação (outbox EventoNotificacao).
+
+As transições de RP/MP/RD só gravam o evento, na mesma transação; o comando
+`despachar_notificacoes` entrega depois, sem broker externo:
+
+    python manage.py despachar_notificacoes            # laço contínuo
+    python manage.py despachar_notificacoes --uma-vez  # esvazia o outbox e sai (cron)
+
+Cada lote é reservado com SELECT ... FOR UPDATE SKIP LOCKED e um UPDATE
+condicional (vários workers podem rodar juntos), montado com poucas consultas
+e passado a cada notificador de settings.NOTIFICACOES_NOTIFICADORES:
+
+- NotificadorInApp:   Notificacao lida pelo app (/api/notificacoes/);
+- NotificadorEmail:   uma conexão SMTP por lote (EMAIL_HOST/EMAIL_PORT; por
+                      padrão um SMTP local de testes em localhost:1025);
+- NotificadorWebhook: um POST JSON por lote em NOTIFICACOES_WEBHOOK_URL.
+
+Um evento só fica "enviado" quando todos os canais entregaram. Se algum falha,
+os que já entregaram ficam em `canais_entregues` e a nova tentativa (com espera
+crescente) repete só os que faltam; após NOTIFICACOES_MAX_TENTATIVAS, "falhou".
+"""
+
+import json
+import urllib.request
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models_funcionario import Funcionario
+from .models_notificacoes import EventoNotificacao, Notificacao
+from .tarefas import identificacao_worker
+
+# Eventos por lote
+TAMANHO_LOTE = 100
+
+# Espera antes da 1ª nova tentativa; dobra a cada falha
+ESPERA_NOVA_TENTATIVA = 30
+
+TIMEOUT_WEBHOOK = 10
+
+
+# --- Mensagens ---
+
+class Mensagem:
+    """ Um evento já pronto para envio (título, texto, link e e-mail do destinatário). """
+
+    def __init__(self, evento, titulo, texto, link, email):
+        self.evento = evento
+        self.titulo = titulo
+        self.texto = texto
+        self.link = link
+        self.email = email
+
+    def como_dict(self):
+        return {
+            'id': self.evento.pk,
+            'tipo': self.evento.tipo,
+            'objeto_id': self.evento.objeto_id,
+            'evento': self.evento.evento,
+            'destinatario_id': self.evento.destinatario_id,
+            'titulo': self.titulo,
+            'texto': self.texto,
+            'link': self.link,
+            'criado_em': self.evento.criado_em.isoformat(),
+        }
+
+
+def _requisicoes_por_tipo(eventos):
+    """ {tipo: {pk: requisição}}, uma consulta por tipo presente no lote. """
+    from .models import MovimentacaoPessoal, RequisicaoDesligamento, RequisicaoPessoal
+
+    consultas = {
+        'RP': RequisicaoPessoal.objects.select_related('vaga'),
+        'MP': MovimentacaoPessoal.objects.select_related('funcionario_movido'),
+        'RD': RequisicaoDesligamento.objects.select_related('funcionario_desligado'),
+    }
+    ids = {}
+    for evento in eventos:
+        ids.setdefault(evento.tipo, set()).add(evento.objeto_id)
+    return {tipo: consultas[tipo].in_bulk(pks) for tipo, pks in ids.items()}
+
+
+def _descrever(tipo, req):
+    if tipo == 'RP':
+        return f"Vaga: {req.vaga.titulo}"
+    if tipo == 'MP':
+        return f"Funcionário: {req.funcionario_movido.ra_nome}"
+    return f"Funcionário: {req.funcionario_desligado.ra_nome}"
+
+
+def montar_mensagens(eventos):
+    """
+    Mensagem de cada evento do lote (requisições e e-mails em poucas consultas).
+    Eventos obsoletos ficam de fora: requisição apagada, ou "aguarda sua
+    aprovação" de uma etapa que já foi tratada antes do envio.
+    """
+    rotulos = dict(EventoNotificacao._meta.get_field('tipo').choices)
+    requisicoes = _requisicoes_por_tipo(eventos)
+    emails = {
+        pk: email_usuario or email_cadastro or ''
+        for pk, email_usuario, email_cadastro in Funcionario.objects.filter(
+            pk__in={evento.destinatario_id for evento in eventos}
+        ).values_list('pk', 'usuario__email', 'ra_email_princ')
+    }
+
+    mensagens = []
+    for evento in eventos:
+        req = requisicoes[evento.tipo].get(evento.objeto_id)
+        if req is None or (evento.evento == EventoNotificacao.EVENTO_PENDENTE
+                           and not req.aguarda(evento.destinatario_id)):
+            continue
+
+        rotulo = f"{rotulos[evento.tipo]} #{evento.objeto_id}"
+        if evento.evento == EventoNotificacao.EVENTO_PENDENTE:
+            titulo = f"{rotulo} aguarda sua aprovação"
+        else:
+            titulo = f"{rotulo} foi {evento.get_evento_display().lower()}"
+
+        linhas = [_descrever(evento.tipo, req), f"Status: {req.get_status_display()}"]
+        if evento.evento == EventoNotificacao.EVENTO_REJEITADA and req.observacao_rejeicao:
+            linhas.append(f"Motivo: {req.observacao_rejeicao}")
+        texto = '\n'.join(linhas)
+
+        link = reverse(f'detalhar_{evento.tipo.lower()}', args=[evento.objeto_id])
+        mensagens.append(Mensagem(evento, titulo, texto, settings.NOTIFICACOES_URL_BASE + link,
+                                  emails.get(evento.destinatario_id, '')))
+    return mensagens
+
+
+# --- Notificadores ---
+
+class Notificador:
+    """
+    Canal de entrega. `enviar(mensagens)` entrega um lote e retorna
+    {evento_id: erro} das que falharam; uma exceção conta como falha do lote todo.
+    """
+    nome = ''
+
+    def enviar(self, mensagens):
+        raise NotImplementedError
+
+
+class NotificadorInApp(Notificador):
+    nome = 'in_app'
+
+    def enviar(self, mensagens):
+        Notificacao.objects.bulk_create([
+            Notificacao(destinatario_id=m.evento.destinatario_id, evento_id=m.evento.pk,
+                        titulo=m.titulo, mensagem=m.texto, link=m.link)
+            for m in mensagens
+        ], ignore_conflicts=True)
+        return {}
+
+
+class NotificadorEmail(Notificador):
+    nome = 'email'
+
+    def enviar(self, mensagens):
+        com_email = [m for m in mensagens if m.email]
+        if not com_email:
+            return {}
+        falhas = {}
+        with get_connection() as conexao:
+            for m in com_email:
+                corpo = f"{m.texto}\n\n{m.link}"
+                try:
+                    EmailMessage(m.titulo, corpo, to=[m.email], connection=conexao).send()
+                except Exception as exc:
+                    falhas[m.evento.pk] = str(exc)
+        return falhas
+
+
+class NotificadorWebhook(Notificador):
+    nome = 'webhook'
+
+    def enviar(self, mensagens):
+        url = settings.NOTIFICACOES_WEBHOOK_URL
+        if not url:
+            return {}
+        corpo = json.dumps({'eventos': [m.como_dict() for m in mensagens]}).encode('utf-8')
+        requisicao = urllib.request.Request(url, data=corpo, method='POST',
+                                            headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(requisicao, timeout=TIMEOUT_WEBHOOK):
+            pass
+        return {}
+
+
+@lru_cache(maxsize=None)
+def notificadores():
+    """ Instâncias dos notificadores de settings.NOTIFICACOES_NOTIFICADORES (uma vez por processo). """
+    return tuple(import_string(caminho)() for caminho in settings.NOTIFICACOES_NOTIFICADORES)
+
+
+# --- Fila ---
+
+def reservar_lote(worker=None, tamanho=TAMANHO_LOTE):
+    """ Marca como "enviando" os eventos mais antigos prontos para envio e os devolve. """
+    worker = worker or identificacao_worker()
+    agora = timezone.now()
+    with transaction.atomic():
+        ids = list(EventoNotificacao.objects.select_for_update(skip_locked=True)
+                                            .filter(status=EventoNotificacao.STATUS_PENDENTE,
+                                                    proxima_tentativa__lte=agora)
+                                            .order_by('criado_em')
+                                            .values_list('pk', flat=True)[:tamanho])
+        if not ids:
+            return []
+        # Como em tarefas.reservar_proxima: o status no WHERE vale também sem SKIP LOCKED
+        EventoNotificacao.objects.filter(pk__in=ids, status=EventoNotificacao.STATUS_PENDENTE) \
+                                 .update(status=EventoNotificacao.STATUS_ENVIANDO, worker=worker, reservado_em=agora)
+    return list(EventoNotificacao.objects.filter(pk__in=ids, status=EventoNotificacao.STATUS_ENVIANDO,
+                                                 worker=worker, reservado_em=agora))
+
+
+def despachar(eventos):
+    """
+    Entrega um lote reservado a todos os notificadores e grava o desfecho
+    (obsoletos viram "enviado" sem envio). Retorna (enviados, falhas).
+    """
+    mensagens = montar_mensagens(eventos)
+    erros = {}
+    for notificador in notificadores():
+        faltam = [m for m in mensagens if notificador.nome not in m.evento.canais_entregues]
+        if not faltam:
+            continue
+        try:
+            falhas = notificador.enviar(faltam)
+        except Exception as exc:
+            falhas = {m.evento.pk: str(exc) for m in faltam}
+        for m in faltam:
+            if m.evento.pk in falhas:
+                erros.setdefault(m.evento.pk, []).append(f"{notificador.nome}: {falhas[m.evento.pk]}")
+            else:
+                m.evento.canais_entregues.append(notificador.nome)
+
+    agora = timezone.now()
+    for evento in eventos:
+        if evento.pk in erros:
+            evento.tentativas += 1
+            evento.erro = '\n'.join(erros[evento.pk])
+            if evento.tentativas >= settings.NOTIFICACOES_MAX_TENTATIVAS:
+                evento.status = EventoNotificacao.STATUS_FALHOU
+            else:
+                evento.status = EventoNotificacao.STATUS_PENDENTE
+                evento.proxima_tentativa = agora + timedelta(
+                    seconds=ESPERA_NOVA_TENTATIVA * 2 ** (evento.tentativas - 1))
+        else:
+            evento.status = EventoNotificacao.STATUS_ENVIADO
+            evento.erro = ''
+            evento.enviado_em = agora
+    EventoNotificacao.objects.bulk_update(eventos, ['status', 'canais_entregues', 'tentativas',
+                                                    'proxima_tentativa', 'erro', 'enviado_em'])
+    return len(eventos) - len(erros), len(erros)
+
+
+def recuperar_abandonados(minutos=10):
+    """ Devolve ao outbox os eventos "enviando" reservados há `minutos` (worker que caiu). Retorna quantos. """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return EventoNotificacao.objects.filter(status=EventoNotificacao.STATUS_ENVIANDO, reservado_em__lt=limite) \
+                                    .update(status=EventoNotificacao.STATUS_PENDENTE, worker='')
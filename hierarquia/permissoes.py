@@ -0,0 +1,113 @@
+# hierarquia/permissoes.py
+"""
+Permissões de "gestão de equipe" no Admin.
+
+Funcionários com cargo de nível <= 4 (até Supervisor/Líder) viram staff e recebem
+add/change/view de Funcionario; os demais perdem. `sincronizar_equipe` aplica a regra
+a vários funcionários com um número fixo de consultas. O save() do Funcionario só a
+aplica quando o resultado da regra pode ter mudado (usuário vinculado ou cargo com
+outro nível); dentro de `adiar_sincronizacao_equipe()` os saves só anotam o
+funcionário e a regra roda uma vez, em lote, no final. Quando o nível de um Cargo
+muda (admin ou importar_cargos), os sinais aplicam a regra a todos os ocupantes.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import Permission, User
+
+from .metricas import etapa
+
+# Maior nível de cargo que pode gerenciar equipe
+NIVEL_MAXIMO_EQUIPE = 4
+CODENAMES_EQUIPE = ('add_funcionario', 'change_funcionario', 'view_funcionario')
+
+
+def pode_gerenciar_equipe(nivel):
+    return bool(nivel) and nivel <= NIVEL_MAXIMO_EQUIPE
+
+
+# IDs das permissões de equipe, lidos uma vez por processo (ver limpar_cache_permissoes)
+_permissoes_cache = None
+
+# Funcionários com a regra pendente dentro de adiar_sincronizacao_equipe()
+_adiados = ContextVar('equipe_adiados', default=None)
+
+
+def permissoes_equipe():
+    """ IDs das permissões de equipe (lista vazia antes da primeira migração, que não fica em cache). """
+    global _permissoes_cache
+    if _permissoes_cache is None:
+        ids = list(Permission.objects.filter(content_type__app_label='hierarquia',
+                                             codename__in=CODENAMES_EQUIPE).values_list('pk', flat=True))
+        if len(ids) < len(CODENAMES_EQUIPE):
+            return ids
+        _permissoes_cache = ids
+    return _permissoes_cache
+
+
+def limpar_cache_permissoes(**kwargs):
+    """ Esquece os IDs em cache (ligado ao post_migrate: um flush/migrate pode recriá-los). """
+    global _permissoes_cache
+    _permissoes_cache = None
+
+
+@contextmanager
+def adiar_sincronizacao_equipe():
+    """
+    Dentro do bloco, Funcionario.save() não mexe em is_staff/permissões: só anota o
+    funcionário. Na saída sem erro, `sincronizar_equipe` roda uma vez para todos.
+    """
+    if _adiados.get() is not None:
+        # Já há um adiamento aberto: quem o abriu sincroniza
+        yield
+        return
+    pendentes = set()
+    token = _adiados.set(pendentes)
+    try:
+        yield
+    finally:
+        _adiados.reset(token)
+    if pendentes:
+        with etapa('permissões (lote)'):
+            sincronizar_equipe(pendentes)
+
+
+def sincronizar_ou_adiar(funcionario_id):
+    """ Aplica a regra ao funcionário agora ou, dentro de adiar_sincronizacao_equipe(), no final. """
+    pendentes = _adiados.get()
+    if pendentes is None:
+        sincronizar_equipe([funcionario_id])
+    else:
+        pendentes.add(funcionario_id)
+
+
+def sincronizar_equipe(funcionario_ids):
+    """
+    Aplica a regra de equipe aos usuários vinculados a `funcionario_ids`:
+    is_staff e permissões, em UPDATE/DELETE/INSERT únicos.
+    """
+    from .models_funcionario import Funcionario
+
+    gestores, demais = [], []
+    vinculos = Funcionario.objects.filter(pk__in=funcionario_ids, usuario__isnull=False) \
+                                  .values_list('usuario_id', 'cargo__nivel')
+    for usuario_id, nivel in vinculos:
+        (gestores if pode_gerenciar_equipe(nivel) else demais).append(usuario_id)
+
+    if gestores:
+        User.objects.filter(pk__in=gestores, is_staff=False).update(is_staff=True)
+    if demais:
+        User.objects.filter(pk__in=demais, is_staff=True).update(is_staff=False)
+
+    permissoes = permissoes_equipe()
+    if not permissoes:
+        return
+    through = User.user_permissions.through
+    if demais:
+        through.objects.filter(user_id__in=demais, permission_id__in=permissoes).delete()
+    if gestores:
+        through.objects.bulk_create([
+            through(user_id=usuario_id, permission_id=permissao_id)
+            for usuario_id in gestores for permissao_id in permissoes
+        ], ignore_conflicts=True)
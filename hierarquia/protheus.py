@@ -0,0 +1,56 @@
+# hierarquia/protheus.py
+"""
+Normalização dos valores texto vindos da SRA (Protheus).
+
+As colunas ra_* são CharField (o importador grava o texto como veio).
+Estas funções convertem UMA vez — no save() / importação — para as colunas
+tipadas do Funcionario (ex: data_admissao), para que as telas não precisem
+fazer strptime em loop.
+"""
+
+import hashlib
+import json
+from datetime import date, datetime
+
+# Formatos aceitos, na ordem em que são tentados
+FORMATOS_DATA = (
+    '%Y%m%d',             # Protheus (AAAAMMDD)
+    '%Y-%m-%d %H:%M:%S',  # Exportado do banco
+    '%Y-%m-%d',
+    '%d/%m/%Y',           # Planilha / relatório
+)
+
+# Colunas tipadas do Funcionario -> coluna SRA de origem
+CAMPOS_DATA = {
+    'data_admissao': 'ra_data_admis',
+    'data_nascimento': 'ra_data_nasc',
+    'data_demissao': 'ra_dt_demissao',
+}
+
+
+def parse_data(valor):
+    """ Converte texto do Protheus em date. Retorna None se vazio ou inválido. """
+    if not valor:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    valor = str(valor).strip()
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def formatar_data(valor, padrao="N/A"):
+    """ date -> 'DD/MM/AAAA' (ou `padrao` se vazio). """
+    return valor.strftime('%d/%m/%Y') if valor else padrao
+
+
+def hash_linha(valores):
+    """ Impressão digital (sha256) de uma linha já normalizada {campo: texto}. """
+    conteudo = json.dumps(valores, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
@@ -1,55 +1,192 @@
 # resources.py (VERSÃO FINAL COM "SUPER-LIMPADOR")
 
+from collections import Counter
+from itertools import islice
+
 from import_export import resources, fields
+from import_export.results import RowResult
 from import_export.widgets import CharWidget, ForeignKeyWidget, ManyToManyWidget
 from .models_funcionario import Funcionario # Importa do models_funcionario.py
 from .models import Cargo, Setor # Importa Cargo/Setor do models.py
+from .metricas import ETAPA_LEITURA, etapa, medindo, medir_etapa
+from .permissoes import adiar_sincronizacao_equipe
 from django.contrib.auth.models import User
 
-# --- ✅ WIDGET CUSTOMIZADO ATUALIZADO ---
-class UppercaseForeignKeyWidget(ForeignKeyWidget):
+def normalizar_nome(value):
     """
-    Widget customizado que limpa o texto antes de procurar:
+    Limpa o texto de Cargo/Setor vindo do Protheus:
     1. Converte para MAIÚSCULAS.
     2. Remove espaços extras no início, no fim E NO MEIO.
     """
+    if value:
+        value = str(value).upper()
+        # Limpa espaços extras (ex: "ANALISTA  DE CUSTOS" -> "ANALISTA DE CUSTOS")
+        value = ' '.join(value.split())
+    return value
+
+
+def _texto(value):
+    return str(value) if value else value
+
+
+# --- WIDGETS COM MAPA PRÉ-CARREGADO ---
+# Sem mapa, cada linha faz uma consulta por FK. Com carregar() (chamado no
+# before_import do Resource), a busca vira um dicionário montado com UMA
+# consulta por importação, e os valores não encontrados são acumulados em
+# `nao_encontrados` ({valor: nº de linhas}) para um relatório único no final.
+
+class MapaForeignKeyWidget(ForeignKeyWidget):
+    normalizar = staticmethod(_texto)
+
+    def __init__(self, model, field='pk', rotulo=None, **kwargs):
+        super().__init__(model, field=field, **kwargs)
+        self.rotulo = rotulo or model._meta.verbose_name
+        self.mapa = None
+        self.nao_encontrados = Counter()
+
+    def carregar(self, queryset=None):
+        queryset = self.get_queryset(None, None) if queryset is None else queryset
+        self.mapa = {self.normalizar(getattr(obj, self.field)): obj for obj in queryset}
+
     def clean(self, value, row=None, **kwargs):
-        if value:
-            value = str(value).upper()
-            # Limpa espaços extras (ex: "ANALISTA  DE CUSTOS" -> "ANALISTA DE CUSTOS")
-            value = ' '.join(value.split()) 
-        
-        return super().clean(value, row, **kwargs)
+        value = self.normalizar(value)
+        if self.mapa is None:
+            return super().clean(value, row, **kwargs)
+        if not value:
+            return None
+        try:
+            return self.mapa[value]
+        except KeyError:
+            self.nao_encontrados[value] += 1
+            raise ValueError(f"{self.rotulo} não encontrado: {value}")
+
+
+# --- ✅ WIDGET CUSTOMIZADO ATUALIZADO ---
+class UppercaseForeignKeyWidget(MapaForeignKeyWidget):
+    """ Widget customizado que limpa o texto (normalizar_nome) antes de procurar. """
+    normalizar = staticmethod(normalizar_nome)
 # --- FIM DO NOVO WIDGET ---
 
 
-class FuncionarioResource(resources.ModelResource):
+class MapaManyToManyWidget(ManyToManyWidget):
+    """
+    ManyToManyWidget com mapa pré-carregado. Como o original, nomes inexistentes
+    são ignorados na gravação; aqui eles também vão para `nao_encontrados`.
+    """
+    def __init__(self, model, separator=None, field=None, rotulo=None, normalizar=None, **kwargs):
+        super().__init__(model, separator=separator, field=field, **kwargs)
+        self.rotulo = rotulo or model._meta.verbose_name
+        self.normalizar = normalizar or _texto
+        self.mapa = None
+        self.nao_encontrados = Counter()
+
+    def carregar(self, queryset=None):
+        queryset = self.model.objects.all() if queryset is None else queryset
+        self.mapa = {self.normalizar(getattr(obj, self.field)): obj for obj in queryset}
+
+    def clean(self, value, row=None, **kwargs):
+        if self.mapa is None or isinstance(value, (float, int)):
+            return super().clean(value, row, **kwargs)
+        if not value:
+            return []
+        objetos = []
+        for nome in filter(None, [self.normalizar(nome.strip()) for nome in str(value).split(self.separator)]):
+            if nome in self.mapa:
+                objetos.append(self.mapa[nome])
+            else:
+                self.nao_encontrados[nome] += 1
+        return objetos
+
+
+def _valores_das_colunas(dataset, colunas):
+    """ Valores distintos (texto) das colunas do Dataset que existirem. """
+    cabecalho = dataset.headers or []
+    return sorted({str(valor) for coluna in colunas if coluna in cabecalho for valor in dataset[coluna] if valor})
+
+
+class MetricasResourceMixin:
+    """
+    Mede cada import_data() por etapa (ver metricas.py): o resultado ganha
+    `result.metricas` e o relatório JSON é gravado ao final.
+    """
+    # Método do Resource -> etapa. Medidos na instância, então valem também
+    # para os métodos sobrescritos na subclasse (ex: skip_row do FuncionarioResource).
+    ETAPAS_METRICAS = {
+        'before_import': 'preparação (mapas e hashes)',
+        'get_or_init_instance': 'busca da instância',
+        'import_instance': 'campos e widgets (FKs)',
+        'skip_row': 'skip_unchanged',
+        'validate_instance': 'validação',
+        'save_instance': 'save()',
+        'save_m2m': 'M2M',
+        'after_import': 'finalização',
+        'import_data_inner': 'demais (laço das linhas)',
+    }
+    ETAPA_DIFF = 'diff da prévia'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        for metodo, nome in self.ETAPAS_METRICAS.items():
+            setattr(self, metodo, medir_etapa(nome)(getattr(self, metodo)))
+
+    def get_diff_class(self):
+        # O Diff exporta todos os campos antes e depois de cada linha (Field.export, fora do Resource)
+        classe = super().get_diff_class()
+        etapa_diff = self.ETAPA_DIFF
+
+        class DiffMedido(classe):
+            def __init__(self, *args, **kwargs):
+                with etapa(etapa_diff):
+                    super().__init__(*args, **kwargs)
+
+            def compare_with(self, *args, **kwargs):
+                with etapa(etapa_diff):
+                    return super().compare_with(*args, **kwargs)
+
+        return DiffMedido
+
+    def import_data(self, dataset, **kwargs):
+        with medindo(type(self).__name__, dry_run=bool(kwargs.get('dry_run')),
+                     arquivo=kwargs.get('file_name')) as metricas:
+            # Decodificação feita pelo Admin antes do import_data() (ver admin._formato_medido)
+            if getattr(dataset, 'segundos_leitura', None) is not None:
+                metricas.registrar_etapa(ETAPA_LEITURA, dataset.segundos_leitura)
+            # O que sobra fora das outras etapas é o commit (ou rollback) da transação
+            with etapa('commit'):
+                result = super().import_data(dataset, **kwargs)
+            metricas.linhas += len(dataset)
+        result.metricas = metricas
+        return result
+
+
+class FuncionarioResource(MetricasResourceMixin, resources.ModelResource):
     
     # --- 1. CAMPOS DE RELACIONAMENTO (CONFORME SOLICITADO) ---
     usuario = fields.Field(
         column_name='usuario_username',
         attribute='usuario',
-        widget=ForeignKeyWidget(User, 'username')
+        widget=MapaForeignKeyWidget(User, 'username', rotulo='Usuário')
     )
     
     # Usa o Widget "Super-Limpador"
     cargo = fields.Field(
         column_name='Desc.Funcao', 
         attribute='cargo',         
-        widget=UppercaseForeignKeyWidget(Cargo, 'nome')
+        widget=UppercaseForeignKeyWidget(Cargo, 'nome', rotulo='Cargo')
     )
     
     # Usa o Widget "Super-Limpador"
     setor_primario = fields.Field(
         column_name='Desc. Depto',
         attribute='setor_primario',
-        widget=UppercaseForeignKeyWidget(Setor, 'nome')
+        widget=UppercaseForeignKeyWidget(Setor, 'nome', rotulo='Setor')
     )
 
     setores_responsaveis = fields.Field(
         column_name='setores_responsaveis_nomes',
         attribute='setores_responsaveis',
-        widget=ManyToManyWidget(Setor, field='nome', separator=',')
+        widget=MapaManyToManyWidget(Setor, field='nome', separator=',', rotulo='Setor responsável',
+                                    normalizar=normalizar_nome)
     )
 
     # --- 2. LÓGICA SKIP_ROW (PULAR DEMITIDOS) ---
@@ -58,6 +195,72 @@ class FuncionarioResource(resources.ModelResource):
         if situacao == 'D':
             return True 
         return False
+
+    # --- 2b. IMPRESSÃO DIGITAL DA LINHA (hash_sra) ---
+    def import_row(self, row, instance_loader, **kwargs):
+        # Linha idêntica à última importada: pula antes de carregar a instância
+        # (a linha SRA completa) e de limpar cada campo
+        valores = self._mapeamento.valores(row)
+        impressao = self._hashes.get(valores.get('ra_mat'))
+        if impressao and impressao == self._mapeamento.impressao(row, valores):
+            row_result = self.get_row_result_class()()
+            row_result.import_type = RowResult.IMPORT_TYPE_SKIP
+            return row_result
+        return super().import_row(row, instance_loader, **kwargs)
+
+    def before_import(self, dataset, **kwargs):
+        from .importacao.funcionarios import MapeamentoSRA
+        if getattr(self, '_mapeamento', None) is None:
+            self._mapeamento = MapeamentoSRA(self)
+        # {matrícula: hash da última linha importada}, só das matrículas deste Dataset
+        colunas = [coluna for coluna, atributos in self._mapeamento.colunas.items() if 'ra_mat' in atributos]
+        self._hashes = dict(self._buscar_em_partes(
+            Funcionario.objects.exclude(hash_sra='').values_list('ra_mat', 'hash_sra'),
+            'ra_mat', _valores_das_colunas(dataset, colunas)))
+
+        # Cargo e Setor: 1 consulta cada por importação; usuários: só os citados no Dataset
+        for nome in ('cargo', 'setor_primario', 'setores_responsaveis'):
+            if self.fields[nome].widget.mapa is None:
+                self.fields[nome].widget.carregar()
+        widget_usuario = self.fields['usuario'].widget
+        widget_usuario.carregar(self._buscar_em_partes(
+            User.objects.all(), 'username', _valores_das_colunas(dataset, [self.fields['usuario'].column_name])))
+        return super().before_import(dataset, **kwargs)
+
+    @staticmethod
+    def _buscar_em_partes(queryset, campo, valores, tamanho_consulta=1000):
+        """ queryset.filter(campo__in=valores) em consultas de até `tamanho_consulta` valores. """
+        resultado = []
+        for inicio in range(0, len(valores), tamanho_consulta):
+            resultado += queryset.filter(**{f'{campo}__in': valores[inicio:inicio + tamanho_consulta]})
+        return resultado
+
+    def nao_encontrados(self):
+        """ {rótulo: Counter({valor: linhas})} com o que os widgets não acharam nesta importação. """
+        relatorio = {}
+        for nome in ('usuario', 'cargo', 'setor_primario', 'setores_responsaveis'):
+            widget = self.fields[nome].widget
+            if widget.nao_encontrados:
+                relatorio.setdefault(widget.rotulo, Counter()).update(widget.nao_encontrados)
+        return relatorio
+
+    def after_import(self, dataset, result, **kwargs):
+        # Import padrão do Admin: um aviso único com tudo o que não foi encontrado
+        if not getattr(self, '_em_lotes', False):
+            from .importacao.funcionarios import descrever_nao_encontrados
+            for mensagem in descrever_nao_encontrados(self.nao_encontrados()):
+                result.append_base_error(self.get_error_result_class()(ValueError(mensagem)))
+        return super().after_import(dataset, result, **kwargs)
+
+    def import_data_inner(self, *args, **kwargs):
+        # Permissões de equipe: uma passada em lote no final, ainda dentro da transação do import
+        with adiar_sincronizacao_equipe():
+            return super().import_data_inner(*args, **kwargs)
+
+    def before_save_instance(self, instance, row, **kwargs):
+        instance.hash_sra = self._mapeamento.impressao(row)
+        instance._importando = True
+        return super().before_save_instance(instance, row, **kwargs)
     
     # --- 3. MAPEAMENTO DE COLUNAS (DO 'quero subir essa aq.csv') ---
     filial = fields.Field(
@@ -1417,6 +1620,58 @@ class FuncionarioResource(resources.ModelResource):
         readonly=False
     )
 
+    def get_queryset(self):
+        # O importador compara/atualiza TODAS as colunas SRA: carrega a linha completa
+        return Funcionario.objects.com_protheus()
+
+    # --- 5. IMPORTAÇÃO EM LOTES (MEMÓRIA CONSTANTE) ---
+    def importar_em_lotes(self, linhas, tamanho_lote=500, pular=0, ao_gravar_lote=None, **kwargs):
+        """
+        Roda o import_data() normal (save() por linha) alimentando-o com Datasets de
+        até `tamanho_lote` linhas, lidas de um iterável de dicts (ex: importacao.ler_linhas).
+        A planilha nunca fica inteira na memória: de cada lote só sobram os totais
+        e os erros, somados num ResultadoImportacao.
+        `pular` e `ao_gravar_lote`: como em ImportadorFuncionarios.importar (retomada).
+        """
+        import tablib
+        from .importacao import ResultadoImportacao, em_lotes
+
+        resultado = ResultadoImportacao()
+        inicio = pular
+        self._em_lotes = True
+        with medindo(type(self).__name__, modo='linha') as metricas:
+            lotes = em_lotes(islice(linhas, pular, None), tamanho_lote)
+            while True:
+                with etapa(ETAPA_LEITURA):
+                    lote = next(lotes, None)
+                    if lote is not None:
+                        cabecalho = list(lote[0].keys())
+                        dataset = tablib.Dataset(*[[linha.get(coluna) for coluna in cabecalho] for linha in lote],
+                                                 headers=cabecalho)
+                if lote is None:
+                    break
+                parcial = self.import_data(dataset, **kwargs)
+
+                do_lote = ResultadoImportacao()
+                do_lote.criados = parcial.totals['new']
+                do_lote.atualizados = parcial.totals['update']
+                do_lote.ignorados = parcial.totals['skip']
+                for numero, erros in parcial.row_errors():
+                    for erro in erros:
+                        do_lote.erro(inicio + (erro.number or numero), str(erro.error))
+                for invalida in parcial.invalid_rows:
+                    do_lote.erro(inicio + invalida.number, '; '.join(invalida.error.messages))
+                for erro in parcial.base_errors:
+                    do_lote.erro(None, str(erro.error))
+                if ao_gravar_lote:
+                    with etapa('ponto de retomada'):
+                        ao_gravar_lote(inicio + 1, inicio + len(lote), do_lote)
+                resultado.somar(do_lote)
+                inicio += len(lote)
+        resultado.metricas = metricas
+        resultado.nao_encontrados = self.nao_encontrados()
+        return resultado
+
     class Meta:
         model = Funcionario
         use_model_save = True
@@ -1429,7 +1684,9 @@ class FuncionarioResource(resources.ModelResource):
         
         # Exclui campos que não vêm do CSV ou que já mapeamos
         exclude = ('id', 'usuario', 'cargo', 'setor_primario', 'setores_responsaveis', 
-                   'ativo', 'salario_bruto_calculado', 'criado_em', 'atualizado_em')
+                   'ativo', 'salario_bruto_calculado', 'criado_em', 'atualizado_em',
+                   # Datas tipadas: derivadas das colunas ra_* no save()
+                   'data_admissao', 'data_nascimento', 'data_demissao', 'hash_sra')
         
         # ✅ CORRIGIDO: Esta é a codificação "ANSI" (Windows Brasil) do seu arquivo
         import_encoding = 'windows-1252'
@@ -0,0 +1,58 @@
+from django.shortcuts import redirect
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.contrib import messages
+from hierarquia.models import RequisicaoPessoal, MovimentacaoPessoal, RequisicaoDesligamento, Funcionario
+from hierarquia.aprovacao_lote import LIMITE_LOTE, NAO_PENDENTE, aprovar_em_lote, rejeitar_em_lote
+
+
+# --- Seleção múltipla das telas "Aprovar RP/MP/RD" (ver aprovacao_lote.py) ---
+
+# tipo (da URL) -> (modelo, tela de onde veio o formulário)
+LISTAS_APROVACAO = {
+    'rp': (RequisicaoPessoal, 'listar_rps_para_aprovar'),
+    'mp': (MovimentacaoPessoal, 'listar_mps_para_aprovar'),
+    'rd': (RequisicaoDesligamento, 'listar_rds_para_aprovar'),
+}
+
+
+@login_required(login_url='login')
+@require_POST
+def acao_em_lote_view(request, tipo):
+    modelo, lista = LISTAS_APROVACAO[tipo]
+    try:
+        funcionario_logado = Funcionario.objects.get(usuario=request.user)
+    except Funcionario.DoesNotExist:
+        messages.error(request, "Funcionário não encontrado.")
+        return redirect('dashboard')
+
+    ids = [int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()]
+    if not ids:
+        messages.error(request, "Selecione ao menos uma requisição.")
+        return redirect(lista)
+    if len(ids) > LIMITE_LOTE:
+        messages.error(request, f"Selecione no máximo {LIMITE_LOTE} requisições por vez.")
+        return redirect(lista)
+
+    if request.POST.get('acao') == 'rejeitar':
+        observacao = request.POST.get('observacao', '').strip()
+        if not observacao:
+            messages.error(request, "A observação é obrigatória para rejeitar.")
+            return redirect(lista)
+        resultados = rejeitar_em_lote(modelo, funcionario_logado, ids, observacao)
+        feito = "rejeitada(s)"
+    else:
+        resultados = aprovar_em_lote(modelo, funcionario_logado, ids)
+        feito = "aprovada(s) ou encaminhada(s) para a próxima etapa"
+
+    tratadas = [resultado['id'] for resultado in resultados if resultado['ok']]
+    falhas = [resultado['id'] for resultado in resultados if not resultado['ok'] and resultado['erro'] == NAO_PENDENTE]
+    if tratadas:
+        messages.success(request, f"{len(tratadas)} requisição(ões) {feito}.")
+    if falhas:
+        messages.warning(request, f"{len(falhas)} não foram alteradas (já tratadas ou não pendentes para você): "
+                                  + ", ".join(f"#{pk}" for pk in falhas))
+    for resultado in resultados:
+        if not resultado['ok'] and resultado['erro'] != NAO_PENDENTE:
+            messages.error(request, f"#{resultado['id']}: {resultado['erro']}")
+    return redirect(lista)
@@ -137,24 +137,11 @@ class AprovarMovimentacoesListView(BasePermissionMixin, ListView):
     paginate_by = 15
 
     def get_queryset(self):
-        user_func = self.funcionario_logado
-        
-        # Filtro complexo:
+        # Caixa de entrada (PendenciaAprovacao):
         # 1. Onde eu sou Gestor Proposto E ainda não aprovei
-        q_proposto = Q(aprovador_gestor_proposto=user_func) & Q(gestor_proposto_aprovou=False)
-        
         # 2. Onde eu sou Gestor Atual E ainda não aprovei
-        q_atual = Q(aprovador_gestor_atual=user_func) & Q(gestor_atual_aprovou=False)
-        
         # 3. Onde eu sou Aprovador de RH E o status é 'pendente_rh'
-        q_rh = Q(aprovador_rh=user_func) & Q(status='pendente_rh')
-        
-        # Une as condições com OR e filtra por status que não estão finalizados
-        return MovimentacaoPessoal.objects.filter(
-            q_proposto | q_atual | q_rh
-        ).exclude(
-            status__in=['aprovada', 'rejeitada']
-        ).distinct().order_by('criado_em')
+        return MovimentacaoPessoal.pendentes_para(self.funcionario_logado).order_by('criado_em')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -218,7 +205,7 @@ class MovimentacaoPessoalDetailView(PodeVerMPMixin, DetailView):
 @login_required(login_url='login')
 @require_POST
 def aprovar_mp_view(request, pk):
-    mp = get_object_or_404(MovimentacaoPessoal, pk=pk)
+    mp = get_object_or_404(MovimentacaoPessoal.objects.select_related('solicitante'), pk=pk)
     try:
         funcionario_logado = Funcionario.objects.get(usuario=request.user)
     except Funcionario.DoesNotExist:
@@ -230,9 +217,10 @@ def aprovar_mp_view(request, pk):
         if (funcionario_logado == mp.aprovador_gestor_proposto and not mp.gestor_proposto_aprovou) or \
            (funcionario_logado == mp.aprovador_gestor_atual and not mp.gestor_atual_aprovou):
             
-            mp.aprovar(aprovador=funcionario_logado) # Chama o método de aprovação de gestor
-            
-            if mp.status == 'pendente_rh':
+            # Chama o método de aprovação de gestor (UPDATE condicional: falha se outro já tratou)
+            if not mp.aprovar(aprovador=funcionario_logado):
+                messages.warning(request, f"A MP #{mp.id} já foi tratada por outra ação. Nada foi alterado.")
+            elif mp.status == 'pendente_rh':
                 messages.success(request, f"Aprovação registrada. A MP #{mp.id} foi encaminhada ao RH.")
             else:
                 messages.success(request, f"Aprovação de gestor registrada para a MP #{mp.id}. Aguardando outra aprovação de gestor.")
@@ -242,24 +230,17 @@ def aprovar_mp_view(request, pk):
     elif mp.status == 'pendente_rh':
         # Verifica se é o aprovador de RH
         if funcionario_logado == mp.aprovador_rh:
-            aprovado = mp.aprovar_rh(aprovador_rh=funcionario_logado)
-            
-            if aprovado:
-                messages.success(request, f"Movimentação Pessoal #{mp.id} APROVADA com sucesso!")
-                
-                # --- Efetivar a Movimentação ---
-                try:
-                    funcionario = mp.funcionario_movido
-                    funcionario.cargo = mp.cargo_proposto
-                    funcionario.setor_primario = mp.setor_proposto
-                    # Adicione salário se aplicável
-                    # funcionario.salario = mp.salario_proposto 
-                    funcionario.save()
-                    messages.info(request, f"Dados do funcionário {funcionario.ra_nome} atualizados.")
-                except Exception as e:
-                    messages.error(request, f"Erro ao tentar efetivar a movimentação: {e}")
+            # Aprovação e efetivação na mesma transação: se efetivar falhar, a MP continua pendente
+            try:
+                aprovado = mp.aprovar_por(funcionario_logado)
+            except Exception as e:
+                messages.error(request, f"Erro ao tentar efetivar a movimentação (nada foi alterado): {e}")
             else:
-                 messages.error(request, "Falha ao processar aprovação do RH.")
+                if aprovado:
+                    messages.success(request, f"Movimentação Pessoal #{mp.id} APROVADA com sucesso!")
+                    messages.info(request, f"Dados do funcionário {mp.funcionario_movido.ra_nome} atualizados.")
+                else:
+                    messages.warning(request, f"A MP #{mp.id} já foi tratada por outra ação. Nada foi alterado.")
         else:
             messages.error(request, "Você não tem permissão para aprovar esta etapa (RH).")
 
@@ -272,7 +253,7 @@ def aprovar_mp_view(request, pk):
 @login_required(login_url='login')
 @require_POST
 def rejeitar_mp_view(request, pk):
-    mp = get_object_or_404(MovimentacaoPessoal, pk=pk)
+    mp = get_object_or_404(MovimentacaoPessoal.objects.select_related('solicitante'), pk=pk)
     try:
         funcionario_logado = Funcionario.objects.get(usuario=request.user)
     except Funcionario.DoesNotExist:
@@ -298,7 +279,9 @@ def rejeitar_mp_view(request, pk):
         messages.error(request, "A observação é obrigatória para rejeitar a movimentação.")
         return redirect('detalhar_mp', pk=mp.pk) 
 
-    mp.rejeitar(aprovador_que_rejeitou=funcionario_logado, observacao=observacao)
+    if not mp.rejeitar(aprovador_que_rejeitou=funcionario_logado, observacao=observacao):
+        messages.warning(request, f"A MP #{mp.id} já foi tratada por outra ação. Nada foi alterado.")
+        return redirect('detalhar_mp', pk=mp.pk)
     messages.warning(request, f"Movimentação Pessoal #{mp.id} REJEITADA.")
 
     return redirect('listar_mps_para_aprovar')
@@ -110,11 +110,8 @@ class AprovarDesligamentosListView(BasePermissionMixin, ListView): # Renomeado d
     paginate_by = 15
 
     def get_queryset(self):
-        # Mostra RDs que estão aguardando aprovação do usuário logado
-        return RequisicaoDesligamento.objects.filter(
-            aprovador_atual=self.funcionario_logado,
-            status__in=['pendente_gestor', 'pendente_rh'] # Apenas status pendentes
-        ).order_by('criado_em')
+        # Mostra RDs que estão aguardando aprovação do usuário logado (caixa de entrada)
+        return RequisicaoDesligamento.pendentes_para(self.funcionario_logado).order_by('criado_em')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -144,7 +141,7 @@ class RequisicaoDesligamentoDetailView(PodeVerRDMixin, DetailView):
 @login_required(login_url='login')
 @require_POST
 def aprovar_rd_view(request, pk):
-    rd = get_object_or_404(RequisicaoDesligamento, pk=pk)
+    rd = get_object_or_404(RequisicaoDesligamento.objects.select_related('solicitante'), pk=pk)
     try:
         funcionario_logado = Funcionario.objects.get(usuario=request.user)
     except Funcionario.DoesNotExist:
@@ -156,8 +153,10 @@ def aprovar_rd_view(request, pk):
         messages.error(request, "Você não tem permissão para aprovar esta requisição ou ela não está mais pendente.")
         return redirect('detalhar_rd', pk=rd.pk) # <- Nova URL
 
-    # Chama o método do modelo para avançar
-    rd.avancar_aprovacao(aprovador=funcionario_logado)
+    # Chama o método do modelo para avançar (UPDATE condicional: falha se outro já tratou)
+    if not rd.avancar_aprovacao(aprovador=funcionario_logado):
+        messages.warning(request, f"A Requisição de Desligamento #{rd.id} já foi tratada por outra ação. Nada foi alterado.")
+        return redirect('detalhar_rd', pk=rd.pk)
 
     if rd.status == 'aprovada':
         messages.success(request, f"Requisição de Desligamento #{rd.id} APROVADA com sucesso.")
@@ -173,7 +172,7 @@ def aprovar_rd_view(request, pk):
 @login_required(login_url='login')
 @require_POST
 def rejeitar_rd_view(request, pk):
-    rd = get_object_or_404(RequisicaoDesligamento, pk=pk)
+    rd = get_object_or_404(RequisicaoDesligamento.objects.select_related('solicitante'), pk=pk)
     try:
         funcionario_logado = Funcionario.objects.get(usuario=request.user)
     except Funcionario.DoesNotExist:
@@ -191,7 +190,9 @@ def rejeitar_rd_view(request, pk):
         return redirect('detalhar_rd', pk=rd.pk) 
 
     # Chama o método do modelo para rejeitar
-    rd.rejeitar(aprovador_que_rejeitou=funcionario_logado, observacao=observacao)
+    if not rd.rejeitar(aprovador_que_rejeitou=funcionario_logado, observacao=observacao):
+        messages.warning(request, f"A Requisição de Desligamento #{rd.id} já foi tratada por outra ação. Nada foi alterado.")
+        return redirect('detalhar_rd', pk=rd.pk)
     messages.warning(request, f"Requisição de Desligamento #{rd.id} REJEITADA.")
 
     return redirect('listar_rds_para_aprovar') # <- Nova URL
@@ -5,6 +5,7 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Q
 from hierarquia.models import RequisicaoPessoal, Funcionario, Cargo, Setor, CentroServico, Vaga # Ajuste nas importações
 from hierarquia.rh.mixin.views_mixin import (
@@ -52,21 +53,9 @@ class AprovarRequisicoesListView(BasePermissionMixin, ListView):
     context_object_name = 'requisicoes'
 
     def get_queryset(self):
-        # --- ✅ CORREÇÃO APLICADA AQUI ---
-        
-        # Lista de TODOS os status que significam "aguardando ação do aprovador"
-        actionable_statuses = [
-            'pendente_gestor',    # Aguardando Gestor (1ª vez)
-            'pendente_rh',        # Aguardando RH
-            'em_revisao_gestor'   # Aguardando Gestor (após edição do RH)
-        ]
-
-        # Mostra RPs que estão esperando aprovação do usuário logado E 
-        # que tenham um dos status da lista acima.
-        return RequisicaoPessoal.objects.filter(
-            aprovador_atual=self.funcionario_logado,
-            status__in=actionable_statuses  # Trocamos 'startswith' por '__in'
-        ).order_by('criado_em')
+        # Mostra RPs que estão esperando aprovação do usuário logado
+        # (pendente_gestor, pendente_rh ou em_revisao_gestor), pela caixa de entrada.
+        return RequisicaoPessoal.pendentes_para(self.funcionario_logado).order_by('criado_em')
 
 class RequisicaoPessoalDetailView(PodeAprovarMixin, DetailView): # Usa o Mixin de permissão
     model = RequisicaoPessoal
@@ -98,7 +87,7 @@ class RequisicaoPessoalDetailView(PodeAprovarMixin, DetailView): # Usa o Mixin d
 @login_required(login_url='login')
 @require_POST # Garante que só aceita POST
 def aprovar_rp_view(request, pk):
-    rp = get_object_or_404(RequisicaoPessoal, pk=pk)
+    rp = get_object_or_404(RequisicaoPessoal.objects.select_related('solicitante'), pk=pk)
     try:
         funcionario_logado = Funcionario.objects.get(usuario=request.user)
     except Funcionario.DoesNotExist:
@@ -113,15 +102,17 @@ def aprovar_rp_view(request, pk):
         messages.error(request, "Você não tem permissão para aprovar esta requisição ou ela não está mais pendente.")
         return redirect('detalhar_rp', pk=rp.pk)
 
-    # Chama o método do modelo para avançar
-    rp.avancar_aprovacao(aprovador_que_aprovou=funcionario_logado)
+    # Chama o método do modelo para avançar (UPDATE condicional: falha se outro já tratou)
+    if not rp.avancar_aprovacao(aprovador_que_aprovou=funcionario_logado):
+        messages.warning(request, f"A Requisição Pessoal #{rp.id} já foi tratada por outra ação. Nada foi alterado.")
+        return redirect('detalhar_rp', pk=rp.pk)
 
     if rp.status == 'aprovada':
         messages.success(request, f"Requisição Pessoal #{rp.id} aprovada com sucesso!")
-        # Notificar RH/DP?
     else:
         messages.info(request, f"Requisição Pessoal #{rp.id} encaminhada para {rp.aprovador_atual.nome}.")
-        # Notificar próximo aprovador?
+    # O solicitante (aprovada) ou o próximo aprovador é avisado pelo outbox de notificações,
+    # gravado na transição e entregue pelo comando despachar_notificacoes.
 
     # --- ✅ CORREÇÃO DE REDIRECT (BÔNUS) ---
     # Removido a URL "hardcoded" 'rh/listar_rps_para_aprovar'
@@ -130,7 +121,7 @@ def aprovar_rp_view(request, pk):
 @login_required(login_url='login')
 @require_POST
 def rejeitar_rp_view(request, pk):
-    rp = get_object_or_404(RequisicaoPessoal, pk=pk)
+    rp = get_object_or_404(RequisicaoPessoal.objects.select_related('solicitante'), pk=pk)
     try:
         funcionario_logado = Funcionario.objects.get(usuario=request.user)
     except Funcionario.DoesNotExist:
@@ -154,9 +145,11 @@ def rejeitar_rp_view(request, pk):
     # Chama o método do modelo para rejeitar
     # --- ✅ CORREÇÃO DE CAMPO DE OBSERVAÇÃO ---
     # Atualizado para 'observacao_rejeicao' (o novo campo no models.py)
-    rp.rejeitar(aprovador_que_rejeitou=funcionario_logado, observacao=observacao)
+    if not rp.rejeitar(aprovador_que_rejeitou=funcionario_logado, observacao=observacao):
+        messages.warning(request, f"A Requisição Pessoal #{rp.id} já foi tratada por outra ação. Nada foi alterado.")
+        return redirect('detalhar_rp', pk=rp.pk)
     messages.warning(request, f"Requisição Pessoal #{rp.id} rejeitada.")
-    # Notificar solicitante?
+    # O solicitante é avisado pelo outbox de notificações (despachar_notificacoes).
 
     # --- ✅ CORREÇÃO DE REDIRECT (BÔNUS) ---
     return redirect('listar_rps_para_aprovar')
@@ -236,14 +229,19 @@ class RequisicaoPessoalRHUpdateView(RHDPRequiredMixin, UpdateView):
         if 'aprovar' in request.POST:
             # --- Se o RH clicar em "APROVAR" ---
             # Primeiro, salva quaisquer edições feitas no formulário
-            if form.is_valid():
-                form.save()
-            else:
+            if not form.is_valid():
                  # Se houver erro de validação ao tentar aprovar direto, mostra o erro
                  return self.form_invalid(form) 
             
-            # Então, avança a aprovação
-            self.object.avancar_aprovacao(aprovador_que_aprovou=self.funcionario_logado)
+            # Então, avança a aprovação (se outro já tratou a RP, as edições são desfeitas)
+            with transaction.atomic():
+                form.save()
+                aprovada = self.object.avancar_aprovacao(aprovador_que_aprovou=self.funcionario_logado)
+                if not aprovada:
+                    transaction.set_rollback(True)
+            if not aprovada:
+                messages.warning(request, f"A Requisição Pessoal #{self.object.id} já foi tratada por outra ação. Nada foi alterado.")
+                return redirect('detalhar_rp', pk=self.object.pk)
             messages.success(request, f"Requisição Pessoal #{self.object.id} APROVADA com sucesso.")
             return redirect(self.get_success_url())
 
@@ -255,14 +253,18 @@ class RequisicaoPessoalRHUpdateView(RHDPRequiredMixin, UpdateView):
                     form.add_error('justificativa_edicao_rh', 'A justificativa é obrigatória para devolver ao gestor.')
                     return self.form_invalid(form)
                 
-                # Salva as mudanças feitas no formulário
-                form.save() 
-                
-                # Chama a função do modelo para devolver
-                self.object.devolver_para_gestor(
-                    rh_editor=self.funcionario_logado,
-                    justificativa=justificativa
-                )
+                # Salva as mudanças feitas no formulário e chama a função do modelo para devolver
+                with transaction.atomic():
+                    form.save() 
+                    devolvida = self.object.devolver_para_gestor(
+                        rh_editor=self.funcionario_logado,
+                        justificativa=justificativa
+                    )
+                    if not devolvida:
+                        transaction.set_rollback(True)
+                if not devolvida:
+                    messages.warning(request, f"A Requisição Pessoal #{self.object.id} já foi tratada por outra ação. Nada foi alterado.")
+                    return redirect('detalhar_rp', pk=self.object.pk)
                 messages.info(request, f"Requisição #{self.object.id} atualizada e devolvida para revisão do Gestor.")
                 return redirect(self.get_success_url())
             else:
@@ -8,15 +8,18 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User, Permission
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.urls import reverse_lazy
-from hierarquia.models import Funcionario, Cargo, Setor, CentroServico, Vaga, RequisicaoPessoal, MovimentacaoPessoal, RequisicaoDesligamento
+from hierarquia.models import Funcionario, Cargo, Setor, CentroServico, Vaga, RequisicaoPessoal, MovimentacaoPessoal, RequisicaoDesligamento, PendenciaAprovacao
 from django.urls import reverse
+from hierarquia.dashboard import montar_dashboard, painel_em_cache
+from hierarquia.eventos_pendencias import servido_por_asgi
+from hierarquia.protheus import formatar_data
 import json
 from datetime import datetime 
 # --- Views de Telas (Dashboard, Funcionários, Setores) ---
 @login_required(login_url='login')
 def dashboard(request):
     try:
-        funcionario = Funcionario.objects.get(usuario=request.user)
+        funcionario = Funcionario.objects.select_related('cargo', 'setor_primario').get(usuario=request.user)
         if not funcionario.cargo:
             return render(request, 'hierarquia/sem_acesso.html', {'mensagem': 'Seu usuário não está associado a um cargo.'})
     except Funcionario.DoesNotExist:
@@ -25,96 +28,50 @@ def dashboard(request):
         else:
             return render(request, 'hierarquia/sem_acesso.html', {'mensagem': 'Não foi encontrado um perfil de funcionário associado ao seu usuário.'})
 
+    # --- Tudo o que é calculado fica em cache por funcionário (ver hierarquia/dashboard.py) ---
+    dados = painel_em_cache('html', funcionario, lambda: _calcular_dashboard(funcionario))
+
     # --- Lógica de Superusuário (para não quebrar a view) ---
     if not funcionario:
-        # Pega todos os dados do sistema para o Superuser
-        setor_data = Setor.objects.annotate(num_funcionarios=Count('funcionarios_primarios'))\
-                             .filter(num_funcionarios__gt=0).order_by('-num_funcionarios')
-        setor_chart_labels = [s.nome for s in setor_data]
-        setor_chart_data = [s.num_funcionarios for s in setor_data]
-        
-        req_status_data = {
-            'Pendentes': RequisicaoPessoal.objects.filter(status__startswith='pendente').count() + MovimentacaoPessoal.objects.filter(status__startswith='pendente').count() + RequisicaoDesligamento.objects.filter(status__startswith='pendente').count(),
-            'Aprovadas': RequisicaoPessoal.objects.filter(status='aprovada').count() + MovimentacaoPessoal.objects.filter(status='aprovada').count() + RequisicaoDesligamento.objects.filter(status='aprovada').count(),
-            'Rejeitadas': RequisicaoPessoal.objects.filter(status='rejeitada').count() + MovimentacaoPessoal.objects.filter(status='rejeitada').count() + RequisicaoDesligamento.objects.filter(status='rejeitada').count(),
-        }
-        req_status_data = {k: v for k, v in req_status_data.items() if v > 0} # Remove zeros
-              
         context = {
+            **dados,
             'funcionario': {'ra_nome': 'Admin', 'cargo': {'nivel': 1, 'nome': 'Superuser'}},
-            'total_funcionarios': Funcionario.objects.count(),
-            'total_cargos': Cargo.objects.count(),
-            'setores_titulo_card': "Total de Setores",
-            'setores_valor_card': Setor.objects.count(),
-            'is_setor_name': False,
-            'vagas_abertas_count': Vaga.objects.filter(status='aberta').count(),
-            'minhas_pendencias_count': 0,
-            'minhas_pendencias_lista': [],
-            'requisicoes_pendentes': 0,
-            'setor_chart_data': json.dumps({'labels': setor_chart_labels, 'data': setor_chart_data}),
-            'req_status_chart_data': json.dumps({'labels': list(req_status_data.keys()), 'data': list(req_status_data.values())}),
-            'data_admissao_formatada': "N/A" # Fallback para o Superuser
+            'pendencias_ao_vivo': servido_por_asgi(request),
         }
         return render(request, 'hierarquia/dashboard.html', context)
-    
-    # --- Lógica Padrão para Funcionários ---
-    nivel = funcionario.cargo.nivel
-    setores_titulo_card = "Informação Setor"
-    setores_valor_card = "N/A"
-    is_setor_name = False
-
-    # --- Lógica de Visibilidade CORRIGIDA ---
-    setores_visiveis_q = Q()
-    
-    if nivel == 1:
-        setores_visiveis_obj = Setor.objects.all()
-        funcionarios_visiveis_qs = Funcionario.objects.filter(ativo=True)
-        setores_visiveis_q = Q(pk__in=setores_visiveis_obj.values_list('pk', flat=True))
-        
-        total_funcionarios_visiveis = funcionarios_visiveis_qs.count()
-        total_cargos_visiveis = Cargo.objects.count()
-        setores_titulo_card = "Total de Setores"
-        setores_valor_card = setores_visiveis_obj.count()
 
-    else:
-        if funcionario.setor_primario:
-            setores_visiveis_q |= Q(pk=funcionario.setor_primario.pk)
-        
-        setores_responsaveis = funcionario.setores_responsaveis.all()
-        if setores_responsaveis.exists():
-            setores_visiveis_q |= Q(pk__in=setores_responsaveis.values_list('pk', flat=True))
-
-        setores_visiveis_obj = Setor.objects.filter(setores_visiveis_q)
-        funcionarios_visiveis_qs = Funcionario.objects.filter(setor_primario__in=setores_visiveis_obj, ativo=True)
-        
-        total_funcionarios_visiveis = funcionarios_visiveis_qs.count()
-        total_cargos_visiveis = Cargo.objects.filter(funcionarios__in=funcionarios_visiveis_qs).distinct().count()
+    # --- Contexto Final ---
+    context = {
+        **dados,
+        'funcionario': funcionario,
+        'pendencias_ao_vivo': servido_por_asgi(request),
+    }
 
-        if nivel <= 3 and setores_responsaveis.exists():
-            setores_titulo_card = "Setores Responsáveis"
-            setores_valor_card = setores_responsaveis.count()
-        else:
-            setores_titulo_card = "Meu Setor Principal"
-            setores_valor_card = funcionario.setor_primario.nome if funcionario.setor_primario else "Nenhum"
-            is_setor_name = True
+    return render(request, 'hierarquia/dashboard.html', context)
 
-    # --- NOVAS VARIÁVEIS PARA O DASHBOARD ---
 
-    # 1. Card de Vagas Abertas
-    vagas_abertas_count = Vaga.objects.filter(status='aberta').count()
+def _calcular_dashboard(funcionario):
+    """ Cards, gráficos, pendências e data de admissão do Dashboard (sem o objeto funcionario). """
+    # 1. Cards e Gráficos (agregações em hierarquia/dashboard.py)
+    painel = montar_dashboard(funcionario)
+    painel['setor_chart_data'] = json.dumps(painel['setor_chart_data'])
+    painel['req_status_chart_data'] = json.dumps(painel['req_status_chart_data'])
 
-    # 2. Pendências Pessoais (Cards e Lista)
-    q_pend_rp = Q(aprovador_atual=funcionario, status__in=['pendente_gestor', 'pendente_rh', 'em_revisao_gestor'])
-    q_pend_mp = (Q(aprovador_gestor_atual=funcionario, gestor_atual_aprovou=False) |
-                 Q(aprovador_gestor_proposto=funcionario, gestor_proposto_aprovou=False) |
-                 Q(aprovador_rh=funcionario, status='pendente_rh'))
-    q_pend_rd = Q(aprovador_atual=funcionario, status__in=['pendente_gestor', 'pendente_rh'])
+    if not funcionario:
+        return {
+            **painel,
+            'minhas_pendencias_count': 0,
+            'minhas_pendencias_lista': [],
+            'requisicoes_pendentes': 0,
+            'data_admissao_formatada': "N/A" # Fallback para o Superuser
+        }
 
-    pend_rps = RequisicaoPessoal.objects.filter(q_pend_rp)
-    pend_mps = MovimentacaoPessoal.objects.filter(q_pend_mp).distinct()
-    pend_rds = RequisicaoDesligamento.objects.filter(q_pend_rd)
+    # 2. Pendências Pessoais (Cards e Lista) — caixa de entrada PendenciaAprovacao
+    pend_rps = RequisicaoPessoal.pendentes_para(funcionario).select_related('vaga').order_by('-pk')
+    pend_mps = MovimentacaoPessoal.pendentes_para(funcionario).select_related('funcionario_movido').order_by('-pk')
+    pend_rds = RequisicaoDesligamento.pendentes_para(funcionario).select_related('funcionario_desligado').order_by('-pk')
 
-    minhas_pendencias_count = pend_rps.count() + pend_mps.count() + pend_rds.count()
+    minhas_pendencias_count = sum(PendenciaAprovacao.contar(funcionario).values())
     
     # 3. Lista de Pendências (para a sidebar)
     minhas_pendencias_lista = []
@@ -141,76 +98,19 @@ def dashboard(request):
         })
     minhas_pendencias_lista = sorted(minhas_pendencias_lista, key=lambda x: x['id'], reverse=True)[:5]
 
-    # 4. Dados do Gráfico de Setores (FILTRADO)
-    setor_data = setores_visiveis_obj.annotate(num_funcionarios=Count('funcionarios_primarios'))\
-                                     .filter(num_funcionarios__gt=0)\
-                                     .order_by('-num_funcionarios')
-    
-    setor_chart_labels = [s.nome for s in setor_data]
-    setor_chart_data = [s.num_funcionarios for s in setor_data]
-    
-    # 5. Dados do Gráfico de Status (FILTRADO)
-    rp_visiveis = RequisicaoPessoal.objects.filter(solicitante__in=funcionarios_visiveis_qs)
-    mp_visiveis = MovimentacaoPessoal.objects.filter(solicitante__in=funcionarios_visiveis_qs)
-    rd_visiveis = RequisicaoDesligamento.objects.filter(solicitante__in=funcionarios_visiveis_qs)
-
-    req_status_data = {
-        'Pendentes': rp_visiveis.filter(status__startswith='pendente').count() + 
-                     mp_visiveis.filter(status__startswith='pendente').count() +
-                     rd_visiveis.filter(status__startswith='pendente').count(),
-        'Aprovadas': rp_visiveis.filter(status='aprovada').count() + 
-                     mp_visiveis.filter(status='aprovada').count() +
-                     rd_visiveis.filter(status='aprovada').count(),
-        'Rejeitadas': rp_visiveis.filter(status='rejeitada').count() + 
-                      mp_visiveis.filter(status='rejeitada').count() +
-                      rd_visiveis.filter(status='rejeitada').count(),
-    }
-    req_status_data = {k: v for k, v in req_status_data.items() if v > 0}
+    # Data tipada (preenchida no save a partir de ra_data_admis)
+    data_admissao_formatada = formatar_data(funcionario.data_admissao)
 
-    # --- ✅ LÓGICA DE DATA CORRIGIDA ---
-    data_admissao_formatada = "N/A"
-    if funcionario.ra_data_admis: # Verifica se o campo não está vazio
-        try:
-            # Tenta o formato exato do banco: YYYY-MM-DD HH:MM:SS
-            data_obj = datetime.strptime(funcionario.ra_data_admis, '%Y-%m-%d %H:%M:%S')
-            data_admissao_formatada = data_obj.strftime('%d/%m/%Y')
-        except ValueError:
-            try:
-                # Tenta o formato YYYYMMDD (Protheus)
-                data_obj = datetime.strptime(funcionario.ra_data_admis, '%Y%m%d')
-                data_admissao_formatada = data_obj.strftime('%d/%m/%Y')
-            except ValueError:
-                try:
-                    # Tenta o formato YYYY-MM-DD (apenas data)
-                    data_obj = datetime.strptime(funcionario.ra_data_admis, '%Y-%m-%d')
-                    data_admissao_formatada = data_obj.strftime('%d/%m/%Y')
-                except ValueError:
-                    # Se tudo falhar, exibe o texto original
-                    data_admissao_formatada = funcionario.ra_data_admis
-
-    # --- Contexto Final ---
-    context = {
-        'funcionario': funcionario,
-        'total_funcionarios': total_funcionarios_visiveis,
-        'total_cargos': total_cargos_visiveis,
-        'setores_titulo_card': setores_titulo_card,
-        'setores_valor_card': setores_valor_card,
-        'is_setor_name': is_setor_name,
-        
-        'vagas_abertas_count': vagas_abertas_count,
+    return {
+        **painel,
         'minhas_pendencias_count': minhas_pendencias_count,
         'minhas_pendencias_lista': minhas_pendencias_lista,
         
-        'setor_chart_data': json.dumps({'labels': setor_chart_labels, 'data': setor_chart_data}),
-        'req_status_chart_data': json.dumps({'labels': list(req_status_data.keys()), 'data': list(req_status_data.values())}),
-        
         'requisicoes_pendentes': minhas_pendencias_count, 
         
         'data_admissao_formatada': data_admissao_formatada # Variável de data
     }
 
-    return render(request, 'hierarquia/dashboard.html', context)
-
 # views.py
 # (Certifique-se que 'datetime' está importado no topo do arquivo)
 from datetime import datetime
@@ -237,7 +137,8 @@ def listar_funcionarios_por_setor(request, setor_id):
         return render(request, 'hierarquia/sem_permissao.html', {'mensagem': f'Você não tem permissão para ver funcionários do setor "{setor.nome}".'})
 
     # 1. Inicia a consulta base
-    funcionarios_qs = Funcionario.objects.filter(ativo=True, setor_primario=setor)
+    funcionarios_qs = Funcionario.objects.com_protheus('ra_cpf', 'ra_centro_custo').select_related('cargo') \
+                                         .filter(ativo=True, setor_primario=setor)
 
     busca = request.GET.get('busca', '')
     # 2. Filtra a consulta SE houver busca
@@ -248,34 +149,14 @@ def listar_funcionarios_por_setor(request, setor_id):
     funcionarios_list = []
         
     # 4. Faz o loop na consulta final (já filtrada)
-    for func in funcionarios_qs.order_by('ra_nome'):
-        # ✅ --- INÍCIO DO BLOCO CORRIGIDO (INDENTADO) ---
-        data_admissao_formatada = "N/A"
-        if func.ra_data_admis:
-            try:
-                # Tenta o formato exato do banco: YYYY-MM-DD HH:MM:SS
-                data_obj = datetime.strptime(func.ra_data_admis, '%Y-%m-%d %H:%M:%S')
-                data_admissao_formatada = data_obj.strftime('%d/%m/%Y')
-            except ValueError:
-                try:
-                    # Tenta o formato YYYYMMDD (Protheus)
-                    data_obj = datetime.strptime(func.ra_data_admis, '%Y%m%d')
-                    data_admissao_formatada = data_obj.strftime('%d/%m/%Y')
-                except ValueError:
-                        try:
-                            # Tenta o formato YYYY-MM-DD (apenas data)
-                            data_obj = datetime.strptime(func.ra_data_admis, '%Y-%m-%d')
-                            data_admissao_formatada = data_obj.strftime('%d/%m/%Y')
-                        except ValueError:
-                            # Se falhar, exibe o original (sem quebrar)
-                            data_admissao_formatada = func.ra_data_admis.split(" ")[0] 
-
+    # Ordenação no banco (?ordem=admissao usa o índice de data_admissao)
+    ordem = ('-data_admissao', 'ra_nome') if request.GET.get('ordem') == 'admissao' else ('ra_nome',)
+    for func in funcionarios_qs.order_by(*ordem):
         # Adiciona o objeto original E a data formatada
         funcionarios_list.append({
             'obj': func,
-            'data_admissao_formatada': data_admissao_formatada
+            'data_admissao_formatada': formatar_data(func.data_admissao)
         })
-        # ✅ --- FIM DO BLOCO CORRIGIDO ---
     # --- FIM DO LOOP FOR ---
 
     # 5. Define o contexto (agora 'funcionarios_list' sempre existe)
@@ -401,7 +282,7 @@ def detalhar_funcionario(request, pk):
     except Funcionario.DoesNotExist:
         return render(request, 'hierarquia/sem_acesso.html')
 
-    funcionario = get_object_or_404(Funcionario, id=pk)
+    funcionario = get_object_or_404(Funcionario.objects.com_protheus(), id=pk)
 
     # (ATUALIZADO) Verificar permissão de visualização
     permitido = False
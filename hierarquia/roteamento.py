@@ -0,0 +1,173 @@
+# hierarquia/roteamento.py
+"""
+Roteamento de aprovadores (RP, MP e RD).
+
+Mantém um "diretório" pré-calculado com, para cada Setor, o Coordenador
+(Nível 3) e o Gestor (Nível 2) ativos — considerando tanto o setor primário
+quanto os setores responsáveis — e o aprovador do RH/DP.
+O diretório fica no cache do Django e é invalidado pelos sinais sempre que
+um Funcionario, Setor ou Cargo muda (ver signals.py).
+
+A chave do diretório leva uma versão, trocada só depois do commit de quem
+alterou os dados: um diretório montado antes do commit (com os aprovadores
+antigos) fica gravado numa versão que ninguém mais lê. Dentro da transação que
+alterou os dados, o diretório é montado na hora e não vai para o cache.
+
+O cache precisa ser compartilhado entre os workers (Redis, Memcached): com o
+LocMem (padrão de desenvolvimento) a troca de versão não chega aos outros
+processos, que continuam roteando para o aprovador antigo até o timeout
+(ver checks.py).
+"""
+
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models_funcionario import Funcionario
+
+# Nomes exatos dos setores de RH/DP (comparação case-insensitive)
+SETORES_RH_DP = ['RECURSOS HUMANOS', 'DEPARTAMENTO DE PESSOAL']
+
+CHAVE_DIRETORIO = 'hierarquia:diretorio_aprovadores'
+CHAVE_VERSAO = 'hierarquia:diretorio_aprovadores:versao'
+
+# Cache por processo (LocMem): a invalidação feita num worker não chega aos outros
+CACHE_POR_PROCESSO = 'locmem' in settings.CACHES['default']['BACKEND'].lower()
+# Tempo máximo de vida (segundos). A invalidação é feita pelos sinais; o timeout
+# só limita a defasagem quando o cache não é compartilhado entre workers.
+TIMEOUT_DIRETORIO = 60 if CACHE_POR_PROCESSO else 60 * 60
+
+
+def _construir_diretorio():
+    """
+    Monta o diretório com 2 consultas:
+    1. Candidatos ativos (Níveis 1-3 ou lotados no RH/DP).
+    2. Setores responsáveis dos Gestores/Coordenadores ativos.
+    """
+    q_rh = Q()
+    for nome in SETORES_RH_DP:
+        q_rh |= Q(setor_primario__nome__iexact=nome)
+
+    candidatos = list(
+        Funcionario.objects.filter(ativo=True)
+        .filter(Q(cargo__nivel__in=[1, 2, 3]) | q_rh)
+        .values_list('pk', 'cargo__nivel', 'setor_primario_id', 'setor_primario__nome', 'ra_nome')
+    )
+
+    nomes_rh = {nome.upper() for nome in SETORES_RH_DP}
+
+    # --- Aprovador do RH/DP ---
+    # Nível mais alto primeiro (sem cargo vai para o fim); desempate pelo nome
+    do_rh = [c for c in candidatos if c[3] and c[3].upper() in nomes_rh]
+    do_rh.sort(key=lambda c: (c[1] is None, c[1] or 0, c[4] or ''))
+    if do_rh:
+        rh_id = do_rh[0][0]
+    else:
+        # Fallback: Diretor (Nível 1)
+        diretores = sorted((c for c in candidatos if c[1] == 1), key=lambda c: c[4] or '')
+        rh_id = diretores[0][0] if diretores else None
+
+    # --- Coordenador / Gestor por Setor ---
+    gestores = {c[0]: c for c in candidatos if c[1] in (2, 3)}
+    setores_de = {pk: {c[2]} if c[2] else set() for pk, c in gestores.items()}
+    responsaveis = Funcionario.setores_responsaveis.through.objects.filter(
+        funcionario_id__in=list(gestores)
+    ).values_list('funcionario_id', 'setor_id')
+    for funcionario_id, setor_id in responsaveis:
+        setores_de[funcionario_id].add(setor_id)
+
+    setores = {}
+    for pk in sorted(gestores, key=lambda pk: gestores[pk][4] or ''):
+        chave = 'coordenador' if gestores[pk][1] == 3 else 'gestor'
+        for setor_id in setores_de[pk]:
+            setores.setdefault(setor_id, {}).setdefault(chave, pk)
+
+    return {'rh': rh_id, 'setores': setores}
+
+
+def _versao():
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        versao = uuid4().hex
+        if not cache.add(CHAVE_VERSAO, versao, None):
+            versao = cache.get(CHAVE_VERSAO, versao)
+    return versao
+
+
+def _alterado_nesta_transacao():
+    """ True se a transação em curso mudou algo do diretório (ainda não confirmado). """
+    conexao = transaction.get_connection()
+    if not conexao.in_atomic_block:
+        # Sobra de uma transação desfeita (o on_commit não rodou)
+        conexao.diretorio_alterado = False
+    return getattr(conexao, 'diretorio_alterado', False)
+
+
+def obter_diretorio():
+    if _alterado_nesta_transacao():
+        # Só esta transação vê as mudanças: monta na hora, sem ler nem gravar o cache
+        return _construir_diretorio()
+    chave = f'{CHAVE_DIRETORIO}:{_versao()}'
+    diretorio = cache.get(chave)
+    if diretorio is None:
+        diretorio = _construir_diretorio()
+        cache.set(chave, diretorio, TIMEOUT_DIRETORIO)
+    return diretorio
+
+
+def _trocar_versao():
+    transaction.get_connection().diretorio_alterado = False
+    cache.set(CHAVE_VERSAO, uuid4().hex, None)
+
+
+def invalidar_diretorio():
+    """ Troca a versão do diretório depois do commit (ou já, fora de transação). """
+    conexao = transaction.get_connection()
+    if conexao.in_atomic_block:
+        conexao.diretorio_alterado = True
+    transaction.on_commit(_trocar_versao)
+
+
+# --- Consultas (retornam IDs: atribua em `aprovador_*_id` sem custo extra) ---
+
+def aprovador_rh_id():
+    """
+    Aprovador do RH: funcionário ativo dos setores 'RECURSOS HUMANOS' ou
+    'DEPARTAMENTO DE PESSOAL', preferindo o nível mais alto.
+    Fallback: Diretor (Nível 1).
+    """
+    return obter_diretorio()['rh']
+
+
+def coordenador_id(setor_id):
+    return obter_diretorio()['setores'].get(setor_id, {}).get('coordenador')
+
+
+def gestor_id(setor_id):
+    return obter_diretorio()['setores'].get(setor_id, {}).get('gestor')
+
+
+def gestor_imediato_id(setor_id):
+    """ Gestor imediato do setor: Coordenador (Nível 3) e, se não houver, Gestor (Nível 2). """
+    if not setor_id:
+        return None
+    return coordenador_id(setor_id) or gestor_id(setor_id)
+
+
+# --- Versões que retornam o Funcionario (1 consulta por chamada) ---
+
+def _carregar(pk):
+    if pk is None:
+        return None
+    return Funcionario.objects.filter(pk=pk).first()
+
+
+def aprovador_rh():
+    return _carregar(aprovador_rh_id())
+
+
+def gestor_imediato(setor):
+    return _carregar(gestor_imediato_id(getattr(setor, 'pk', setor)))
@@ -0,0 +1,210 @@
+# hierarquia/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_migrate, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import dashboard, permissoes, roteamento
+from .aprovacao_lote import requisicoes_tratadas_em_lote
+from .models import (
+    Cargo, Funcionario, MovimentacaoPessoal, PendenciaAprovacao, RelacaoHierarquica,
+    RequisicaoDesligamento, RequisicaoPessoal, Setor, Vaga,
+)
+from .importacao import cadastros_importados, funcionarios_importados
+from .models_pendencias import VersaoCaixaEntrada, pendencias_alteradas
+
+
+# --- Tabela de hierarquia (RelacaoHierarquica) ---
+
+@receiver(post_save, sender=Funcionario)
+def recalcular_hierarquia_funcionario(sender, instance, created, raw=False, **kwargs):
+    """ Recalcula as relações do funcionário quando cargo ou setor primário mudam. """
+    if raw:
+        return
+    if created or instance.estado_hierarquico_mudou():
+        RelacaoHierarquica.recalcular([instance.pk])
+
+
+@receiver(m2m_changed, sender=Funcionario.setores_responsaveis.through)
+def recalcular_hierarquia_responsaveis(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Recalcula quando setores_responsaveis muda (pelos dois lados da M2M). """
+    if not reverse:
+        # instance é o Funcionario
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            RelacaoHierarquica.recalcular([instance.pk])
+        return
+
+    # instance é o Setor; pk_set são Funcionarios
+    if action == 'pre_clear':
+        instance._responsaveis_antes_clear = list(instance.responsaveis.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        RelacaoHierarquica.recalcular(pk_set or [])
+    elif action == 'post_clear':
+        RelacaoHierarquica.recalcular(getattr(instance, '_responsaveis_antes_clear', []))
+
+
+@receiver(post_save, sender=Cargo)
+def recalcular_hierarquia_cargo(sender, instance, created, raw=False, **kwargs):
+    """
+    Mudou o nível de um cargo: recalcula a hierarquia e a regra de equipe
+    (is_staff/permissões) de todos os funcionários com esse cargo.
+    """
+    if raw or created:
+        return
+    if getattr(instance, '_nivel_original', None) != instance.nivel:
+        ids = list(instance.funcionarios.values_list('pk', flat=True))
+        RelacaoHierarquica.recalcular(ids)
+        permissoes.sincronizar_equipe(ids)
+    instance._nivel_original = instance.nivel
+
+
+# --- Diretório de aprovadores (roteamento.py) ---
+
+@receiver(post_save, sender=Funcionario)
+@receiver(post_delete, sender=Funcionario)
+@receiver(post_save, sender=Setor)
+@receiver(post_delete, sender=Setor)
+@receiver(post_save, sender=Cargo)
+@receiver(post_delete, sender=Cargo)
+def invalidar_diretorio_aprovadores(sender, **kwargs):
+    roteamento.invalidar_diretorio()
+
+
+@receiver(m2m_changed, sender=Funcionario.setores_responsaveis.through)
+def invalidar_diretorio_responsaveis(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        roteamento.invalidar_diretorio()
+
+
+# --- Caixa de entrada de aprovações (PendenciaAprovacao) ---
+
+@receiver(post_delete, sender=RequisicaoPessoal)
+@receiver(post_delete, sender=MovimentacaoPessoal)
+@receiver(post_delete, sender=RequisicaoDesligamento)
+def remover_pendencias(sender, instance, **kwargs):
+    """ As pendências não têm FK para a requisição: remove junto quando ela é apagada. """
+    PendenciaAprovacao.remover(sender.TIPO_PENDENCIA, instance.pk)
+
+
+@receiver(pendencias_alteradas)
+def versionar_caixa_entrada(sender, aprovador_ids, **kwargs):
+    """
+    Avisa o stream de pendências (eventos_pendencias.py). Só depois do commit:
+    a linha de versão de um aprovador muito acionado (ex: o RH) não fica
+    travada durante as transições, e ninguém é avisado de algo desfeito.
+    """
+    ids = None if aprovador_ids is None else sorted(aprovador_ids)
+    transaction.on_commit(lambda: VersaoCaixaEntrada.incrementar(ids))
+
+
+# --- Cache do Dashboard (etiquetas em dashboard.py) ---
+
+@receiver(pendencias_alteradas)
+def invalidar_dashboard_pendencias(sender, aprovador_ids, **kwargs):
+    if aprovador_ids is None:
+        dashboard.invalidar('estrutura')
+    else:
+        dashboard.invalidar(*[f'func:{pk}' for pk in aprovador_ids])
+
+
+@receiver(post_save, sender=Funcionario)
+@receiver(post_delete, sender=Funcionario)
+def invalidar_dashboard_funcionario(sender, instance, **kwargs):
+    """ O próprio funcionário, quem vê o setor antigo/novo dele e a Diretoria. """
+    setor_anterior = getattr(instance, '_estado_hierarquico', (None, None))[1]
+    setores = {setor_anterior, instance.setor_primario_id} - {None}
+    dashboard.invalidar(f'func:{instance.pk}', 'empresa', *[f'setor:{pk}' for pk in setores])
+
+
+@receiver(m2m_changed, sender=Funcionario.setores_responsaveis.through)
+def invalidar_dashboard_responsaveis(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Mudou a lista de setores visíveis de alguém. """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        dashboard.invalidar(f'func:{instance.pk}')
+    elif action == 'post_clear':
+        dashboard.invalidar(*[f'func:{pk}' for pk in getattr(instance, '_responsaveis_antes_clear', [])])
+    else:
+        dashboard.invalidar(*[f'func:{pk}' for pk in pk_set or []])
+
+
+@receiver(post_save, sender=RequisicaoPessoal)
+@receiver(post_delete, sender=RequisicaoPessoal)
+@receiver(post_save, sender=MovimentacaoPessoal)
+@receiver(post_delete, sender=MovimentacaoPessoal)
+@receiver(post_save, sender=RequisicaoDesligamento)
+@receiver(post_delete, sender=RequisicaoDesligamento)
+def invalidar_dashboard_requisicao(sender, instance, **kwargs):
+    """ Gráfico de status: o solicitante, quem vê o setor dele e a Diretoria. """
+    if sender.solicitante.is_cached(instance):
+        # Quem cria/aprova pela tela já tem o solicitante carregado: sem consulta extra
+        setor_id = instance.solicitante.setor_primario_id
+    else:
+        setor_id = Funcionario.objects.filter(pk=instance.solicitante_id) \
+                                      .values_list('setor_primario_id', flat=True).first()
+    etiquetas = [f'func:{instance.solicitante_id}', 'empresa']
+    if setor_id:
+        etiquetas.append(f'setor:{setor_id}')
+    dashboard.invalidar(*etiquetas)
+
+
+@receiver(requisicoes_tratadas_em_lote)
+def invalidar_dashboard_requisicoes_em_lote(sender, requisicoes, **kwargs):
+    """ Como invalidar_dashboard_requisicao, para um lote (aprovacao_lote.py), numa consulta. """
+    solicitantes = {req.solicitante_id for req in requisicoes}
+    setores = Funcionario.objects.filter(pk__in=solicitantes).exclude(setor_primario=None) \
+                                 .values_list('setor_primario_id', flat=True).distinct()
+    dashboard.invalidar('empresa', *[f'func:{pk}' for pk in solicitantes], *[f'setor:{pk}' for pk in setores])
+
+
+@receiver(post_save, sender=Vaga)
+@receiver(post_delete, sender=Vaga)
+def invalidar_dashboard_vagas(sender, **kwargs):
+    dashboard.invalidar('vagas')
+
+
+@receiver(post_save, sender=Cargo)
+@receiver(post_delete, sender=Cargo)
+@receiver(post_save, sender=Setor)
+@receiver(post_delete, sender=Setor)
+def invalidar_dashboard_estrutura(sender, **kwargs):
+    dashboard.invalidar('estrutura')
+
+
+# --- Importação em massa (importacao/) ---
+
+@receiver(funcionarios_importados)
+def atualizar_apos_importacao(sender, funcionario_ids, **kwargs):
+    """
+    A importação em massa não dispara post_save/m2m_changed: refaz de uma vez
+    o que os sinais acima fariam linha a linha.
+    """
+    ids = set(funcionario_ids)
+    if len(ids) * 2 > Funcionario.objects.count():
+        # Carga de boa parte do quadro: mais barato refazer a tabela inteira
+        RelacaoHierarquica.reconstruir()
+    else:
+        RelacaoHierarquica.recalcular(ids)
+    roteamento.invalidar_diretorio()
+    dashboard.invalidar('estrutura')
+
+
+@receiver(cadastros_importados)
+def atualizar_apos_importacao_cadastros(sender, cargos_nivel_alterado=(), **kwargs):
+    """ Cargos/Setores/Centros gravados com bulk_create/bulk_update (importacao/cadastros.py). """
+    if cargos_nivel_alterado:
+        ids = list(Funcionario.objects.filter(cargo__in=cargos_nivel_alterado).values_list('pk', flat=True))
+        RelacaoHierarquica.recalcular(ids)
+        permissoes.sincronizar_equipe(ids)
+    if sender in (Cargo, Setor):
+        roteamento.invalidar_diretorio()
+        dashboard.invalidar('estrutura')
+
+
+# --- Permissões de equipe (permissoes.py) ---
+
+@receiver(post_migrate)
+def limpar_cache_permissoes(sender, **kwargs):
+    """ Os IDs das permissões ficam em cache por processo; migrate/flush podem recriá-las. """
+    permissoes.limpar_cache_permissoes()
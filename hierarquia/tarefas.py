@@ -0,0 +1,168 @@
+# hierarquia/tarefas.py
+"""
+Tarefas em segundo plano (importação/exportação da SRA pelo Admin).
+
+A requisição só grava uma TarefaSegundoPlano (e o arquivo enviado) e responde;
+o comando `processar_tarefas` executa a fila, sem broker externo:
+
+    python manage.py processar_tarefas            # laço contínuo
+    python manage.py processar_tarefas --uma-vez  # esvazia a fila e sai (cron)
+
+Vários workers podem rodar juntos: cada um reserva a próxima tarefa com
+SELECT ... FOR UPDATE SKIP LOCKED e um UPDATE condicional no status. Durante a
+execução a tarefa grava `processadas`/`total`, lidos pelo endpoint de progresso
+do Admin. Uma tarefa "executando" sem atualização há muito tempo (worker que
+caiu) volta para a fila; a importação continua do ponto de retomada.
+"""
+
+import os
+import socket
+import tempfile
+import time
+import traceback
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from .models_tarefas import TarefaSegundoPlano
+
+# tipo -> função(tarefa, progresso) que executa a tarefa
+EXECUTORES = {}
+
+# Intervalo mínimo entre duas gravações de progresso da mesma tarefa
+INTERVALO_PROGRESSO = 1.0
+
+
+def executor(tipo):
+    """ Registra a função que executa as tarefas de `tipo`. """
+    def registrar(funcao):
+        EXECUTORES[tipo] = funcao
+        return funcao
+    return registrar
+
+
+def enfileirar(tipo, usuario=None, arquivo=None, **parametros):
+    """ Cria a tarefa pendente (com o arquivo enviado, se houver) e a devolve. """
+    tarefa = TarefaSegundoPlano(tipo=tipo, parametros=parametros,
+                                criado_por=usuario if usuario and usuario.is_authenticated else None)
+    if arquivo is not None:
+        tarefa.nome_arquivo = os.path.basename(arquivo.name)[-255:]
+        tarefa.arquivo_entrada.save(tarefa.nome_arquivo, arquivo, save=False)
+    tarefa.save()
+    return tarefa
+
+
+def identificacao_worker():
+    """ host:pid do processo, gravado no que ele reserva (tarefas e notificações). """
+    return f"{socket.gethostname()}:{os.getpid()}"[:100]
+
+
+def reservar_proxima(worker=None):
+    """ Marca como "executando" a tarefa pendente mais antiga e a devolve (None se a fila está vazia). """
+    with transaction.atomic():
+        tarefa = TarefaSegundoPlano.objects.select_for_update(skip_locked=True) \
+                                           .filter(status=TarefaSegundoPlano.STATUS_PENDENTE) \
+                                           .order_by('criada_em').first()
+        if tarefa is None:
+            return None
+        agora = timezone.now()
+        # Sem SKIP LOCKED (ex: SQLite) o UPDATE condicional garante que só um worker fica com ela
+        reservada = TarefaSegundoPlano.objects.filter(pk=tarefa.pk, status=TarefaSegundoPlano.STATUS_PENDENTE) \
+                                              .update(status=TarefaSegundoPlano.STATUS_EXECUTANDO,
+                                                      worker=worker or identificacao_worker(),
+                                                      iniciada_em=agora, atualizada_em=agora)
+    if not reservada:
+        return None
+    tarefa.refresh_from_db()
+    return tarefa
+
+
+def recuperar_abandonadas(minutos=30):
+    """ Devolve à fila as tarefas "executando" sem progresso há `minutos`. Retorna quantas. """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return TarefaSegundoPlano.objects.filter(status=TarefaSegundoPlano.STATUS_EXECUTANDO,
+                                             atualizada_em__lt=limite) \
+                                     .update(status=TarefaSegundoPlano.STATUS_PENDENTE, worker='')
+
+
+class Progresso:
+    """ progresso(processadas, total=None): grava no máximo uma vez por INTERVALO_PROGRESSO. """
+
+    def __init__(self, tarefa):
+        self.tarefa = tarefa
+        self._ultima = 0.0
+
+    def __call__(self, processadas, total=None, forcar=False):
+        self.tarefa.processadas = processadas
+        campos = {'processadas': processadas, 'atualizada_em': timezone.now()}
+        if total is not None:
+            self.tarefa.total = campos['total'] = total
+        agora = time.monotonic()
+        if forcar or total is not None or agora - self._ultima >= INTERVALO_PROGRESSO:
+            self._ultima = agora
+            TarefaSegundoPlano.objects.filter(pk=self.tarefa.pk).update(**campos)
+
+
+def executar(tarefa):
+    """ Roda a tarefa já reservada e grava o desfecho (concluída ou falhou). """
+    progresso = Progresso(tarefa)
+    try:
+        EXECUTORES[tarefa.tipo](tarefa, progresso)
+    except Exception as exc:
+        tarefa.status = TarefaSegundoPlano.STATUS_FALHOU
+        tarefa.erro = f"{exc}\n\n{traceback.format_exc()}"
+    else:
+        tarefa.status = TarefaSegundoPlano.STATUS_CONCLUIDA
+    tarefa.concluida_em = timezone.now()
+    tarefa.save(update_fields=['status', 'erro', 'resumo', 'arquivo_resultado', 'processadas', 'total',
+                               'concluida_em', 'atualizada_em'])
+    return tarefa
+
+
+# --- Executores ---
+
+@executor(TarefaSegundoPlano.TIPO_IMPORTAR_SRA)
+def importar_sra(tarefa, progresso):
+    """ Importação da planilha SRA (importacao/retomada.py); o resultado é o relatório de erros. """
+    from .importacao import importar_arquivo
+    from .importacao.leitura import contar_linhas
+
+    parametros = tarefa.parametros
+    with tarefa.arquivo_entrada.open('rb') as arquivo:
+        progresso(0, total=contar_linhas(arquivo, nome=tarefa.nome_arquivo))
+        _, resultado = importar_arquivo(arquivo, nome=tarefa.nome_arquivo, modo=parametros.get('modo', 'massa'),
+                                        reiniciar=parametros.get('reiniciar', False), ao_progresso=progresso)
+    progresso(tarefa.total or tarefa.processadas, forcar=True)
+
+    linhas = [f"Importação concluída: {resultado.resumo()}."]
+    if resultado.retomada_de:
+        linhas.append(f"Retomada após a linha {resultado.retomada_de}.")
+    linhas += resultado.relatorio_nao_encontrados()
+    if resultado.metricas:
+        linhas.append(f"Desempenho: {resultado.metricas.resumo()}.")
+    tarefa.resumo = '\n'.join(linhas)
+    if resultado.erros:
+        relatorio = ''.join(f"Linha {linha}: {mensagem}\n" for linha, mensagem in resultado.erros)
+        tarefa.arquivo_resultado.save(f"erros_tarefa_{tarefa.pk}.txt", ContentFile(relatorio.encode('utf-8')),
+                                      save=False)
+
+
+@executor(TarefaSegundoPlano.TIPO_EXPORTAR_SRA)
+def exportar_sra(tarefa, progresso):
+    """ Exportação da SRA (exportacao.py) dos ids gravados na tarefa (ou de todos). """
+    from .exportacao import gravar_csv, gravar_xlsx
+    from .models_funcionario import Funcionario
+
+    formato = tarefa.parametros.get('formato', 'xlsx')
+    ids = tarefa.parametros.get('ids')
+    queryset = Funcionario.objects.all() if ids is None else Funcionario.objects.filter(pk__in=ids)
+    progresso(0, total=len(ids) if ids is not None else queryset.count())
+
+    with tempfile.TemporaryFile() as arquivo:
+        (gravar_csv if formato == 'csv' else gravar_xlsx)(queryset, arquivo, ao_progresso=progresso)
+        arquivo.seek(0)
+        tarefa.arquivo_resultado.save(f"funcionarios_{tarefa.pk}.{formato}", File(arquivo), save=False)
+    tarefa.resumo = f"{tarefa.processadas} funcionários exportados ({formato.upper()})."
@@ -1,3 +1,1298 @@
-from django.test import TestCase
+import asyncio
+import itertools
+import random
+import re
+from datetime import date
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import tablib
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat
+from django.db.models.signals import post_save
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import dashboard, eventos_pendencias, roteamento, signals
+from .aprovacao_lote import LIMITE_LOTE, NAO_PENDENTE, aprovar_em_lote, rejeitar_em_lote
+from .eventos_pendencias import MARGEM, CentralPendencias, montar_estado
+from .importacao import ImportadorFuncionarios, sincronizar_delta
+from .importacao.origem import TabelaSRA
+from .management.commands._worker import ComandoWorker
+from .models_hierarquia import calcular_pares
+from .notificacoes import (
+    ESPERA_NOVA_TENTATIVA, Notificador, NotificadorInApp, despachar, notificadores, recuperar_abandonados,
+    reservar_lote,
+)
+from .resources import FuncionarioResource
+from .models import (
+    Cargo, ControleSincronizacao, EventoNotificacao, Funcionario, MovimentacaoPessoal, Notificacao,
+    PendenciaAprovacao, RelacaoHierarquica, RequisicaoDesligamento, RequisicaoPessoal, Setor, Vaga,
+    VersaoCaixaEntrada,
+)
+
+
+# --- Leitura da SRA direto do banco (importacao/origem.py) ---
+
+# Banco que faz o papel do Protheus nos testes: um SQLite em memória, fora do banco de testes
+PROTHEUS = 'protheus_teste'
+
+SRA_DDL = '''
+    CREATE TABLE SRA010 (
+        RA_FILIAL CHAR(4), RA_MAT CHAR(6), RA_NOME CHAR(30), RA_SIT_FOLHA CHAR(1),
+        RJ_DESC CHAR(30), D_E_L_E_T_ CHAR(1), S_T_A_M_P_ INTEGER, R_E_C_N_O_ INTEGER
+    )
+'''
+
+
+def _linha_sra(filial, matricula, nome, cargo='ANALISTA', excluida=False, marca=1):
+    # CHAR do Protheus: completado com espaços até o tamanho da coluna
+    return (filial.ljust(4), matricula.ljust(6), nome.ljust(30), ' ', cargo.ljust(30),
+            '*' if excluida else ' ', marca, marca)
+
+
+@override_settings(PROTHEUS_SRA_TABELA='SRA010', PROTHEUS_SRA_COLUNAS={'cargo': 'RJ_DESC'})
+class TabelaSRATests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # O alias só existe durante a classe: o test runner não cria banco de testes para ele
+        connections.databases[PROTHEUS] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: {},
+            PROTHEUS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+        })[PROTHEUS]
+        cls.databases = {DEFAULT_DB_ALIAS, PROTHEUS}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[PROTHEUS].close()
+        del connections[PROTHEUS]
+        del connections.databases[PROTHEUS]
+
+    @classmethod
+    def setUpTestData(cls):
+        Cargo.objects.create(nome='ANALISTA', nivel=5)
+
+    def setUp(self):
+        with connections[PROTHEUS].cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS SRA010')
+            cursor.execute(SRA_DDL)
+            cursor.executemany('INSERT INTO SRA010 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)', [
+                _linha_sra('0101', '000001', 'ANA', marca=10),
+                _linha_sra('0101', '000002', 'BRUNO', marca=20),
+                _linha_sra('0102', '000003', 'CARLA', excluida=True, marca=30),
+            ])
+
+    def test_mapeia_colunas_para_as_da_planilha(self):
+        linhas = list(TabelaSRA(PROTHEUS).linhas())
+        self.assertEqual(linhas[0]['Filial'], '0101')
+        self.assertEqual(linhas[0]['Matricula'], '000001')
+        self.assertEqual(linhas[0]['Nome'], 'ANA')
+        # Coluna sem campo correspondente (R_E_C_N_O_) não é lida
+        self.assertNotIn('R_E_C_N_O_', linhas[0])
+
+    def test_colunas_de_settings_substituem_o_nome_padrao(self):
+        linha = next(TabelaSRA(PROTHEUS).linhas())
+        self.assertEqual(linha['Desc.Funcao'], 'ANALISTA')
+
+        with override_settings(PROTHEUS_SRA_COLUNAS={'ra_nome': 'RJ_DESC'}):
+            linha = next(TabelaSRA(PROTHEUS).linhas())
+        self.assertEqual(linha['Nome'], 'ANALISTA')
+        self.assertNotIn('Desc.Funcao', linha)
+
+    def test_ignora_registros_excluidos(self):
+        matriculas = [linha['Matricula'] for linha in TabelaSRA(PROTHEUS).linhas()]
+        self.assertEqual(matriculas, ['000001', '000002'])
+
+    def test_remove_espacos_das_colunas_char(self):
+        linha = next(TabelaSRA(PROTHEUS).linhas())
+        self.assertEqual(linha['Nome'], 'ANA')
+        self.assertEqual(linha['Sit. Folha'], '')
+
+    def test_marca_filtra_no_banco_e_ordena(self):
+        linhas = list(TabelaSRA(PROTHEUS).linhas(coluna_marca='S_T_A_M_P_', apos=10))
+        self.assertEqual([(linha['Matricula'], linha['S_T_A_M_P_']) for linha in linhas], [('000002', 20)])
+
+    def test_tabela_inexistente(self):
+        with self.assertRaises(ValueError):
+            list(TabelaSRA(PROTHEUS, tabela='SRA990').linhas())
+
+    def test_comando_delta_le_so_linhas_apos_a_marca(self):
+        ControleSincronizacao.objects.create(origem='SRA', tipo_marca=ControleSincronizacao.MARCA_SEQUENCIA,
+                                             ultima_marca='10')
+
+        call_command('importar_sra_banco', database=PROTHEUS, delta=True, stdout=StringIO())
+
+        self.assertEqual(list(Funcionario.objects.values_list('ra_mat', flat=True)), ['000002'])
+        self.assertEqual(Funcionario.objects.get().cargo.nome, 'ANALISTA')
+        self.assertEqual(ControleSincronizacao.objects.get(origem='SRA').ultima_marca, '20')
+
+
+# --- Sincronização delta (importacao/delta.py) ---
+
+class SincronizacaoDeltaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Cargo.objects.create(nome='ANALISTA', nivel=5)
+
+    def _sincronizar(self, *linhas):
+        return sincronizar_delta(
+            [{'Matricula': mat, 'Nome': nome, 'Desc.Funcao': cargo, 'S_T_A_M_P_': marca}
+             for mat, nome, cargo, marca in linhas],
+            tipo_marca=ControleSincronizacao.MARCA_SEQUENCIA)
+
+    def _controle(self):
+        return ControleSincronizacao.objects.get(origem='SRA')
+
+    def test_linha_com_erro_nao_segura_a_marca(self):
+        resultado = self._sincronizar(('000001', 'ANA', 'ANALISTA', 1), ('000002', 'BRUNO', 'XPTO', 2),
+                                      ('000003', 'CARLA', 'ANALISTA', 3))
+
+        self.assertEqual(len(resultado.erros), 1)
+        controle = self._controle()
+        self.assertEqual(controle.ultima_marca, '3')
+        self.assertEqual(list(controle.linhas_pendentes), ['000002'])
+        self.assertIn('XPTO', controle.linhas_pendentes['000002']['erro'])
+
+    def test_pendente_e_gravada_quando_o_erro_some(self):
+        self._sincronizar(('000002', 'BRUNO', 'XPTO', 2))
+        Cargo.objects.create(nome='XPTO', nivel=5)
+
+        resultado = self._sincronizar()
+
+        self.assertEqual(resultado.criados, 1)
+        self.assertEqual(Funcionario.objects.get(ra_mat='000002').cargo.nome, 'XPTO')
+        self.assertEqual(self._controle().linhas_pendentes, {})
+
+    def test_linha_mais_nova_substitui_a_pendente(self):
+        self._sincronizar(('000002', 'BRUNO', 'XPTO', 2))
+        self._sincronizar(('000002', 'BRUNO SILVA', 'ANALISTA', 5))
+        Cargo.objects.create(nome='XPTO', nivel=5)
+        self._sincronizar()
+
+        funcionario = Funcionario.objects.get(ra_mat='000002')
+        self.assertEqual((funcionario.ra_nome, funcionario.cargo.nome), ('BRUNO SILVA', 'ANALISTA'))
+        self.assertEqual(self._controle().linhas_pendentes, {})
+
+
+class AtualizacaoEmMassaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Cargo.objects.create(nome='ANALISTA', nivel=5)
+        Cargo.objects.create(nome='GERENTE', nivel=2)
+
+    def _importar(self, *linhas):
+        return ImportadorFuncionarios().importar(
+            [{'Matricula': mat, 'Nome': nome, 'Desc.Funcao': cargo} for mat, nome, cargo in linhas])
+
+    def test_atualiza_so_as_colunas_que_mudaram(self):
+        self._importar(('000001', 'ANA', 'ANALISTA'), ('000002', 'BRUNO', 'ANALISTA'),
+                       ('000003', 'CARLA', 'ANALISTA'))
+
+        with mock.patch.object(QuerySet, 'bulk_update', autospec=True,
+                               side_effect=QuerySet.bulk_update) as bulk_update:
+            resultado = self._importar(('000001', 'ANA MARIA', 'ANALISTA'), ('000002', 'BRUNO', 'GERENTE'),
+                                       ('000003', 'CARLA', 'ANALISTA'))
+
+        self.assertEqual((resultado.atualizados, resultado.inalterados), (2, 1))
+        campos = sorted(tuple(chamada.args[2]) for chamada in bulk_update.call_args_list)
+        self.assertEqual(campos, [('cargo', 'hash_sra', 'ra_descfuncao', 'atualizado_em'),
+                                  ('hash_sra', 'ra_nome', 'atualizado_em')])
+        self.assertTrue(all(chamada.kwargs['batch_size'] for chamada in bulk_update.call_args_list))
+        self.assertEqual(Funcionario.objects.get(ra_mat='000001').ra_nome, 'ANA MARIA')
+        self.assertEqual(Funcionario.objects.get(ra_mat='000002').cargo.nome, 'GERENTE')
+
+
+class ReimportacaoAdminTests(TestCase):
+    """ Import do django-import-export (Admin e modo='linha'): linhas inalteradas não custam consultas. """
+
+    @classmethod
+    def setUpTestData(cls):
+        Cargo.objects.create(nome='ANALISTA', nivel=5)
+
+    def _dataset(self, quantidade):
+        return tablib.Dataset(*[(f'{i:06d}', f'FUNCIONARIO {i}', 'ANALISTA') for i in range(quantidade)],
+                              headers=['Matricula', 'Nome', 'Desc.Funcao'])
+
+    def _consultas_reimportando(self, quantidade):
+        FuncionarioResource().import_data(self._dataset(quantidade))
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as consultas:
+            resultado = FuncionarioResource().import_data(self._dataset(quantidade))
+        self.assertFalse(resultado.has_errors())
+        self.assertEqual(resultado.totals['skip'], quantidade)
+        # Fora o SAVEPOINT/RELEASE que o import-export abre em volta de cada linha
+        return [c['sql'] for c in consultas if not c['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))]
+
+    def test_reimportacao_inalterada_nao_consulta_por_linha(self):
+        poucas, muitas = self._consultas_reimportando(3), self._consultas_reimportando(12)
+        self.assertEqual(len(poucas), len(muitas))
+        self.assertFalse(any('"ra_cpf"' in sql for sql in muitas))
+
+    def test_linha_alterada_e_gravada(self):
+        FuncionarioResource().import_data(self._dataset(2))
+        dataset = self._dataset(2)
+        dataset[1] = ('000001', 'OUTRO NOME', 'ANALISTA')
+
+        resultado = FuncionarioResource().import_data(dataset)
+
+        self.assertEqual((resultado.totals['skip'], resultado.totals['update']), (1, 1))
+        self.assertEqual(Funcionario.objects.get(ra_mat='000001').ra_nome, 'OUTRO NOME')
+
+
+class FuncionarioAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.funcionario = Funcionario.objects.create(ra_mat='000001', ra_nome='ANA', ra_cpf='12345678900')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_change_list_nao_carrega_a_linha_sra_completa(self):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as consultas:
+            resposta = self.client.get(reverse('admin:hierarquia_funcionario_changelist'))
+
+        self.assertContains(resposta, 'ANA')
+        selects = [c['sql'] for c in consultas if 'FROM "hierarquia_funcionario"' in c['sql']]
+        self.assertTrue(selects)
+        self.assertFalse(any('"ra_cpf"' in sql for sql in selects))
+
+    def test_edicao_carrega_a_linha_sra_completa(self):
+        resposta = self.client.get(reverse('admin:hierarquia_funcionario_change', args=[self.funcionario.pk]))
+
+        self.assertContains(resposta, '12345678900')
+        self.assertEqual(resposta.context['original'].get_deferred_fields(), set())
+
+
+# --- Diretório de aprovadores (roteamento.py) ---
+
+class RoteamentoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Como dados já confirmados: os sinais trocam a versão do diretório no commit
+        with self.captureOnCommitCallbacks(execute=True):
+            gestor = Cargo.objects.create(nome='GESTOR', nivel=2)
+            self.analista = Cargo.objects.create(nome='ANALISTA', nivel=5)
+            self.setor_rh = Setor.objects.create(nome='RECURSOS HUMANOS')
+            self.vendas = Setor.objects.create(nome='VENDAS')
+            self.rh = Funcionario.objects.create(ra_nome='ANA', ra_mat='000001', cargo=self.analista,
+                                                 setor_primario=self.setor_rh)
+            self.diretor = Funcionario.objects.create(ra_nome='DIRETOR', ra_mat='000002',
+                                                      cargo=Cargo.objects.create(nome='DIRETOR', nivel=1))
+            # Sem superiores: a RP do gestor vai direto para o RH
+            self.solicitante = Funcionario.objects.create(ra_nome='GESTOR', ra_mat='000003', cargo=gestor,
+                                                          setor_primario=self.vendas)
+            self.vaga = Vaga.objects.create(titulo='Vendedor', setor=self.vendas, cargo=self.analista,
+                                            justificativa='Teste')
+
+    def _nova_rp(self):
+        return RequisicaoPessoal.objects.create(vaga=self.vaga, solicitante=self.solicitante, justificativa_rp='Teste')
+
+    def test_troca_de_funcionario_no_rh_muda_a_proxima_rp(self):
+        self.assertEqual(self._nova_rp().aprovador_atual, self.rh)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            novo_rh = Funcionario.objects.create(ra_nome='BIA', ra_mat='000004', cargo=self.analista,
+                                                 setor_primario=self.setor_rh)
+            self.rh.setor_primario = self.vendas
+            self.rh.save()
+
+        self.assertEqual(self._nova_rp().aprovador_atual, novo_rh)
+
+    def test_renomear_setor_muda_a_proxima_rp(self):
+        self.assertEqual(self._nova_rp().aprovador_atual, self.rh)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.setor_rh.nome = 'TREINAMENTO'
+            self.setor_rh.save()
+
+        # Sem ninguém no RH/DP: fallback para o Diretor
+        self.assertEqual(self._nova_rp().aprovador_atual, self.diretor)
+
+    def test_diretorio_montado_antes_do_commit_nao_vale_depois(self):
+        self.assertEqual(roteamento.aprovador_rh_id(), self.rh.pk)
+        chave_antiga = f'{roteamento.CHAVE_DIRETORIO}:{roteamento._versao()}'
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.rh.setor_primario = self.vendas
+            self.rh.save()
+            # A própria transação já vê a mudança, sem gravar no cache
+            self.assertEqual(roteamento.aprovador_rh_id(), self.diretor.pk)
+        # O diretório antigo (o que um processo concorrente montaria antes do commit) continua lá...
+        self.assertEqual(cache.get(chave_antiga)['rh'], self.rh.pk)
+
+        for callback in callbacks:
+            callback()
+        # ...mas o commit troca a versão e ninguém mais o lê
+        self.assertEqual(roteamento.aprovador_rh_id(), self.diretor.pk)
+
+    def test_transacao_desfeita_nao_deixa_nada_no_cache(self):
+        self.assertEqual(roteamento.aprovador_rh_id(), self.rh.pk)
+        chave = f'{roteamento.CHAVE_DIRETORIO}:{roteamento._versao()}'
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.rh.setor_primario = self.vendas
+                self.rh.save()
+                self.assertEqual(roteamento.aprovador_rh_id(), self.diretor.pk)
+                raise RuntimeError
+
+        self.assertEqual(cache.get(chave)['rh'], self.rh.pk)
+        self.assertEqual(roteamento.aprovador_rh_id(), self.rh.pk)
+
+
+# --- Tabela de hierarquia (models_hierarquia.py) ---
+
+def _superiores_por_consulta(funcionario):
+    """ obter_superiores() como era antes da RelacaoHierarquica (consultas diretas). """
+    diretor = Q(cargo__nivel=1, ativo=True)
+    if not funcionario.setor_primario_id:
+        filtro = diretor
+    else:
+        nivel = funcionario.cargo.nivel
+        filtro = (Q(setor_primario=funcionario.setor_primario_id, cargo__nivel__lt=nivel, ativo=True)
+                  | Q(setores_responsaveis=funcionario.setor_primario_id, cargo__nivel__lt=nivel, ativo=True)
+                  | diretor)
+    return set(Funcionario.objects.filter(filtro).exclude(pk=funcionario.pk).values_list('pk', flat=True))
+
+
+def _subordinados_por_consulta(funcionario, incluir_responsaveis=True):
+    """ obter_subordinados() como era antes da RelacaoHierarquica (consultas diretas). """
+    if not funcionario.cargo_id:
+        return set()
+    nivel = funcionario.cargo.nivel
+    ids = set()
+    if funcionario.setor_primario_id:
+        ids |= set(Funcionario.objects.filter(setor_primario=funcionario.setor_primario_id, cargo__nivel__gt=nivel,
+                                              ativo=True).values_list('pk', flat=True))
+    if incluir_responsaveis:
+        ids |= set(Funcionario.objects.filter(setor_primario__in=funcionario.setores_responsaveis.all(),
+                                              cargo__nivel__gt=nivel, ativo=True)
+                                      .exclude(pk=funcionario.pk).values_list('pk', flat=True))
+    return ids
+
+
+class RelacaoHierarquicaTests(TestCase):
+    """
+    A tabela mantida pelos sinais (recalcular) tem que responder como as
+    consultas diretas de antes e ser igual à tabela refeita do zero.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cargos = {nivel: Cargo.objects.create(nome=f'NIVEL {nivel}', nivel=nivel) for nivel in (1, 2, 3, 4, 5)}
+        cls.setores = [Setor.objects.create(nome=nome) for nome in ('VENDAS', 'COMPRAS', 'LOGISTICA')]
+        vendas, compras, logistica = cls.setores
+        quadro = [
+            ('DIRETOR', 1, None), ('GESTOR VENDAS', 2, vendas), ('COORD VENDAS', 3, vendas),
+            ('ANALISTA VENDAS', 5, vendas), ('GESTOR COMPRAS', 2, compras), ('SUPERVISOR COMPRAS', 4, compras),
+            ('ANALISTA COMPRAS', 5, compras), ('ANALISTA LOGISTICA', 5, logistica), ('SEM SETOR', 5, None),
+        ]
+        cls.pessoas = {
+            nome: Funcionario.objects.create(ra_nome=nome, ra_mat=f'{i:06d}', cargo=cls.cargos[nivel],
+                                             setor_primario=setor)
+            for i, (nome, nivel, setor) in enumerate(quadro)
+        }
+        cls.pessoas['GESTOR VENDAS'].setores_responsaveis.add(logistica)
+
+    def _conferir(self):
+        for funcionario in Funcionario.objects.select_related('cargo'):
+            with self.subTest(funcionario=funcionario.ra_nome):
+                self.assertEqual(set(funcionario.obter_superiores().values_list('pk', flat=True)),
+                                 _superiores_por_consulta(funcionario))
+                for incluir in (True, False):
+                    self.assertEqual(
+                        set(funcionario.obter_subordinados(incluir).values_list('pk', flat=True)),
+                        _subordinados_por_consulta(funcionario, incluir))
+
+        # O que reconstruir() gravaria, sem substituir a tabela mantida pelos sinais
+        do_zero = calcular_pares(RelacaoHierarquica._carregar_pessoas(), RelacaoHierarquica._carregar_responsaveis())
+        self.assertEqual(set(RelacaoHierarquica.objects.values_list('superior_id', 'subordinado_id', 'via')), do_zero)
+
+    def _funcionario(self, nome):
+        return Funcionario.objects.get(pk=self.pessoas[nome].pk)
+
+    def test_estado_inicial(self):
+        self._conferir()
+
+    def test_troca_de_cargo_e_de_setor(self):
+        analista = self._funcionario('ANALISTA VENDAS')
+        analista.cargo = self.cargos[3]
+        analista.save()
+        self._conferir()
+
+        analista.setor_primario = self.setores[1]
+        analista.save()
+        self._conferir()
+
+        analista.setor_primario = None
+        analista.save()
+        self._conferir()
+
+    def test_setores_responsaveis_pelos_dois_lados(self):
+        vendas, compras, logistica = self.setores
+        self._funcionario('SUPERVISOR COMPRAS').setores_responsaveis.add(vendas, logistica)
+        self._conferir()
+
+        self._funcionario('GESTOR VENDAS').setores_responsaveis.remove(logistica)
+        self._conferir()
+
+        compras.responsaveis.add(self.pessoas['COORD VENDAS'])
+        self._conferir()
+
+        logistica.responsaveis.clear()
+        self._conferir()
+
+        vendas.responsaveis.set([self.pessoas['DIRETOR'], self.pessoas['GESTOR COMPRAS']])
+        self._conferir()
+
+    def test_mudanca_de_nivel_do_cargo(self):
+        cargo = Cargo.objects.get(pk=self.cargos[4].pk)
+        cargo.nivel = 1
+        cargo.save()
+        self._conferir()
+
+        cargo.nivel = 5
+        cargo.save()
+        self._conferir()
+
+    def test_inativo_some_das_listas(self):
+        gestor = self._funcionario('GESTOR VENDAS')
+        gestor.ativo = False
+        gestor.save()
+        self._conferir()
+
+    def test_novo_funcionario_e_exclusao(self):
+        Funcionario.objects.create(ra_nome='NOVO DIRETOR', ra_mat='000100', cargo=self.cargos[1])
+        Funcionario.objects.create(ra_nome='NOVO COORD', ra_mat='000101', cargo=self.cargos[3],
+                                   setor_primario=self.setores[2])
+        self._conferir()
+
+        self._funcionario('COORD VENDAS').delete()
+        self._conferir()
+
+    def test_sequencia_aleatoria_de_mudancas(self):
+        sorteio = random.Random(20240601)
+        for _ in range(40):
+            funcionario = Funcionario.objects.get(pk=sorteio.choice(list(self.pessoas.values())).pk)
+            mudanca = sorteio.choice(['cargo', 'setor', 'responsavel', 'nivel'])
+            if mudanca == 'cargo':
+                funcionario.cargo = sorteio.choice(list(self.cargos.values()))
+                funcionario.save()
+            elif mudanca == 'setor':
+                funcionario.setor_primario = sorteio.choice(self.setores + [None])
+                funcionario.save()
+            elif mudanca == 'responsavel':
+                setor = sorteio.choice(self.setores)
+                if sorteio.random() < 0.5:
+                    funcionario.setores_responsaveis.add(setor)
+                else:
+                    setor.responsaveis.remove(funcionario)
+            else:
+                cargo = Cargo.objects.get(pk=sorteio.choice(list(self.cargos.values())).pk)
+                cargo.nivel = sorteio.randint(1, 5)
+                cargo.save()
+            self._conferir()
+
+
+# --- Caixa de entrada (models_pendencias.py) ---
+
+# Filtros que as telas e a API usavam antes da PendenciaAprovacao
+FILTROS_PENDENTES_ANTIGOS = {
+    RequisicaoPessoal: lambda f: Q(aprovador_atual=f, status__in=['pendente_gestor', 'pendente_rh',
+                                                                  'em_revisao_gestor']),
+    MovimentacaoPessoal: lambda f: (Q(aprovador_gestor_atual=f, gestor_atual_aprovou=False)
+                                    | Q(aprovador_gestor_proposto=f, gestor_proposto_aprovou=False)
+                                    | Q(aprovador_rh=f, status='pendente_rh'))
+                                   & ~Q(status__in=['aprovada', 'rejeitada']),
+    RequisicaoDesligamento: lambda f: Q(aprovador_atual=f, status__in=['pendente_gestor', 'pendente_rh']),
+}
+
+
+class CaixaEntradaTests(TestCase):
+    """ Em cada etapa do fluxo, pendentes_para() responde como os filtros antigos, para todo o quadro. """
+
+    @classmethod
+    def setUpTestData(cls):
+        gestor = Cargo.objects.create(nome='GESTOR', nivel=2)
+        coordenador = Cargo.objects.create(nome='COORDENADOR', nivel=3)
+        cls.analista = Cargo.objects.create(nome='ANALISTA', nivel=5)
+        rh = Setor.objects.create(nome='RECURSOS HUMANOS')
+        cls.vendas = Setor.objects.create(nome='VENDAS')
+        cls.compras = Setor.objects.create(nome='COMPRAS')
+
+        def funcionario(nome, cargo, setor):
+            return Funcionario.objects.create(ra_nome=nome, ra_mat=nome[:6], cargo=cargo, setor_primario=setor)
+
+        cls.gestor_vendas = funcionario('GESTOR_VENDAS', gestor, cls.vendas)
+        cls.coord_vendas = funcionario('COORD_VENDAS', coordenador, cls.vendas)
+        cls.coord_compras = funcionario('COORD_COMPRAS', coordenador, cls.compras)
+        cls.rh = funcionario('ANALISTA_RH', cls.analista, rh)
+        cls.solicitante = funcionario('SOLICITANTE', cls.analista, cls.vendas)
+        cls.outro = funcionario('OUTRO', cls.analista, cls.vendas)
+        cls.vaga = Vaga.objects.create(titulo='Vendedor', setor=cls.vendas, cargo=cls.analista, justificativa='Teste')
+
+    def setUp(self):
+        cache.clear()
+
+    def _conferir(self, req, status):
+        modelo = type(req)
+        req.refresh_from_db()
+        self.assertEqual(req.status, status)
+        for funcionario in Funcionario.objects.all():
+            with self.subTest(modelo=modelo.__name__, status=status, funcionario=funcionario.ra_nome):
+                self.assertEqual(
+                    set(modelo.pendentes_para(funcionario).values_list('pk', flat=True)),
+                    set(modelo.objects.filter(FILTROS_PENDENTES_ANTIGOS[modelo](funcionario))
+                                      .values_list('pk', flat=True)))
+
+    def _rp(self):
+        return RequisicaoPessoal.objects.create(vaga=self.vaga, solicitante=self.solicitante, justificativa_rp='Teste')
+
+    def _mp(self):
+        return MovimentacaoPessoal.objects.create(
+            solicitante=self.solicitante, funcionario_movido=self.outro, cargo_proposto=self.analista,
+            setor_proposto=self.compras, data_efetiva=date(2026, 1, 1), justificativa='Teste')
+
+    def _rd(self):
+        return RequisicaoDesligamento.objects.create(
+            solicitante=self.solicitante, funcionario_desligado=self.outro, tipo_desligamento='empresa',
+            motivo='reducao_quadro', data_prevista_desligamento=date(2026, 1, 1), tipo_aviso='indenizado',
+            justificativa='Teste')
+
+    def test_rp_gestor_rh_devolucao_e_aprovacao(self):
+        rp = self._rp()
+        self._conferir(rp, 'pendente_gestor')
+        self.assertTrue(rp.aprovar_por(rp.aprovador_atual))
+        self._conferir(rp, 'pendente_rh')
+        self.assertTrue(rp.devolver_para_gestor(self.rh, 'Ajustei a faixa salarial'))
+        self._conferir(rp, 'em_revisao_gestor')
+        self.assertTrue(rp.aprovar_por(rp.aprovador_atual))
+        self._conferir(rp, 'pendente_rh')
+        self.assertTrue(rp.aprovar_por(self.rh))
+        self._conferir(rp, 'aprovada')
+
+    def test_rp_rejeitada(self):
+        rp = self._rp()
+        self.assertTrue(rp.rejeitar(rp.aprovador_atual, 'Sem verba'))
+        self._conferir(rp, 'rejeitada')
+
+    def test_mp_gestores_rh_e_aprovacao(self):
+        mp = self._mp()
+        self._conferir(mp, 'pendente_gestores')
+        self.assertTrue(mp.aprovar_por(mp.aprovador_gestor_proposto))
+        self._conferir(mp, 'pendente_gestores')
+        self.assertTrue(mp.aprovar_por(mp.aprovador_gestor_atual))
+        self._conferir(mp, 'pendente_rh')
+        self.assertTrue(mp.aprovar_por(self.rh))
+        self._conferir(mp, 'aprovada')
+
+    def test_mp_rejeitada_no_rh(self):
+        mp = self._mp()
+        self.assertTrue(mp.aprovar_por(mp.aprovador_gestor_atual))
+        self.assertTrue(mp.aprovar_por(mp.aprovador_gestor_proposto))
+        self.assertTrue(mp.rejeitar(self.rh, 'Sem vaga'))
+        self._conferir(mp, 'rejeitada')
+
+    def test_rd_gestor_rh_e_aprovacao(self):
+        rd = self._rd()
+        self._conferir(rd, 'pendente_gestor')
+        self.assertTrue(rd.aprovar_por(rd.aprovador_atual))
+        self._conferir(rd, 'pendente_rh')
+        self.assertTrue(rd.aprovar_por(self.rh))
+        self._conferir(rd, 'aprovada')
+
+    def test_rd_rejeitada_pelo_gestor(self):
+        rd = self._rd()
+        self.assertTrue(rd.rejeitar(rd.aprovador_atual, 'Não procede'))
+        self._conferir(rd, 'rejeitada')
+
+
+# --- Transições condicionais (models_alteracoes.py / models_pendencias.py) ---
+
+class TransicoesMPTests(TestCase):
+    """
+    Cada teste carrega a MP em duas instâncias, como duas requisições HTTP
+    simultâneas: a segunda age sobre um estado que já não está no banco.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        coordenador = Cargo.objects.create(nome='COORDENADOR', nivel=3)
+        cls.analista = Cargo.objects.create(nome='ANALISTA', nivel=5)
+        rh = Setor.objects.create(nome='RECURSOS HUMANOS')
+        cls.vendas = Setor.objects.create(nome='VENDAS')
+        cls.compras = Setor.objects.create(nome='COMPRAS')
+
+        def funcionario(nome, cargo, setor):
+            usuario = User.objects.create_user(nome.lower(), password='senha')
+            return Funcionario.objects.create(ra_nome=nome, ra_mat=nome[:6], cargo=cargo, setor_primario=setor,
+                                              usuario=usuario)
+
+        cls.gestor_atual = funcionario('GESTOR_VENDAS', coordenador, cls.vendas)
+        cls.gestor_proposto = funcionario('GESTOR_COMPRAS', coordenador, cls.compras)
+        cls.rh = funcionario('ANALISTA_RH', cls.analista, rh)
+        cls.solicitante = funcionario('SOLICITANTE', cls.analista, cls.vendas)
+        cls.movido = funcionario('MOVIDO', cls.analista, cls.vendas)
+
+    def setUp(self):
+        # O diretório de aprovadores fica em cache entre os testes
+        cache.clear()
+        self.mp = self._criar_mp()
+
+    def _criar_mp(self):
+        return MovimentacaoPessoal.objects.create(
+            solicitante=self.solicitante, funcionario_movido=self.movido, cargo_proposto=self.analista,
+            setor_proposto=self.compras, data_efetiva=date(2026, 1, 1), justificativa='Teste')
+
+    def _duas_copias(self):
+        return MovimentacaoPessoal.objects.get(pk=self.mp.pk), MovimentacaoPessoal.objects.get(pk=self.mp.pk)
+
+    def _aprovar_gestores(self):
+        primeira, segunda = self._duas_copias()
+        self.assertTrue(primeira.aprovar(self.gestor_atual))
+        self.assertTrue(segunda.aprovar(self.gestor_proposto))
+
+    def test_aprovadores_iniciais(self):
+        self.assertEqual(self.mp.status, 'pendente_gestores')
+        self.assertEqual(self.mp.aprovador_gestor_atual_id, self.gestor_atual.pk)
+        self.assertEqual(self.mp.aprovador_gestor_proposto_id, self.gestor_proposto.pk)
+
+    def test_gestores_em_qualquer_ordem_levam_ao_rh(self):
+        for ordem in [(self.gestor_atual, self.gestor_proposto), (self.gestor_proposto, self.gestor_atual)]:
+            with self.subTest(primeiro=ordem[0].ra_nome):
+                self.mp = self._criar_mp()
+                primeira, segunda = self._duas_copias()
+                self.assertTrue(primeira.aprovar(ordem[0]))
+                self.assertEqual(primeira.status, 'pendente_gestores')
+                # `segunda` ainda vê a outra parte como não aprovada: o CASE decide no banco
+                self.assertTrue(segunda.aprovar(ordem[1]))
+
+                self.mp.refresh_from_db()
+                self.assertEqual(self.mp.status, 'pendente_rh')
+                self.assertTrue(self.mp.gestor_atual_aprovou and self.mp.gestor_proposto_aprovou)
+                self.assertEqual(self.mp.aprovador_rh_id, self.rh.pk)
+                self.assertEqual(segunda.status, 'pendente_rh')
+
+    def test_quem_perde_a_corrida_nao_grava_nada(self):
+        self._aprovar_gestores()
+        primeira, segunda = self._duas_copias()
+        self.assertTrue(primeira.aprovar_por(self.rh))
+        gravada = MovimentacaoPessoal.objects.values().get(pk=self.mp.pk)
+
+        self.assertFalse(segunda.aprovar_por(self.rh))
+        self.assertFalse(segunda.rejeitar(self.rh, 'tarde demais'))
+        self.assertEqual(MovimentacaoPessoal.objects.values().get(pk=self.mp.pk), gravada)
+        self.assertEqual(gravada['status'], 'aprovada')
+
+    def test_mesmo_gestor_nao_aprova_duas_vezes(self):
+        primeira, segunda = self._duas_copias()
+        self.assertTrue(primeira.aprovar(self.gestor_atual))
+        data = MovimentacaoPessoal.objects.values_list('data_aprovacao_gestor_atual', flat=True).get(pk=self.mp.pk)
+
+        self.assertFalse(segunda.aprovar(self.gestor_atual))
+        self.mp.refresh_from_db()
+        self.assertEqual(self.mp.data_aprovacao_gestor_atual, data)
+        self.assertEqual(self.mp.status, 'pendente_gestores')
+
+    def test_aprovacao_final_efetiva_o_funcionario(self):
+        self._aprovar_gestores()
+        self.mp.refresh_from_db()
+        self.assertTrue(self.mp.aprovar_por(self.rh))
+        self.movido.refresh_from_db()
+        self.assertEqual(self.movido.setor_primario_id, self.compras.pk)
+
+    def test_view_nao_aprova_se_efetivar_falhar(self):
+        self._aprovar_gestores()
+        self.client.force_login(self.rh.usuario)
+        with mock.patch.object(MovimentacaoPessoal, 'efetivar', side_effect=RuntimeError('falhou')):
+            self.client.post(reverse('aprovar_mp', args=[self.mp.pk]))
+
+        self.mp.refresh_from_db()
+        self.assertEqual(self.mp.status, 'pendente_rh')
+        self.movido.refresh_from_db()
+        self.assertEqual(self.movido.setor_primario_id, self.vendas.pk)
+
+    def test_api_responde_409_se_ja_tratada_e_403_sem_permissao(self):
+        url = reverse('movimentacao-pessoal-aprovar', args=[self.mp.pk])
+        api = APIClient()
+
+        api.force_authenticate(self.solicitante.usuario)
+        self.assertEqual(api.post(url).status_code, 403)
+
+        api.force_authenticate(self.gestor_atual.usuario)
+        self.assertEqual(api.post(url).status_code, 200)
+        self.assertEqual(api.post(url).status_code, 409)
+
+        api.force_authenticate(self.solicitante.usuario)
+        self.assertEqual(api.post(url).status_code, 403)
+
+    def test_api_responde_409_se_perdeu_a_corrida(self):
+        self._aprovar_gestores()
+        url = reverse('movimentacao-pessoal-aprovar', args=[self.mp.pk])
+        api = APIClient()
+        api.force_authenticate(self.rh.usuario)
+        # Outra requisição aprova entre a leitura (pré-checagem) e o UPDATE condicional
+        aprovar_por = MovimentacaoPessoal.aprovar_por
+
+        def concorrente_antes(mp, aprovador):
+            MovimentacaoPessoal.objects.get(pk=mp.pk).rejeitar(self.rh, 'outra aba')
+            return aprovar_por(mp, aprovador)
+
+        with mock.patch.object(MovimentacaoPessoal, 'aprovar_por', concorrente_antes):
+            resposta = api.post(url)
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.data['status'], 'rejeitada')
+
+
+def _colunas_do_update(consultas, tabela):
+    """ Colunas do SET de cada UPDATE em `tabela` capturado. """
+    updates = [consulta['sql'] for consulta in consultas if consulta['sql'].startswith(f'UPDATE "{tabela}"')]
+    return [set(re.findall(r'"(\w+)" = ', sql.partition(' WHERE ')[0])) for sql in updates]
+
+
+class RastreiaAlteracoesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        coordenador = Cargo.objects.create(nome='COORDENADOR', nivel=3)
+        cls.analista = Cargo.objects.create(nome='ANALISTA', nivel=5)
+        cls.vendas = Setor.objects.create(nome='VENDAS')
+        cls.compras = Setor.objects.create(nome='COMPRAS')
+        cls.gestor_vendas = Funcionario.objects.create(ra_nome='GESTOR_VENDAS', ra_mat='000001', cargo=coordenador,
+                                                       setor_primario=cls.vendas)
+        cls.gestor_compras = Funcionario.objects.create(ra_nome='GESTOR_COMPRAS', ra_mat='000002',
+                                                        cargo=coordenador, setor_primario=cls.compras)
+        cls.rh = Funcionario.objects.create(ra_nome='ANALISTA_RH', ra_mat='000003', cargo=cls.analista,
+                                            setor_primario=Setor.objects.create(nome='RECURSOS HUMANOS'))
+        cls.solicitante = Funcionario.objects.create(ra_nome='SOLICITANTE', ra_mat='000004', cargo=cls.analista,
+                                                     setor_primario=cls.vendas)
+
+    def setUp(self):
+        cache.clear()
+        self.rd = RequisicaoDesligamento.objects.create(
+            solicitante=self.solicitante, funcionario_desligado=self.solicitante, tipo_desligamento='empresa',
+            motivo='reducao_quadro', data_prevista_desligamento=date(2026, 1, 1), tipo_aviso='indenizado',
+            justificativa='Teste')
+        self.salvos = []
+        post_save.connect(self._registrar, sender=RequisicaoDesligamento)
+        self.addCleanup(post_save.disconnect, self._registrar, sender=RequisicaoDesligamento)
+
+    def _registrar(self, sender, instance, created, update_fields, **kwargs):
+        self.salvos.append((created, update_fields))
+
+    def test_save_grava_so_as_colunas_alteradas(self):
+        rd = RequisicaoDesligamento.objects.get(pk=self.rd.pk)
+        # Outra requisição muda uma coluna que esta instância não tocou
+        RequisicaoDesligamento.objects.filter(pk=rd.pk).update(observacao_rejeicao='De outra tela')
+
+        rd.justificativa = 'Revisada'
+        with CaptureQueriesContext(connection) as consultas:
+            rd.save()
+
+        self.assertEqual(_colunas_do_update(consultas, RequisicaoDesligamento._meta.db_table),
+                         [{'justificativa', 'atualizado_em'}])
+        self.assertEqual(self.salvos, [(False, frozenset({'justificativa', 'atualizado_em'}))])
+        rd.refresh_from_db()
+        self.assertEqual((rd.justificativa, rd.observacao_rejeicao), ('Revisada', 'De outra tela'))
+
+        # Sem alteração, só a auto_now
+        with CaptureQueriesContext(connection) as consultas:
+            rd.save()
+        self.assertEqual(_colunas_do_update(consultas, RequisicaoDesligamento._meta.db_table),
+                         [{'atualizado_em'}])
+
+    def test_save_do_funcionario_grava_so_as_colunas_alteradas(self):
+        funcionario = Funcionario.objects.get(pk=self.solicitante.pk)
+        funcionario.ra_nome = 'SOLICITANTE RENOMEADO'
+        with CaptureQueriesContext(connection) as consultas:
+            funcionario.save()
+        # hash_sra é zerado em toda edição fora da importação (ver Funcionario.save)
+        self.assertEqual(_colunas_do_update(consultas, Funcionario._meta.db_table),
+                         [{'ra_nome', 'hash_sra', 'atualizado_em'}])
+
+    def test_update_fields_explicito_continua_no_controle(self):
+        rd = RequisicaoDesligamento.objects.get(pk=self.rd.pk)
+        rd.justificativa = 'Revisada'
+        rd.observacao_rejeicao = 'Fica de fora'
+        rd.save(update_fields=['justificativa'])
+
+        self.assertEqual(self.salvos, [(False, frozenset({'justificativa'}))])
+        rd.refresh_from_db()
+        self.assertEqual((rd.justificativa, rd.observacao_rejeicao), ('Revisada', None))
+
+    def test_expressoes_de_atualizar_se_sao_relidas_do_banco(self):
+        mp = MovimentacaoPessoal.objects.create(
+            solicitante=self.solicitante, funcionario_movido=self.solicitante, cargo_proposto=self.analista,
+            setor_proposto=self.compras, data_efetiva=date(2026, 1, 1), justificativa='Teste')
+        mp = MovimentacaoPessoal.objects.get(pk=mp.pk)
+        self.assertTrue(mp.aprovar(self.gestor_vendas))
+        # status e aprovador_rh_id são Case(...) no UPDATE: a instância guarda o valor gravado
+        self.assertEqual((mp.status, mp.aprovador_rh_id), ('pendente_gestores', None))
+
+        self.assertTrue(mp.aprovar(self.gestor_compras))
+        self.assertEqual((mp.status, mp.aprovador_rh_id), ('pendente_rh', self.rh.pk))
+        self.assertEqual(mp.campos_alterados(), [])
+
+        rd = RequisicaoDesligamento.objects.get(pk=self.rd.pk)
+        self.assertTrue(rd.atualizar_se(Q(status='pendente_gestor'),
+                                        justificativa=Concat(F('justificativa'), Value(' revisada'))))
+        self.assertEqual(rd.justificativa, 'Teste revisada')
+        self.assertEqual(rd.campos_alterados(), [])
+
+    def test_atualizar_se_envia_post_save_com_os_campos_gravados(self):
+        rd = RequisicaoDesligamento.objects.get(pk=self.rd.pk)
+        self.assertTrue(rd.atualizar_se(Q(status='pendente_gestor'), observacao_rejeicao='Motivo'))
+        self.assertEqual(self.salvos, [(False, frozenset({'observacao_rejeicao', 'atualizado_em'}))])
+
+        # Condição que não vale mais: nada gravado, nenhum sinal
+        self.assertFalse(rd.atualizar_se(Q(status='aprovada'), observacao_rejeicao='Outro'))
+        self.assertEqual(len(self.salvos), 1)
+        rd.refresh_from_db()
+        self.assertEqual(rd.observacao_rejeicao, 'Motivo')
+
+
+# --- Aprovação em lote (aprovacao_lote.py) ---
+
+class AprovacaoEmLoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        coordenador = Cargo.objects.create(nome='COORDENADOR', nivel=3)
+        cls.analista = Cargo.objects.create(nome='ANALISTA', nivel=5)
+        rh = Setor.objects.create(nome='RECURSOS HUMANOS')
+        cls.vendas = Setor.objects.create(nome='VENDAS')
+        cls.compras = Setor.objects.create(nome='COMPRAS')
+
+        def funcionario(nome, cargo, setor):
+            usuario = User.objects.create_user(nome.lower(), password='senha')
+            return Funcionario.objects.create(ra_nome=nome, ra_mat=nome[:6], cargo=cargo, setor_primario=setor,
+                                              usuario=usuario)
+
+        cls.gestor_vendas = funcionario('GESTOR_VENDAS', coordenador, cls.vendas)
+        cls.gestor_compras = funcionario('GESTOR_COMPRAS', coordenador, cls.compras)
+        cls.rh = funcionario('ANALISTA_RH', cls.analista, rh)
+        cls.solicitante = funcionario('SOLICITANTE', cls.analista, cls.vendas)
+        cls.de_vendas = [funcionario(f'VEND{i}', cls.analista, cls.vendas) for i in range(2)]
+        cls.de_compras = funcionario('COMPRADOR', cls.analista, cls.compras)
+
+    def setUp(self):
+        cache.clear()
+
+    def _criar_rd(self, funcionario):
+        return RequisicaoDesligamento.objects.create(
+            solicitante=self.solicitante, funcionario_desligado=funcionario, tipo_desligamento='empresa',
+            motivo='reducao_quadro', data_prevista_desligamento=date(2026, 1, 1), tipo_aviso='indenizado',
+            justificativa='Teste')
+
+    def _criar_mp(self, funcionario):
+        return MovimentacaoPessoal.objects.create(
+            solicitante=self.solicitante, funcionario_movido=funcionario, cargo_proposto=self.analista,
+            setor_proposto=self.compras, data_efetiva=date(2026, 1, 1), justificativa='Teste')
+
+    def _rds_no_rh(self):
+        rds = [self._criar_rd(funcionario) for funcionario in self.de_vendas]
+        aprovar_em_lote(RequisicaoDesligamento, self.gestor_vendas, [rd.pk for rd in rds])
+        return rds
+
+    def test_so_as_elegiveis_sao_tratadas_na_ordem_recebida(self):
+        rd1, rd2 = [self._criar_rd(funcionario) for funcionario in self.de_vendas]
+        de_outro_gestor = self._criar_rd(self.de_compras)
+
+        resultados = aprovar_em_lote(RequisicaoDesligamento, self.gestor_vendas,
+                                     [rd1.pk, de_outro_gestor.pk, rd2.pk, 999999])
+
+        self.assertEqual([(r['id'], r['ok']) for r in resultados],
+                         [(rd1.pk, True), (de_outro_gestor.pk, False), (rd2.pk, True), (999999, False)])
+        self.assertEqual(resultados[0]['status'], 'pendente_rh')
+        self.assertEqual(resultados[1]['erro'], NAO_PENDENTE)
+        de_outro_gestor.refresh_from_db()
+        self.assertEqual(de_outro_gestor.status, 'pendente_gestor')
+
+    def test_mp_passa_ao_rh_depois_dos_dois_gestores(self):
+        mps = [self._criar_mp(funcionario) for funcionario in self.de_vendas]
+        ids = [mp.pk for mp in mps]
+
+        self.assertTrue(all(r['ok'] for r in aprovar_em_lote(MovimentacaoPessoal, self.gestor_vendas, ids)))
+        self.assertEqual(set(MovimentacaoPessoal.objects.filter(pk__in=ids).values_list('status', flat=True)),
+                         {'pendente_gestores'})
+        # O mesmo gestor não aprova a mesma etapa duas vezes
+        self.assertFalse(any(r['ok'] for r in aprovar_em_lote(MovimentacaoPessoal, self.gestor_vendas, ids)))
+
+        self.assertTrue(all(r['ok'] for r in aprovar_em_lote(MovimentacaoPessoal, self.gestor_compras, ids)))
+        for mp in MovimentacaoPessoal.objects.filter(pk__in=ids):
+            self.assertEqual((mp.status, mp.aprovador_rh_id), ('pendente_rh', self.rh.pk))
+            self.assertTrue(mp.gestor_atual_aprovou and mp.gestor_proposto_aprovou)
+
+    def test_aprovacao_final_de_rd_desliga_o_funcionario(self):
+        rds = self._rds_no_rh()
+
+        resultados = aprovar_em_lote(RequisicaoDesligamento, self.rh, [rd.pk for rd in rds])
+
+        self.assertEqual([r['status'] for r in resultados], ['aprovada', 'aprovada'])
+        self.assertFalse(Funcionario.objects.filter(pk__in=[f.pk for f in self.de_vendas], ativo=True).exists())
+
+    def test_efetivar_com_erro_falha_so_aquela_requisicao(self):
+        ok, com_erro = self._rds_no_rh()
+        efetivar = RequisicaoDesligamento.efetivar
+
+        def falha_em_uma(rd):
+            if rd.pk == com_erro.pk:
+                raise RuntimeError('falhou')
+            return efetivar(rd)
+
+        with mock.patch.object(RequisicaoDesligamento, 'efetivar', falha_em_uma):
+            resultados = aprovar_em_lote(RequisicaoDesligamento, self.rh, [ok.pk, com_erro.pk])
+
+        self.assertEqual(resultados[0], {'id': ok.pk, 'ok': True, 'status': 'aprovada'})
+        self.assertFalse(resultados[1]['ok'])
+        self.assertIn('falhou', resultados[1]['erro'])
+        com_erro.refresh_from_db()
+        self.assertEqual(com_erro.status, 'pendente_rh')
+        self.assertIn(com_erro.pk, [p['objeto_id'] for p in PendenciaAprovacao.ids_pendentes(
+            self.rh, PendenciaAprovacao.TIPO_RD)])
+        self.assertTrue(Funcionario.objects.get(pk=self.de_vendas[1].pk).ativo)
+        self.assertFalse(Funcionario.objects.get(pk=self.de_vendas[0].pk).ativo)
+
+    def test_rejeicao_em_lote(self):
+        rds = self._rds_no_rh()
+
+        resultados = rejeitar_em_lote(RequisicaoDesligamento, self.rh, [rd.pk for rd in rds], 'Sem verba')
+
+        self.assertEqual([r['status'] for r in resultados], ['rejeitada', 'rejeitada'])
+        self.assertEqual(set(RequisicaoDesligamento.objects.values_list('observacao_rejeicao', flat=True)),
+                         {'Sem verba'})
+        self.assertTrue(Funcionario.objects.get(pk=self.de_vendas[0].pk).ativo)
+
+    def test_lote_acima_do_limite_e_recusado(self):
+        rd = self._criar_rd(self.de_vendas[0])
+        ids = [rd.pk] + list(range(10**6, 10**6 + LIMITE_LOTE))
+
+        api = APIClient()
+        api.force_authenticate(self.gestor_vendas.usuario)
+        resposta = api.post(reverse('requisicao-desligamento-bulk-aprovar'), {'ids': ids}, format='json')
+        self.assertEqual(resposta.status_code, 400)
+
+        self.client.force_login(self.gestor_vendas.usuario)
+        self.client.post(reverse('lote_rds'), {'ids': ids})
+
+        rd.refresh_from_db()
+        self.assertEqual(rd.status, 'pendente_gestor')
+
+
+# --- Outbox de notificações (notificacoes.py) ---
+
+class NotificadorDeTeste(Notificador):
+    """ Canal que registra o que recebeu e, com `falhar`, recusa o lote todo. """
+    nome = 'teste'
+    falhar = False
+    recebidos = []
+
+    def enviar(self, mensagens):
+        if NotificadorDeTeste.falhar:
+            raise ConnectionError('canal fora do ar')
+        NotificadorDeTeste.recebidos.extend(m.evento.pk for m in mensagens)
+        return {}
+
+
+@override_settings(NOTIFICACOES_NOTIFICADORES=['hierarquia.notificacoes.NotificadorInApp',
+                                               'hierarquia.tests.NotificadorDeTeste'],
+                   NOTIFICACOES_MAX_TENTATIVAS=3)
+class NotificacoesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        coordenador = Cargo.objects.create(nome='COORDENADOR', nivel=3)
+        analista = Cargo.objects.create(nome='ANALISTA', nivel=5)
+        vendas = Setor.objects.create(nome='VENDAS')
+        cls.gestor = Funcionario.objects.create(ra_nome='GESTOR', ra_mat='000001', cargo=coordenador,
+                                                setor_primario=vendas)
+        cls.rh = Funcionario.objects.create(ra_nome='ANALISTA_RH', ra_mat='000002', cargo=analista,
+                                            setor_primario=Setor.objects.create(nome='RECURSOS HUMANOS'))
+        cls.solicitante = Funcionario.objects.create(ra_nome='SOLICITANTE', ra_mat='000003', cargo=analista,
+                                                     setor_primario=vendas)
+        cls.desligado = Funcionario.objects.create(ra_nome='DESLIGADO', ra_mat='000004', cargo=analista,
+                                                   setor_primario=vendas)
+
+    def setUp(self):
+        cache.clear()
+        notificadores.cache_clear()
+        self.addCleanup(notificadores.cache_clear)
+        NotificadorDeTeste.falhar = False
+        NotificadorDeTeste.recebidos = []
+
+    def _criar_rd(self):
+        return RequisicaoDesligamento.objects.create(
+            solicitante=self.solicitante, funcionario_desligado=self.desligado, tipo_desligamento='empresa',
+            motivo='reducao_quadro', data_prevista_desligamento=date(2026, 1, 1), tipo_aviso='indenizado',
+            justificativa='Teste')
+
+    def _eventos(self, rd):
+        return list(EventoNotificacao.objects.filter(objeto_id=rd.pk).order_by('pk')
+                                             .values_list('evento', 'destinatario_id'))
+
+    def _despachar(self):
+        EventoNotificacao.objects.filter(status=EventoNotificacao.STATUS_PENDENTE) \
+                                 .update(proxima_tentativa=timezone.now())
+        return despachar(reservar_lote('teste'))
+
+    def test_transicoes_gravam_um_evento_por_destinatario(self):
+        rd = self._criar_rd()
+        self.assertEqual(self._eventos(rd), [('pendente', self.gestor.pk)])
+
+        # Um save sem transição não grava evento
+        rd.justificativa = 'Outra'
+        rd.save()
+        self.assertEqual(len(self._eventos(rd)), 1)
+
+        self.assertTrue(rd.aprovar_por(self.gestor))
+        self.assertTrue(rd.aprovar_por(self.rh))
+        self.assertEqual(self._eventos(rd), [('pendente', self.gestor.pk), ('pendente', self.rh.pk),
+                                             ('aprovada', self.solicitante.pk)])
+
+    def test_falha_agenda_nova_tentativa_com_espera_crescente(self):
+        rd = self._criar_rd()
+        evento = EventoNotificacao.objects.get(objeto_id=rd.pk)
+        NotificadorDeTeste.falhar = True
+
+        esperas = []
+        for _ in range(2):
+            antes = timezone.now()
+            self.assertEqual(self._despachar(), (0, 1))
+            evento.refresh_from_db()
+            esperas.append(round((evento.proxima_tentativa - antes).total_seconds()))
+            self.assertEqual(evento.status, EventoNotificacao.STATUS_PENDENTE)
+            self.assertIn('canal fora do ar', evento.erro)
+        self.assertEqual(esperas, [ESPERA_NOVA_TENTATIVA, 2 * ESPERA_NOVA_TENTATIVA])
+
+        self.assertEqual(self._despachar(), (0, 1))
+        evento.refresh_from_db()
+        self.assertEqual((evento.status, evento.tentativas), (EventoNotificacao.STATUS_FALHOU, 3))
+        # Um evento que falhou de vez não volta a ser reservado
+        self.assertEqual(self._despachar(), (0, 0))
+
+    def test_nova_tentativa_nao_repete_o_canal_que_ja_entregou(self):
+        rd = self._criar_rd()
+        evento = EventoNotificacao.objects.get(objeto_id=rd.pk)
+        NotificadorDeTeste.falhar = True
+        self._despachar()
+        evento.refresh_from_db()
+        self.assertEqual(evento.canais_entregues, ['in_app'])
+
+        NotificadorDeTeste.falhar = False
+        with mock.patch.object(NotificadorInApp, 'enviar', return_value={}) as in_app:
+            self.assertEqual(self._despachar(), (1, 0))
+        in_app.assert_not_called()
+        self.assertEqual(NotificadorDeTeste.recebidos, [evento.pk])
+        evento.refresh_from_db()
+        self.assertEqual((evento.status, evento.canais_entregues),
+                         (EventoNotificacao.STATUS_ENVIADO, ['in_app', 'teste']))
+        self.assertEqual(Notificacao.objects.filter(evento=evento).count(), 1)
+
+    def test_pendente_ja_tratado_antes_do_envio_e_descartado(self):
+        rd = self._criar_rd()
+        rd.aprovar_por(self.gestor)
+        para_gestor, para_rh = EventoNotificacao.objects.filter(objeto_id=rd.pk).order_by('pk')
+
+        self.assertEqual(self._despachar(), (2, 0))
+
+        self.assertEqual(NotificadorDeTeste.recebidos, [para_rh.pk])
+        self.assertFalse(Notificacao.objects.filter(evento=para_gestor).exists())
+        para_gestor.refresh_from_db()
+        self.assertEqual(para_gestor.status, EventoNotificacao.STATUS_ENVIADO)
+
+    def test_worker_recupera_abandonados_durante_o_laco(self):
+        rd = self._criar_rd()
+        EventoNotificacao.objects.filter(objeto_id=rd.pk).update(status=EventoNotificacao.STATUS_ENVIANDO,
+                                                                 worker='caiu', reservado_em=timezone.now())
+        # Relógio que anda um intervalo de recuperação a cada volta; 2ª espera = Ctrl+C
+        relogio = itertools.count(0, ComandoWorker.intervalo_recuperacao)
+        recuperados = []
+
+        def recuperar(comando, minutos):
+            total = recuperar_abandonados(minutos=-1) if len(recuperados) == 1 else 0
+            recuperados.append(total)
+            return total
+
+        with mock.patch('hierarquia.management.commands._worker.time') as tempo, \
+                mock.patch('hierarquia.management.commands.despachar_notificacoes.Command.recuperar',
+                           recuperar):
+            tempo.monotonic.side_effect = lambda: next(relogio)
+            tempo.sleep.side_effect = [None, KeyboardInterrupt]
+            call_command('despachar_notificacoes', stdout=StringIO())
+
+        # Recuperou na partida e de novo com o worker já rodando
+        self.assertEqual(recuperados, [0, 1, 0])
+        self.assertEqual(EventoNotificacao.objects.get(objeto_id=rd.pk).status, EventoNotificacao.STATUS_ENVIADO)
+
+
+# --- Cache do Dashboard (dashboard.py / signals.py) ---
+
+class DashboardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        analista = Cargo.objects.create(nome='ANALISTA', nivel=5)
+        vendas = Setor.objects.create(nome='VENDAS')
+        compras = Setor.objects.create(nome='COMPRAS')
+        cls.solicitante = Funcionario.objects.create(ra_nome='SOLICITANTE', ra_mat='000001', cargo=analista,
+                                                     setor_primario=vendas)
+        cls.colega = Funcionario.objects.create(ra_nome='COLEGA', ra_mat='000002', cargo=analista,
+                                                setor_primario=vendas)
+        cls.de_compras = Funcionario.objects.create(ra_nome='COMPRADOR', ra_mat='000003', cargo=analista,
+                                                    setor_primario=compras)
+
+    def setUp(self):
+        cache.clear()
+        self.calculos = []
+
+    def _painel(self, funcionario):
+        def calcular():
+            self.calculos.append(funcionario.pk)
+            return {'de': funcionario.pk}
+        return dashboard.painel_em_cache('api', funcionario, calcular)
+
+    def _criar_rd(self):
+        return RequisicaoDesligamento.objects.create(
+            solicitante=self.solicitante, funcionario_desligado=self.colega, tipo_desligamento='empresa',
+            motivo='reducao_quadro', data_prevista_desligamento=date(2026, 1, 1), tipo_aviso='indenizado',
+            justificativa='Teste')
+
+    def test_requisicao_invalida_so_quem_ve_o_setor_do_solicitante_depois_do_commit(self):
+        for funcionario in (self.solicitante, self.colega, self.de_compras):
+            self._painel(funcionario)
+        self.assertEqual(len(self.calculos), 3)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._criar_rd()
+        # Antes do commit os painéis continuam valendo
+        self._painel(self.colega)
+        self.assertEqual(len(self.calculos), 3)
+
+        for callback in callbacks:
+            callback()
+        self.calculos.clear()
+        for funcionario in (self.solicitante, self.colega, self.de_compras):
+            self._painel(funcionario)
+        self.assertEqual(self.calculos, [self.solicitante.pk, self.colega.pk])
+
+    def test_setor_do_solicitante_vem_da_relacao_ja_carregada(self):
+        rd = self._criar_rd()
+        carregada = RequisicaoDesligamento.objects.select_related('solicitante').get(pk=rd.pk)
+        with self.assertNumQueries(0):
+            signals.invalidar_dashboard_requisicao(RequisicaoDesligamento, carregada)
+
+        sem_relacao = RequisicaoDesligamento.objects.get(pk=rd.pk)
+        with self.assertNumQueries(1):
+            signals.invalidar_dashboard_requisicao(RequisicaoDesligamento, sem_relacao)
+
+    def test_com_a_trava_ocupada_espera_o_painel_de_quem_calcula(self):
+        chave = f'dashboard:api:{self.colega.pk}'
+        cache.add(f'{chave}:trava', 1)
+
+        def outro_processo_grava(segundos):
+            versoes = dashboard._versoes(dashboard.etiquetas_funcionario(self.colega))
+            cache.set(chave, {'versoes': versoes, 'dados': {'de': 'outro'}})
+
+        with mock.patch('hierarquia.dashboard.time.sleep', side_effect=outro_processo_grava):
+            self.assertEqual(self._painel(self.colega), {'de': 'outro'})
+        self.assertEqual(self.calculos, [])
+
+    def test_trava_presa_calcula_sem_gravar(self):
+        chave = f'dashboard:api:{self.colega.pk}'
+        cache.add(f'{chave}:trava', 1)
+
+        with mock.patch('hierarquia.dashboard.time.sleep') as sleep:
+            self.assertEqual(self._painel(self.colega), {'de': self.colega.pk})
+        self.assertEqual(sleep.call_count, dashboard.TENTATIVAS_TRAVA)
+        self.assertIsNone(cache.get(chave))
+
+        cache.delete(f'{chave}:trava')
+        self._painel(self.colega)
+        self._painel(self.colega)
+        self.assertEqual(self.calculos, [self.colega.pk, self.colega.pk])
+
+
+# --- Stream da caixa de entrada (eventos_pendencias.py) ---
+
+class StreamPendenciasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        coordenador = Cargo.objects.create(nome='COORDENADOR', nivel=3)
+        analista = Cargo.objects.create(nome='ANALISTA', nivel=5)
+        vendas = Setor.objects.create(nome='VENDAS')
+        cls.gestor = Funcionario.objects.create(ra_nome='GESTOR', ra_mat='000001', cargo=coordenador,
+                                                setor_primario=vendas,
+                                                usuario=User.objects.create_user('gestor', password='senha'))
+        cls.rh = Funcionario.objects.create(ra_nome='ANALISTA_RH', ra_mat='000002', cargo=analista,
+                                            setor_primario=Setor.objects.create(nome='RECURSOS HUMANOS'))
+        cls.solicitante = Funcionario.objects.create(ra_nome='SOLICITANTE', ra_mat='000003', cargo=analista,
+                                                     setor_primario=vendas)
+        cls.sem_funcionario = User.objects.create_user('sem_funcionario', password='senha')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_consulta_so_traz_quem_esta_conectado_e_mudou_de_versao(self):
+        RequisicaoDesligamento.objects.create(
+            solicitante=self.solicitante, funcionario_desligado=self.solicitante, tipo_desligamento='empresa',
+            motivo='reducao_quadro', data_prevista_desligamento=date(2026, 1, 1), tipo_aviso='indenizado',
+            justificativa='Teste')
+        VersaoCaixaEntrada.incrementar([self.gestor.pk, self.rh.pk, self.solicitante.pk])
+
+        central = CentralPendencias()
+        central._desde = timezone.now() - MARGEM
+        # O RH já recebeu a versão 1; o solicitante mudou, mas não está conectado
+        central._versoes = {self.gestor.pk: 0, self.rh.pk: 1}
+
+        with self.assertNumQueries(2):
+            estados = central._consultar({self.gestor.pk, self.rh.pk})
+
+        self.assertEqual(estados, {self.gestor.pk: {'versao': 1, 'RP': 0, 'MP': 0, 'RD': 1, 'total': 1}})
+        # Sem alteração nova desde a última leitura: uma consulta e nada a acordar
+        central._versoes[self.gestor.pk] = 1
+        with self.assertNumQueries(1):
+            self.assertEqual(central._consultar({self.gestor.pk, self.rh.pk}), {})
+
+    def test_laco_acorda_so_as_conexoes_de_quem_mudou(self):
+        estado = montar_estado(2, {'RP': 1, 'MP': 0, 'RD': 0})
+
+        async def cenario():
+            central = CentralPendencias()
+            do_gestor = central.assinar(self.gestor.pk, 1)
+            do_rh = central.assinar(self.rh.pk, 1)
+            recebido = await asyncio.wait_for(do_gestor.get(), timeout=1)
+            vazia = do_rh.empty()
+            central.cancelar(self.gestor.pk, do_gestor)
+            central.cancelar(self.rh.pk, do_rh)
+            await asyncio.wait_for(central._tarefa, timeout=1)
+            return recebido, vazia, central._filas
+
+        with mock.patch.object(eventos_pendencias, 'INTERVALO', 0), \
+                mock.patch.object(CentralPendencias, '_consultar', return_value={self.gestor.pk: estado}):
+            recebido, vazia, filas = asyncio.run(cenario())
+
+        self.assertEqual(recebido, estado)
+        self.assertTrue(vazia)
+        self.assertEqual(filas, {})
+
+    def test_fora_do_asgi_responde_204(self):
+        self.client.force_login(self.gestor.usuario)
+        resposta = self.client.get(reverse('api-pendencias-stream'))
+        self.assertEqual(resposta.status_code, 204)
+
+    async def test_sem_sessao_nem_token_responde_401(self):
+        url = reverse('api-pendencias-stream')
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+        self.assertEqual((await self.async_client.get(url, headers={'Authorization': 'Token invalido'}))
+                         .status_code, 401)
+
+        token = await Token.objects.acreate(user=self.sem_funcionario)
+        resposta = await self.async_client.get(url, headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(resposta.status_code, 401)
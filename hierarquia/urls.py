@@ -48,6 +48,7 @@ urlpatterns = [
     path('rp/nova/', views.RequisicaoPessoalCreateView.as_view(), name='criar_rp'),
     path('rp/minhas/', views.MinhasRequisicoesListView.as_view(), name='minhas_rps'),
     path('rp/aprovar/', views.AprovarRequisicoesListView.as_view(), name='listar_rps_para_aprovar'),
+    path('rp/aprovar/lote/', views.acao_em_lote_view, {'tipo': 'rp'}, name='lote_rps'),
     path('rp/<int:pk>/', views.RequisicaoPessoalDetailView.as_view(), name='detalhar_rp'),
     path('rp/editar-rh/<int:pk>/', views.RequisicaoPessoalRHUpdateView.as_view(), name='editar_rp_rh'),
     path('rp/historico/', views.HistoricoRPListView.as_view(), name='historico_rps'),
@@ -62,6 +63,7 @@ urlpatterns = [
     path('mp/nova/', views.MovimentacaoPessoalCreateView.as_view(), name='criar_mp'),
     path('mp/minhas/', views.MinhasMovimentacoesListView.as_view(), name='minhas_mps'),
     path('mp/aprovar/', views.AprovarMovimentacoesListView.as_view(), name='listar_mps_para_aprovar'),
+    path('mp/aprovar/lote/', views.acao_em_lote_view, {'tipo': 'mp'}, name='lote_mps'),
     path('mp/<int:pk>/', views.MovimentacaoPessoalDetailView.as_view(), name='detalhar_mp'),
     path('mp/historico/', views.HistoricoMPListView.as_view(), name='historico_mps'),
     # Funções de ação MP
@@ -75,6 +77,7 @@ urlpatterns = [
     path('rd/nova/', views.RequisicaoDesligamentoCreateView.as_view(), name='criar_rd'),
     path('rd/minhas/', views.MinhasDesligamentosListView.as_view(), name='minhas_rds'),
     path('rd/aprovar/', views.AprovarDesligamentosListView.as_view(), name='listar_rds_para_aprovar'),
+    path('rd/aprovar/lote/', views.acao_em_lote_view, {'tipo': 'rd'}, name='lote_rds'),
     path('rd/<int:pk>/', views.RequisicaoDesligamentoDetailView.as_view(), name='detalhar_rd'),
     path('rd/historico/', views.HistoricoRDListView.as_view(), name='historico_rds'),
     # Funções de ação RD
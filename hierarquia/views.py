@@ -24,6 +24,7 @@ from .rh.rd.views_rd import (
     RequisicaoDesligamentoDetailView, aprovar_rd_view, rejeitar_rd_view,
     HistoricoRDListView, MinhasDesligamentosListView, AprovarDesligamentosListView
 )
+from .rh.lote.views_lote import acao_em_lote_view
 
 # Se o arquivo original views.py estava dentro de uma pasta 'rh',
 # esta importação pode precisar ser ajustada para refletir a estrutura do projeto.